@@ -1,19 +1,44 @@
 import gradio as gr
+import argparse
+import atexit
+import contextlib
 import logging
-import ollama
 import os
 import json
+import sys
+import threading
+import time
 from pathlib import Path
 from toolbox.Toolbox import Toolbox
 from agent.agent import Agent  # Import the Agent class from the agents module
+from agent.registry import AgentDescriptor, AgentRegistry
+from agent.personalities import PersonalityLoader
+from agent.router import AgentRouter, Route
+from llm.admission import AdmissionController
+from llm.backend import LLMBackend, create_backend, DEFAULT_OLLAMA_HOST
+from llm.budget import TokenBudgetPlanner
+from runtime.singleflight import SingleFlight
+from runtime.metrics import REGISTRY
+from runtime.profiling import PROFILER
+from runtime.logs import configure_logging
+from runtime.sessions import SessionStore
+from runtime.config_store import ConfigStore
+from runtime.memory import format_bytes, size_of
+from runtime.intro_cache import IntroCache
+from runtime.fanout import FanOutResult, fan_out
+from runtime.bus import MessageBus
+from runtime.http_api import ApiServer
+from runtime.batch import BatchRunner, completed_ids, read_items
+from runtime.workers import WorkerPool
+from runtime.transcript import TranscriptStore
 from agents.agents import AGENT_REBECCA  # Import the agents.py file to access the agent personality details.
 from datetime import date
-from typing import List, Dict, Optional, Tuple, Any, Union
+from typing import List, Dict, Optional, Tuple, Any, Union, Iterator
 from tools.Time_Keeper import TimeKeeper
 from tools.LLMVersionCheck import get_disruption_dates, get_llm_versions
 from tools.System_Status import get_system_metrics
 from tools.Browser_Search import browser
-from tools.List_Images import list_images, change_image
+from tools.List_Images import list_images, change_image, IMAGE_CATALOG
 from tools.Weather_Info import get_weather
 from tools.Calculator import calculate
 
@@ -37,17 +62,81 @@ DEFAULT_TOOLS = [
     calculate
 ]
 AGENT = AGENT_REBECCA
+# Configuration written when no config file exists yet
+DEFAULT_CONFIG = {
+    "username": USERNAME,
+    "default_model": MODELS[4],
+    "launch_gui": True,
+    "max_history": 1000,
+    "max_history_bytes": 1048576,
+    "max_transcript": 1000,
+    "transcript_window": 50,
+    "transcript_page": 50,
+    "transcript_dir": "cache/transcripts",
+    "temperature": 0.6,
+    "theme": "ocean",
+    "max_in_flight": 4,
+    "latency_target": 30.0,
+    "backend": "ollama",
+    "ollama_hosts": [DEFAULT_OLLAMA_HOST],
+    "hedge_percentile": 95,
+    "max_hedges": 2,
+    "openai_base_url": "http://localhost:8080/v1",
+    "openai_api_key": "",
+    "coalesce_window_ms": 0,
+    "coalesce_max_batch": 8,
+    "singleflight": True,
+    "metrics_port": 9464,
+    "log_level": "INFO",
+    "log_file": "",
+    "log_sampling": {},
+    "log_max_payload": 2000,
+    "max_context": 8192,
+    "response_tokens": 512,
+    "openai_slot_id": 0,
+    "resume_session": True,
+    "session_dir": "sessions",
+    "intro_cache_dir": "cache/intros",
+    "thumbnail_dir": "cache/thumbnails",
+    "thumbnail_size": [300, 400],
+    "max_live_agents": 64,
+    "max_live_memory": 134217728,
+    "personality_cache": "cache/personalities.pickle",
+    "personality_reload_interval": 0,
+    "fanout_concurrency": 4,
+    "bus_mailbox_size": 16,
+    "bus_llm_concurrency": 2,
+    "discussion_turns": 2,
+    "discussion_timeout": 120.0,
+    "auto_route": False,
+    "router_min_confidence": 0.15,
+    "router_llm_tiebreak": False,
+    "api_port": 0,
+    "api_host": "127.0.0.1",
+    "api_only": False,
+    "api_max_body": 65536,
+    "api_concurrency": 4,
+    "api_max_connections": 256,
+    "api_max_sessions": 256,
+    "api_drain_timeout": 30.0,
+    "batch_concurrency": 4,
+    "workers": 0,
+    "worker_threads": 4,
+    "config_flush_delay": 0.5,
+    "config_reload_interval": 2.0
+}
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging; records are written by a background thread, see runtime/logs.py
+configure_logging()
 logger = logging.getLogger(__name__)
 
-class Config:
+class Config(ConfigStore):
     """
     Manages application configuration with persistence.
+    
+    Reads come from an in-memory snapshot and set() returns at once; the file
+    is written atomically in the background and reloaded when edited, see
+    runtime/config_store.py.
     """
     
     def __init__(self, config_file: str = CONFIG_FILE):
@@ -57,102 +146,188 @@ class Config:
         Args:
             config_file: Path to the configuration file
         """
+        super().__init__(config_file, DEFAULT_CONFIG)
         self.config_file = config_file
-        self.config = self._load_config()
-        
-    def _load_config(self) -> Dict[str, Any]:
+        self.flush_delay = self.get("config_flush_delay", 0.5)
+        self.reload_interval = self.get("config_reload_interval", 2.0)
+        self.start()
+
+
+class CommunityOfAgents:
+    """
+    Manages a collection of Agent instances.
+    """
+
+    def __init__(self):
         """
-        Load configuration from file or create default.
-        
-        Returns:
-            Dictionary containing configuration
+        Initialize an empty community of agents.
         """
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
-            else:
-                # Default configuration
-                default_config = {
-                    "username": USERNAME,
-                    "default_model": MODELS[4],
-                    "launch_gui": True,
-                    "max_history": 1000,
-                    "temperature": 0.6,
-                    "theme": "ocean"
-                }
-                self._save_config(default_config)
-                return default_config
-        except Exception as e:
-            logger.error(f"Error loading configuration: {str(e)}")
-            # Return default config on error
-            return {
-                "username": USERNAME,
-                "default_model": MODELS[4],
-                "launch_gui": True,
-                "max_history": 1000,
-                "temperature": 0.6,
-                "theme": "ocean"
-            }
-    
-    def _save_config(self, config: Dict[str, Any]) -> None:
+        self.config = Config()
+        self._create_services()
+        # Personalities are indexed up front; Agent objects are built on first use and evicted past the cap
+        self.registry = AgentRegistry(
+            self.create_agent,
+            max_live=self.config.get("max_live_agents", 64),
+            on_evict=self.park_agent,
+            max_bytes=self.config.get("max_live_memory", 134217728),
+            size_of=lambda agent: agent.memory_bytes()
+        )
+        self.registry.register(AgentDescriptor.from_personality(AGENT_REBECCA, "agents.agents"))
+        # Messages are routed to the best matching agent from an index of missions, tools and personalities
+        self.router = AgentRouter(
+            {tool.__name__: tool.__doc__.strip() for tool in DEFAULT_TOOLS},
+            min_confidence=self.config.get("router_min_confidence", 0.15),
+            backend=self.llm_backend if self.config.get("router_llm_tiebreak", False) else None,
+            model=self.config.get("default_model", MODELS[4])
+        )
+        self.router_stale = True
+        # Personality files are validated once and compiled into a cache checked by mtime and hash
+        self.personality_loader = PersonalityLoader(
+            AGENT_PATH, self.config.get("personality_cache", "cache/personalities.pickle"))
+        logger.info(f"Personality files: {self.reload_agents()}")
+        reload_interval = self.config.get("personality_reload_interval", 0)
+        if reload_interval:
+            threading.Thread(target=self._watch_personalities, args=(reload_interval,),
+                             name="personality-reload", daemon=True).start()
+        REGISTRY.add_collector(self.collect_metrics)
+
+    def _create_services(self, backend: Optional[LLMBackend] = None) -> None:
         """
-        Save configuration to file.
+        Creates the services shared by the agents of this process.
         
         Args:
-            config: Configuration dictionary to save
+            backend: LLM backend to use, the configured one when None
         """
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=4)
-        except Exception as e:
-            logger.error(f"Error saving configuration: {str(e)}")
-    
-    def get(self, key: str, default: Any = None) -> Any:
+        # Shared by all agents so load shedding sees every in-flight LLM request
+        self.admission = AdmissionController(
+            MODELS,
+            max_in_flight=self.config.get("max_in_flight", 4),
+            latency_target=self.config.get("latency_target", 30.0)
+        )
+        # One backend for the whole community keeps connections, batching and load figures shared
+        self.llm_backend = backend or create_backend(self.config.get_all())
+        # Context lengths are looked up once per model and shared by all agents
+        self.budget_planner = TokenBudgetPlanner(
+            self.llm_backend,
+            max_context=self.config.get("max_context", 8192),
+            response_tokens=self.config.get("response_tokens", 512)
+        )
+        # Conversations and the server's context are saved here to resume after a restart
+        self.sessions = SessionStore(self.llm_backend, self.config.get("session_dir", "sessions"))
+        # Introductions are generated once per agent, model and day
+        self.intro_cache = IntroCache(self.config.get("intro_cache_dir", "cache/intros"))
+        # Identical tool and LLM calls running in different sessions are executed once
+        self.singleflight = SingleFlight() if self.config.get("singleflight", True) else None
+        # Agents talk to each other over bounded mailboxes; the bus caps concurrent agent turns
+        self.bus = MessageBus(
+            mailbox_size=self.config.get("bus_mailbox_size", 16),
+            llm_concurrency=self.config.get("bus_llm_concurrency", 2)
+        )
+
+    def after_fork(self, backend: Optional[LLMBackend] = None) -> None:
         """
-        Get configuration value.
+        Prepares the community for use in a forked worker process.
+        
+        The agent descriptors, compiled personalities and router index are kept
+        and stay shared with the parent until written. Connections and threads
+        don't survive a fork, so the backend and the services holding them are
+        created again, and the parent's loaded agents are dropped unsaved.
         
         Args:
-            key: Configuration key
-            default: Default value if key not found
-            
-        Returns:
-            Configuration value or default
+            backend: LLM backend for this process, the configured one when None
         """
-        return self.config.get(key, default)
-    
-    def set(self, key: str, value: Any) -> None:
+        self._create_services(backend)
+        if self.router.backend is not None:
+            self.router.backend = self.llm_backend
+        self.registry.drop_live()
+
+    def reload_agents(self) -> str:
         """
-        Set configuration value and save.
+        Picks up added, changed and removed personality files.
         
-        Args:
-            key: Configuration key
-            value: Configuration value
+        Returns:
+            Summary of the changes
         """
-        self.config[key] = value
-        self._save_config(self.config)
-    
-    def get_all(self) -> Dict[str, Any]:
+        changes = self.personality_loader.load()
+        self.registry.apply(changes)
+        self.router_stale = self.router_stale or bool(changes.updated or changes.removed)
+        return changes.describe()
+
+    def _watch_personalities(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                changes = self.personality_loader.load()
+                if changes.updated or changes.removed:
+                    self.registry.apply(changes)
+                    self.router_stale = True
+                    logger.info(f"Reloaded personality files: {changes.describe()}")
+            except Exception as e:
+                logger.error(f"Error reloading personality files: {str(e)}")
+
+    @property
+    def agents(self) -> List[Agent]:
+        """
+        The agents currently loaded in memory.
         """
-        Get all configuration values.
+        return list(self.registry.live.values())
+
+    def create_agent(self, personality: Dict[str, Any], username: Optional[str] = None) -> Agent:
+        """
+        Builds an agent for a personality with the community's shared services.
         
+        Args:
+            personality: Dictionary containing agent personality details
+            username: User the agent talks to, the configured username when None
+            
         Returns:
-            Dictionary containing all configuration
+            The new Agent instance
         """
-        return self.config.copy()
-
+        tools = DEFAULT_TOOLS
+        if "tools" in personality:
+            tools = [tool for tool in DEFAULT_TOOLS if tool.__name__ in personality["tools"]]
+        agent = Agent(personality, username or self.config.get("username", USERNAME),
+                      self.config.get("default_model", MODELS[4]), tools,
+                      temperature=self.config.get("temperature", 0.6), admission=self.admission,
+                      backend=self.llm_backend, singleflight=self.singleflight, planner=self.budget_planner,
+                      intro_cache=self.intro_cache, max_history=self.config.get("max_history", 1000),
+                      max_history_bytes=self.config.get("max_history_bytes", 1048576))
+        if self.config.get("resume_session", True) and os.path.exists(self.sessions.path(agent)):
+            logger.info(self.sessions.restore(agent))
+        return agent
 
-class CommunityOfAgents:
-    """
-    Manages a collection of Agent instances.
-    """
+    def park_agent(self, agent: Agent) -> None:
+        """
+        Saves the conversation of an agent that is evicted from memory so it resumes on the next use.
+        """
+        if self.config.get("resume_session", True) and agent.conversation_history.messages:
+            self.sessions.save(agent)
 
-    def __init__(self):
+    def collect_metrics(self) -> List[Tuple[str, str, Dict[str, str], float]]:
         """
-        Initialize an empty community of agents.
+        Reports community-wide load shedding and deduplication metrics for export.
+        
+        Returns:
+            List of (name, type, labels, value) tuples
         """
-        self.agents: List[Agent] = []
-        self.config = Config()
+        admission = self.admission.metrics()
+        metrics = [
+            ("coa_admission_in_flight", "gauge", {}, admission["in_flight"]),
+            ("coa_admission_level", "gauge", {}, admission["level"]),
+            ("coa_admission_p95_seconds", "gauge", {}, admission["p95_seconds"]),
+        ]
+        for counter in ("admitted", "rejected", "degraded_requests", "degrade_events", "recover_events"):
+            metrics.append((f"coa_admission_{counter}_total", "counter", {}, admission[counter]))
+        if self.singleflight:
+            for namespace, stats in self.singleflight.stats.items():
+                metrics.append(("coa_singleflight_calls_total", "counter", {"kind": namespace}, stats["calls"]))
+                metrics.append(("coa_singleflight_collapsed_total", "counter", {"kind": namespace}, stats["collapsed"]))
+        metrics.append(("coa_agents", "gauge", {}, len(self.registry)))
+        metrics.append(("coa_agents_live", "gauge", {}, len(self.registry.live)))
+        metrics.append(("coa_agent_hydrations_total", "counter", {}, self.registry.hydrations))
+        metrics.append(("coa_agent_evictions_total", "counter", {}, self.registry.evictions))
+        metrics.append(("coa_agents_live_bytes", "gauge", {}, self.registry.live_bytes()))
+        return metrics
 
     def list_agents(self) -> str:
         """
@@ -162,14 +337,15 @@ class CommunityOfAgents:
             String listing all available agents
         """
 
-        if self.agents:
-            return "\n".join([f"Agent available: {agent.first_name} {agent.last_name}" for agent in self.agents])
+        if self.registry.descriptors:
+            return "\n".join([f"Agent available: {descriptor.first_name} {descriptor.last_name}"
+                              for descriptor in self.registry.descriptors.values()])
         else:
             return "There are no local agents loaded."
 
     def add_agent(self, agent) -> str:
         """
-        Adds an agent to the community.
+        Adds an agent to the community. It stays in memory regardless of the live agent cap.
         
         Args:
             agent: The Agent instance to add
@@ -178,7 +354,8 @@ class CommunityOfAgents:
             Confirmation message
         """
 
-        self.agents.append(agent)
+        self.registry.add_live(agent)
+        self.router_stale = True
         return f"Agent {agent.first_name} {agent.last_name} added."
 
     def remove_agent(self, agent) -> str:
@@ -192,12 +369,113 @@ class CommunityOfAgents:
             Confirmation message
         """
 
-        self.agents.remove(agent)
+        self.registry.remove(agent.agent_id)
+        self.router_stale = True
         return f"Agent {agent.first_name} {agent.last_name} removed."
 
+    def route(self, message: str) -> Route:
+        """
+        Picks the agent that should answer a message, rebuilding the router index after agent changes.
+        
+        Args:
+            message: The incoming message, optionally with an @name mention
+            
+        Returns:
+            The routing decision
+        """
+        if self.router_stale:
+            self.router_stale = False
+            self.router.build(self._routing_personalities())
+        return self.router.route(message, self.registry.find_id)
+
+    def _routing_personalities(self) -> Iterator[Dict[str, Any]]:
+        for agent_id, descriptor in list(self.registry.descriptors.items()):
+            personality = descriptor.details()
+            if not personality:
+                # Added as a constructed agent; index what it was built with
+                agent = self.registry.live.get(agent_id)
+                if agent is None:
+                    continue
+                personality = {"agent_id": agent_id, "first_name": agent.first_name, "mission": agent.mission,
+                               "personality": agent.personality, "description": agent.description,
+                               "tools": [tool.__name__ for tool in agent.toolbox.toolbox]}
+            yield personality
+
+    def resolve_agents(self, names: str) -> Tuple[List[str], List[str]]:
+        """
+        Resolves "all" or a comma separated list of agent names or ids.
+        
+        Args:
+            names: "all" or e.g. "rebecca,00002"
+            
+        Returns:
+            Tuple of (agent ids, names that matched no agent)
+        """
+        if names.strip().lower() == "all":
+            return list(self.registry.descriptors), []
+        agent_ids, unknown = [], []
+        for name in filter(None, (part.strip() for part in names.split(","))):
+            agent_id = name if name in self.registry.descriptors else self.registry.find_id(name)
+            if agent_id is None:
+                unknown.append(name)
+            elif agent_id not in agent_ids:
+                agent_ids.append(agent_id)
+        return agent_ids, unknown
+
+    def broadcast(self, agent_ids: List[str], message: str) -> Iterator[FanOutResult]:
+        """
+        Sends one message to several agents concurrently.
+        
+        At most `fanout_concurrency` agents are loaded and answering at once;
+        tool results are shared between them for the duration of the broadcast.
+        Each agent answers on a scratch copy, so the broadcast doesn't end up
+        in its conversation with whoever talks to it next.
+        
+        Args:
+            agent_ids: Agents to ask
+            message: The user message
+            
+        Yields:
+            FanOutResult per agent, in the order the answers complete
+        """
+        def ask(agent_id: str) -> str:
+            agent = self.get_agent_by_id(agent_id)
+            if agent is None:
+                raise ValueError(f"Agent {agent_id} is not available")
+            # A group question doesn't open a conversation; no introduction and no history
+            return agent.scratch_copy().agent_response(message)
+
+        yield from fan_out(agent_ids, ask, max_concurrency=self.config.get("fanout_concurrency", 4))
+
+    def discuss(self, agent_ids: List[str], opener: str) -> str:
+        """
+        Lets agents discuss a message with each other over the message bus.
+        
+        Each agent answers at most `discussion_turns` times and the discussion
+        is cut off after `discussion_timeout` seconds. Agents take part through
+        scratch copies, so the discussion stays out of their conversations.
+        
+        Args:
+            agent_ids: Participating agents
+            opener: Message starting the discussion
+            
+        Returns:
+            The discussion transcript
+        """
+        agents = [agent.scratch_copy() for agent in map(self.get_agent_by_id, agent_ids) if agent is not None]
+        if len(agents) < 2:
+            return "A discussion needs at least two agents."
+        timeout = self.config.get("discussion_timeout", 120.0)
+        start = time.perf_counter()
+        transcript = self.bus.run(self.bus.discuss(agents, opener, max_turns=self.config.get("discussion_turns", 2),
+                                                   timeout=timeout), timeout + 30)
+        lines = [f"{message.name}>: {message.content}" for message in transcript[1:]]
+        lines.append(f"{len(transcript) - 1} messages from {len(agents)} agents in {time.perf_counter() - start:.1f}s")
+        return "\n\n".join(lines)
+
     def get_agent_by_id(self, agent_id: str) -> Optional[Agent]:
         """
-        Retrieves an agent by its ID.
+        Retrieves an agent by its ID, loading it on first use.
         
         Args:
             agent_id: The ID of the agent to retrieve
@@ -205,14 +483,11 @@ class CommunityOfAgents:
         Returns:
             The Agent instance or None if not found
         """
-        for agent in self.agents:
-            if agent.agent_id == agent_id:
-                return agent
-        return None
+        return self.registry.get(agent_id)
     
     def get_agent_by_name(self, first_name: str) -> Optional[Agent]:
         """
-        Retrieves an agent by its first name.
+        Retrieves an agent by its first name (case-insensitive), loading it on first use.
         
         Args:
             first_name: The first name of the agent to retrieve
@@ -220,10 +495,7 @@ class CommunityOfAgents:
         Returns:
             The Agent instance or None if not found
         """
-        for agent in self.agents:
-            if agent.first_name.lower() == first_name.lower():
-                return agent
-        return None
+        return self.registry.get_by_name(first_name)
 
 
 class Interface:
@@ -246,6 +518,14 @@ class Interface:
         self.config = community.config
         self.launch_gui = self.config.get("launch_gui", True)
         self.console_history: List[Dict[str, str]] = []
+        self.max_transcript = self.config.get("max_transcript", 1000)
+        # Chat transcripts of the web interface stay here; the browser only gets the latest entries
+        self.transcript_window = self.config.get("transcript_window", 50)
+        self.transcript_page = self.config.get("transcript_page", 50)
+        self.transcripts = TranscriptStore(self.config.get("transcript_dir", "cache/transcripts"), self.max_transcript)
+        # The avatar is served from a thumbnail of its display size rather than the full image
+        IMAGE_CATALOG.thumbnail_dir = self.config.get("thumbnail_dir", "cache/thumbnails")
+        IMAGE_CATALOG.thumbnail_size = tuple(self.config.get("thumbnail_size", [300, 400]))
 
     def command_interface(self, message: str, history: List[Dict[str, str]]) -> str:
         """
@@ -262,12 +542,18 @@ class Interface:
             # Handle commands (messages starting with !)
             if message == "!agent list":
                 return self.community.list_agents()
+            elif message == "!agent registry":
+                return self.community.registry.show_stats()
+            elif message == "!agent reload":
+                return self.community.reload_agents()
             elif message == "!quit" or message == "!bye":
                 return "Goodbye!"
             elif message == "!version":
                 return self.show_version()
             elif message == "!agent details":
-                return self.agent.show_agent_details()
+                return (f"{self.agent.show_agent_details()}\n"
+                        f"Transcript:      {len(history)}/{self.max_transcript} entries, "
+                        f"{format_bytes(size_of(history))}")
             elif message == "!agent history":
                 return self.agent.conversation_history.show_history()
             elif message == "!agent history clear":
@@ -286,9 +572,38 @@ class Interface:
                 return self.show_model()
             elif message == "!config":
                 return self.show_config()
+            elif message == "!admission":
+                return self.community.admission.show_metrics()
+            elif message == "!llm status":
+                return self.community.llm_backend.show_status()
+            elif message == "!stats":
+                return REGISTRY.show_stats()
+            elif message == "!stats reset":
+                REGISTRY.reset()
+                return "Statistics cleared."
+            elif message == "!session save":
+                return self.community.sessions.save(self.agent)
+            elif message == "!session restore":
+                return self.community.sessions.restore(self.agent)
+            elif message.startswith("!profile"):
+                return self.profile_command(message)
+            elif message.startswith("!ask"):
+                return "\n\n".join(self.ask_command(message))
+            elif message.startswith("!discuss"):
+                return self.discuss_command(message)
+            elif message == "!bus":
+                return self.community.bus.show_stats()
+            elif message.startswith("!route "):
+                return self.community.route(message[len("!route "):]).describe()
+            elif message == "!dedup":
+                if self.community.singleflight is None:
+                    return "Request deduplication is disabled."
+                return self.community.singleflight.show_stats()
             elif message == "!help":
                 return """Available Commands:
                 !agent list    - List all available agents
+                !agent registry - Show indexed and loaded agent counts
+                !agent reload  - Reload changed personality files
                 !agent details - Show details of the current agent
                 !agent history - Show conversation history
                 !agent history clear  - Clear conversation history
@@ -296,6 +611,21 @@ class Interface:
                 !agent tools   - List all available tools
                 !agent model   - Show current model information
                 !config        - Show current configuration
+                !admission     - Show load shedding metrics
+                !llm status    - Show LLM backend status
+                !dedup         - Show in-flight request deduplication stats
+                !stats         - Show per-stage turn latency statistics
+                !stats reset   - Clear turn latency statistics
+                !session save  - Save the conversation and model context
+                !session restore - Resume the saved conversation
+                !profile on [N] - Profile CPU and memory for the next N turns (default 5)
+                !profile off   - Stop profiling and save the results
+                !profile dump  - Save and show the collected profile
+                !ask all <msg> - Ask every agent at once
+                !ask a,b,c <msg> - Ask the listed agents (names or ids) at once
+                !discuss a,b,c <msg> - Let the listed agents discuss a message
+                !bus           - Show agent message bus statistics
+                !route <msg>   - Show which agent the router picks for a message
                 !version       - Show version
                 !quit or !bye  - Exit the application
                 !help          - Show this help message"""
@@ -325,20 +655,30 @@ class Interface:
                     break
                 
                 # Process the input
-                if user_input.startswith("!"):
+                if user_input.startswith("!ask"):
+                    # Print each agent's answer as soon as it arrives
+                    answers = []
+                    print("\nAgents:")
+                    for answer in self.ask_command(user_input):
+                        answers.append(answer)
+                        print(self.format_cli_output(answer))
+                    response = "\n\n".join(answers)
+                elif user_input.startswith("!"):
                     # Handle commands
                     response = self.command_interface(user_input, self.console_history)
                     print("\nSystem:")
                     print(self.format_cli_output(response))
                 else:
                     # Handle regular messages
-                    response = self.agent.agent_response(user_input)
+                    agent, user_message = self.target_agent(user_input)
+                    response = agent.agent_response(user_message)
                     print("\nAgent:")
                     print(self.format_cli_output(response))
                     
                 # Update console history
                 self.console_history.append({"role": "user", "content": user_input})
                 self.console_history.append({"role": "assistant", "content": response})
+                self.trim_transcript(self.console_history)
                     
             except KeyboardInterrupt:
                 print("\nExiting...")
@@ -347,6 +687,53 @@ class Interface:
                 logger.error(f"Error in CLI interface: {str(e)}")
                 print(f"\nAn error occurred: {str(e)}")
 
+    def batch_interface(self, path: str, output_path: Optional[str] = None, concurrency: Optional[int] = None,
+                        ordered: bool = True, agent_name: Optional[str] = None) -> int:
+        """
+        Answers the JSONL prompts in a file, or stdin for "-", and writes JSONL results.
+        
+        Results go to output_path, or stdout when None. Prompts already answered
+        in an existing output file are skipped, so an interrupted run resumes.
+        Progress is reported on stderr.
+        
+        Args:
+            path: Input file, "-" for stdin
+            output_path: Results file
+            concurrency: Prompts answered at once, `batch_concurrency` when None
+            ordered: Write results in input order instead of completion order
+            agent_name: Agent answering prompts that don't name one, the current agent when None
+            
+        Returns:
+            Exit status: 0 when every prompt was answered
+        """
+        try:
+            if path == "-":
+                items = read_items(sys.stdin)
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    items = read_items(f)
+            done = completed_ids(output_path) if output_path else set()
+        except OSError as e:
+            print(f"Error reading batch input: {str(e)}", file=sys.stderr)
+            return 2
+        runner = BatchRunner(self.community, self.agent.agent_id,
+                             concurrency=concurrency or self.config.get("batch_concurrency", 4), ordered=ordered,
+                             command=lambda command: self.command_interface(command, []))
+        try:
+            runner.default_agent_id = runner.resolve(agent_name)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+        output = open(output_path, "a", encoding="utf-8") if output_path else sys.stdout
+        try:
+            # Agents print their <think> sections; keep stdout for the results
+            with contextlib.redirect_stdout(sys.stderr):
+                summary = runner.run(items, output, done)
+        finally:
+            if output_path:
+                output.close()
+        print(f"Batch: {summary.describe()}", file=sys.stderr)
+        return 0 if not summary.errors and not summary.interrupted else 1
 
     def format_cli_output(self, text: str, width: int = 120) -> str:
         """
@@ -440,7 +827,7 @@ class Interface:
             with gr.Row():
                 # Left column for the image and agent info
                 with gr.Column(scale=1):
-                    agent_img = gr.Image(value=f"./images/{self.agent.first_name}.jpg", 
+                    agent_img = gr.Image(value=self.avatar_path(), 
                                         height=400, width=300, label="Agent Avatar")
                     
                     with gr.Accordion("Agent Information", open=False):
@@ -453,6 +840,8 @@ class Interface:
                     with gr.Accordion("Available Commands", open=False):
                         gr.Markdown("""
                         - !agent list - List all available agents
+                        - !agent registry - Show indexed and loaded agent counts
+                        - !agent reload - Reload changed personality files
                         - !agent details - Show details of the current agent
                         - !agent history - Show conversation history
                         - !agent history clear - Clear conversation history
@@ -460,13 +849,30 @@ class Interface:
                         - !agent tools - List all available tools
                         - !agent model - Show current model information
                         - !config - Show current configuration
+                        - !admission - Show load shedding metrics
+                        - !llm status - Show LLM backend status
+                        - !dedup - Show in-flight request deduplication stats
+                        - !stats - Show per-stage turn latency statistics
+                        - !stats reset - Clear turn latency statistics
+                        - !session save - Save the conversation and model context
+                        - !session restore - Resume the saved conversation
+                        - !profile on [N] - Profile CPU and memory for the next N turns (default 5)
+                        - !profile off - Stop profiling and save the results
+                        - !profile dump - Save and show the collected profile
+                        - !ask all <msg> - Ask every agent at once
+                        - !ask a,b,c <msg> - Ask the listed agents (names or ids) at once
+                        - !discuss a,b,c <msg> - Let the listed agents discuss a message
+                        - !bus - Show agent message bus statistics
+                        - !route <msg> - Show which agent the router picks for a message
                         - !version - Show version
                         - !help - Show this help message
                         """)
 
                 # Right column for chat components
                 with gr.Column(scale=3):
+                    older = gr.Button("Load older messages", visible=False, size="sm")
                     chatbot = gr.Chatbot(type="messages",height=600, show_label=False, container=True)
+                    shown = gr.State(self.transcript_window)
                     
                     with gr.Row():
                         msg = gr.Textbox(placeholder="Type a message...", show_label=False, container=True)
@@ -490,9 +896,12 @@ class Interface:
                         )
 
             # Set up event handlers
-            submit.click(fn=self.respond, inputs=[msg, chatbot], outputs=[msg, chatbot])
-            msg.submit(fn=self.respond, inputs=[msg, chatbot], outputs=[msg, chatbot])
-            clear.click(lambda: None, None, chatbot, queue=False)
+            # The transcript stays on the server: only the message goes up and the latest entries come back
+            submit.click(fn=self.respond_window, inputs=[msg], outputs=[msg, chatbot, older, shown])
+            msg.submit(fn=self.respond_window, inputs=[msg], outputs=[msg, chatbot, older, shown])
+            older.click(fn=self.load_older, inputs=[shown], outputs=[chatbot, older, shown])
+            clear.click(fn=self.clear_transcript, inputs=None, outputs=[chatbot, older, shown], queue=False)
+            interface.unload(self.close_transcript)
             
             # Model and temperature change handlers
             def update_model(model):
@@ -537,36 +946,226 @@ class Interface:
         try:
             if not message:
                 return "", history
-                
-            if message.startswith("!"):
-                # Handle commands
-                response = self.command_interface(message, history)
-                history.append({"role": "user", "content": message})
-                history.append({"role": "assistant", "content": response})
-                return "", history
-            else:
-                # Handle regular chat messages
-                response = self.agent.agent_response(message)
-                
-                # Check if response contains an image change request
-                if "change_image" in response and ".jpg" in response:
-                    # Extract image name from response
-                    import re
-                    match = re.search(r'([A-Za-z0-9_]+\.jpg)', response)
-                    if match:
-                        image_name = match.group(1)
-                        # Update the image in the UI (this will be handled by the frontend)
-                        logger.info(f"Image change requested: {image_name}")
-                
-                history.append({"role": "user", "content": message})
-                history.append({"role": "assistant", "content": response})
-                return "", history
+            response = self.answer(message, history)
+            history.append({"role": "user", "content": message})
+            history.append({"role": "assistant", "content": response})
+            return "", self.trim_transcript(history)
         except Exception as e:
             logger.error(f"Error in respond: {str(e)}")
             error_msg = f"Error processing your request: {str(e)}"
             history.append({"role": "user", "content": message})
             history.append({"role": "assistant", "content": error_msg})
-            return "", history
+            return "", self.trim_transcript(history)
+
+    def answer(self, message: str, history: List[Dict[str, str]]) -> str:
+        """
+        Returns the reply to a chat message or command.
+        
+        Args:
+            message: Current message from user
+            history: Chat history, passed on to commands
+            
+        Returns:
+            The command output or the agent's response
+        """
+        if message.startswith("!"):
+            return self.command_interface(message, history)
+        agent, user_message = self.target_agent(message)
+        response = agent.agent_response(user_message)
+        
+        # Check if response contains an image change request
+        if "change_image" in response and ".jpg" in response:
+            # Extract image name from response
+            import re
+            match = re.search(r'([A-Za-z0-9_]+\.jpg)', response)
+            if match:
+                image_name = match.group(1)
+                # Update the image in the UI (this will be handled by the frontend)
+                logger.info(f"Image change requested: {image_name}")
+        return response
+
+    def avatar_path(self) -> str:
+        """
+        Returns the path of the current agent's avatar thumbnail, or of its image if there is none.
+        """
+        image = f"{self.agent.first_name}.jpg"
+        return IMAGE_CATALOG.thumbnail(image) or f"./images/{image}"
+
+    def transcript_view(self, session_id: str, shown: int) -> Tuple[List[Dict[str, str]], Any]:
+        """
+        Returns the last `shown` entries of a session's transcript and the update of the "older" button.
+        """
+        start, entries = self.transcripts.get(session_id).tail(shown)
+        older = gr.update(visible=start > 0, value=f"Load older messages ({start} more)")
+        return entries, older
+
+    def respond_window(self, message: str, request: gr.Request) -> Iterator[Tuple[str, List[Dict[str, str]], Any, int]]:
+        """
+        Gradio handler that keeps the transcript on the server and sends only its latest entries.
+        
+        The browser uploads just the message, and every update carries the
+        last `transcript_window` entries, so its size doesn't depend on the
+        length of the conversation. The message is shown as soon as it is
+        received, !ask answers as they complete.
+        
+        Args:
+            message: Current message from user
+            request: The Gradio request, whose session hash identifies the transcript
+            
+        Yields:
+            tuple: (cleared message, transcript window, "older" button update, entries shown)
+        """
+        session_id = request.session_hash
+        transcript = self.transcripts.get(session_id)
+        shown = self.transcript_window
+        if not message:
+            yield "", *self.transcript_view(session_id, shown), shown
+            return
+        transcript.append("user", message)
+        yield "", *self.transcript_view(session_id, shown), shown
+        if message.startswith("!ask"):
+            for answer in self.ask_command(message):
+                transcript.append("assistant", answer)
+                yield "", *self.transcript_view(session_id, shown), shown
+            return
+        try:
+            response = self.answer(message, transcript.recent)
+        except Exception as e:
+            logger.error(f"Error in respond: {str(e)}")
+            response = f"Error processing your request: {str(e)}"
+        transcript.append("assistant", response)
+        yield "", *self.transcript_view(session_id, shown), shown
+
+    def load_older(self, shown: int, request: gr.Request) -> Tuple[List[Dict[str, str]], Any, int]:
+        """
+        Gradio handler that extends the chat window by one page of older entries.
+        """
+        shown = min(shown + self.transcript_page, len(self.transcripts.get(request.session_hash)))
+        return *self.transcript_view(request.session_hash, shown), shown
+
+    def clear_transcript(self, request: gr.Request) -> Tuple[List[Dict[str, str]], Any, int]:
+        self.transcripts.drop(request.session_hash)
+        return [], gr.update(visible=False), self.transcript_window
+
+    def close_transcript(self, request: gr.Request) -> None:
+        # Called when the browser tab is closed
+        self.transcripts.drop(request.session_hash)
+
+    def trim_transcript(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Drops the oldest chat entries beyond max_transcript, in place.
+        
+        The agents keep their own bounded history, so this only shortens what
+        the chat window shows.
+        
+        Args:
+            history: Chat history (list of dictionaries with 'role' and 'content' keys)
+            
+        Returns:
+            The same list
+        """
+        excess = len(history) - self.max_transcript
+        if self.max_transcript and excess > 0:
+            del history[:excess]
+        return history
+
+    def target_agent(self, message: str) -> Tuple[Agent, str]:
+        """
+        Chooses the agent that answers a chat message.
+        
+        An @name mention always picks that agent. With auto_route enabled the
+        router picks the best matching agent; otherwise the current agent answers.
+        
+        Args:
+            message: The chat message
+            
+        Returns:
+            Tuple of the agent and the message to send it
+        """
+        if "@" not in message and not self.config.get("auto_route", False):
+            return self.agent, message
+        route = self.community.route(message)
+        if route.method == "index" and not self.config.get("auto_route", False):
+            return self.agent, message
+        agent = self.community.get_agent_by_id(route.agent_id) if route.agent_id else None
+        if agent is None:
+            return self.agent, message
+        logger.debug(route.describe())
+        return agent, route.message
+
+    def ask_command(self, message: str) -> Iterator[str]:
+        """
+        Handles !ask all <msg> and !ask a,b,c <msg>, yielding each answer as it completes.
+        
+        Args:
+            message: The full command message
+            
+        Yields:
+            One line per agent answer or error, then a timing summary
+        """
+        parts = message.split(maxsplit=2)
+        if len(parts) < 3:
+            yield "Usage: !ask all <message> | !ask name1,name2 <message>"
+            return
+        agent_ids, unknown = self.community.resolve_agents(parts[1])
+        if unknown:
+            yield f"Unknown agents: {', '.join(unknown)}"
+        if not agent_ids:
+            return
+        start = time.perf_counter()
+        slowest = 0.0
+        for result in self.community.broadcast(agent_ids, parts[2]):
+            slowest = max(slowest, result.seconds)
+            if result.error:
+                yield f"{result.target}>: Error: {result.error}"
+            else:
+                yield result.response
+        yield (f"{len(agent_ids)} agents answered in {time.perf_counter() - start:.1f}s "
+               f"(slowest {slowest:.1f}s)")
+
+    def discuss_command(self, message: str) -> str:
+        """
+        Handles !discuss a,b,c <msg>.
+        
+        Args:
+            message: The full command message
+            
+        Returns:
+            The discussion transcript or a usage message
+        """
+        parts = message.split(maxsplit=2)
+        if len(parts) < 3:
+            return "Usage: !discuss name1,name2[,...] <message>"
+        agent_ids, unknown = self.community.resolve_agents(parts[1])
+        if unknown:
+            return f"Unknown agents: {', '.join(unknown)}"
+        return self.community.discuss(agent_ids, parts[2])
+
+    def profile_command(self, message: str) -> str:
+        """
+        Handles the !profile on [N], off and dump commands.
+        
+        Args:
+            message: The full command message
+            
+        Returns:
+            Status or report of the turn profiler
+        """
+        parts = message.split()
+        action = parts[1] if len(parts) > 1 else ""
+        if action == "on":
+            try:
+                turns = int(parts[2]) if len(parts) > 2 else 5
+            except ValueError:
+                return f"Invalid number of turns: {parts[2]}"
+            return PROFILER.start(turns)
+        elif action == "off":
+            return PROFILER.stop()
+        elif action == "dump":
+            return PROFILER.dump()
+        elif not action:
+            return PROFILER.status()
+        return "Usage: !profile on [turns] | off | dump"
 
     def show_version(self) -> str:
         """
@@ -585,7 +1184,7 @@ class Interface:
             String containing the model information
         """
         try:
-            return str(ollama.show(self.agent.model))
+            return str(self.agent.backend.show(self.agent.model))
         except Exception as e:
             logger.error(f"Error showing model: {str(e)}")
             return f"Error retrieving model information: {str(e)}"
@@ -602,6 +1201,14 @@ class Interface:
 
 
 if __name__== "__main__":
+    parser = argparse.ArgumentParser(description="Community of Agents")
+    parser.add_argument("--batch", metavar="FILE", help="Answer the JSONL prompts in FILE (- for stdin) and exit")
+    parser.add_argument("--output", metavar="FILE",
+                        help="Write batch results to FILE instead of stdout; an existing FILE is resumed")
+    parser.add_argument("--concurrency", type=int, help="Prompts answered at once (default: batch_concurrency)")
+    parser.add_argument("--order", choices=["input", "completion"], default="input", help="Order of the batch results")
+    parser.add_argument("--agent", help="Agent answering batch prompts that don't name one")
+    args = parser.parse_args()
     try:
         # Initialize the community of agents
         community = CommunityOfAgents()
@@ -611,18 +1218,82 @@ if __name__== "__main__":
         launch_gui = config.get("launch_gui", True)
         default_model = config.get("default_model", MODELS[4])
         temperature = config.get("temperature", 0.6)
+        configure_logging(
+            level=config.get("log_level", "INFO"),
+            jsonl_path=config.get("log_file") or None,
+            sampling=config.get("log_sampling", {}),
+            max_payload=config.get("log_max_payload", 2000)
+        )
         
         # Initialize the default agent with the specified personality and tools
-        agent = Agent(AGENT, USERNAME, default_model, DEFAULT_TOOLS, temperature=temperature)
+        agent = Agent(AGENT, USERNAME, default_model, DEFAULT_TOOLS, temperature=temperature,
+                      admission=community.admission, backend=community.llm_backend,
+                      singleflight=community.singleflight, planner=community.budget_planner,
+                      intro_cache=community.intro_cache, max_history=config.get("max_history", 1000),
+                      max_history_bytes=config.get("max_history_bytes", 1048576))
         
         # Add the agent to the community
         community.add_agent(agent)
         
+        # Resume the previous conversation and save it again on exit
+        if config.get("resume_session", True):
+            logger.info(community.sessions.restore(agent))
+            atexit.register(community.sessions.save, agent)
+        
         # Initialize the interface
         agent_interface = Interface(community, agent)
+        # Web chat transcripts only live as long as the process
+        atexit.register(agent_interface.transcripts.close)
+        
+        # Batch mode answers the prompts and exits without starting any server
+        if args.batch:
+            sys.exit(agent_interface.batch_interface(args.batch, args.output, args.concurrency,
+                                                     args.order == "input", args.agent))
         
-        # Start the interface
-        agent_interface.start_interface()
+        # Fork the session workers first, while this process runs no server threads
+        api_port = config.get("api_port", 0)
+        workers = None
+        if api_port and config.get("workers", 0):
+            workers = WorkerPool(
+                community,
+                workers=config.get("workers", 0),
+                threads=config.get("worker_threads", 4),
+                max_sessions=config.get("api_max_sessions", 256)
+            ).start()
+            atexit.register(workers.stop)
+        
+        # Generate today's introduction in the background so the first session gets it instantly
+        if not agent.intro_given:
+            community.intro_cache.warm([agent])
+        
+        # Export metrics in the Prometheus text format if a port is configured
+        metrics_port = config.get("metrics_port", 0)
+        if metrics_port:
+            REGISTRY.start_http_server(metrics_port)
+        
+        # Serve the HTTP API for other services if a port is configured; it drains on exit
+        if api_port:
+            api = ApiServer(
+                agent_interface,
+                host=config.get("api_host", "127.0.0.1"),
+                port=api_port,
+                max_body=config.get("api_max_body", 65536),
+                max_concurrency=config.get("api_concurrency", 4),
+                max_connections=config.get("api_max_connections", 256),
+                max_sessions=config.get("api_max_sessions", 256),
+                drain_timeout=config.get("api_drain_timeout", 30.0),
+                workers=workers
+            )
+            atexit.register(api.stop)
+        
+        if api_port and config.get("api_only", False):
+            # Headless: serve the API until SIGINT or SIGTERM
+            api.serve_forever()
+        else:
+            if api_port:
+                api.start()
+            # Start the interface
+            agent_interface.start_interface()
         
     except Exception as e:
         logger.error(f"Error starting application: {str(e)}")
@@ -1,14 +1,35 @@
+import copy
 import json
 import re
-import ollama
-from typing import List, Dict, Optional, Callable
+import sys
+import threading
+from typing import List, Dict, Optional, Callable, Tuple
 import logging
 from toolbox.Toolbox import Toolbox
+from llm.admission import AdmissionController, BUSY_MESSAGE
+from llm.backend import LLMBackend, create_backend
+from llm.budget import TokenBudget, TokenBudgetPlanner, estimate_tokens
+from runtime.singleflight import SingleFlight, make_key
+from runtime.metrics import REGISTRY
+from runtime.profiling import PROFILER
+from runtime.logs import Payload
+from runtime.intro_cache import IntroCache
+from runtime.memory import format_bytes, size_of
 import platform
+import time
 from datetime import date, datetime
 import textwrap
 
 logger = logging.getLogger(__name__)
+# Prompts, raw responses and tool output, so they can be sampled separately
+payload_logger = logging.getLogger(f"{__name__}.payload")
+
+
+class ReplyUnavailable(RuntimeError):
+    """
+    Raised by a strict turn instead of returning a busy or error reply.
+    """
+
 
 class Message:
     """
@@ -21,14 +42,22 @@ class Message:
         username (str): The name of the user
         agent_name (str): The name of the agent
         max_length (int): Maximum number of messages to store
+        max_bytes (int): Maximum bytes of messages to store, 0 for no limit
         messages (List[str]): List of messages in the conversation history
+        token_counts (List[int]): Estimated tokens of each message
+        bytes (int): Memory held by the messages
+        dropped (int): Messages removed to stay within the limits
     """
 
-    def __init__(self, username: str, agent_name: str, max_length: int):
+    def __init__(self, username: str, agent_name: str, max_length: int, max_bytes: int = 0):
         self.username = username
         self.agent_name = agent_name
         self.max_length = max_length
+        self.max_bytes = max_bytes
         self.messages = []
+        self.token_counts = []
+        self.bytes = 0
+        self.dropped = 0
 
     def update_history(self, user_input: str, agent_response: str) -> None:
         """
@@ -38,18 +67,80 @@ class Message:
             user_input: The user's message
             agent_response: The agent's response
         """
-        if len(self.messages) >= self.max_length:
-            self.messages.pop(0)  # Remove oldest message if max length exceeded
-        self.messages.append(f"{self.username}>: {user_input}")
-        self.messages.append(f"{self.agent_name}>: {agent_response}")
+        self._sync()
+        for entry in (f"{self.username}>: {user_input}", f"{self.agent_name}>: {agent_response}"):
+            self.messages.append(entry)
+            self.token_counts.append(estimate_tokens(entry) + 1)  # +1 for the joining newline
+            self.bytes += sys.getsizeof(entry)
+        self._trim()
+
+    def _sync(self) -> None:
+        if len(self.token_counts) != len(self.messages):
+            # The message list was replaced directly, e.g. by !agent history clear
+            self.token_counts = [estimate_tokens(entry) + 1 for entry in self.messages]
+            self.bytes = sum(sys.getsizeof(entry) for entry in self.messages)
+
+    def _trim(self) -> None:
+        """
+        Drops the oldest messages beyond max_length or max_bytes, keeping at least the last exchange.
+        """
+        excess = max(0, len(self.messages) - self.max_length)
+        if self.max_bytes:
+            size = self.bytes
+            for entry in self.messages[:excess]:
+                size -= sys.getsizeof(entry)
+            while size > self.max_bytes and len(self.messages) - excess > 2:
+                size -= sys.getsizeof(self.messages[excess])
+                excess += 1
+        if excess:
+            # One slice deletion instead of popping from the front entry by entry
+            self.bytes -= sum(sys.getsizeof(entry) for entry in self.messages[:excess])
+            del self.messages[:excess]
+            del self.token_counts[:excess]
+            self.dropped += excess
+
+    def load_history(self, messages: List[str]) -> None:
+        """
+        Replaces the history with saved messages, keeping the most recent max_length.
+        
+        Args:
+            messages: Formatted history entries as stored by update_history
+        """
+        self.messages = list(messages[-self.max_length:])
+        self.token_counts = [estimate_tokens(entry) + 1 for entry in self.messages]
+        self.bytes = sum(sys.getsizeof(entry) for entry in self.messages)
+        self._trim()
 
-    def show_history(self) -> str:
+    def fit(self, budget: int) -> Tuple[int, int]:
+        """
+        Counts how many of the most recent messages fit in a token budget.
+        
+        Args:
+            budget: Tokens available for the history
+            
+        Returns:
+            Tuple of (number of messages, tokens they use)
+        """
+        self._sync()
+        used = 0
+        for count, tokens in enumerate(reversed(self.token_counts)):
+            if used + tokens > budget:
+                return count, used
+            used += tokens
+        return len(self.token_counts), used
+
+    def show_history(self, limit: Optional[int] = None) -> str:
         """
         Returns the conversation history as a formatted string.
         
+        Args:
+            limit: Only return the most recent `limit` entries when set
+            
         Returns:
             String containing the conversation history
         """
+        if limit is not None:
+            return "\n".join(self.messages[-limit:]) if limit > 0 else ""
         return "\n".join(self.messages)
         
     def clear_message_history(self) -> str:
@@ -60,6 +151,8 @@ class Message:
             Confirmation message
         """
         self.messages = []
+        self.token_counts = []
+        self.bytes = 0
         return "Conversation history cleared."
 
 
@@ -90,9 +183,18 @@ class Agent:
         tools (List[callable]): List of tools available to the agent
         custom_tools (Dict): Dictionary of dynamically created tools
         conversation_history (List[str]): Record of conversation exchanges
+        admission (AdmissionController): Optional load shedding controller shared between agents
+        backend (LLMBackend): LLM backend used for chat requests
+        singleflight (SingleFlight): Optional deduplication of identical concurrent LLM and tool calls
+        planner (TokenBudgetPlanner): Optional context window planner sizing the history per model
+        budget (TokenBudget): Token allocation of the most recent prompt
+        intro_cache (IntroCache): Optional cache of introductions per agent, model and day
     """
 
-    def __init__(self, agent: dict, username: str, model: str, tools: List[callable], temperature: float = 0.6):
+    def __init__(self, agent: dict, username: str, model: str, tools: List[callable], temperature: float = 0.6,
+                 admission: Optional[AdmissionController] = None, backend: Optional[LLMBackend] = None,
+                 singleflight: Optional[SingleFlight] = None, planner: Optional[TokenBudgetPlanner] = None,
+                 intro_cache: Optional[IntroCache] = None, max_history: int = 1000, max_history_bytes: int = 0):
         """
         Initialize a new Agent instance.
         
@@ -102,9 +204,17 @@ class Agent:
             model: LLM model to use for generating responses
             tools: List of callable tools available to the agent
             temperature: Temperature setting for response generation (0.0-1.0)
+            admission: Optional admission controller used to shed or degrade LLM calls under load
+            backend: LLM backend, defaults to the local Ollama server
+            singleflight: Single-flight table shared between sessions, None disables deduplication
+            planner: Token budget planner, None keeps the full history up to MAX_HISTORY_LENGTH
+            intro_cache: Cache of generated introductions shared between sessions
+            max_history: Maximum conversation history entries
+            max_history_bytes: Maximum bytes of conversation history, 0 for no limit
         """
 
-        self.MAX_HISTORY_LENGTH = 1000  # Maximum conversation history entries
+        self.MAX_HISTORY_LENGTH = max_history  # Maximum conversation history entries
+        self.max_history_bytes = max_history_bytes
 
         # Agent personality attributes
         self.agent_id = agent["agent_id"]
@@ -122,14 +232,24 @@ class Agent:
         self.model = model
         self.temperature = temperature
         self.username = username
-        self.conversation_history = Message(self.username, self.first_name,self.MAX_HISTORY_LENGTH)
+        self.admission = admission
+        self.backend = backend or create_backend({})
+        self.singleflight = singleflight
+        self.planner = planner
+        self.intro_cache = intro_cache
+        self.budget: Optional[TokenBudget] = None
+        self.prompt_tokens: Optional[int] = None  # Tokens of the system prompt without tools and history
+        self.last_request = None  # (model, messages, options) of the last successful LLM call
+        self.conversation_history = Message(self.username, self.first_name, self.MAX_HISTORY_LENGTH,
+                                            max_history_bytes)
         #self.conversation_history = []  # Initialize conversation history as a list
 
         # Initialize tool system
         logger.debug(f"Initializing toolbox with {len(tools)} tools: [{tools}]")
-        self.toolbox = Toolbox(tools)
+        self.toolbox = Toolbox(tools, singleflight)
         self.custom_tools = {} # Storage for dynamically created tools
         self.tool_descriptions = self.toolbox.prepare_agent_tools()
+        self.tool_tokens = estimate_tokens(self.tool_descriptions)
 
         # System state
         self.intro_given = False
@@ -138,6 +258,9 @@ class Agent:
         self.introduction = (f"Introduce yourself to {self.username}. "
                            "Keep it short and describe how you can assist.")
         self.user_prompt = ""
+        # A turn keeps its prompts and last request in attributes, so turns of one agent run one at a time
+        # whoever calls them: the web chat, the HTTP API, !ask fan-out or the message bus
+        self.turn_lock = threading.RLock()
 
         #self.agent_introduction(self)
 
@@ -146,7 +269,7 @@ class Agent:
         Checks if the response contains a valid JSON object and extracts fields.
         """
         try:
-            logger.debug(f"Raw response before parsing: {response}")
+            payload_logger.debug("Raw response before parsing: %s", Payload(response))
             
             # Sanitize the response to escape invalid characters and fix unterminated strings
             sanitized_response = response.replace('\\"', '"')  # Unescape any escaped quotes
@@ -163,9 +286,9 @@ class Agent:
                 match = re.search(pattern, sanitized_response, re.DOTALL)
                 if match:
                     json_str = match.group(1).strip()
-                    logger.debug(f"Sanitized JSON string: {json_str}")
+                    payload_logger.debug("Sanitized JSON string: %s", Payload(json_str))
                     response_data = json.loads(json_str)  # Parse the JSON
-                    logger.debug(f"Parsed JSON data: {response_data}")
+                    payload_logger.debug("Parsed JSON data: %s", Payload(response_data))
                     return {
                         "tool_choice": response_data.get("tool_choice"),
                         "tool_input": response_data.get("tool_input"),
@@ -209,12 +332,12 @@ class Agent:
          
         try:
             # Extract the content from the message structure
-            logger.debug(f"Received agent_respose: {agent_response}")
+            payload_logger.debug("Received agent_response: %s", Payload(agent_response))
             tool_choice = agent_response.get('tool_choice')
             tool_input = agent_response.get('tool_input')
             agent_resp_text = agent_response.get('agent_response')
             
-            logger.debug(f"Extracted fields - tool: {tool_choice}, input: {tool_input}, response: {agent_resp_text}")
+            payload_logger.debug("Extracted fields - tool: %s, input: %s, response: %s", tool_choice, Payload(tool_input), Payload(agent_resp_text))
             if tool_choice == "None":
                 logger.debug("No tool choice found or explicitly no tool")
                 return {
@@ -224,7 +347,7 @@ class Agent:
                 }
             # Check if tool exists and execute it
             if self.toolbox.check_tool_exists(tool_choice):
-                logger.debug(f"Executing tool: {tool_choice}")
+                logger.debug("Executing tool: %s", tool_choice)
                 return self.toolbox.execute_tool(tool_choice, tool_input)
             # Tool wasn't found
             logger.warning(f"Tool not found: {tool_choice}")
@@ -243,10 +366,24 @@ class Agent:
         }
         
 
-    def update_system_prompt(self) -> None:
+    def update_system_prompt(self, history_limit: Optional[int] = None, model: Optional[str] = None) -> None:
         """
         Updates the system prompt with the description of the agent and includes the conversation history.
+        
+        Args:
+            history_limit: Only render the most recent `history_limit` history entries when set
+            model: Model the prompt is built for, defaults to the agent's model
         """
+        if self.planner:
+            if self.prompt_tokens is None and history_limit != 0:
+                # Render once without history to measure the fixed part of the prompt
+                self.update_system_prompt(0, model)
+            self.budget = self.planner.plan(model or self.model, self.prompt_tokens or 0, self.tool_tokens,
+                                            self.user_prompt, self.conversation_history)
+            if history_limit is None or history_limit > self.budget.history_entries:
+                history_limit = self.budget.history_entries
+        start = time.perf_counter()
+        history = self.conversation_history.show_history(history_limit)
         day_of_week = datetime.now().strftime('%A')
         date_today = date.today()
         self.system_prompt = textwrap.dedent(rf"""
@@ -314,9 +451,12 @@ class Agent:
         You will always read the conversation history below and remember the details so you can respond to the user with accurate information.
         The conversation history between {self.username} and {self.first_name} is below:
         <conversation_history>
-        {self.conversation_history.show_history()}
+        {history}
         </conversation_history>
         """)
+        if self.planner and not history:
+            self.prompt_tokens = estimate_tokens(self.system_prompt) - self.tool_tokens
+        REGISTRY.observe("coa_span_seconds", time.perf_counter() - start, span="prompt_build")
 
     def show_system_prompt(self) -> str: 
         """
@@ -327,104 +467,209 @@ class Agent:
         """
         return self.system_prompt    
 
-    def llm_response(self, model: str) -> dict:
+    def llm_response(self, model: str, stage: str = "first") -> dict:
         """
         Generates the agent response using the specified model.
         
         Args:
             model: The LLM model to use
+            stage: Which call of the turn this is, used to label latency metrics
             
         Returns:
             Dictionary containing the model's response
         """
+        ticket = None
+        if self.admission:
+            ticket = self.admission.admit(model)
+            if ticket is None:
+                return self.canned_response(BUSY_MESSAGE)
+            downgraded = ticket.model != model
+            if downgraded:
+                logger.info(f"Admission downgraded model {model} -> {ticket.model}")
+                model = ticket.model
+            if ticket.history_limit is not None or (downgraded and self.planner):
+                self.update_system_prompt(ticket.history_limit, model)
         try:
-            return ollama.chat(
-                model,
-                messages=[
-                    {'role': 'system', 'content': self.system_prompt},
-                    {'role': 'user', 'content': self.user_prompt}
-                ],
-                options={'temperature': self.temperature}
-            )
+            messages = [
+                {'role': 'system', 'content': self.system_prompt},
+                {'role': 'user', 'content': self.user_prompt}
+            ]
+            options = self.request_options(model)
+            with REGISTRY.span("llm", stage=stage):
+                if self.singleflight:
+                    # Sessions sending the exact same request at the same time share one LLM call
+                    key = make_key("llm", model, messages, options)
+                    response = self.singleflight.do(key, self.backend.chat, model, messages, options=options)
+                else:
+                    response = self.backend.chat(model, messages, options=options)
+            REGISTRY.record_llm(response, stage)
+            self.last_request = (model, messages, options)
+            return response
         except Exception as e:
             logger.error(f"Error generating agent response: {str(e)}")
-            return {
-                'message': {
-                    'content': f"```json\n{{\n\"tool_choice\": \"None\",\n\"tool_input\": \"None\",\n\"agent_response\": \"I'm sorry, I encountered an error: {str(e)}\"\n}}\n```"
-                }
+            return self.canned_response(f"I'm sorry, I encountered an error: {str(e)}")
+        finally:
+            if ticket:
+                self.admission.release(ticket)
+
+    def request_options(self, model: str) -> dict:
+        """
+        Builds the generation options sent with a request.
+        
+        Args:
+            model: The model the request goes to
+            
+        Returns:
+            Dictionary of generation options
+        """
+        options = {'temperature': self.temperature}
+        if self.budget and self.budget.model == model:
+            # Ask for the window the prompt was planned for instead of the server default
+            options['num_ctx'] = self.budget.context
+        return options
+
+    def canned_response(self, text: str) -> dict:
+        """
+        Wraps a fixed reply in the same shape as an LLM chat response.
+        
+        Args:
+            text: The text the agent should reply with
+            
+        Returns:
+            Dictionary mimicking the model's response
+        """
+        return {
+            'canned': True,
+            'text': text,
+            'message': {
+                'content': f"```json\n{{\n\"tool_choice\": \"None\",\n\"tool_input\": \"None\",\n\"agent_response\": \"{text}\"\n}}\n```"
             }
+        }
 
 
-    def agent_introduction(self) -> Optional[str]:
+    def generate_introduction(self) -> Optional[str]:
+        """
+        Asks the model for an introduction without touching the agent's conversation state.
+        
+        Returns:
+            The introduction text, or None if the LLM call failed
+        """
+        # An empty history keeps the prompt independent of the session
+        intro_agent = self.scratch_copy()
+        intro_agent.user_prompt = self.introduction
+        intro_agent.update_system_prompt()
+        response = intro_agent.llm_response(self.model, "introduction")
+        if response.get('canned'):
+            return None
+        parsed_response = self.check_json_response(response['message']['content'])
+        return parsed_response.get('agent_response')
+
+    def scratch_copy(self) -> "Agent":
+        """
+        Returns a copy of the agent with an empty conversation, for one-off questions.
+        
+        The copy shares the personality, tools and backend, but answering
+        through it leaves this agent's conversation, introduction state and
+        turn lock alone.
+        
+        Returns:
+            The copy, already introduced
+        """
+        scratch = copy.copy(self)
+        scratch.conversation_history = Message(self.username, self.first_name, self.MAX_HISTORY_LENGTH,
+                                               self.max_history_bytes)
+        scratch.turn_lock = threading.RLock()
+        scratch.intro_given = True
+        return scratch
+
+    def agent_introduction(self, blocking: bool = True) -> Optional[str]:
         """
         Provides the initial introduction by the agent.
         
+        Args:
+            blocking: Generate the introduction now if it isn't cached; otherwise it is
+                skipped for this session and generated in the background for later ones
+        
         Returns:
-            The agent's introduction message or None if already introduced
+            The agent's introduction message or None if already introduced or skipped
         """
         if not self.intro_given:
             self.intro_given = True
-            self.user_prompt = self.introduction
-            self.update_system_prompt()
-            response = self.llm_response(self.model)['message']['content']
-            parsed_response = self.check_json_response(response)
-            agent_resp_text = parsed_response.get('agent_response')
-            logger.debug(f"Agent introduction: {agent_resp_text}")
+            agent_resp_text = self.intro_cache.get(self) if self.intro_cache else None
+            if agent_resp_text is None:
+                if not blocking:
+                    if self.intro_cache:
+                        self.intro_cache.warm([self])
+                    return None
+                agent_resp_text = self.generate_introduction()
+                if agent_resp_text is None:
+                    agent_resp_text = "I'm sorry, I encountered an error while introducing myself."
+                elif self.intro_cache:
+                    self.intro_cache.put(self, agent_resp_text)
+            payload_logger.debug("Agent introduction: %s", Payload(agent_resp_text))
             self.conversation_history.update_history("", agent_resp_text)
             self.update_system_prompt()
-            logger.debug(f"Agent introduction: {agent_resp_text}")
             return f"{self.first_name}>: {agent_resp_text}"
         return None
 
-    def agent_response(self, user_input: str) -> str:
+    def agent_response(self, user_input: str, strict: bool = False) -> str:
         """
         Processes the user message and generates a response.
         
         Args:
             user_input: The user's message
+            strict: Raise ReplyUnavailable instead of replying that the model is busy or failed
             
         Returns:
             The agent's response
         """
-        # Handle introduction if needed
-        introduction = self.agent_introduction()
-        if introduction and not user_input:
-            return introduction
-        if not user_input:
-            logger.debug("No user input provided")
-            return f"{self.first_name}>: I'm waiting for your message."
+        with self.turn_lock, REGISTRY.span("turn"), PROFILER.turn():
+            # Handle introduction if needed; a real first message doesn't wait for one
+            introduction = self.agent_introduction(blocking=not user_input)
+            if introduction and not user_input:
+                return introduction
+            if not user_input:
+                logger.debug("No user input provided")
+                return f"{self.first_name}>: I'm waiting for your message."
+
+            # Update system prompt with latest conversation history
+            payload_logger.debug("Message history: %s", Payload(self.conversation_history.show_history))
+            self.user_prompt = user_input
+            self.update_system_prompt()
 
-        # Update system prompt with latest conversation history
-        logger.debug(f"message history {self.conversation_history}")
-        self.update_system_prompt()
-        self.user_prompt = user_input
-
-        # Get initial response
-        raw_response = self.llm_response(self.model)['message']['content']
-        logger.debug(f"Initial response: {raw_response}")
-
-        # Extract and log the <think> section
-        think_match = re.search(r"<think>(.*?)</think>", raw_response, re.DOTALL)
-        think_text = "None"
-        if think_match:
-            think_text = think_match.group(1).strip()
-            logger.debug(f"Think section: {think_text}")
-            print(f"Think: {think_text}")  # Print the <think> section for visibility
-
-        # Check for JSON response and extract fields
-        response = self.check_json_response(raw_response)
-        logger.debug(f"Checked response: {response}")
-
-        # Process tool usage if any
-        tool_response = self.choose_agent_tools(response)
-        logger.debug(f"Tool response: {tool_response}")
-
-        # Handle case where no tool is used   
-        if tool_response.get('tool_choice') == "None":
-            return self.handle_no_tool_response(user_input, tool_response)
-        else:
-            # Handle case where a tool is used
-            return self.handle_tool_response(user_input, tool_response)
+            # Get initial response
+            llm_reply = self.llm_response(self.model)
+            if llm_reply.get('canned'):
+                # Busy and error replies go to the user only; the model never said them
+                return self.canned_reply(llm_reply, strict)
+            raw_response = llm_reply['message']['content']
+            payload_logger.debug("Initial response: %s", Payload(raw_response))
+
+            # Extract and log the <think> section
+            with REGISTRY.span("think_parse"):
+                think_match = re.search(r"<think>(.*?)</think>", raw_response, re.DOTALL)
+            think_text = "None"
+            if think_match:
+                think_text = think_match.group(1).strip()
+                payload_logger.debug("Think section: %s", Payload(think_text))
+                print(f"Think: {think_text}")  # Print the <think> section for visibility
+
+            # Check for JSON response and extract fields
+            with REGISTRY.span("json_parse"):
+                response = self.check_json_response(raw_response)
+            payload_logger.debug("Checked response: %s", Payload(response))
+
+            # Process tool usage if any
+            with REGISTRY.span("tool_select"):
+                tool_response = self.choose_agent_tools(response)
+            payload_logger.debug("Tool response: %s", Payload(tool_response))
+
+            # Handle case where no tool is used   
+            if tool_response.get('tool_choice') == "None":
+                return self.handle_no_tool_response(user_input, tool_response)
+            else:
+                # Handle case where a tool is used
+                return self.handle_tool_response(user_input, tool_response, strict)
 
     
     def handle_no_tool_response(self, user_input: str, tool_response: dict) -> str:
@@ -439,17 +684,19 @@ class Agent:
             The agent's response
         """
         agent_response_text = tool_response.get('agent_response', "I'm not sure how to respond to that.")
-        self.conversation_history.update_history(user_input, agent_response_text)
+        with REGISTRY.span("history_update"):
+            self.conversation_history.update_history(user_input, agent_response_text)
         self.update_system_prompt()
         return f"{self.first_name}>: {agent_response_text}"
 
-    def handle_tool_response(self, user_input: str, tool_response: dict) -> str:
+    def handle_tool_response(self, user_input: str, tool_response: dict, strict: bool = False) -> str:
         """
         Handles the case where a tool is used in the response.
         
         Args:
             user_input: The user's message
             tool_response: The tool response dictionary
+            strict: Raise ReplyUnavailable instead of replying that the model is busy or failed
             
         Returns:
             The agent's response
@@ -457,19 +704,94 @@ class Agent:
         try:
             tool_choice = tool_response.get('tool_choice')
             tool_output = tool_response.get('tool_output', "No output")
-            logger.debug(f"Using tool: {tool_choice} with output: {tool_output}")
+            payload_logger.debug("Using tool: %s with output: %s", tool_choice, Payload(tool_output))
             self.user_prompt = f"I have used the {tool_choice} tool and the output of the tool is {tool_output}. Please respond to the user with this information."
             self.update_system_prompt()
-            response = self.llm_response(self.model)['message']['content']
-            agent_response=self.check_json_response(response)
+            llm_reply = self.llm_response(self.model, "tool_followup")
+            if llm_reply.get('canned'):
+                return self.canned_reply(llm_reply, strict)
+            response = llm_reply['message']['content']
+            with REGISTRY.span("json_parse"):
+                agent_response=self.check_json_response(response)
             agent_resp_text = agent_response.get('agent_response')
-            self.conversation_history.update_history(user_input, agent_resp_text)
+            with REGISTRY.span("history_update"):
+                self.conversation_history.update_history(user_input, agent_resp_text)
             self.update_system_prompt()
             return f"{self.first_name}>: {agent_resp_text}"
+        except ReplyUnavailable:
+            raise
         except Exception as e:
             logger.error(f"Error processing tool response: {str(e)}")
+            if strict:
+                raise ReplyUnavailable(str(e)) from e
             return f"I'm sorry, I encountered an error: {str(e)}"
 
+    def canned_reply(self, llm_reply: dict, strict: bool = False) -> str:
+        """
+        Turns a busy or error reply from llm_response into the agent's answer.
+        
+        Args:
+            llm_reply: A reply built by canned_response
+            strict: Raise ReplyUnavailable instead
+            
+        Returns:
+            The reply text prefixed with the agent's name
+        """
+        if strict:
+            raise ReplyUnavailable(llm_reply['text'])
+        return f"{self.first_name}>: {llm_reply['text']}"
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Returns the memory held by this agent's conversation state, in bytes and entries.
+
+        Covers the history, the cached prompts (the system and user prompt and
+        the last request kept for session saves) and the tool state (custom
+        tools and the rendered tool descriptions).
+        
+        Returns:
+            Dictionary of entry counts and byte sizes per kind of state
+        """
+        history = self.conversation_history
+        history._sync()
+        prompts = size_of(getattr(self, "system_prompt", None), self.user_prompt, self.last_request)
+        tools = size_of(self.custom_tools, self.toolbox.custom_tools, self.tool_descriptions)
+        return {
+            "history_entries": len(history.messages),
+            "history_bytes": history.bytes + sys.getsizeof(history.messages) + sys.getsizeof(history.token_counts),
+            "history_dropped": history.dropped,
+            "prompt_bytes": prompts,
+            "tool_entries": len(self.custom_tools) + len(self.toolbox.custom_tools),
+            "tool_bytes": tools,
+        }
+
+    def memory_bytes(self) -> int:
+        """
+        Returns the total memory held by this agent's conversation state.
+        
+        This is what the agent registry measures against `max_live_memory`.
+        
+        Returns:
+            Bytes held by the history, the cached prompts and the tool state
+        """
+        usage = self.memory_usage()
+        return usage["history_bytes"] + usage["prompt_bytes"] + usage["tool_bytes"]
+
+    def describe_memory(self) -> str:
+        """
+        Summarizes the memory held by this agent for the agent details.
+        
+        Returns:
+            String with the total and the history, prompt and tool shares
+        """
+        usage = self.memory_usage()
+        total = usage["history_bytes"] + usage["prompt_bytes"] + usage["tool_bytes"]
+        limit = f" of {format_bytes(self.max_history_bytes)}" if self.max_history_bytes else ""
+        return (f"{format_bytes(total)} (history {usage['history_entries']}/{self.MAX_HISTORY_LENGTH} entries, "
+                f"{format_bytes(usage['history_bytes'])}{limit}, {usage['history_dropped']} dropped; "
+                f"prompts {format_bytes(usage['prompt_bytes'])}; "
+                f"tools {usage['tool_entries']} custom, {format_bytes(usage['tool_bytes'])})")
+
     def show_agent_details(self) -> str:
         """
         Returns a formatted string with the agent's details.
@@ -489,6 +811,8 @@ class Agent:
             f"System Prompt:   {self.system_prompt}",
             f"User Prompt:     {self.user_prompt}",
             f"Temperature:     {self.temperature}",
-            f"Tools available: {len(self.toolbox) + len(self.custom_tools)}"
+            f"Token Budget:    {self.budget.describe() if self.budget else 'Not planned'}",
+            f"Tools available: {len(self.toolbox) + len(self.custom_tools)}",
+            f"Memory:          {self.describe_memory()}"
         ]
         return f"\n".join(details)
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.registry import AgentDescriptor
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+logger = logging.getLogger(__name__)
+
+PERSONALITY_CACHE = os.path.join("cache", "personalities.pickle")
+# Bump when the schema or the cache layout changes so old caches are rebuilt
+CACHE_VERSION = 1
+EXTENSIONS = (".json", ".toml")
+
+# Field -> (accepted types, required). Agent reads the required fields when it is constructed.
+SCHEMA: Dict[str, Tuple[tuple, bool]] = {
+    "agent_id": ((str, int), True),
+    "first_name": ((str,), True),
+    "last_name": ((str,), True),
+    "sex": ((str,), True),
+    "age": ((str, int), True),
+    "personality": ((str,), True),
+    "description": ((str,), True),
+    "mission": ((str,), True),
+    "city": ((str,), True),
+    "country": ((str,), True),
+    "nick_name": ((str,), False),
+    "handle": ((str,), False),
+    "hair": ((str,), False),
+    "e-mail": ((str,), False),
+    "friends": ((list,), False),
+    "data": ((dict,), False),
+    "create_date": ((str,), False),
+    "tools": ((list,), False),  # Tool names; all default tools when absent
+}
+
+
+def validate_personality(personality: Any) -> List[str]:
+    """
+    Checks a personality against SCHEMA.
+
+    Args:
+        personality: Parsed personality definition
+
+    Returns:
+        List of problems, empty when the personality is valid
+    """
+    if not isinstance(personality, dict):
+        return [f"expected a table of fields, got {type(personality).__name__}"]
+    errors = []
+    for name, (types, required) in SCHEMA.items():
+        if name not in personality:
+            if required:
+                errors.append(f"missing {name}")
+        elif not isinstance(personality[name], types):
+            errors.append(f"{name} must be {' or '.join(t.__name__ for t in types)}")
+    unknown = sorted(set(personality) - set(SCHEMA))
+    if unknown:
+        errors.append(f"unknown fields {', '.join(unknown)}")
+    return errors
+
+
+def normalize_personality(personality: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns a validated personality with ids and ages as strings, as in agents/agents.py.
+    """
+    normalized = dict(personality)
+    normalized["agent_id"] = str(normalized["agent_id"])
+    normalized["age"] = str(normalized["age"])
+    return normalized
+
+
+def parse_file(path: str, content: bytes) -> List[Any]:
+    """
+    Parses a JSON or TOML personality file into a list of personality definitions.
+
+    A JSON file holds one personality object or a list of them. A TOML file
+    holds the fields of one personality at the top level, or an `[[agents]]`
+    array of tables.
+    """
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ValueError("TOML personality files need Python 3.11 or newer")
+        data = tomllib.loads(content.decode("utf-8"))
+        return data["agents"] if isinstance(data.get("agents"), list) else [data]
+    data = json.loads(content)
+    return data if isinstance(data, list) else [data]
+
+
+@dataclass
+class CompiledFile:
+    """
+    Validated personalities of one file and the stamp used to detect changes.
+
+    Only the (agent_id, first_name, last_name) index is unpickled with the
+    cache; each full personality stays a pickled blob until its agent is
+    hydrated.
+    """
+    mtime_ns: int
+    size: int
+    sha256: str
+    index: List[Tuple[str, str, str]]
+    blobs: List[bytes]
+    errors: List[str] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, stat: os.stat_result, sha256: str, personalities: List[Dict[str, Any]],
+              errors: List[str]) -> "CompiledFile":
+        index = [(p["agent_id"], p["first_name"], p["last_name"]) for p in personalities]
+        blobs = [pickle.dumps(p, protocol=pickle.HIGHEST_PROTOCOL) for p in personalities]
+        return cls(stat.st_mtime_ns, stat.st_size, sha256, index, blobs, errors)
+
+    def descriptors(self, source: str) -> List[AgentDescriptor]:
+        return [AgentDescriptor(agent_id, first_name, last_name, partial(pickle.loads, blob), source)
+                for (agent_id, first_name, last_name), blob in zip(self.index, self.blobs)]
+
+
+@dataclass
+class PersonalityChanges:
+    """
+    Result of a (re)load: descriptors to (re)register and ids that disappeared.
+    """
+    updated: List[AgentDescriptor] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    parsed: int = 0
+    unchanged: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def describe(self) -> str:
+        summary = (f"{len(self.updated)} personalities updated, {len(self.removed)} removed "
+                   f"({self.parsed} files parsed, {self.unchanged} unchanged)")
+        if self.errors:
+            summary += "\n" + "\n".join(self.errors)
+        return summary
+
+
+class PersonalityLoader:
+    """
+    Loads a directory of JSON and TOML personality files through a compiled cache.
+
+    Each file is parsed and validated once. The validated personalities are
+    pickled to a cache together with every file's mtime, size and content
+    hash, so a later start only stats the files and unpickles the cache's
+    id and name index; full personalities are decoded when an agent is built. A
+    file whose mtime changed but whose content hash did not is not parsed
+    again. load() is incremental: after the first call it only reports the
+    personalities of files that were added, changed or removed.
+    """
+
+    def __init__(self, directory: str, cache_path: str = PERSONALITY_CACHE):
+        """
+        Initialize the loader and read the compiled cache.
+
+        Args:
+            directory: Directory holding the personality files
+            cache_path: Compiled cache file, empty to disable caching
+        """
+        self.directory = directory
+        self.cache_path = cache_path
+        self.files: Dict[str, CompiledFile] = {}
+        self.loaded: Dict[str, CompiledFile] = {}  # What the last load() reported to the caller
+        self._lock = threading.Lock()
+        self._read_cache()
+
+    def _read_cache(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == CACHE_VERSION and data.get("directory") == os.path.abspath(self.directory):
+                self.files = data["files"]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable personality cache {self.cache_path}: {str(e)}")
+
+    def _write_cache(self) -> None:
+        if not self.cache_path:
+            return
+        data = {"version": CACHE_VERSION, "directory": os.path.abspath(self.directory), "files": self.files}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.error(f"Error saving personality cache: {str(e)}")
+
+    def _compile(self, path: str, stat: os.stat_result, previous: Optional[CompiledFile]) -> Tuple[CompiledFile, bool]:
+        """
+        Returns the compiled file and whether it had to be parsed.
+        """
+        with open(path, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if previous and previous.sha256 == digest:
+            # Touched or copied without changes: keep the compiled result
+            return CompiledFile(stat.st_mtime_ns, stat.st_size, digest, previous.index, previous.blobs,
+                                previous.errors), False
+        personalities, errors = [], []
+        try:
+            entries = parse_file(path, content)
+        except Exception as e:
+            entries, errors = [], [f"{path}: {str(e)}"]
+        for index, entry in enumerate(entries):
+            problems = validate_personality(entry)
+            if problems:
+                errors.append(f"{path} entry {index + 1}: {'; '.join(problems)}")
+            else:
+                personalities.append(normalize_personality(entry))
+        return CompiledFile.build(stat, digest, personalities, errors), True
+
+    def load(self) -> PersonalityChanges:
+        """
+        Brings the loaded personalities up to date with the directory.
+
+        Returns:
+            PersonalityChanges with the personalities of new and changed files
+            and the ids no file defines any more
+        """
+        with self._lock:
+            changes = PersonalityChanges()
+            current: Dict[str, CompiledFile] = {}
+            dirty = False
+            paths = []
+            if os.path.isdir(self.directory):
+                with os.scandir(self.directory) as entries:
+                    paths = sorted((entry.path, entry.stat()) for entry in entries
+                                   if entry.is_file() and entry.name.endswith(EXTENSIONS))
+            for path, stat in paths:
+                compiled = self.files.get(path)
+                if compiled is None or compiled.mtime_ns != stat.st_mtime_ns or compiled.size != stat.st_size:
+                    try:
+                        compiled, parsed = self._compile(path, stat, compiled)
+                    except OSError as e:
+                        changes.errors.append(f"{path}: {str(e)}")
+                        continue
+                    changes.parsed += parsed
+                    dirty = True
+                current[path] = compiled
+                if self.loaded.get(path) is compiled or (path in self.loaded and self.loaded[path].sha256 == compiled.sha256):
+                    changes.unchanged += 1
+                    continue
+                changes.updated.extend(compiled.descriptors(path))
+                changes.errors.extend(compiled.errors)
+            dirty = dirty or set(current) != set(self.files)
+
+            defined = {entry[0] for compiled in current.values() for entry in compiled.index}
+            previous = {entry[0] for compiled in self.loaded.values() for entry in compiled.index}
+            changes.removed = sorted(previous - defined)
+            self.files = current
+            self.loaded = dict(current)
+            if dirty:
+                self._write_cache()
+            for error in changes.errors:
+                logger.warning(f"Invalid personality file: {error}")
+            return changes
@@ -0,0 +1,360 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from runtime.memory import format_bytes
+from runtime.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AgentDescriptor:
+    """
+    Lightweight record of a personality; the full Agent is only built when it is used.
+
+    `personality` is the personality dictionary or a callable returning it,
+    so compiled personalities are only decoded on hydration.
+    """
+    agent_id: str
+    first_name: str
+    last_name: str
+    personality: Union[Dict[str, Any], Callable[[], Dict[str, Any]]] = field(repr=False)
+    source: str = ""
+
+    @classmethod
+    def from_personality(cls, personality: Dict[str, Any], source: str = "") -> "AgentDescriptor":
+        return cls(str(personality["agent_id"]), personality["first_name"], personality.get("last_name", ""),
+                   personality, source)
+
+    def details(self) -> Dict[str, Any]:
+        return self.personality() if callable(self.personality) else self.personality
+
+
+class AgentRegistry:
+    """
+    Index of agent descriptors with lazily built, bounded live Agent objects.
+
+    Lookups by id and by case-folded first name are dictionary hits. Agents are
+    hydrated by the factory on first use and kept in LRU order; when more than
+    `max_live` are alive, the least recently used unpinned agent is evicted
+    (after the `on_evict` callback, which can persist its conversation).
+    Callbacks run after the registry lock is released, so saving a session
+    never holds up other lookups, and an agent in the middle of a turn (its
+    `turn_lock` held) is skipped until the turn is over.
+    With `max_bytes`, agents are also evicted while the live agents together
+    hold more than that many bytes, as measured by `size_of`. Each agent is
+    measured when it becomes live and again on each lookup, the only time
+    its conversation can have grown, so a lookup costs one measurement.
+    The factory runs outside the registry lock, once per id however many
+    callers ask for the agent at the same time.
+    """
+
+    def __init__(self, factory: Callable[[Dict[str, Any]], Any], max_live: int = 64,
+                 on_evict: Optional[Callable[[Any], None]] = None, max_bytes: int = 0,
+                 size_of: Optional[Callable[[Any], int]] = None):
+        """
+        Initialize an empty registry.
+
+        Args:
+            factory: Builds an Agent from a personality dictionary
+            max_live: Maximum number of hydrated agents kept in memory, 0 for no limit
+            on_evict: Called with an agent before it is dropped
+            max_bytes: Memory the live agents may hold together, 0 for no limit
+            size_of: Returns the bytes held by an agent; required for max_bytes
+        """
+        self.factory = factory
+        self.max_live = max_live
+        self.on_evict = on_evict
+        self.max_bytes = max_bytes if size_of else 0
+        self.size_of = size_of
+        self.descriptors: Dict[str, AgentDescriptor] = {}
+        self.by_name: Dict[str, List[str]] = {}
+        self.live: "OrderedDict[str, Any]" = OrderedDict()
+        self.sizes: Dict[str, int] = {}  # Bytes of each live agent when last measured
+        self.total_bytes = 0
+        self.pinned: set = set()
+        self.stale: set = set()  # Live agents whose descriptor was replaced during a turn
+        self.hydrations = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._hydrating = SingleFlight()
+        self._parking: Dict[str, threading.Event] = {}  # Dropped agents whose on_evict is running
+
+    def __len__(self) -> int:
+        return len(self.descriptors)
+
+    def register(self, descriptor: AgentDescriptor) -> None:
+        """
+        Adds or replaces a descriptor.
+
+        A live agent of a replaced descriptor is dropped through on_evict, so
+        its conversation is kept, and rebuilt from the new descriptor on next
+        use; one in the middle of a turn is dropped on its first use after the
+        turn. A pinned live agent stays until it is unpinned.
+        """
+        with self._lock:
+            victims = self._register(descriptor)
+        self._park(victims)
+
+    def _register(self, descriptor: AgentDescriptor) -> List[Any]:
+        victims = []
+        previous = self.descriptors.get(descriptor.agent_id)
+        if previous:
+            self._unindex(previous)
+            agent = self.live.get(descriptor.agent_id)
+            if descriptor.agent_id in self.pinned:
+                if agent is not None:
+                    logger.info(f"Agent {descriptor.agent_id} is pinned; its new definition applies once it is rebuilt")
+            elif agent is not None:
+                if self._claim(agent):
+                    victims.append(self._drop(descriptor.agent_id))
+                else:
+                    self.stale.add(descriptor.agent_id)
+        self.descriptors[descriptor.agent_id] = descriptor
+        self.by_name.setdefault(descriptor.first_name.casefold(), []).append(descriptor.agent_id)
+        return victims
+
+    def register_all(self, descriptors: Iterable[AgentDescriptor]) -> int:
+        count = 0
+        for descriptor in descriptors:
+            self.register(descriptor)
+            count += 1
+        return count
+
+    def apply(self, changes) -> None:
+        """
+        Applies a PersonalityChanges from the personality loader.
+
+        Changed personalities replace their descriptors, which drops any live
+        agent built from the old definition. Removed ids are dropped unless the
+        agent is pinned.
+        """
+        victims = []
+        with self._lock:
+            for descriptor in changes.updated:
+                victims += self._register(descriptor)
+            for agent_id in changes.removed:
+                if agent_id not in self.pinned:
+                    self.remove(agent_id)
+        self._park(victims)
+
+    def add_live(self, agent, pin: bool = True) -> None:
+        """
+        Registers an already constructed agent.
+
+        Args:
+            agent: The Agent instance
+            pin: Keep the agent in memory regardless of the cap
+        """
+        with self._lock:
+            if agent.agent_id not in self.descriptors:
+                self._register(AgentDescriptor(agent.agent_id, agent.first_name, agent.last_name, {}, "live"))
+            self.live[agent.agent_id] = agent
+            self.live.move_to_end(agent.agent_id)
+            self.stale.discard(agent.agent_id)
+            self._measure(agent.agent_id)
+            if pin:
+                self.pinned.add(agent.agent_id)
+            victims = self._evict(keep=agent.agent_id)
+        self._park(victims)
+
+    def remove(self, agent_id: str) -> Optional[AgentDescriptor]:
+        """
+        Removes an agent and its descriptor.
+        """
+        with self._lock:
+            descriptor = self.descriptors.pop(agent_id, None)
+            if descriptor:
+                self._unindex(descriptor)
+            self.live.pop(agent_id, None)
+            self._forget(agent_id)
+            self.pinned.discard(agent_id)
+            self.stale.discard(agent_id)
+            return descriptor
+
+    def drop_live(self) -> int:
+        """
+        Forgets every loaded agent without calling on_evict, e.g. in a forked process.
+
+        Returns:
+            int: Number of agents dropped
+        """
+        with self._lock:
+            dropped = len(self.live)
+            self.live.clear()
+            self.pinned.clear()
+            self.stale.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+        return dropped
+
+    def _unindex(self, descriptor: AgentDescriptor) -> None:
+        key = descriptor.first_name.casefold()
+        ids = self.by_name.get(key, [])
+        if descriptor.agent_id in ids:
+            ids.remove(descriptor.agent_id)
+        if not ids:
+            self.by_name.pop(key, None)
+
+    def get(self, agent_id: str):
+        """
+        Returns the agent with an id, hydrating it if needed.
+
+        Returns:
+            The Agent instance or None if the id is unknown
+        """
+        while True:
+            victims = []
+            with self._lock:
+                agent = self.live.get(agent_id)
+                if agent is not None and agent_id in self.stale and self._claim(agent):
+                    # Its descriptor was replaced during a turn; rebuild it from the new one
+                    victims.append(self._drop(agent_id))
+                    agent = None
+                if agent is not None:
+                    self.live.move_to_end(agent_id)
+                    if self.max_bytes:
+                        # Conversations grow while agents stay live, so the byte cap is checked on every use
+                        self._measure(agent_id)
+                        victims = self._evict(keep=agent_id)
+                descriptor = self.descriptors.get(agent_id)
+            self._park(victims)
+            if agent is not None:
+                return agent
+            if descriptor is None or not descriptor.personality:
+                return None
+            # Restoring a session can be slow; other lookups go on meanwhile
+            agent = self._hydrating.do(("agent", agent_id), self._hydrate, agent_id, descriptor)
+            if agent is not None:
+                return agent
+            # The descriptor was replaced while the agent was built; build it from the new one
+
+    def _hydrate(self, agent_id: str, descriptor: AgentDescriptor):
+        """
+        Builds an agent and makes it live, or returns None if its descriptor changed meanwhile.
+        """
+        with self._lock:
+            agent = self.live.get(agent_id)
+            if agent is not None:
+                # Built by a hydration that finished after the caller's lookup
+                return agent
+            parking = self._parking.get(agent_id)
+        if parking is not None:
+            # Its conversation is still being saved; restoring it now would miss the latest turns
+            parking.wait()
+        agent = self.factory(descriptor.details())
+        with self._lock:
+            if self.descriptors.get(agent_id) is not descriptor:
+                return None
+            existing = self.live.get(agent_id)
+            if existing is not None:
+                return existing
+            self.hydrations += 1
+            self.live[agent_id] = agent
+            self._measure(agent_id)
+            victims = self._evict(keep=agent_id)
+        self._park(victims)
+        return agent
+
+    def find_id(self, first_name: str) -> Optional[str]:
+        """
+        Returns the id of the first agent registered with a first name, ignoring case.
+        """
+        ids = self.by_name.get(first_name.casefold())
+        return ids[0] if ids else None
+
+    def get_by_name(self, first_name: str):
+        agent_id = self.find_id(first_name)
+        return self.get(agent_id) if agent_id else None
+
+    def live_bytes(self) -> int:
+        """
+        Measures every live agent again and returns the memory they hold, 0 without a size_of function.
+        """
+        if not self.size_of:
+            return 0
+        with self._lock:
+            for agent_id in self.live:
+                self._measure(agent_id)
+            return self.total_bytes
+
+    def _measure(self, agent_id: str) -> None:
+        if self.size_of:
+            size = self.size_of(self.live[agent_id])
+            self.total_bytes += size - self.sizes.get(agent_id, 0)
+            self.sizes[agent_id] = size
+
+    def _forget(self, agent_id: str) -> None:
+        self.total_bytes -= self.sizes.pop(agent_id, 0)
+
+    def _over_cap(self) -> bool:
+        return bool(self.max_live and len(self.live) > self.max_live or
+                    self.max_bytes and self.total_bytes > self.max_bytes)
+
+    def _evict(self, keep: Optional[str] = None) -> List[Any]:
+        """
+        Drops least recently used agents while over a cap; the caller passes them to _park() after unlocking.
+        """
+        victims = []
+        if not self._over_cap():
+            return victims
+        candidates = [agent_id for agent_id in self.live if agent_id not in self.pinned and agent_id != keep]
+        while candidates and self._over_cap():
+            agent_id = candidates.pop(0)
+            if not self._claim(self.live[agent_id]):
+                # Mid-turn; considered again by the next eviction once the turn is over
+                continue
+            victims.append(self._drop(agent_id))
+            self.evictions += 1
+        return victims
+
+    @staticmethod
+    def _claim(agent) -> bool:
+        """
+        Takes the turn lock of an agent about to be dropped, or returns False while one of its turns runs.
+        """
+        lock = getattr(agent, "turn_lock", None)
+        return lock is None or lock.acquire(blocking=False)
+
+    def _drop(self, agent_id: str):
+        """
+        Removes a claimed agent from the live agents; it is released by _park().
+        """
+        agent = self.live.pop(agent_id)
+        self._forget(agent_id)
+        self.stale.discard(agent_id)
+        self._parking.setdefault(agent_id, threading.Event())
+        return agent
+
+    def _park(self, victims: List[Any]) -> None:
+        """
+        Runs on_evict for dropped agents, outside the registry lock, and releases their turn locks.
+        """
+        for agent in victims:
+            try:
+                if self.on_evict:
+                    self.on_evict(agent)
+            except Exception as e:
+                logger.error(f"Error evicting agent {agent.agent_id}: {str(e)}")
+            finally:
+                lock = getattr(agent, "turn_lock", None)
+                if lock is not None:
+                    lock.release()
+                with self._lock:
+                    parking = self._parking.pop(agent.agent_id, None)
+                if parking is not None:
+                    parking.set()
+
+    def show_stats(self) -> str:
+        """
+        Returns the registry size, live agents and hydration counts.
+        """
+        memory = ""
+        if self.size_of:
+            memory = f", memory: {format_bytes(self.live_bytes())}"
+            memory += f" of {format_bytes(self.max_bytes)}" if self.max_bytes else ""
+        return (f"Agents known: {len(self.descriptors)}, live: {len(self.live)}/{self.max_live or 'unlimited'}, "
+                f"pinned: {len(self.pinned)}, hydrations: {self.hydrations}, evictions: {self.evictions}{memory}")
@@ -0,0 +1,239 @@
+import logging
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from llm.backend import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+|[+*/^%=]")
+MENTION_PATTERN = re.compile(r"(?<![\w@])@([\w.-]+)")
+STOPWORDS = frozenset("""
+a about all also am an and any are as at be been but by can could do does for from get give has have
+how i if in is it its me my of on or our please show so tell than that the their them then there
+these they this to up us was we what when where which who why will with would you your
+""".split())
+# Weight of each personality field in an agent's document
+FIELD_WEIGHTS = {"mission": 2.0, "tools": 1.5, "personality": 1.0, "description": 0.5}
+
+
+def terms(text: str) -> List[str]:
+    """
+    Splits text into lower-case routing terms without stopwords and plural endings.
+
+    Numbers and arithmetic operators become the terms "#num" and "#op", so a
+    bare expression still matches an agent whose tools take expressions.
+    """
+    result = []
+    for word in WORD_PATTERN.findall(text.lower()):
+        if word.isdigit():
+            word = "#num"
+        elif not word[0].isalnum():
+            word = "#op"
+        elif word in STOPWORDS:
+            continue
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        result.append(word)
+    return result
+
+
+@dataclass
+class Route:
+    """
+    Routing decision for one message.
+    """
+    agent_id: Optional[str]
+    message: str
+    score: float = 0.0
+    confidence: float = 0.0
+    method: str = "index"  # index, mention, llm or none
+    candidates: List[Tuple[str, float]] = field(default_factory=list)
+    micros: float = 0.0
+
+    def describe(self) -> str:
+        ranked = ", ".join(f"{agent_id} {score:.3f}" for agent_id, score in self.candidates)
+        return (f"Route: {self.agent_id or 'none'} via {self.method}, score {self.score:.3f}, "
+                f"confidence {self.confidence:.2f}, {self.micros:.0f} us (candidates: {ranked or 'none'})")
+
+
+class AgentRouter:
+    """
+    Picks the agent that should answer a message without calling the LLM.
+
+    Each agent's mission, tool descriptions, personality and description are
+    indexed as TF-IDF weighted, length normalised term vectors, stored as an
+    inverted index of NumPy arrays. Scoring a message gathers the postings of
+    its terms and sums them per agent with np.bincount, so the cost depends on
+    the message and the agents sharing its terms, not on a full matrix product.
+
+    An `@name` mention always wins. Confidence is the margin of the best agent
+    over the runner-up; below `min_confidence` the top candidates can be put
+    to the LLM as a tiebreak, if a backend and model are configured.
+    """
+
+    def __init__(self, tool_docs: Optional[Dict[str, str]] = None, min_confidence: float = 0.15,
+                 backend: Optional[LLMBackend] = None, model: Optional[str] = None, tiebreak_candidates: int = 3):
+        """
+        Initialize an empty router.
+
+        Args:
+            tool_docs: Tool name -> description, used to index the tools a personality lists
+            min_confidence: Confidence below which the LLM tiebreak is used
+            backend: Backend for the tiebreak, None disables it
+            model: Model for the tiebreak
+            tiebreak_candidates: Number of top agents offered to the tiebreak
+        """
+        self.tool_docs = tool_docs or {}
+        self.min_confidence = min_confidence
+        self.backend = backend
+        self.model = model
+        self.tiebreak_candidates = tiebreak_candidates
+        self.agent_ids: List[str] = []
+        self.summaries: Dict[str, str] = {}
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.postings_start = np.zeros(1, dtype=np.int64)
+        self.postings_agent = np.zeros(0, dtype=np.int32)
+        self.postings_weight = np.zeros(0, dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def document(self, personality: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Returns the weighted term counts of a personality.
+        """
+        tools = personality.get("tools")
+        if tools is None:
+            tools = list(self.tool_docs)
+        fields = {
+            "mission": personality.get("mission", ""),
+            "tools": " ".join(f"{name} {self.tool_docs.get(name, '')}" for name in tools),
+            "personality": personality.get("personality", ""),
+            "description": personality.get("description", ""),
+        }
+        counts: Dict[str, float] = {}
+        for name, text in fields.items():
+            for term in terms(text):
+                counts[term] = counts.get(term, 0.0) + FIELD_WEIGHTS[name]
+        return counts
+
+    def build(self, personalities: Iterable[Dict[str, Any]]) -> None:
+        """
+        Rebuilds the index from personality dictionaries.
+        """
+        agent_ids, summaries, documents = [], {}, []
+        document_frequency: Dict[str, int] = {}
+        for personality in personalities:
+            agent_id = str(personality["agent_id"])
+            counts = self.document(personality)
+            agent_ids.append(agent_id)
+            summaries[agent_id] = f"{personality.get('first_name', agent_id)}: {personality.get('mission', '')}"
+            documents.append(counts)
+            for term in counts:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+
+        total = len(documents)
+        vocabulary = {term: index for index, term in enumerate(sorted(document_frequency))}
+        idf = np.zeros(len(vocabulary), dtype=np.float32)
+        for term, index in vocabulary.items():
+            # Terms every agent has (e.g. shared tools) get no weight
+            idf[index] = math.log(total / document_frequency[term]) if total > 1 else 1.0
+        postings: List[List[Tuple[int, float]]] = [[] for _ in vocabulary]
+        for agent_index, counts in enumerate(documents):
+            weights = {term: (1 + math.log(count)) * idf[vocabulary[term]] for term, count in counts.items()}
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for term, weight in weights.items():
+                if weight > 0:
+                    postings[vocabulary[term]].append((agent_index, weight / norm))
+
+        start = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        start[1:] = np.cumsum([len(entries) for entries in postings])
+        flat = [entry for entries in postings for entry in entries]
+        with self._lock:
+            self.agent_ids = agent_ids
+            self.summaries = summaries
+            self.vocabulary = vocabulary
+            self.idf = idf
+            self.postings_start = start
+            self.postings_agent = np.fromiter((entry[0] for entry in flat), dtype=np.int32, count=len(flat))
+            self.postings_weight = np.fromiter((entry[1] for entry in flat), dtype=np.float32, count=len(flat))
+        logger.info(f"Router indexed {total} agents with {len(vocabulary)} terms")
+
+    def scores(self, message: str) -> np.ndarray:
+        """
+        Returns the similarity of a message to every indexed agent.
+        """
+        with self._lock:
+            indices = [self.vocabulary[term] for term in set(terms(message)) if term in self.vocabulary]
+            if not indices or not self.agent_ids:
+                return np.zeros(len(self.agent_ids), dtype=np.float32)
+            query = self.idf[indices]
+            norm = float(np.sqrt(np.dot(query, query))) or 1.0
+            slices = [slice(self.postings_start[i], self.postings_start[i + 1]) for i in indices]
+            agents = np.concatenate([self.postings_agent[s] for s in slices])
+            weights = np.concatenate([self.postings_weight[s] * (query[n] / norm) for n, s in enumerate(slices)])
+            return np.bincount(agents, weights=weights, minlength=len(self.agent_ids))
+
+    def route(self, message: str, resolve_name: Optional[Callable[[str], Optional[str]]] = None) -> Route:
+        """
+        Picks the agent for a message.
+
+        Args:
+            message: The incoming message
+            resolve_name: Maps an @name mention to an agent id
+
+        Returns:
+            Route with the chosen agent (None if nothing matched) and the message
+            to send, without the mention
+        """
+        start = time.perf_counter()
+        mention = MENTION_PATTERN.search(message)
+        if mention and resolve_name:
+            agent_id = resolve_name(mention.group(1))
+            if agent_id:
+                stripped = (message[:mention.start()] + message[mention.end():]).strip(" ,:")
+                return Route(agent_id, stripped or message, 1.0, 1.0, "mention",
+                             micros=(time.perf_counter() - start) * 1e6)
+
+        scores = self.scores(message)
+        if not len(scores) or not scores.max() > 0:
+            return Route(None, message, method="none", micros=(time.perf_counter() - start) * 1e6)
+        count = min(self.tiebreak_candidates, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        candidates = [(self.agent_ids[i], float(scores[i])) for i in top]
+        best = candidates[0][1]
+        runner_up = candidates[1][1] if len(candidates) > 1 else 0.0
+        route = Route(candidates[0][0], message, best, (best - runner_up) / best, "index", candidates)
+        if route.confidence < self.min_confidence and self.backend and self.model and len(candidates) > 1:
+            choice = self.tiebreak(message, [agent_id for agent_id, _ in candidates])
+            if choice:
+                route.agent_id, route.method = choice, "llm"
+        route.micros = (time.perf_counter() - start) * 1e6
+        return route
+
+    def tiebreak(self, message: str, agent_ids: List[str]) -> Optional[str]:
+        """
+        Asks the LLM which of a few agents should answer; None if the reply names none of them.
+        """
+        options = "\n".join(f"{number}. {self.summaries.get(agent_id, agent_id)}"
+                            for number, agent_id in enumerate(agent_ids, 1))
+        messages = [
+            {"role": "system", "content": "Pick the agent best suited to answer the user's message. "
+                                          "Reply with the number of the agent only."},
+            {"role": "user", "content": f"Agents:\n{options}\n\nMessage: {message}"},
+        ]
+        try:
+            reply = self.backend.chat(self.model, messages, options={"temperature": 0, "num_predict": 8})
+            number = re.search(r"\d+", reply["message"]["content"])
+            if number and 1 <= int(number.group()) <= len(agent_ids):
+                return agent_ids[int(number.group()) - 1]
+        except Exception as e:
+            logger.warning(f"Routing tiebreak failed: {str(e)}")
+        return None
@@ -0,0 +1,280 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Allow running as a script from the benchmarks directory as well as with `python -m`
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.agent import Agent
+from agents.agents import AGENT_REBECCA
+from benchmarks.fake_ollama import FakeOllamaServer
+from llm.ollama_backend import OllamaBackend
+from llm.pool import OllamaClientPool
+from toolbox.Toolbox import Toolbox
+from tools.Calculator import calculate
+from tools.LLMVersionCheck import get_disruption_dates
+from tools.List_Images import list_images, change_image
+from tools.Time_Keeper import TimeKeeper
+
+logger = logging.getLogger(__name__)
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+# Offline tools only, so results don't depend on the network
+BENCH_TOOLS = [TimeKeeper, calculate, list_images, change_image, get_disruption_dates]
+LENGTHS = [5, 25, 100]
+MIXES = {"chat": 0.0, "mixed": 0.34, "tools": 1.0}
+CHAT_PROMPTS = [
+    "tell me about night city, story {i}",
+    "what's your favourite piece of chrome? ({i})",
+    "any gigs for me today? #{i}",
+]
+TOOL_PROMPTS = [
+    "what time is it",
+    "calculate {i}*7+3",
+    "list the images you have",
+    "how long until the disruption",
+    "show image agent.jpg",
+]
+TOOL_CALLS = [
+    ("TimeKeeper", "None"),
+    ("calculate", "12*7+3"),
+    ("list_images", "None"),
+    ("change_image", "agent.jpg"),
+    ("get_disruption_dates", "None"),
+]
+# Metric -> (higher is better, relative tolerance before it counts as a regression)
+METRICS = {
+    "turns_per_sec": (True, 0.25),
+    "p50_ms": (False, 0.25),
+    "p99_ms": (False, 0.35),
+    "prompt_bytes": (False, 0.05),
+    "alloc_kib": (False, 0.25),
+}
+
+
+def conversation(length: int, tool_fraction: float) -> List[str]:
+    """
+    Builds a deterministic scripted conversation.
+
+    Args:
+        length: Number of user messages
+        tool_fraction: Share of messages that should trigger a tool
+
+    Returns:
+        List of user messages
+    """
+    messages = []
+    for i in range(length):
+        if int((i + 1) * tool_fraction) > int(i * tool_fraction):
+            messages.append(TOOL_PROMPTS[i % len(TOOL_PROMPTS)].format(i=i))
+        else:
+            messages.append(CHAT_PROMPTS[i % len(CHAT_PROMPTS)].format(i=i))
+    return messages
+
+
+def percentile(values: List[float], quantile: float) -> float:
+    """
+    Returns the nearest-rank percentile of a list of values.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(quantile * len(ordered))) - 1))]
+
+
+def measure(turns: List[Callable[[], object]]) -> Dict[str, float]:
+    """
+    Times a list of calls and then replays them under tracemalloc.
+
+    Args:
+        turns: Zero-argument callables, one per turn; called twice in total
+
+    Returns:
+        Dictionary with throughput, latency percentiles and allocation per turn
+    """
+    latencies = []
+    start = time.perf_counter()
+    for turn in turns:
+        turn_start = time.perf_counter()
+        turn()
+        latencies.append(time.perf_counter() - turn_start)
+    elapsed = time.perf_counter() - start
+    return {
+        "turns": len(turns),
+        "turns_per_sec": round(len(turns) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def measure_allocations(turns: List[Callable[[], object]]) -> float:
+    """
+    Returns the mean peak traced allocation per turn in KiB.
+    """
+    peaks = []
+    tracemalloc.start()
+    try:
+        for turn in turns:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            turn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return round(sum(peaks) / len(peaks) / 1024, 2)
+
+
+def make_agent(server: FakeOllamaServer) -> Agent:
+    """
+    Creates a fresh agent talking to the fake server.
+    """
+    backend = OllamaBackend(OllamaClientPool([server.url], hedge_percentile=None, health_interval=0))
+    return Agent(AGENT_REBECCA, "Bench", "fake:1b", BENCH_TOOLS, temperature=0.6, backend=backend)
+
+
+def bench_agent(server: FakeOllamaServer, messages: List[str]) -> Dict[str, float]:
+    """
+    Drives Agent.agent_response through a conversation.
+    """
+    agent = make_agent(server)
+    server.reset_stats()
+    result = measure([lambda m=m: agent.agent_response(m) for m in messages])
+    result["prompt_bytes"] = round(sum(server.prompt_bytes) / max(1, len(server.prompt_bytes)))
+    agent = make_agent(server)
+    result["alloc_kib"] = measure_allocations([lambda m=m: agent.agent_response(m) for m in messages])
+    return result
+
+
+def bench_interface(server: FakeOllamaServer, messages: List[str]) -> Dict[str, float]:
+    """
+    Drives Interface.respond (the Gradio handler) through a conversation.
+    """
+    # COA pulls in gradio, so only import it when this target is selected
+    from COA import CommunityOfAgents, Interface
+
+    def run() -> List[Callable[[], object]]:
+        community = CommunityOfAgents()
+        agent = make_agent(server)
+        community.add_agent(agent)
+        interface = Interface(community, agent)
+        history: List[Dict[str, str]] = []
+        return [lambda m=m: interface.respond(m, history) for m in messages]
+
+    server.reset_stats()
+    result = measure(run())
+    result["prompt_bytes"] = round(sum(server.prompt_bytes) / max(1, len(server.prompt_bytes)))
+    result["alloc_kib"] = measure_allocations(run())
+    return result
+
+
+def bench_toolbox(calls: int) -> Dict[str, float]:
+    """
+    Calls Toolbox.execute_tool directly with the offline tool mix.
+    """
+    toolbox = Toolbox(BENCH_TOOLS)
+    turns = [lambda c=TOOL_CALLS[i % len(TOOL_CALLS)]: toolbox.execute_tool(*c) for i in range(calls)]
+    result = measure(turns)
+    result["prompt_bytes"] = 0
+    result["alloc_kib"] = measure_allocations(turns)
+    return result
+
+
+def run_suite(targets: List[str], lengths: List[int], think: bool, malformed_every: int) -> Dict[str, Dict[str, float]]:
+    """
+    Runs every selected target over the conversation lengths and tool mixes.
+
+    Returns:
+        Mapping of scenario name to its results
+    """
+    results = {}
+    with FakeOllamaServer(think=think, malformed_every=malformed_every) as server:
+        for target in targets:
+            if target == "toolbox":
+                for calls in lengths:
+                    results[f"toolbox/calls={calls * 10}"] = bench_toolbox(calls * 10)
+                continue
+            runner = bench_agent if target == "agent" else bench_interface
+            for length in lengths:
+                for mix, fraction in MIXES.items():
+                    name = f"{target}/{mix}/turns={length}"
+                    # Agent prints <think> blocks; keep the report readable
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        results[name] = runner(server, conversation(length, fraction))
+                    print(f"  {name}: {results[name]['turns_per_sec']} turns/s", file=sys.stderr)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> List[str]:
+    """
+    Prints the results next to the baseline and returns the regressions found.
+    """
+    regressions = []
+    header = f"{'scenario':<34}" + "".join(f"{metric:>22}" for metric in METRICS)
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        cells = []
+        for metric, (higher_is_better, tolerance) in METRICS.items():
+            value = result.get(metric, 0)
+            base = baseline.get(name, {}).get(metric)
+            if not base:
+                cells.append(f"{value:>22}")
+                continue
+            change = (value - base) / base
+            worse = -change if higher_is_better else change
+            flag = "!" if worse > tolerance else " "
+            if worse > tolerance:
+                regressions.append(f"{name} {metric}: {base} -> {value} ({change:+.0%})")
+            cells.append(f"{f'{value} ({change:+.0%}){flag}':>22}")
+        print(f"{name:<34}" + "".join(cells))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks against a fake Ollama server.")
+    parser.add_argument("--targets", default="agent,toolbox,interface",
+                        help="Comma separated targets: agent, toolbox, interface")
+    parser.add_argument("--lengths", default=",".join(str(n) for n in LENGTHS),
+                        help="Comma separated conversation lengths")
+    parser.add_argument("--think", action="store_true", help="Add <think> blocks to every reply")
+    parser.add_argument("--malformed-every", type=int, default=7, help="Make every Nth reply malformed JSON (0 disables)")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="Baseline file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 on regressions")
+    parser.add_argument("--json", help="Write the raw results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    lengths = [int(n) for n in args.lengths.split(",")]
+    results = run_suite(targets, lengths, args.think, args.malformed_every)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=4)
+        print(f"\nBaseline saved to {args.baseline}")
+    if regressions:
+        print("\nRegressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1 if args.check else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import argparse
+import contextlib
+import io
+import logging
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+
+from benchmarks.loadgen import ApiTarget, GradioTarget, TraceRecord, run_closed_loop, summarize
+from llm.fake_backend import FakeBackend
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fake_interface(latency: float, session_dir: str):
+    """
+    Builds the application's community and interface on the fake backend.
+    """
+    # COA pulls in gradio and reads config.json, so only import it here
+    from COA import CommunityOfAgents, Interface, AGENT
+
+    community = CommunityOfAgents()
+    backend = FakeBackend(latency=latency)
+    community.llm_backend = community.budget_planner.backend = community.sessions.backend = backend
+    community.sessions.directory = session_dir
+    community.intro_cache = None
+    agent = community.get_agent_by_id(AGENT["agent_id"])
+    agent.intro_given = True
+    return Interface(community, agent), backend
+
+
+def run(send: Callable[[str, str], str], clients: int, requests: int) -> Dict[str, float]:
+    records = [TraceRecord(f"client{i}", f"Question {n} from client {i}")
+               for n in range(requests) for i in range(clients)]
+    report = run_closed_loop(send, records, clients)
+    result = summarize(report.outcomes)
+    result["rps"] = len(report.outcomes) / report.elapsed
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare chat throughput of the HTTP API and the Gradio app.")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per client")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake LLM reply")
+    parser.add_argument("--concurrency", type=int, default=4, help="API worker threads")
+    parser.add_argument("--skip-gradio", action="store_true", help="Only measure the HTTP API")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    from runtime.http_api import ApiServer
+
+    rows: Dict[str, Tuple[Dict[str, float], int]] = {}
+    with tempfile.TemporaryDirectory() as session_dir, contextlib.redirect_stdout(io.StringIO()):
+        interface, backend = fake_interface(args.latency, session_dir)
+        api = ApiServer(interface, port=0, max_concurrency=args.concurrency).start()
+        url = f"http://127.0.0.1:{api.port}"
+
+        # One shared agent, as in the Gradio app, then one session per client
+        agent_id = interface.agent.agent_id
+        shared = ApiTarget(url, agent=agent_id, sessions=False)
+        calls = len(backend.calls)
+        rows["api, shared agent"] = (run(shared.send, args.clients, args.requests), len(backend.calls) - calls)
+        sessions = ApiTarget(url, agent=agent_id)
+        calls = len(backend.calls)
+        rows["api, session per client"] = (run(sessions.send, args.clients, args.requests),
+                                           len(backend.calls) - calls)
+        api.stop()
+
+        gradio_error = None
+        if not args.skip_gradio:
+            try:
+                port = free_port()
+                app = interface.gradio_interface()
+                app.launch(server_port=port, prevent_thread_lock=True, quiet=True)
+            except Exception as e:
+                gradio_error = f"{type(e).__name__}: {str(e)}"
+            else:
+                gradio = GradioTarget(f"http://127.0.0.1:{port}/")
+                calls = len(backend.calls)
+                rows["gradio"] = (run(gradio.send, args.clients, args.requests), len(backend.calls) - calls)
+                app.close()
+
+    print(f"{args.clients} clients x {args.requests} requests, fake LLM latency {args.latency * 1000:.0f} ms")
+    print(f"{'target':<26}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'busy':>7}{'LLM calls':>11}")
+    for name, (result, llm_calls) in rows.items():
+        print(f"{name:<26}{result['rps']:>8.1f}{result['p50_s'] * 1000:>9.0f}{result['p99_s'] * 1000:>9.0f}"
+              f"{result['error_rate']:>8.1%}{result['busy_rate']:>7.1%}{llm_calls:>11}")
+    if gradio_error:
+        print(f"{'gradio':<26}could not start the app ({gradio_error})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
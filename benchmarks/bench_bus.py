@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.agent import Agent
+from agents.agents import AGENT_REBECCA
+from benchmarks.bench_agent import BENCH_TOOLS
+from llm.fake_backend import FakeBackend
+from runtime.bus import BusMessage, MessageBus
+
+
+def make_agents(count: int, backend: FakeBackend) -> List[Agent]:
+    agents = []
+    for i in range(count):
+        personality = dict(AGENT_REBECCA, agent_id=f"{i:05d}", first_name=f"Agent{i}")
+        agent = Agent(personality, "Bench", "fake:1b", BENCH_TOOLS, backend=backend)
+        agent.intro_given = True
+        agents.append(agent)
+    return agents
+
+
+async def pump(messages: int, subscribers: int, mailbox_size: int) -> tuple:
+    """
+    Publishes messages to subscribers that drain their mailboxes, without agents.
+
+    Returns:
+        Tuple of (messages delivered per second, dropped deliveries)
+    """
+    bus = MessageBus(mailbox_size=mailbox_size, put_timeout=0.5)
+    ids = [f"s{i}" for i in range(subscribers)]
+    for agent_id in ids:
+        bus.subscribe(agent_id, "pump")
+
+    async def drain(agent_id: str) -> None:
+        mailbox = bus.mailbox(agent_id, "pump")
+        while True:
+            await mailbox.get()
+
+    consumers = [asyncio.create_task(drain(agent_id)) for agent_id in ids]
+    start = time.perf_counter()
+    for i in range(messages):
+        await bus.publish(BusMessage("pump", "bench", f"message {i}"))
+    elapsed = time.perf_counter() - start
+    for consumer in consumers:
+        consumer.cancel()
+    return bus.stats["delivered"] / elapsed, bus.stats["dropped"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure agent message bus throughput with the fake backend.")
+    parser.add_argument("--agents", type=int, default=6, help="Agents in the discussion")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per agent")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per fake LLM reply")
+    parser.add_argument("--caps", default="1,2,4,8", help="Comma separated LLM concurrency caps")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Discussion timeout in seconds")
+    parser.add_argument("--messages", type=int, default=20000, help="Messages for the bus-only measurement")
+    args = parser.parse_args()
+
+    print(f"{'cap':>4}{'wall s':>10}{'turns':>8}{'turns/s':>10}{'ideal s':>10}{'timeouts':>10}{'dropped':>9}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = []
+        for cap in [int(value) for value in args.caps.split(",")]:
+            backend = FakeBackend(latency=args.latency)
+            agents = make_agents(args.agents, backend)
+            bus = MessageBus(llm_concurrency=cap)
+            start = time.perf_counter()
+            transcript = asyncio.run(bus.discuss(agents, "Which chrome is worth the eddies?",
+                                                 max_turns=args.turns, timeout=args.timeout))
+            elapsed = time.perf_counter() - start
+            turns = len(transcript) - 1
+            ideal = -(-turns // cap) * args.latency
+            rows.append((cap, elapsed, turns, turns / elapsed, ideal, bus.stats["timeouts"], bus.stats["dropped"]))
+    for cap, elapsed, turns, rate, ideal, timeouts, dropped in rows:
+        print(f"{cap:>4}{elapsed:>10.2f}{turns:>8}{rate:>10.1f}{ideal:>10.2f}{timeouts:>10}{dropped:>9}")
+
+    print()
+    print(f"{'bus only':<28}{'deliveries/s':>14}{'dropped':>9}")
+    for subscribers, mailbox_size in ((4, 16), (16, 16), (16, 1024)):
+        rate, dropped = asyncio.run(pump(args.messages, subscribers, mailbox_size))
+        print(f"{f'{subscribers} subscribers, mailbox {mailbox_size}':<28}{rate:>14.0f}{dropped:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
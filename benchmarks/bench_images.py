@@ -0,0 +1,98 @@
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from runtime.image_catalog import ImageCatalog
+from runtime.memory import format_bytes
+
+IMAGES = Path(__file__).resolve().parent.parent / "images"
+
+
+def walk_listing(directory: Path) -> str:
+    """
+    Lists a directory the way list_images did before the catalog: a Path and a stat per file, string concatenation.
+    """
+    image_files = [f for f in directory.iterdir() if f.is_file() and f.suffix.lower() in [".png", ".jpg", ".jpeg", ".gif"]]
+    result = "Available images:\n"
+    for image_file in image_files:
+        result += f"- {image_file.name}\n"
+    return result
+
+
+def catalog_listing(catalog: ImageCatalog) -> str:
+    names, _ = catalog.list("", 1, 50)
+    return "\n".join(["Available images:"] + [f"- {name}" for name in names]) + "\n"
+
+
+def timed(call: Callable[[], object], repeat: int) -> float:
+    """
+    Returns the mean milliseconds of `repeat` calls.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare image listing by directory walk and by catalog, and thumbnail sizes.")
+    parser.add_argument("--images", type=int, default=10000, help="Images in the synthetic library")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per measurement")
+    parser.add_argument("--avatar", default="Rebecca.jpg", help="Image of the images directory to make a thumbnail of")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as work:
+        library = Path(work) / "images"
+        library.mkdir()
+        for n in range(args.images):
+            (library / f"image{n:06d}{'.png' if n % 4 else '.jpg'}").touch()
+        for n in range(args.images // 10):
+            (library / f"notes{n:06d}.txt").touch()
+        catalog = ImageCatalog(str(library), os.path.join(work, "thumbnails"))
+
+        rows = [("directory walk", timed(lambda: walk_listing(library), args.repeat))]
+        start = time.perf_counter()
+        catalog.refresh()
+        rows.append(("catalog, first scan", (time.perf_counter() - start) * 1000))
+        # Let the directory mtime age past the racy window so the scan is trusted
+        past = time.time() - 10
+        os.utime(library, (past, past))
+        catalog.refresh()
+        rows.append(("catalog, unchanged", timed(lambda: catalog_listing(catalog), args.repeat)))
+        rows.append(("catalog, filtered", timed(lambda: catalog.list("*.jpg", 3, 50), args.repeat)))
+
+        def added() -> None:
+            (library / f"added{time.perf_counter_ns()}.gif").touch()
+            os.utime(library, (past, time.time() - 5))
+            catalog_listing(catalog)
+
+        rows.append(("catalog, after an add", timed(added, args.repeat)))
+
+        shutil.copy(IMAGES / args.avatar, library / args.avatar)
+        os.utime(library, (past, past))
+        start = time.perf_counter()
+        thumbnail = catalog.thumbnail(args.avatar)
+        created = (time.perf_counter() - start) * 1000
+        cached = timed(lambda: catalog.thumbnail(args.avatar), args.repeat)
+        original, small = os.path.getsize(library / args.avatar), os.path.getsize(thumbnail)
+
+    print(f"Listing a library of {args.images} images and {args.images // 10} other files, mean of {args.repeat} calls")
+    print(f"{'method':<24}{'ms':>9}")
+    for name, ms in rows:
+        print(f"{name:<24}{ms:>9.2f}")
+    print(f"Avatar {args.avatar}: {format_bytes(original)} -> thumbnail {format_bytes(small)} "
+          f"at {catalog.thumbnail_size[0]}x{catalog.thumbnail_size[1]}, created in {created:.1f} ms, cached hit {cached:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.agent import Agent
+from agents.agents import AGENT_REBECCA
+from benchmarks.bench_agent import BENCH_TOOLS, conversation
+from benchmarks.fake_ollama import DEFAULT_SCRIPT, scripted_reply
+from llm.fake_backend import FakeBackend
+from runtime.logs import LOG_FORMAT, Payload, configure_logging, shutdown_logging
+
+
+def responder(model: str, messages: List[Dict[str, str]]) -> str:
+    """
+    Replies like the fake Ollama server, in process so turns are CPU bound.
+    """
+    return "```json\n" + json.dumps(scripted_reply(messages[-1]["content"], DEFAULT_SCRIPT), indent=2) + "\n```"
+
+
+def sync_logging(level: str, path: str) -> None:
+    """
+    Writes records on the calling thread, as logging.basicConfig does.
+    """
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.FileHandler(path, mode="w", encoding="utf-8")
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def run_turns(turns: int) -> float:
+    """
+    Runs a fresh agent through a conversation and returns microseconds per turn.
+    """
+    agent = Agent(AGENT_REBECCA, "Bench", "fake:1b", BENCH_TOOLS, backend=FakeBackend(responder=responder))
+    messages = conversation(turns, 0.34)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for message in messages[:10]:
+            agent.agent_response(message)
+        start = time.perf_counter()
+        for message in messages:
+            agent.agent_response(message)
+        elapsed = time.perf_counter() - start
+    return elapsed / turns * 1e6
+
+
+def time_calls(log, calls: int) -> float:
+    """
+    Returns the caller-side cost of one log call in microseconds.
+    """
+    start = time.perf_counter()
+    for i in range(calls):
+        log(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def bench_calls(calls: int, text_log: str, jsonl_log: str) -> List[tuple]:
+    """
+    Times a debug call that logs a 200 entry conversation history, as logged on every turn.
+    """
+    logger = logging.getLogger("agent.agent.payload")
+    history = [f"Vampy>: tell me about night city, story {i}" for i in range(200)]
+    eager = lambda i: logger.debug(f"Message history: {history}")
+    lazy = lambda i: logger.debug("Message history: %s", Payload(history))
+    rows = []
+    sync_logging("INFO", text_log)
+    rows.append(("f-string, DEBUG off", time_calls(eager, calls)))
+    rows.append(("lazy Payload, DEBUG off", time_calls(lazy, calls)))
+    sync_logging("DEBUG", text_log)
+    rows.append(("f-string, sync file handler", time_calls(eager, calls)))
+    configure_logging("DEBUG", jsonl_path=jsonl_log)
+    rows.append(("lazy Payload, queue + jsonl", time_calls(lazy, calls)))
+    configure_logging("DEBUG", jsonl_path=jsonl_log, sampling={"agent.agent.payload": 0.1})
+    rows.append(("lazy Payload, queue, 10% sampled", time_calls(lazy, calls)))
+    configure_logging("DEBUG", jsonl_path=jsonl_log, sampling={"agent.agent.payload": 0})
+    rows.append(("lazy Payload, queue, payloads off", time_calls(lazy, calls)))
+    shutdown_logging()
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure the cost of logging on the agent turn path.")
+    parser.add_argument("--turns", type=int, default=100, help="Turns per run")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per setup; the fastest is reported")
+    parser.add_argument("--calls", type=int, default=20000, help="Log calls per micro benchmark")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="coa-logbench-")
+    text_log = os.path.join(directory, "sync.log")
+    jsonl_log = os.path.join(directory, "records.jsonl")
+    setups = {
+        "sync file handler": lambda level: sync_logging(level, text_log),
+        "queue + jsonl sink": lambda level: configure_logging(level, jsonl_path=jsonl_log),
+        "queue + jsonl, payload 10%": lambda level: configure_logging(
+            level, jsonl_path=jsonl_log, sampling={"agent.agent.payload": 0.1, "toolbox.Toolbox.payload": 0.1}),
+    }
+    # The console handler of the pipeline would dominate; only the files are written here
+    with contextlib.redirect_stderr(io.StringIO()):
+        calls = bench_calls(args.calls, text_log, jsonl_log)
+        rows = []
+        for name, setup in setups.items():
+            for level in ("INFO", "DEBUG"):
+                timings = []
+                for _ in range(args.repeats):
+                    setup(level)
+                    timings.append(run_turns(args.turns))
+                rows.append((name, level, min(timings)))
+        shutdown_logging()
+    print(f"{'log call (200 entry history)':<40}{'us/call':>10}")
+    for name, micros in calls:
+        print(f"{name:<40}{micros:>10.2f}")
+    print()
+    print(f"{'setup':<30}{'level':>8}{'us/turn':>12}")
+    for name, level, micros in rows:
+        print(f"{name:<30}{level:>8}{micros:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
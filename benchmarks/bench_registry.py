@@ -0,0 +1,142 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.agent import Agent
+from agent.personalities import PersonalityLoader
+from agent.registry import AgentRegistry
+from agents.agents import AGENT_REBECCA
+from benchmarks.bench_agent import BENCH_TOOLS
+from llm.fake_backend import FakeBackend
+
+
+def personalities(count: int) -> List[Dict[str, Any]]:
+    """
+    Returns `count` distinct personalities derived from Rebecca.
+    """
+    return [dict(AGENT_REBECCA, agent_id=f"{i:06d}", first_name=f"Agent{i}", last_name=f"Number{i}")
+            for i in range(count)]
+
+
+def write_files(directory: str, people: List[Dict[str, Any]], per_file: int) -> None:
+    for start in range(0, len(people), per_file):
+        with open(os.path.join(directory, f"agents-{start:06d}.json"), "w", encoding="utf-8") as f:
+            json.dump(people[start:start + per_file], f)
+
+
+def per_call(function, keys: List[str]) -> float:
+    """
+    Returns microseconds per call of function over the keys.
+    """
+    start = time.perf_counter()
+    for key in keys:
+        function(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def timed(function):
+    """
+    Returns (result, seconds) of a call.
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def retained(function) -> float:
+    """
+    Returns the KiB allocated by a call that are still alive afterwards.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1024
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure agent lookup and hydration cost at scale.")
+    parser.add_argument("--agents", type=int, default=10000, help="Number of personalities")
+    parser.add_argument("--per-file", type=int, default=100, help="Personalities per JSON file")
+    parser.add_argument("--lookups", type=int, default=20000, help="Lookups per measurement")
+    parser.add_argument("--hydrate", type=int, default=500, help="Agents hydrated in the hydration run")
+    parser.add_argument("--max-live", type=int, default=64, help="Live agent cap")
+    args = parser.parse_args()
+
+    backend = FakeBackend()
+    factory = lambda personality: Agent(personality, "Bench", "fake:1b", BENCH_TOOLS, backend=backend)
+    people = personalities(args.agents)
+    rng = random.Random(7)
+    ids = [rng.choice(people)["agent_id"] for _ in range(args.lookups)]
+    names = [rng.choice(people)["first_name"].upper() for _ in range(args.lookups)]
+    rows = []
+
+    directory = tempfile.mkdtemp(prefix="coa-registry-")
+    write_files(directory, people, args.per_file)
+    cache_path = os.path.join(directory, "cache", "personalities.pickle")
+    registry = AgentRegistry(factory, max_live=args.max_live)
+    changes, elapsed = timed(lambda: PersonalityLoader(directory, cache_path).load())
+    rows.append(("parse + validate files (cold)", f"{elapsed * 1000:.1f} ms", ""))
+    changes, elapsed = timed(lambda: PersonalityLoader(directory, cache_path).load())
+    rows.append(("load compiled cache (warm start)", f"{elapsed * 1000:.1f} ms", ""))
+    _, elapsed = timed(lambda: registry.apply(changes))
+    rows.append(("index descriptors", f"{elapsed * 1000:.1f} ms",
+                 f"{retained(lambda: PersonalityLoader(directory, cache_path).load()):.0f} KiB retained"))
+
+    loader = PersonalityLoader(directory, cache_path)
+    loader.load()
+    changed = dict(people[0], mission="Benchmark the registry.")
+    write_files(directory, [changed] + people[1:args.per_file], args.per_file)
+    changes, elapsed = timed(loader.load)
+    rows.append(("reload after editing one file", f"{elapsed * 1000:.1f} ms",
+                 f"{len(changes.updated)} re-registered"))
+    _, elapsed = timed(loader.load)
+    rows.append(("reload with no changes", f"{elapsed * 1000:.1f} ms", ""))
+
+    # The previous community kept every Agent in a list and scanned it
+    eager = [factory(people[i]) for i in range(min(args.hydrate, args.agents))]
+    scan_id = lambda agent_id: next((a for a in eager if a.agent_id == agent_id), None)
+    scan_name = lambda name: next((a for a in eager if a.first_name.lower() == name.lower()), None)
+    rows.append((f"linear scan by id ({len(eager)} agents)", f"{per_call(scan_id, ids):.2f} us", ""))
+    rows.append((f"linear scan by name ({len(eager)} agents)", f"{per_call(scan_name, names):.2f} us", ""))
+    del eager
+
+    rows.append((f"index lookup by id ({args.agents})", f"{per_call(registry.descriptors.get, ids):.3f} us", ""))
+    rows.append((f"index lookup by name ({args.agents})", f"{per_call(registry.find_id, names):.3f} us", ""))
+
+    cold = ids[:args.hydrate]
+    _, elapsed = timed(lambda: [registry.get(agent_id) for agent_id in cold])
+    rows.append(("hydrate on first use", f"{elapsed / len(cold) * 1e6:.0f} us/agent", ""))
+    hot = list(registry.live)
+    hot_keys = [rng.choice(hot) for _ in range(args.lookups)]
+    rows.append(("get of a live agent", f"{per_call(registry.get, hot_keys):.3f} us", ""))
+
+    bounded = AgentRegistry(factory, max_live=args.max_live)
+    bounded.register_all(registry.descriptors.values())
+    kib = retained(lambda: [bounded.get(agent_id) for agent_id in cold][-1])
+    rows.append((f"hydrated {len(cold)}, cap {args.max_live}", "", f"{kib:.0f} KiB retained"))
+    kib = retained(lambda: [factory(people[i]) for i in range(len(cold))])
+    rows.append((f"eager construction, {len(cold)} agents kept", "", f"{kib:.0f} KiB retained"))
+
+    print(f"{'measurement':<42}{'time':>18}  memory")
+    for name, timing, memory in rows:
+        print(f"{name:<42}{timing:>18}  {memory}")
+    print(registry.show_stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.router import AgentRouter
+from tools.Time_Keeper import TimeKeeper
+from tools.LLMVersionCheck import get_disruption_dates, get_llm_versions
+from tools.System_Status import get_system_metrics
+from tools.Browser_Search import browser
+from tools.List_Images import list_images, change_image
+from tools.Weather_Info import get_weather
+from tools.Calculator import calculate
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+TOOLS = [TimeKeeper, get_disruption_dates, get_llm_versions, get_system_metrics, browser,
+         list_images, change_image, get_weather, calculate]
+
+
+def load_queries(path: Path) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_agents(agents: List[Dict[str, Any]], count: int) -> List[Dict[str, Any]]:
+    """
+    Returns `count` agents: the labeled ones plus variants with shuffled mission words.
+
+    The variants compete for the same terms as the labeled agents, so the scale
+    run measures latency with realistic posting lists, not accuracy.
+    """
+    rng = random.Random(11)
+    vocabulary = sorted({word for agent in agents for word in agent["mission"].split()})
+    result = list(agents)
+    while len(result) < count:
+        template = rng.choice(agents)
+        mission = " ".join(rng.sample(vocabulary, 12))
+        result.append(dict(template, agent_id=f"s{len(result)}", first_name=f"Synth{len(result)}", mission=mission))
+    return result
+
+
+def evaluate(router: AgentRouter, queries: List[Dict[str, Any]], names: Dict[str, str]) -> Dict[str, float]:
+    ids = {agent_id: name for name, agent_id in names.items()}
+    correct = top3 = low = 0
+    micros = []
+    for query in queries:
+        route = router.route(query["query"], lambda name: names.get(name.lower()))
+        micros.append(route.micros)
+        expected = query["agent"].lower()
+        correct += ids.get(route.agent_id) == expected
+        top3 += route.method == "mention" and ids.get(route.agent_id) == expected or \
+            any(ids.get(agent_id) == expected for agent_id, _ in route.candidates)
+        low += route.method in ("index", "llm") and route.confidence < router.min_confidence
+    micros.sort()
+    return {
+        "accuracy": correct / len(queries),
+        "top3": top3 / len(queries),
+        "low_confidence": low / len(queries),
+        "p50_us": statistics.median(micros),
+        "p99_us": micros[min(len(micros) - 1, int(len(micros) * 0.99))],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure routing accuracy and latency on a labeled set.")
+    parser.add_argument("--agents", type=Path, default=DATA_DIR / "routing_agents.json", help="Labeled agents")
+    parser.add_argument("--queries", type=Path, default=DATA_DIR / "routing_queries.jsonl", help="Labeled queries")
+    parser.add_argument("--scale", type=int, default=10000, help="Agents in the scale run, 0 to skip")
+    parser.add_argument("--min-confidence", type=float, default=0.15, help="Confidence below which to tiebreak")
+    args = parser.parse_args()
+
+    with open(args.agents, "r", encoding="utf-8") as f:
+        agents = json.load(f)
+    queries = load_queries(args.queries)
+    tool_docs = {tool.__name__: tool.__doc__.strip() for tool in TOOLS}
+
+    rows = []
+    for count in [len(agents)] + ([args.scale] if args.scale else []):
+        population = synthetic_agents(agents, count)
+        router = AgentRouter(tool_docs, min_confidence=args.min_confidence)
+        start = time.perf_counter()
+        router.build(population)
+        build_ms = (time.perf_counter() - start) * 1000
+        names = {agent["first_name"].lower(): agent["agent_id"] for agent in agents}
+        rows.append((count, build_ms, evaluate(router, queries, names)))
+
+    print(f"{len(queries)} labeled queries")
+    print(f"{'agents':>8}{'build ms':>10}{'accuracy':>10}{'top-3':>8}{'low conf':>10}{'p50 us':>9}{'p99 us':>9}")
+    for count, build_ms, result in rows:
+        if count == len(agents):
+            quality = f"{result['accuracy']:>10.1%}{result['top3']:>8.1%}{result['low_confidence']:>10.1%}"
+        else:
+            quality = f"{'-':>10}{'-':>8}{'-':>10}"
+        print(f"{count:>8}{build_ms:>10.1f}{quality}{result['p50_us']:>9.1f}{result['p99_us']:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+
+from benchmarks.bench_api import fake_interface
+
+
+def measure(turn: Callable[[str], Tuple[int, int]], messages: int, checkpoints: List[int]) -> List[Dict[str, float]]:
+    """
+    Runs chat turns until `messages` transcript entries, recording the cost of the turns around each checkpoint.
+
+    `turn` sends one message and returns the bytes uploaded and sent back.
+    """
+    rows = []
+    window: List[Tuple[int, int, float]] = []
+    pending = list(checkpoints)
+    for n in range(1, messages // 2 + 1):
+        start = time.perf_counter()
+        up, down = turn(f"Message {n} with some words to answer")
+        window.append((up, down, time.perf_counter() - start))
+        window = window[-10:]
+        if pending and n * 2 >= pending[0]:
+            rows.append({"messages": n * 2, "up": sum(w[0] for w in window) / len(window),
+                         "down": sum(w[1] for w in window) / len(window),
+                         "ms": sum(w[2] for w in window) / len(window) * 1000})
+            pending.pop(0)
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare per-turn chat payloads with and without the server-side transcript.")
+    parser.add_argument("--messages", type=int, default=4000, help="Transcript entries to reach")
+    parser.add_argument("--checkpoints", default="100,500,1000,2000,4000", help="Entry counts to report")
+    args = parser.parse_args()
+    checkpoints = [int(value) for value in args.checkpoints.split(",")]
+
+    logging.disable(logging.WARNING)
+    results = {}
+    with tempfile.TemporaryDirectory() as session_dir, contextlib.redirect_stdout(io.StringIO()):
+        interface, backend = fake_interface(0.0, session_dir)
+        # Show what the full history costs once it is no longer trimmed
+        interface.max_transcript = 0
+        history: list = []
+
+        def full_history(message: str) -> Tuple[int, int]:
+            # The chatbot is both input and output: the browser uploads the history and gets it back
+            up = len(json.dumps([message, history]))
+            outputs = interface.respond(message, history)
+            backend.calls.clear()
+            return up, len(json.dumps(outputs))
+
+        results["full history"] = measure(full_history, args.messages, checkpoints)
+
+        interface.max_transcript = 1000
+        interface.transcripts.directory = session_dir
+        interface.transcripts.max_memory = interface.max_transcript
+        request = SimpleNamespace(session_hash="bench")
+
+        def server_side(message: str) -> Tuple[int, int]:
+            up = len(json.dumps([message]))
+            down = 0
+            for outputs in interface.respond_window(message, request):
+                # A State output stays on the server; the button update is a small dict
+                down += len(json.dumps(outputs[:2])) + len(json.dumps(outputs[2]))
+            backend.calls.clear()
+            return up, down
+
+        results["server-side"] = measure(server_side, args.messages, checkpoints)
+        older = interface.transcripts.get("bench").page(0, interface.transcript_page)
+        interface.transcripts.close()
+
+    print(f"Per-turn payloads, window {interface.transcript_window} entries; averages over the last 10 turns")
+    print(f"{'transcript':<14}{'messages':>9}{'upload B':>11}{'response B':>12}{'handler ms':>12}")
+    for name, rows in results.items():
+        for row in rows:
+            print(f"{name:<14}{row['messages']:>9}{row['up']:>11.0f}{row['down']:>12.0f}{row['ms']:>12.2f}")
+    print(f"Oldest page read back from disk: {len(older)} entries, first: {older[0]['content'][:40]!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
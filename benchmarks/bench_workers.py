@@ -0,0 +1,122 @@
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+
+from llm.fake_backend import FakeBackend, default_reply
+from runtime.sessions import SessionHost
+from runtime.workers import WorkerPool
+
+
+def cpu_backend(latency: float, cpu_ms: float) -> FakeBackend:
+    """
+    Returns a fake backend whose replies also cost `cpu_ms` of pure Python work under the GIL.
+
+    The work stands in for what a session does in-process around each LLM
+    call: prompt rendering, JSON parsing, tool calls.
+    """
+    def responder(model, messages):
+        deadline = time.thread_time() + cpu_ms / 1000
+        while time.thread_time() < deadline:
+            sum(i * i for i in range(200))
+        return default_reply(model, messages)
+    return FakeBackend(responder=responder, latency=latency)
+
+
+def fake_community(backend: FakeBackend, session_dir: str):
+    """
+    Builds the application's community on a fake backend, saving sessions in `session_dir`.
+    """
+    # COA pulls in gradio and reads config.json, so only import it here
+    from COA import CommunityOfAgents
+
+    community = CommunityOfAgents()
+    # Workers build their own services from the config, so point it at the temporary directory too
+    community.config.update({"session_dir": session_dir, "intro_cache_dir": os.path.join(session_dir, "intros")},
+                            persist=False)
+    community.llm_backend = community.budget_planner.backend = community.sessions.backend = backend
+    community.sessions.directory = session_dir
+    community.intro_cache = None
+    return community
+
+
+def run(chat: Callable[[str, str], None], clients: int, requests: int) -> float:
+    """
+    Sends `requests` messages from each of `clients` users at once.
+
+    Returns:
+        Messages answered per second
+    """
+    def client(user: str) -> None:
+        for n in range(requests):
+            chat(user, f"Question {n} from {user}")
+
+    threads = [threading.Thread(target=client, args=(f"user{i}",)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return clients * requests / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure session throughput in-process and on worker processes.")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent users, one session each")
+    parser.add_argument("--requests", type=int, default=10, help="Messages per user")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per fake LLM reply")
+    parser.add_argument("--cpu-ms", type=float, default=20.0, help="Milliseconds of Python work per reply")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Largest worker pool to measure")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker and in-process")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    rows: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as session_dir, contextlib.redirect_stdout(io.StringIO()):
+        community = fake_community(cpu_backend(args.latency, args.cpu_ms), session_dir)
+        agent_id = next(iter(community.registry.descriptors))
+
+        host = SessionHost(community)
+        slots = threading.BoundedSemaphore(args.threads)
+
+        def local_chat(user: str, message: str) -> None:
+            with slots:
+                host.chat(agent_id, user, message)
+
+        rows["in-process"] = run(local_chat, args.clients, args.requests)
+        host.save_all()
+
+        for size in range(1, args.workers + 1):
+            pool = WorkerPool(community, workers=size, threads=args.threads,
+                              backend_factory=lambda: cpu_backend(args.latency, args.cpu_ms)).start()
+
+            def pool_chat(user: str, message: str, pool: WorkerPool = pool) -> None:
+                key = f"{agent_id}-{user}"
+                pool.submit(key, "chat", agent_id, user, message).result()
+
+            rows[f"{size} worker{'s' if size > 1 else ''}"] = run(pool_chat, args.clients, args.requests)
+            pool.stop()
+
+    print(f"{args.clients} users x {args.requests} messages, fake LLM latency {args.latency * 1000:.0f} ms "
+          f"+ {args.cpu_ms:.0f} ms CPU, {args.threads} threads per process, {os.cpu_count()} CPU cores")
+    baseline = rows["in-process"]
+    widest = max(rows.values())
+    print(f"{'mode':<12}{'msg/s':>8}{'speedup':>9}")
+    for name, rate in rows.items():
+        bar = "#" * max(1, round(40 * rate / widest))
+        print(f"{name:<12}{rate:>8.1f}{rate / baseline:>8.2f}x  {bar}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Keyword in the user message -> (tool_choice, tool_input); the input may reference the regex group 1
+DEFAULT_SCRIPT: List[Tuple[str, str, str]] = [
+    (r"\btime\b", "TimeKeeper", "None"),
+    (r"\bcalculate (.+)", "calculate", r"\1"),
+    (r"\bimages?\b", "list_images", "None"),
+    (r"\bdisruption\b", "get_disruption_dates", "None"),
+    (r"\bshow image (\S+)", "change_image", r"\1"),
+]
+
+
+def scripted_reply(user_message: str, script: List[Tuple[str, str, str]]) -> Dict[str, str]:
+    """
+    Picks the JSON reply the fake model gives to a user message.
+
+    Args:
+        user_message: Content of the last user message
+        script: Keyword rules mapping messages to tool calls
+
+    Returns:
+        Dictionary with tool_choice, tool_input and agent_response
+    """
+    followup = re.match(r"I have used the (\S+) tool and the output of the tool is (.*)", user_message, re.DOTALL)
+    if followup:
+        output = " ".join(followup.group(2).split())[:80]
+        return {"tool_choice": "None", "tool_input": "None",
+                "agent_response": f"The {followup.group(1)} tool says: {output}"}
+    for pattern, tool, tool_input in script:
+        match = re.search(pattern, user_message, re.IGNORECASE)
+        if match:
+            return {"tool_choice": tool, "tool_input": match.expand(tool_input).strip(),
+                    "agent_response": f"Running {tool} for you, choom."}
+    return {"tool_choice": "None", "tool_input": "None",
+            "agent_response": f"Sure thing. You asked: {user_message[:60]}"}
+
+
+class FakeOllamaServer:
+    """
+    Local HTTP server speaking enough of the Ollama API for offline benchmarks.
+
+    Replies are scripted from the user message, generated at a configurable
+    token rate after a fixed prefill latency, and can optionally include
+    <think> blocks or be deliberately malformed JSON. The server implements
+    /api/chat (streaming and non-streaming), /api/show, /api/ps, /api/tags and
+    /api/version, and records request counts and prompt sizes.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, token_rate: float = 2000.0, latency: float = 0.005,
+                 think: bool = False, malformed_every: int = 0, context_length: int = 8192,
+                 script: Optional[List[Tuple[str, str, str]]] = None,
+                 responder: Optional[Callable[[str, List[Dict[str, str]]], str]] = None):
+        """
+        Initialize the fake server.
+
+        Args:
+            host: Interface to bind
+            port: Port to bind, 0 picks a free port
+            token_rate: Generated tokens per second, 0 for instant replies
+            latency: Prefill delay in seconds before the first token
+            think: Prefix every reply with a <think> block
+            malformed_every: Make every Nth reply malformed JSON, 0 disables
+            context_length: Context length reported by /api/show
+            script: Keyword rules mapping messages to tool calls
+            responder: Function (model, messages) -> reply text overriding the script
+        """
+        self.token_rate = token_rate
+        self.latency = latency
+        self.think = think
+        self.malformed_every = malformed_every
+        self.context_length = context_length
+        self.script = script or DEFAULT_SCRIPT
+        self.responder = responder
+        self.requests = 0
+        self.prompt_bytes: List[int] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllamaServer":
+        """
+        Starts serving in a background thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        """
+        Clears the request counters.
+        """
+        with self._lock:
+            self.requests = 0
+            self.prompt_bytes = []
+
+    def reply_for(self, model: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Builds the reply text for a chat request.
+        """
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+            self.prompt_bytes.append(sum(len(m.get("content", "").encode("utf-8")) for m in messages))
+        if self.responder:
+            return self.responder(model, messages)
+        user_message = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        text = "```json\n" + json.dumps(scripted_reply(user_message, self.script), indent=2) + "\n```"
+        if self.malformed_every and number % self.malformed_every == 0:
+            # Drop the closing fence and brace, the kind of truncation small models produce
+            text = text[:text.rindex("}")]
+        if self.think:
+            text = f"<think>\nThe user said: {user_message[:80]}. Deciding which tool to use.\n</think>\n{text}"
+        return text
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; Nagle would add ~40ms per reply
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                logger.debug(f"Fake Ollama: {format % args}")
+
+            def _json(self, body: dict, status: int = 200) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _read(self) -> dict:
+                length = int(self.headers.get("Content-Length", 0))
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                if self.path == "/api/version":
+                    self._json({"version": "0.0.0-fake"})
+                elif self.path in ("/api/tags", "/api/ps"):
+                    self._json({"models": []})
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                body = self._read()
+                if self.path == "/api/chat":
+                    try:
+                        self._chat(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        # The client closed a stream early
+                        logger.debug("Fake Ollama: client disconnected")
+                elif self.path == "/api/show":
+                    self._json({
+                        "modelfile": "", "template": "{{ .Prompt }}",
+                        "parameters": f"num_ctx {server.context_length}",
+                        "details": {"family": "fake", "parameter_size": "1B", "quantization_level": "Q4_0"},
+                        "model_info": {"general.architecture": "fake", "fake.context_length": server.context_length},
+                    })
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def _chat(self, body: dict) -> None:
+                model = body.get("model", "fake")
+                messages = body.get("messages", [])
+                start = time.perf_counter_ns()
+                reply = server.reply_for(model, messages)
+                tokens = reply.split(" ")
+                prompt_tokens = sum(len(m.get("content", "").split()) for m in messages)
+                if server.latency:
+                    time.sleep(server.latency)
+                prefill_done = time.perf_counter_ns()
+                per_token = 1.0 / server.token_rate if server.token_rate else 0.0
+                created = datetime.now(timezone.utc).isoformat()
+                final = {
+                    "model": model, "created_at": created, "done": True, "done_reason": "stop",
+                    "prompt_eval_count": prompt_tokens, "eval_count": len(tokens),
+                }
+
+                if not body.get("stream", True):
+                    if per_token:
+                        time.sleep(per_token * len(tokens))
+                    end = time.perf_counter_ns()
+                    final.update({"message": {"role": "assistant", "content": reply},
+                                  "prompt_eval_duration": prefill_done - start, "eval_duration": end - prefill_done,
+                                  "total_duration": end - start, "load_duration": 0})
+                    self._json(final)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for index, token in enumerate(tokens):
+                    if per_token:
+                        time.sleep(per_token)
+                    chunk = {"model": model, "created_at": created, "done": False,
+                             "message": {"role": "assistant", "content": token + (" " if index < len(tokens) - 1 else "")}}
+                    self._write_chunk(json.dumps(chunk) + "\n")
+                end = time.perf_counter_ns()
+                final.update({"message": {"role": "assistant", "content": ""},
+                              "prompt_eval_duration": prefill_done - start, "eval_duration": end - prefill_done,
+                              "total_duration": end - start, "load_duration": 0})
+                self._write_chunk(json.dumps(final) + "\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, text: str) -> None:
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server for offline testing.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-rate", type=float, default=50.0)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--think", action="store_true")
+    parser.add_argument("--malformed-every", type=int, default=0)
+    args = parser.parse_args()
+    fake = FakeOllamaServer(port=args.port, token_rate=args.token_rate, latency=args.latency,
+                            think=args.think, malformed_every=args.malformed_every)
+    print(f"Fake Ollama listening on {fake.url}")
+    fake._server.serve_forever()
@@ -0,0 +1,394 @@
+import argparse
+import http.client
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llm.admission import BUSY_MESSAGE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE = Path(__file__).resolve().parent.parent / "requests.jsonl"
+
+
+@dataclass
+class TraceRecord:
+    """
+    One request in a replay trace.
+
+    Attributes:
+        session (str): Session the message belongs to
+        message (str): User message
+        think_time (float): Seconds the user waits after the reply (closed loop only)
+    """
+    session: str
+    message: str
+    think_time: float = 0.0
+
+
+@dataclass
+class Outcome:
+    """
+    Result of replaying one trace record.
+    """
+    session: str
+    latency: float
+    status: str  # 'ok', 'busy' or 'error'
+    finished: float = 0.0
+
+
+@dataclass
+class RunReport:
+    """
+    Results of one load generation run.
+    """
+    mode: str
+    load: float
+    elapsed: float
+    outcomes: List[Outcome] = field(default_factory=list)
+
+
+def load_trace(path: str, limit: Optional[int] = None) -> List[TraceRecord]:
+    """
+    Reads a JSONL trace.
+
+    Each line holds `session` (or `session_id`), `message` and an optional
+    `think_time`. Backlog files using `request_id`/`title`/`body` are accepted
+    too, with every request treated as its own session.
+
+    Args:
+        path: Path to the JSONL file
+        limit: Maximum number of records to read
+
+    Returns:
+        List of trace records
+    """
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            session = data.get("session") or data.get("session_id") or data.get("request_id") or str(index)
+            message = data.get("message") or data.get("body") or data.get("title") or ""
+            records.append(TraceRecord(str(session), message, float(data.get("think_time", 0.0))))
+            if limit and len(records) >= limit:
+                break
+    return records
+
+
+def classify(response: str) -> str:
+    """
+    Classifies an agent reply as ok, busy (shed by admission control) or error.
+    """
+    if BUSY_MESSAGE in response:
+        return "busy"
+    if "encountered an error" in response or response.startswith("Error"):
+        return "error"
+    return "ok"
+
+
+class InProcessTarget:
+    """
+    Sends messages to agents created inside this process through CommunityOfAgents.
+
+    Every agent session gets its own Agent sharing the community's backend,
+    admission controller and single-flight table, as the application does.
+    """
+
+    def __init__(self, fake: bool = False):
+        # COA pulls in gradio, so only import it when this target is used
+        from COA import CommunityOfAgents, AGENT, USERNAME, DEFAULT_TOOLS, MODELS
+        from agent.agent import Agent
+
+        self.fake_server = None
+        self.community = CommunityOfAgents()
+        if fake:
+            from benchmarks.fake_ollama import FakeOllamaServer
+            from llm.ollama_backend import OllamaBackend
+            from llm.pool import OllamaClientPool
+            self.fake_server = FakeOllamaServer(token_rate=50.0, latency=0.2).start()
+            self.community.llm_backend = OllamaBackend(OllamaClientPool([self.fake_server.url], hedge_percentile=None))
+        config = self.community.config
+        self._make_agent = lambda: Agent(
+            AGENT, USERNAME, config.get("default_model", MODELS[4]), DEFAULT_TOOLS,
+            temperature=config.get("temperature", 0.6), admission=self.community.admission,
+            backend=self.community.llm_backend, singleflight=self.community.singleflight)
+        self.agents: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def send(self, session: str, message: str) -> str:
+        with self._lock:
+            agent = self.agents.get(session)
+            if agent is None:
+                agent = self.agents[session] = self._make_agent()
+                self.community.add_agent(agent)
+        return agent.agent_response(message)
+
+    def close(self) -> None:
+        if self.fake_server:
+            self.fake_server.stop()
+
+
+class GradioTarget:
+    """
+    Sends messages to a running Gradio app through its `respond_window` endpoint.
+
+    The app keeps one agent and the chat transcript of each client on the
+    server, so sessions only differ by their client.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._local = threading.local()
+
+    def send(self, session: str, message: str) -> str:
+        from gradio_client import Client
+        # gradio_client is not thread safe, so every worker thread gets its own client
+        if not hasattr(self._local, "client"):
+            self._local.client = Client(self.url, verbose=False)
+        # Outputs are the cleared message, the chat window and the "older" button (states are not returned)
+        window = self._local.client.predict(message, api_name="/respond_window")[1]
+        return window[-1]["content"] if window else ""
+
+    def close(self) -> None:
+        pass
+
+
+class ApiTarget:
+    """
+    Sends messages to a running HTTP API (runtime/http_api.py) through POST /v1/chat.
+
+    Every trace session is an API session with its own agent, unless
+    `sessions` is off and all messages go to one shared agent like in the
+    Gradio app. Each worker thread keeps one keep-alive connection.
+    """
+
+    def __init__(self, url: str, agent: Optional[str] = None, sessions: bool = True):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.agent = agent
+        self.sessions = sessions
+        self._local = threading.local()
+
+    def send(self, session: str, message: str) -> str:
+        if not hasattr(self._local, "connection"):
+            self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=600)
+        body = {"message": message}
+        if self.sessions:
+            body["user"] = session
+        if self.agent:
+            body["agent"] = self.agent
+        connection = self._local.connection
+        try:
+            connection.request("POST", "/v1/chat", json.dumps(body), {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            data = json.loads(response.read())
+        except (http.client.HTTPException, ConnectionError):
+            connection.close()  # Reconnects on the next request
+            raise
+        if response.status != 200:
+            return BUSY_MESSAGE if response.status == 503 else f"Error {response.status}: {data.get('error')}"
+        return data["response"]
+
+    def close(self) -> None:
+        pass
+
+
+def assign_sessions(records: List[TraceRecord], sessions: int) -> Dict[str, List[TraceRecord]]:
+    """
+    Maps trace sessions onto a fixed number of agent sessions, keeping message order.
+    """
+    slots: Dict[str, str] = {}
+    queues: Dict[str, List[TraceRecord]] = {}
+    for record in records:
+        slot = slots.setdefault(record.session, f"session-{len(slots) % sessions}")
+        queues.setdefault(slot, []).append(record)
+    return queues
+
+
+def run_closed_loop(send: Callable[[str, str], str], records: List[TraceRecord], sessions: int) -> RunReport:
+    """
+    Replays the trace with one worker per session, each waiting for its reply
+    and the record's think time before sending the next message.
+    """
+    queues = assign_sessions(records, sessions)
+    report = RunReport("closed", sessions, 0.0)
+    lock = threading.Lock()
+
+    def worker(session: str, queue: List[TraceRecord]) -> None:
+        for record in queue:
+            start = time.perf_counter()
+            try:
+                status = classify(send(session, record.message))
+            except Exception as e:
+                logger.warning(f"Request failed for {session}: {str(e)}")
+                status = "error"
+            end = time.perf_counter()
+            with lock:
+                report.outcomes.append(Outcome(session, end - start, status, end))
+            if record.think_time:
+                time.sleep(record.think_time)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=item, daemon=True) for item in queues.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report.elapsed = time.perf_counter() - start
+    for outcome in report.outcomes:
+        outcome.finished -= start
+    return report
+
+
+def run_open_loop(send: Callable[[str, str], str], records: List[TraceRecord], sessions: int,
+                  rps: float, poisson: bool = False, seed: int = 0) -> RunReport:
+    """
+    Replays the trace at a target arrival rate regardless of completions.
+
+    Latency is measured from the scheduled arrival time, so time spent queued
+    behind a busy session or worker counts (no coordinated omission). Messages
+    of one session are still processed in order.
+    """
+    slots: Dict[str, str] = {}
+    # Same session mapping as assign_sessions, but keeping the trace's interleaving
+    ordered = [(slots.setdefault(r.session, f"session-{len(slots) % sessions}"), r) for r in records]
+    session_locks = {slot: threading.Lock() for slot in set(slots.values())}
+    report = RunReport("open", rps, 0.0)
+    lock = threading.Lock()
+    rng = random.Random(seed)
+
+    def execute(slot: str, record: TraceRecord, scheduled: float) -> None:
+        with session_locks[slot]:
+            try:
+                status = classify(send(slot, record.message))
+            except Exception as e:
+                logger.warning(f"Request failed for {slot}: {str(e)}")
+                status = "error"
+        end = time.perf_counter()
+        with lock:
+            report.outcomes.append(Outcome(slot, end - scheduled, status, end))
+
+    start = time.perf_counter()
+    arrival = start
+    with ThreadPoolExecutor(max_workers=max(sessions, 1) * 2) as executor:
+        for slot, record in ordered:
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(execute, slot, record, arrival)
+            arrival += rng.expovariate(rps) if poisson else 1.0 / rps
+    report.elapsed = time.perf_counter() - start
+    for outcome in report.outcomes:
+        outcome.finished -= start
+    return report
+
+
+def summarize(outcomes: List[Outcome]) -> Dict[str, float]:
+    """
+    Returns latency percentiles and error rates for a set of outcomes.
+    """
+    if not outcomes:
+        return {"requests": 0}
+    latencies = sorted(o.latency for o in outcomes)
+
+    def pick(quantile: float) -> float:
+        return latencies[min(len(latencies) - 1, max(0, int(round(quantile * len(latencies))) - 1))]
+
+    return {
+        "requests": len(outcomes),
+        "p50_s": round(pick(0.50), 3),
+        "p90_s": round(pick(0.90), 3),
+        "p99_s": round(pick(0.99), 3),
+        "max_s": round(latencies[-1], 3),
+        "error_rate": round(sum(o.status == "error" for o in outcomes) / len(outcomes), 4),
+        "busy_rate": round(sum(o.status == "busy" for o in outcomes) / len(outcomes), 4),
+    }
+
+
+def print_report(report: RunReport, per_session: bool) -> Dict[str, object]:
+    """
+    Prints and returns the aggregate (and optionally per-session) results of a run.
+    """
+    aggregate = summarize(report.outcomes)
+    throughput = len(report.outcomes) / report.elapsed if report.elapsed else 0.0
+    load = f"{report.load} rps offered" if report.mode == "open" else f"{int(report.load)} sessions"
+    print(f"\n{report.mode}-loop, {load}: {throughput:.2f} req/s achieved over {report.elapsed:.1f}s")
+    print("  aggregate: " + ", ".join(f"{k}={v}" for k, v in aggregate.items()))
+    sessions = {}
+    for outcome in report.outcomes:
+        sessions.setdefault(outcome.session, []).append(outcome)
+    summaries = {name: summarize(items) for name, items in sorted(sessions.items())}
+    if per_session:
+        for name, summary in summaries.items():
+            print(f"  {name}: " + ", ".join(f"{k}={v}" for k, v in summary.items()))
+    return {"mode": report.mode, "load": report.load, "throughput": round(throughput, 3),
+            "aggregate": aggregate, "sessions": summaries}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay a JSONL request trace against agent sessions.")
+    parser.add_argument("--trace", default=str(DEFAULT_TRACE), help="JSONL trace file")
+    parser.add_argument("--limit", type=int, help="Only replay the first N records")
+    parser.add_argument("--sessions", type=int, default=4, help="Number of concurrent agent sessions")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--rps", type=float, default=1.0, help="Target arrival rate for open-loop mode")
+    parser.add_argument("--poisson", action="store_true", help="Use Poisson arrivals in open-loop mode")
+    parser.add_argument("--sweep", help="Comma separated rps (open) or session counts (closed) for a saturation curve")
+    parser.add_argument("--url", help="Replay against a running Gradio app instead of in-process agents")
+    parser.add_argument("--api", help="Replay against a running HTTP API, e.g. http://127.0.0.1:8081")
+    parser.add_argument("--fake", action="store_true", help="Use the fake Ollama server for in-process runs")
+    parser.add_argument("--per-session", action="store_true", help="Print per-session latency distributions")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    records = load_trace(args.trace, args.limit)
+    if not records:
+        print(f"No records in {args.trace}")
+        return 1
+    loads = [float(x) for x in args.sweep.split(",")] if args.sweep else [args.rps if args.mode == "open" else args.sessions]
+
+    results = []
+    for load in loads:
+        # A fresh target per point keeps conversation histories from one run out of the next
+        if args.api:
+            target = ApiTarget(args.api)
+        else:
+            target = GradioTarget(args.url) if args.url else InProcessTarget(args.fake)
+        try:
+            if args.mode == "open":
+                report = run_open_loop(target.send, records, args.sessions, load, args.poisson)
+            else:
+                report = run_closed_loop(target.send, records, int(load))
+        finally:
+            target.close()
+        results.append(print_report(report, args.per_session))
+
+    if len(results) > 1:
+        print(f"\nSaturation curve ({'offered rps' if args.mode == 'open' else 'sessions'}):")
+        print(f"{'load':>8}{'req/s':>10}{'p50_s':>10}{'p99_s':>10}{'errors':>10}{'busy':>10}")
+        for result in results:
+            aggregate = result["aggregate"]
+            print(f"{result['load']:>8}{result['throughput']:>10}{aggregate.get('p50_s', 0):>10}"
+                  f"{aggregate.get('p99_s', 0):>10}{aggregate.get('error_rate', 0):>10.2%}{aggregate.get('busy_rate', 0):>10.2%}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.agent import Agent
+from agents.agents import AGENT_REBECCA
+from llm.backend import LLMBackend, create_backend
+from runtime.singleflight import normalize_text
+
+logger = logging.getLogger(__name__)
+
+BENCH_DIR = Path(__file__).resolve().parent
+QUERIES_FILE = BENCH_DIR / "data" / "tool_queries.jsonl"
+RESULTS_DIR = BENCH_DIR / "results"
+CACHE_FILE = RESULTS_DIR / "model_eval_cache.jsonl"
+REPORT_FILE = RESULTS_DIR / "model_eval_report.md"
+
+
+def load_queries(path: Path) -> List[Dict[str, str]]:
+    """
+    Reads the labeled query set (id, query, tool_choice, tool_input per line).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def prompt_hash(agent: Agent) -> str:
+    """
+    Hashes the system prompt without its date line, so results stay cached across days
+    but are invalidated when the prompt or the tool descriptions change.
+    """
+    agent.update_system_prompt()
+    stable = re.sub(r"Today is .*", "", agent.system_prompt)
+    return hashlib.sha256(stable.encode("utf-8")).hexdigest()[:12]
+
+
+def cache_key(model: str, temperature: float, query_id: str, repeat: int, prompt: str) -> str:
+    return f"{model}|{temperature}|{query_id}|{repeat}|{prompt}"
+
+
+def load_cache(path: Path) -> Dict[str, Dict]:
+    """
+    Loads previously evaluated results; a truncated last line from an interrupted run is skipped.
+    """
+    cache = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                cache[result["key"]] = result
+    return cache
+
+
+def parsed_as_json(agent: Agent, raw: str, parsed: Dict) -> bool:
+    """
+    Tells whether check_json_response found a JSON object rather than falling back to plain text.
+    """
+    text = str(parsed.get("agent_response") or "")
+    if text.startswith("Error parsing JSON") or text.startswith("Error processing response"):
+        return False
+    return not (parsed.get("tool_choice") == "None" and parsed.get("tool_input") == "None" and text == raw.strip())
+
+
+def input_matches(expected: str, actual) -> bool:
+    """
+    Compares tool inputs after normalization; '*' accepts any non-empty input.
+    """
+    if expected == "*":
+        return actual not in (None, "", "None")
+    return normalize_text(expected).replace(" ", "") == normalize_text(actual if actual is not None else "None").replace(" ", "")
+
+
+def evaluate(backend: LLMBackend, model: str, temperature: float, query: Dict[str, str], tools: List) -> Dict:
+    """
+    Runs one labeled query through the agent's first LLM call.
+
+    Returns:
+        Dictionary with parse success, tool accuracy, token counts and latency
+    """
+    agent = Agent(AGENT_REBECCA, "Eval", model, tools, temperature=temperature, backend=backend)
+    agent.intro_given = True
+    agent.update_system_prompt()
+    agent.user_prompt = query["query"]
+    start = time.perf_counter()
+    response = agent.llm_response(model)
+    latency = time.perf_counter() - start
+    raw = response["message"]["content"]
+    # check_json_response tolerates <think> blocks the same way agent_response does
+    with contextlib.redirect_stdout(io.StringIO()):
+        parsed = agent.check_json_response(raw)
+    tool_ok = str(parsed.get("tool_choice")) == query["tool_choice"]
+    return {
+        "parse_ok": parsed_as_json(agent, raw, parsed),
+        "tool_ok": tool_ok,
+        "input_ok": tool_ok and input_matches(query["tool_input"], parsed.get("tool_input")),
+        "predicted": parsed.get("tool_choice"),
+        "prompt_tokens": response.get("prompt_eval_count") or 0,
+        "eval_tokens": response.get("eval_count") or 0,
+        "latency": round(latency, 3),
+        "error": "encountered an error" in raw,
+    }
+
+
+def summarize(results: List[Dict]) -> Dict[str, float]:
+    """
+    Aggregates per-query results for one model and temperature.
+    """
+    count = len(results)
+    latencies = sorted(r["latency"] for r in results)
+    return {
+        "runs": count,
+        "parse_rate": sum(r["parse_ok"] for r in results) / count,
+        "tool_accuracy": sum(r["tool_ok"] for r in results) / count,
+        "input_accuracy": sum(r["input_ok"] for r in results) / count,
+        "p50_latency": latencies[count // 2],
+        "p90_latency": latencies[min(count - 1, int(0.9 * count))],
+        "mean_eval_tokens": sum(r["eval_tokens"] for r in results) / count,
+        "errors": sum(r["error"] for r in results),
+    }
+
+
+def write_report(rows: List[Dict], path: Path) -> str:
+    """
+    Ranks the model/temperature combinations and writes a markdown report.
+
+    Ranking is by tool accuracy, then parse rate, then p50 latency.
+    """
+    rows = sorted(rows, key=lambda r: (-r["tool_accuracy"], -r["parse_rate"], r["p50_latency"]))
+    lines = [
+        "| rank | model | temp | tool acc | input acc | parse rate | p50 s | p90 s | eval tokens | errors |",
+        "|---:|---|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for rank, r in enumerate(rows, 1):
+        lines.append(f"| {rank} | {r['model']} | {r['temperature']} | {r['tool_accuracy']:.0%} | {r['input_accuracy']:.0%} "
+                     f"| {r['parse_rate']:.0%} | {r['p50_latency']:.2f} | {r['p90_latency']:.2f} "
+                     f"| {r['mean_eval_tokens']:.0f} | {r['errors']} |")
+    report = "\n".join(lines)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# Tool selection accuracy vs latency\n\nGenerated {time.strftime('%Y-%m-%d %H:%M')}\n\n{report}\n")
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare models on the JSON tool protocol.")
+    parser.add_argument("--models", help="Comma separated models (defaults to MODELS in COA.py)")
+    parser.add_argument("--temperatures", default="0.0,0.6", help="Comma separated temperatures")
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per query, model and temperature")
+    parser.add_argument("--queries", default=str(QUERIES_FILE), help="Labeled query set")
+    parser.add_argument("--cache", default=str(CACHE_FILE), help="Result cache used to resume runs")
+    parser.add_argument("--report", default=str(REPORT_FILE), help="Markdown report to write")
+    parser.add_argument("--fake", action="store_true", help="Run against the fake Ollama server")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    from COA import CommunityOfAgents, DEFAULT_TOOLS, MODELS
+
+    models = [m.strip() for m in args.models.split(",")] if args.models else MODELS
+    temperatures = [float(t) for t in args.temperatures.split(",")]
+    queries = load_queries(Path(args.queries))
+
+    fake_server = None
+    if args.fake:
+        from benchmarks.fake_ollama import FakeOllamaServer
+        fake_server = FakeOllamaServer(token_rate=0, latency=0).start()
+        backend = create_backend({"ollama_hosts": [fake_server.url], "hedge_percentile": None})
+    else:
+        backend = CommunityOfAgents().llm_backend
+
+    prompt = prompt_hash(Agent(AGENT_REBECCA, "Eval", models[0], DEFAULT_TOOLS, backend=backend))
+    cache_path = Path(args.cache)
+    if args.fake and cache_path == CACHE_FILE:
+        # Keep fake replies out of the cache used for real models
+        cache_path = cache_path.with_name("model_eval_cache_fake.jsonl")
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache = load_cache(cache_path)
+    total = len(models) * len(temperatures) * len(queries) * args.repeats
+    done = 0
+    rows = []
+    try:
+        with open(cache_path, "a", encoding="utf-8") as cache_out:
+            for model in models:
+                for temperature in temperatures:
+                    results = []
+                    for query in queries:
+                        for repeat in range(args.repeats):
+                            key = cache_key(model, temperature, query["id"], repeat, prompt)
+                            done += 1
+                            if key not in cache:
+                                result = evaluate(backend, model, temperature, query, DEFAULT_TOOLS)
+                                result["key"] = key
+                                cache[key] = result
+                                # One line per result, flushed, so an interrupted run resumes where it stopped
+                                cache_out.write(json.dumps(result) + "\n")
+                                cache_out.flush()
+                                print(f"[{done}/{total}] {model} t={temperature} {query['id']}: "
+                                      f"{result['predicted']} ({result['latency']}s)", file=sys.stderr)
+                            results.append(cache[key])
+                    row = summarize(results)
+                    row.update({"model": model, "temperature": temperature})
+                    rows.append(row)
+    finally:
+        if fake_server:
+            fake_server.stop()
+        backend.close()
+
+    print(write_report(rows, Path(args.report)))
+    print(f"\nReport written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import argparse
+import contextlib
+import gc
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+
+from llm.fake_backend import FakeBackend
+from runtime.memory import format_bytes, rss_bytes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that memory stays flat over a long chat session.")
+    parser.add_argument("--turns", type=int, default=100000, help="Chat turns to run")
+    parser.add_argument("--samples", type=int, default=10, help="RSS samples over the run")
+    parser.add_argument("--message-chars", type=int, default=200, help="Length of each user message")
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Allowed RSS growth between the first sample and the end")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as session_dir, contextlib.redirect_stdout(io.StringIO()):
+        # COA pulls in gradio and reads config.json, so only import it here
+        from COA import CommunityOfAgents, Interface, AGENT
+
+        community = CommunityOfAgents()
+        # A real backend keeps nothing per call, so neither should the fake one
+        backend = FakeBackend(max_calls=0)
+        community.llm_backend = community.budget_planner.backend = community.sessions.backend = backend
+        community.sessions.directory = session_dir
+        community.intro_cache = None
+        agent = community.get_agent_by_id(AGENT["agent_id"])
+        agent.intro_given = True
+        interface = Interface(community, agent)
+
+        history = []
+        filler = "x" * args.message_chars
+        every = max(1, args.turns // args.samples)
+        rows = []
+        start = time.perf_counter()
+        for turn in range(1, args.turns + 1):
+            _, history = interface.respond(f"Message {turn} {filler}", history)
+            if turn % every == 0 or turn == args.turns:
+                gc.collect()
+                usage = agent.memory_usage()
+                rows.append((turn, time.perf_counter() - start, rss_bytes(), usage, len(history)))
+
+    print(f"{args.turns} turns of {args.message_chars}-character messages, "
+          f"max_history {agent.MAX_HISTORY_LENGTH} entries / {format_bytes(agent.max_history_bytes)}, "
+          f"max_transcript {interface.max_transcript}")
+    print(f"{'turn':>8}{'seconds':>9}{'RSS':>11}{'history':>9}{'hist size':>11}{'prompts':>10}{'transcript':>12}")
+    for turn, seconds, rss, usage, transcript in rows:
+        print(f"{turn:>8}{seconds:>9.1f}{format_bytes(rss):>11}{usage['history_entries']:>9}"
+              f"{format_bytes(usage['history_bytes']):>11}{format_bytes(usage['prompt_bytes']):>10}{transcript:>12}")
+    first, last = rows[0][2], rows[-1][2]
+    growth = (last - first) / first if first else 0.0
+    print(f"RSS growth after the first sample: {growth:+.1%} ({'flat' if growth <= args.tolerance else 'GROWING'})")
+    return 0 if growth <= args.tolerance else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
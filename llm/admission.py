@@ -0,0 +1,244 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Reply given to the user when the controller is saturated and sheds the request
+BUSY_MESSAGE = "I'm swamped with other jobs right now, choom. Give me a few seconds and try again."
+
+
+def model_size(model: str) -> Optional[float]:
+    """
+    Estimates the parameter count of a model from its Ollama tag.
+
+    Args:
+        model: Model name such as 'qwen3:8b' or 'gemma3:12b'
+
+    Returns:
+        float: Size in billions of parameters, or None when the tag carries no size
+    """
+    match = re.search(r":(\d+(?:\.\d+)?)b\b", model.lower())
+    if match:
+        return float(match.group(1))
+    return None
+
+
+@dataclass
+class AdmissionTicket:
+    """
+    Result of admitting a request to the LLM.
+
+    Attributes:
+        requested (str): Model the agent asked for
+        model (str): Model the request should run on (may be downgraded)
+        history_limit (Optional[int]): Maximum history entries to render, None for all
+        level (int): Degradation level the ticket was issued at
+        started (float): Monotonic start time of the request
+    """
+    requested: str
+    model: str
+    history_limit: Optional[int]
+    level: int
+    started: float
+
+
+class AdmissionController:
+    """
+    Admission control and load shedding around LLM calls.
+
+    The controller tracks in-flight requests and the p95 latency of recent calls.
+    When the latency target is missed it degrades in steps: first the rendered
+    conversation history is shortened, then each further step moves to the next
+    smaller model from the configured model list. Latency must fall well below
+    the target (hysteresis) before a step is undone. When the number of in-flight
+    requests reaches the cap, new requests are rejected immediately.
+    """
+
+    def __init__(self, models: List[str], max_in_flight: int = 4, latency_target: float = 30.0,
+                 recover_ratio: float = 0.6, window: int = 50, cooldown: int = 5,
+                 history_budget: int = 20):
+        """
+        Initialize the admission controller.
+
+        Args:
+            models: Models available for degradation
+            max_in_flight: Maximum concurrent LLM requests before rejecting
+            latency_target: p95 latency target in seconds
+            recover_ratio: Fraction of the target p95 must drop below to recover a step
+            window: Number of recent latencies used for the p95 estimate
+            cooldown: Minimum completed requests between level changes
+            history_budget: History entries rendered once degraded
+        """
+        # Largest first, so stepping down the ladder means moving to higher indexes.
+        # Models without a size in their tag can't be placed on it and are never substituted.
+        self.models = sorted([m for m in models if model_size(m) is not None], key=model_size, reverse=True)
+        self.max_in_flight = max_in_flight
+        self.latency_target = latency_target
+        self.recover_ratio = recover_ratio
+        self.cooldown = cooldown
+        self.history_budget = history_budget
+
+        self.level = 0
+        self.in_flight = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.since_change = 0
+        self.counters = {
+            "admitted": 0,
+            "rejected": 0,
+            "degraded_requests": 0,
+            "degrade_events": 0,
+            "recover_events": 0,
+        }
+        self.events: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    def _smaller(self, model: str) -> List[str]:
+        """
+        Returns the models smaller than a model, largest first; none for a model of unknown size.
+        """
+        size = model_size(model)
+        if size is None:
+            return []
+        return [m for m in self.models if model_size(m) < size]
+
+    def _plan(self, model: str, level: int) -> AdmissionTicket:
+        """
+        Works out the model and history budget for a degradation level.
+
+        Args:
+            model: The model requested by the agent
+            level: The level the request runs at
+
+        Returns:
+            AdmissionTicket: The ticket for the request
+        """
+        history_limit = self.history_budget if level >= 1 else None
+        chosen = model
+        if level >= 2:
+            smaller = self._smaller(model)
+            if smaller:
+                chosen = smaller[min(level - 2, len(smaller) - 1)]
+        return AdmissionTicket(model, chosen, history_limit, level, time.monotonic())
+
+    def max_level(self, model: str) -> int:
+        """
+        Returns the deepest degradation level available for a model.
+
+        Args:
+            model: The requested model
+
+        Returns:
+            int: The maximum level
+        """
+        return 1 + len(self._smaller(model))
+
+    def admit(self, model: str) -> Optional[AdmissionTicket]:
+        """
+        Admits a request or sheds it when saturated.
+
+        Args:
+            model: The model requested by the agent
+
+        Returns:
+            AdmissionTicket or None if the request was rejected
+        """
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.counters["rejected"] += 1
+                logger.warning(f"Admission rejected: {self.in_flight} requests in flight")
+                return None
+            self.in_flight += 1
+            self.counters["admitted"] += 1
+            # A model with fewer steps below it runs at its own deepest level; the shared level stays
+            ticket = self._plan(model, min(self.level, self.max_level(model)))
+            if ticket.level:
+                self.counters["degraded_requests"] += 1
+            return ticket
+
+    def release(self, ticket: AdmissionTicket) -> float:
+        """
+        Marks a request as finished and adjusts the degradation level.
+
+        Args:
+            ticket: The ticket returned by admit()
+
+        Returns:
+            float: The latency of the request in seconds
+        """
+        latency = time.monotonic() - ticket.started
+        with self._lock:
+            self.in_flight -= 1
+            # Only latencies observed at the current level say anything about it
+            if ticket.level != min(self.level, self.max_level(ticket.requested)):
+                return latency
+            self.latencies.append(latency)
+            self.since_change += 1
+            if self.since_change < self.cooldown:
+                return latency
+            p95 = self._p95()
+            if p95 > self.latency_target and self.level < self.max_level(ticket.requested):
+                self._change_level(self.level + 1, p95, "degrade")
+            elif p95 < self.latency_target * self.recover_ratio and self.level > 0:
+                self._change_level(self.level - 1, p95, "recover")
+        return latency
+
+    def _change_level(self, level: int, p95: float, kind: str) -> None:
+        """
+        Moves to a new degradation level and records the event.
+
+        Args:
+            level: The new level
+            p95: The p95 latency that triggered the change
+            kind: 'degrade' or 'recover'
+        """
+        logger.warning(f"Admission {kind}: level {self.level} -> {level} (p95 {p95:.2f}s, target {self.latency_target:.2f}s)")
+        self.events.append({"time": time.time(), "event": kind, "from": self.level, "to": level, "p95": round(p95, 3)})
+        self.counters[f"{kind}_events"] += 1
+        self.level = level
+        self.since_change = 0
+        self.latencies.clear()
+
+    def _p95(self) -> float:
+        """
+        Returns the p95 of the recent latency window.
+        """
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the admission metrics.
+
+        Returns:
+            Dict containing counters, gauges and recent degradation events
+        """
+        with self._lock:
+            snapshot = dict(self.counters)
+            snapshot.update({
+                "level": self.level,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "p95_seconds": round(self._p95(), 3),
+                "latency_target_seconds": self.latency_target,
+                "events": list(self.events),
+            })
+            return snapshot
+
+    def show_metrics(self) -> str:
+        """
+        Returns the admission metrics as a formatted string.
+        """
+        metrics = self.metrics()
+        events = metrics.pop("events")
+        lines = [f"{key}: {value}" for key, value in metrics.items()]
+        for event in events:
+            lines.append(f"{time.strftime('%H:%M:%S', time.localtime(event['time']))} {event['event']} "
+                         f"level {event['from']} -> {event['to']} (p95 {event['p95']}s)")
+        return "\n".join(lines)
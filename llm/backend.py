@@ -0,0 +1,138 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ["ollama", "openai", "fake"]
+DEFAULT_OLLAMA_HOST = "http://localhost:11434"
+
+
+class LLMBackend:
+    """
+    Interface every LLM backend implements.
+
+    Responses follow the shape of the Ollama chat API so callers can read
+    `response['message']['content']` and the `prompt_eval_count`, `eval_count`
+    and `*_duration` fields whatever server produced them.
+    """
+
+    name = "base"
+
+    def chat(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Sends a chat request and waits for the full reply.
+
+        Args:
+            model: Model name
+            messages: Chat messages with 'role' and 'content' keys
+            options: Generation options such as temperature
+
+        Returns:
+            Dictionary in the Ollama chat response format
+        """
+        raise NotImplementedError
+
+    def stream(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Sends a chat request and yields the reply as it is generated.
+
+        Args:
+            model: Model name
+            messages: Chat messages with 'role' and 'content' keys
+            options: Generation options such as temperature
+
+        Returns:
+            Iterator of chunks in the Ollama chat response format, the last one with 'done' set
+        """
+        raise NotImplementedError
+
+    def embed(self, model: str, input: Union[str, List[str]]) -> Dict[str, Any]:
+        """
+        Computes embeddings.
+
+        Args:
+            model: Embedding model name
+            input: Text or list of texts to embed
+
+        Returns:
+            Dictionary with an 'embeddings' list
+        """
+        raise NotImplementedError
+
+    def show(self, model: str) -> Dict[str, Any]:
+        """
+        Returns information about a model.
+
+        Args:
+            model: Model name
+
+        Returns:
+            Dictionary in the Ollama show response format
+        """
+        raise NotImplementedError
+
+    def save_context(self, model: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Persists the server's reusable context (its KV cache) after the last request.
+
+        Args:
+            model: Model the context belongs to
+            name: Session name used to identify the snapshot on the server
+
+        Returns:
+            Details to store with the session, or None when the backend can't save its context
+        """
+        return None
+
+    def restore_context(self, model: str, name: str, messages: List[Dict[str, str]],
+                        options: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Brings the server's context back for a resumed session so the next request skips the prefill.
+
+        Args:
+            model: Model the context belongs to
+            name: Session name the snapshot was saved under
+            messages: Prompt prefix the next request starts with
+            options: Generation options the next request is sent with
+
+        Returns:
+            bool: True if the context was restored
+        """
+        return False
+
+    def show_status(self) -> str:
+        """
+        Returns a short description of the backend state.
+        """
+        return f"Backend: {self.name}"
+
+    def close(self) -> None:
+        """
+        Releases connections and background threads.
+        """
+
+
+def create_backend(config: Dict[str, Any]) -> LLMBackend:
+    """
+    Creates the backend selected by the 'backend' configuration key.
+
+    Backend modules are imported on demand so only the client library of the
+    selected backend needs to be installed.
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        LLMBackend: The configured backend
+    """
+    kind = config.get("backend", "ollama")
+    if kind == "ollama":
+        from llm.ollama_backend import OllamaBackend
+        return OllamaBackend.from_config(config)
+    if kind == "openai":
+        from llm.openai_backend import OpenAICompatibleBackend
+        return OpenAICompatibleBackend.from_config(config)
+    if kind == "fake":
+        from llm.fake_backend import FakeBackend
+        return FakeBackend()
+    raise ValueError(f"Unknown backend '{kind}', expected one of {', '.join(BACKENDS)}")
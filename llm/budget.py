@@ -0,0 +1,164 @@
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from llm.backend import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+# Context Ollama uses when a model reports none and no num_ctx is set
+DEFAULT_CONTEXT = 4096
+# BPE tokenizers keep common short words whole, split longer ones and give punctuation its own token
+TOKEN_PATTERN = re.compile(r"\w{1,5}|[^\w\s]")
+# Retry a failed model lookup after this many seconds instead of on every turn
+RETRY_AFTER = 60.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximates the number of tokens a BPE tokenizer produces for a text.
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        int: Estimated token count, on the high side for long words and identifiers
+    """
+    if not text:
+        return 0
+    return len(TOKEN_PATTERN.findall(text))
+
+
+@dataclass
+class TokenBudget:
+    """
+    Token allocation for one LLM request.
+    """
+    model: str
+    context: int
+    response: int
+    system: int
+    tools: int
+    memory: int
+    user: int
+    history_budget: int
+    history_used: int
+    history_entries: int
+    history_dropped: int
+
+    def total(self) -> int:
+        return self.system + self.tools + self.memory + self.user + self.history_used + self.response
+
+    def describe(self) -> str:
+        """
+        Returns the breakdown as a one-line summary.
+        """
+        return (f"{self.model} context {self.context}: system {self.system}, tools {self.tools}, "
+                f"memory {self.memory}, user {self.user}, history {self.history_used}/{self.history_budget} "
+                f"({self.history_entries} entries, {self.history_dropped} dropped), response {self.response}, "
+                f"free {self.context - self.total()}")
+
+
+class TokenBudgetPlanner:
+    """
+    Fits each prompt into the context window of the model it is sent to.
+
+    Context lengths come from the backend's show() and are cached per model.
+    The fixed parts of the prompt (system prefix, tool descriptions, memory and
+    the user message) and a reserve for the response are taken first; the rest
+    of the window goes to the conversation history, newest entries first.
+    """
+
+    def __init__(self, backend: LLMBackend, max_context: int = 8192, response_tokens: int = 512):
+        """
+        Initialize the planner.
+
+        Args:
+            backend: Backend used to look up model details
+            max_context: Largest context window to request, 0 for the model maximum
+            response_tokens: Tokens kept free for the model's reply
+        """
+        self.backend = backend
+        self.max_context = max_context
+        self.response_tokens = response_tokens
+        self.models: Dict[str, Tuple[int, Dict[str, Any], float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_context(details: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Extracts the context length and parameters from a show() response.
+
+        Returns:
+            Tuple of context length (0 if unknown) and the model parameters
+        """
+        context = 0
+        for key, value in (details.get("model_info") or {}).items():
+            if key.endswith(".context_length") and value:
+                context = int(value)
+        parameters: Dict[str, Any] = {}
+        for line in (details.get("parameters") or "").splitlines():
+            name, _, value = line.strip().partition(" ")
+            if name:
+                parameters[name] = value.strip().strip('"')
+        return context, parameters
+
+    def model_context(self, model: str) -> int:
+        """
+        Returns the context window to use for a model, looking it up once.
+
+        Args:
+            model: Model name
+
+        Returns:
+            int: Context window in tokens
+        """
+        with self._lock:
+            cached = self.models.get(model)
+        if cached and (cached[0] or time.monotonic() - cached[2] < RETRY_AFTER):
+            context = cached[0] or DEFAULT_CONTEXT
+        else:
+            try:
+                context, parameters = self.parse_context(self.backend.show(model))
+                if str(parameters.get("num_ctx", "")).isdigit():
+                    # A num_ctx set in the Modelfile is the operator's choice of window
+                    num_ctx = int(parameters["num_ctx"])
+                    context = min(context, num_ctx) if context else num_ctx
+            except Exception as e:
+                logger.warning(f"Could not read the context length of {model}: {str(e)}")
+                context, parameters = 0, {}
+            with self._lock:
+                self.models[model] = (context, parameters, time.monotonic())
+            context = context or DEFAULT_CONTEXT
+        if self.max_context:
+            context = min(context, self.max_context)
+        return context
+
+    def plan(self, model: str, system_tokens: int, tools_tokens: int, user_prompt: str,
+             history, memory: str = "") -> TokenBudget:
+        """
+        Allocates the context window of a model for one request.
+
+        Args:
+            model: Model the request is sent to
+            system_tokens: Tokens of the system prompt without tools and history
+            tools_tokens: Tokens of the tool descriptions
+            user_prompt: The user message of the request
+            history: Conversation history (Message) providing per-entry token counts
+            memory: Any other text added to the prompt
+
+        Returns:
+            TokenBudget with the number of history entries that fit
+        """
+        context = self.model_context(model)
+        user = estimate_tokens(user_prompt)
+        memory_tokens = estimate_tokens(memory)
+        history_budget = max(0, context - self.response_tokens - system_tokens - tools_tokens - memory_tokens - user)
+        entries, used = history.fit(history_budget)
+        return TokenBudget(model=model, context=context, response=self.response_tokens, system=system_tokens,
+                           tools=tools_tokens, memory=memory_tokens, user=user, history_budget=history_budget,
+                           history_used=used, history_entries=entries,
+                           history_dropped=len(history.messages) - entries)
@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from functools import partial
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Open coalescers, whose dispatcher threads are restarted in a forked child
+_coalescers: "weakref.WeakSet[RequestCoalescer]" = weakref.WeakSet()
+
+
+class RequestCoalescer:
+    """
+    Gathers requests that arrive close together and submits them as one batch.
+
+    Callers block in `submit` while a dispatcher thread waits up to `window`
+    seconds (or until `max_batch` requests are queued) and hands the whole batch
+    to `submit_batch`. Servers with continuous batching, such as llama.cpp in
+    parallel-slot mode, then see concurrent agent turns at the same time.
+
+    `submit_batch` only starts the requests and returns a future for each, so
+    the dispatcher goes straight back to collecting the next batch: a request
+    never waits for an earlier batch to finish.
+
+    `close` submits what is still queued and stops the dispatcher. A forked
+    child starts a dispatcher of its own, since threads don't survive a fork.
+    """
+
+    def __init__(self, submit_batch: Callable[[List[Any]], List[Future]], window: float = 0.005, max_batch: int = 8):
+        """
+        Initialize the coalescer.
+
+        Args:
+            submit_batch: Function starting a list of requests without waiting for them,
+                returning a future per request in the same order
+            window: Seconds to wait for more requests after the first one arrives
+            max_batch: Maximum requests per batch
+        """
+        self.submit_batch = submit_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+        self._queue: List[Tuple[Any, Future]] = []
+        self._cond = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._closed = False
+        _coalescers.add(self)
+        self.start()
+
+    def start(self) -> "RequestCoalescer":
+        """
+        Starts the dispatcher thread unless it is already running or the coalescer is closed.
+        """
+        with self._cond:
+            if not self._closed and (self._dispatcher is None or not self._dispatcher.is_alive()):
+                # Also restarts it in a forked process, where the parent's thread doesn't exist
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="llm-coalescer", daemon=True)
+                self._dispatcher.start()
+        return self
+
+    def close(self) -> None:
+        """
+        Submits the requests still queued and stops the dispatcher.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            dispatcher = self._dispatcher
+        _coalescers.discard(self)
+        if dispatcher is not None and dispatcher is not threading.current_thread():
+            dispatcher.join()
+
+    def submit(self, request: Any) -> Any:
+        """
+        Queues a request and waits for its result.
+
+        Args:
+            request: The request to submit
+
+        Returns:
+            The result for this request
+
+        Raises:
+            RuntimeError: If the coalescer is closed
+        """
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Request coalescer is closed")
+            self._queue.append((request, future))
+            self._cond.notify()
+        return future.result()
+
+    def _dispatch_loop(self) -> None:
+        """
+        Collects batches and runs them until closed and drained.
+        """
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                deadline = time.monotonic() + self.window
+                while len(self._queue) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            self.batches += 1
+            self.requests += len(batch)
+            logger.debug(f"Submitting coalesced batch of {len(batch)} requests")
+            try:
+                started = self.submit_batch([request for request, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, started):
+                result.add_done_callback(partial(self._settle, future))
+
+    @staticmethod
+    def _settle(future: Future, result: Future) -> None:
+        """
+        Passes the outcome of a started request on to the caller waiting for it.
+        """
+        error = result.exception()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result.result())
+
+    def average_batch(self) -> float:
+        """
+        Returns the mean number of requests per submitted batch.
+        """
+        return self.requests / self.batches if self.batches else 0.0
+
+
+def _restart_after_fork() -> None:
+    """
+    Starts new dispatcher threads in a forked child; threads don't survive a fork.
+
+    Requests queued in the parent belong to callers that only exist there, so
+    the child starts with an empty queue and a fresh lock.
+    """
+    for coalescer in list(_coalescers):
+        coalescer._cond = threading.Condition()
+        coalescer._queue = []
+        coalescer._dispatcher = None
+        coalescer.start()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
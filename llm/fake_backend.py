@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Union
+
+from llm.backend import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+
+def default_reply(model: str, messages: List[Dict[str, str]]) -> str:
+    """
+    Builds a deterministic no-tool JSON reply echoing the last user message.
+    """
+    user_message = messages[-1]["content"] if messages else ""
+    return "```json\n" + json.dumps({
+        "tool_choice": "None",
+        "tool_input": "None",
+        "agent_response": f"[{model}] You said: {user_message}"
+    }) + "\n```"
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic in-process backend for tests and benchmarks.
+
+    Replies come from a scripted list (used in order and then repeated) or from
+    a responder function. Token counts are whitespace word counts and latency
+    can be simulated per request and per generated token. Only the latest
+    `max_calls` requests are kept in `calls`, so long soak runs don't measure
+    the backend's own growth.
+    """
+
+    name = "fake"
+
+    def __init__(self, replies: Optional[List[str]] = None,
+                 responder: Optional[Callable[[str, List[Dict[str, str]]], str]] = None,
+                 latency: float = 0.0, token_delay: float = 0.0, context_length: int = 8192,
+                 max_calls: int = 1000):
+        """
+        Initialize the fake backend.
+
+        Args:
+            replies: Scripted replies returned in order, cycling when exhausted
+            responder: Function (model, messages) -> reply used when no replies are scripted
+            latency: Seconds to wait before each reply
+            token_delay: Extra seconds per generated token
+            context_length: Context length reported by show()
+            max_calls: Latest requests kept in `calls`, 0 to keep none
+        """
+        self.replies = list(replies or [])
+        self.responder = responder or default_reply
+        self.latency = latency
+        self.token_delay = token_delay
+        self.context_length = context_length
+        self.calls: Deque[Dict[str, Any]] = deque(maxlen=max_calls)
+        self.call_count = 0
+        self._lock = threading.Lock()
+
+    def _next_reply(self, model: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Picks the reply for the next call and records the call.
+        """
+        with self._lock:
+            index = self.call_count
+            self.call_count += 1
+            self.calls.append({"model": model, "messages": messages})
+        if self.replies:
+            return self.replies[index % len(self.replies)]
+        return self.responder(model, messages)
+
+    def chat(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        start = time.perf_counter_ns()
+        reply = self._next_reply(model, messages)
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        eval_tokens = len(reply.split())
+        delay = self.latency + self.token_delay * eval_tokens
+        if delay:
+            time.sleep(delay)
+        total = time.perf_counter_ns() - start
+        return {
+            "model": model,
+            "message": {"role": "assistant", "content": reply},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": eval_tokens,
+            "prompt_eval_duration": int(self.latency * 1e9),
+            "eval_duration": total - int(self.latency * 1e9),
+            "total_duration": total,
+        }
+
+    def stream(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        reply = self._next_reply(model, messages)
+        if self.latency:
+            time.sleep(self.latency)
+        for word in reply.split(" "):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield {"model": model, "message": {"role": "assistant", "content": word + " "}, "done": False}
+        yield {"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+               "eval_count": len(reply.split())}
+
+    def embed(self, model: str, input: Union[str, List[str]]) -> Dict[str, Any]:
+        texts = [input] if isinstance(input, str) else input
+        embeddings = []
+        for text in texts:
+            digest = hashlib.sha256(text.encode("utf-8")).digest()
+            embeddings.append([(byte - 127.5) / 127.5 for byte in digest[:16]])
+        return {"model": model, "embeddings": embeddings}
+
+    def show(self, model: str) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "details": {"family": "fake", "parameter_size": "0B"},
+            "model_info": {"general.architecture": "fake", "fake.context_length": self.context_length},
+            "parameters": "",
+        }
+
+    def show_status(self) -> str:
+        return f"Backend: {self.name} ({self.call_count} calls)"
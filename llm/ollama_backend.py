@@ -0,0 +1,88 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import ollama
+
+from llm.backend import LLMBackend, DEFAULT_OLLAMA_HOST
+from llm.pool import OllamaClientPool
+
+logger = logging.getLogger(__name__)
+
+
+def to_dict(response: Any) -> Dict[str, Any]:
+    """
+    Converts an ollama response model to a plain dictionary.
+    """
+    if hasattr(response, "model_dump"):
+        return response.model_dump()
+    return dict(response)
+
+
+class OllamaBackend(LLMBackend):
+    """
+    Backend talking to one or more Ollama servers.
+
+    Attributes:
+        client: Anything with the `ollama` module interface, usually an OllamaClientPool
+    """
+
+    name = "ollama"
+
+    def __init__(self, client=None):
+        """
+        Initialize the Ollama backend.
+
+        Args:
+            client: Client with the `ollama` module interface, defaults to the `ollama` module
+        """
+        self.client = client or ollama
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "OllamaBackend":
+        """
+        Creates the backend with a client pool over the configured hosts.
+
+        Args:
+            config: Application configuration
+
+        Returns:
+            OllamaBackend: The configured backend
+        """
+        return cls(OllamaClientPool(
+            config.get("ollama_hosts", [DEFAULT_OLLAMA_HOST]),
+            hedge_percentile=config.get("hedge_percentile", 95),
+            max_hedges=config.get("max_hedges", 2)
+        ))
+
+    def chat(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return to_dict(self.client.chat(model, messages=messages, options=options))
+
+    def stream(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        for chunk in self.client.chat(model, messages=messages, options=options, stream=True):
+            yield to_dict(chunk)
+
+    def embed(self, model: str, input: Union[str, List[str]]) -> Dict[str, Any]:
+        return to_dict(self.client.embed(model, input=input))
+
+    def show(self, model: str) -> Dict[str, Any]:
+        return to_dict(self.client.show(model))
+
+    def restore_context(self, model: str, name: str, messages: List[Dict[str, str]],
+                        options: Optional[Dict[str, Any]] = None) -> bool:
+        # Ollama can't load a KV cache from disk, so prefill the prefix now with a one token
+        # request; the next chat with the same prefix and options reuses the runner's cache
+        try:
+            self.client.chat(model, messages=messages, options=dict(options or {}, num_predict=1))
+            return True
+        except Exception as e:
+            logger.info(f"Could not warm the context of {model}: {str(e)}")
+            return False
+
+    def show_status(self) -> str:
+        if hasattr(self.client, "show_status"):
+            return f"Backend: {self.name}\n{self.client.show_status()}"
+        return f"Backend: {self.name} (default host)"
+
+    def close(self) -> None:
+        if hasattr(self.client, "close"):
+            self.client.close()
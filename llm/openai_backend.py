@@ -0,0 +1,216 @@
+import json
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from llm.backend import LLMBackend
+from llm.coalesce import RequestCoalescer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "http://localhost:8080/v1"
+
+# Ollama option names mapped to their OpenAI request field
+OPTION_FIELDS = {
+    "temperature": "temperature",
+    "top_p": "top_p",
+    "num_predict": "max_tokens",
+    "seed": "seed",
+    "stop": "stop",
+}
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Backend for servers speaking the OpenAI `/v1/chat/completions` API.
+
+    Works with llama.cpp server, vLLM and similar servers. Concurrent chat
+    requests can optionally be coalesced and sent together; servers with
+    continuous batching already decode concurrent requests in parallel slots,
+    so this is off by default. Replies are translated to the Ollama response
+    format used by the rest of the application.
+    """
+
+    name = "openai"
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, api_key: str = "", timeout: float = 300.0,
+                 coalesce_window: float = 0.0, max_batch: int = 8, slot_id: int = 0):
+        """
+        Initialize the OpenAI compatible backend.
+
+        Args:
+            base_url: Base URL including the /v1 prefix
+            api_key: Bearer token, empty for local servers
+            timeout: Request timeout in seconds
+            coalesce_window: Seconds to wait for concurrent requests, 0 disables coalescing
+            max_batch: Maximum requests submitted together
+            slot_id: llama.cpp slot whose KV cache is saved and restored for resumed sessions
+        """
+        self.base_url = base_url.rstrip("/")
+        self.slot_id = slot_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Keep one connection per parallel request alive
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_batch)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+        self._executor = ThreadPoolExecutor(max_workers=max_batch, thread_name_prefix="openai-batch")
+        self.coalescer = RequestCoalescer(self._send_batch, coalesce_window, max_batch) if coalesce_window > 0 else None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "OpenAICompatibleBackend":
+        """
+        Creates the backend from the application configuration.
+
+        Args:
+            config: Application configuration
+
+        Returns:
+            OpenAICompatibleBackend: The configured backend
+        """
+        return cls(
+            base_url=config.get("openai_base_url", DEFAULT_BASE_URL),
+            api_key=config.get("openai_api_key", ""),
+            coalesce_window=config.get("coalesce_window_ms", 0) / 1000.0,
+            max_batch=config.get("coalesce_max_batch", 8),
+            slot_id=config.get("openai_slot_id", 0)
+        )
+
+    def _payload(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+        """
+        Builds a chat completion request body.
+        """
+        payload = {"model": model, "messages": messages, "stream": stream}
+        for option, field in OPTION_FIELDS.items():
+            if options and option in options:
+                payload[field] = options[option]
+        return payload
+
+    @staticmethod
+    def _to_ollama(model: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Translates a chat completion response to the Ollama format.
+        """
+        usage = body.get("usage") or {}
+        # llama.cpp reports its own timings, other servers don't
+        timings = body.get("timings") or {}
+        prompt_ns = int(timings.get("prompt_ms", 0) * 1e6)
+        eval_ns = int(timings.get("predicted_ms", 0) * 1e6)
+        return {
+            "model": body.get("model", model),
+            "message": {"role": "assistant", "content": body["choices"][0]["message"].get("content") or ""},
+            "done": True,
+            "done_reason": body["choices"][0].get("finish_reason"),
+            "prompt_eval_count": usage.get("prompt_tokens"),
+            "eval_count": usage.get("completion_tokens"),
+            "prompt_eval_duration": prompt_ns or None,
+            "eval_duration": eval_ns or None,
+            "total_duration": (prompt_ns + eval_ns) or None,
+        }
+
+    def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Sends one chat completion request.
+        """
+        response = self.session.post(f"{self.base_url}/chat/completions", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return self._to_ollama(payload["model"], response.json())
+
+    def _send_batch(self, payloads: List[Dict[str, Any]]) -> List[Future]:
+        """
+        Starts a batch of chat requests concurrently without waiting for them.
+
+        Returns:
+            List of futures of the responses, in the order of the payloads
+        """
+        return [self._executor.submit(self._post, payload) for payload in payloads]
+
+    def chat(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        payload = self._payload(model, messages, options, stream=False)
+        if self.coalescer:
+            return self.coalescer.submit(payload)
+        return self._post(payload)
+
+    def stream(self, model: str, messages: List[Dict[str, str]], options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        payload = self._payload(model, messages, options, stream=True)
+        with self.session.post(f"{self.base_url}/chat/completions", json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                chunk = json.loads(data)
+                if not chunk.get("choices"):
+                    continue
+                delta = chunk["choices"][0].get("delta", {}).get("content") or ""
+                yield {"model": model, "message": {"role": "assistant", "content": delta}, "done": False}
+        yield {"model": model, "message": {"role": "assistant", "content": ""}, "done": True}
+
+    def embed(self, model: str, input: Union[str, List[str]]) -> Dict[str, Any]:
+        response = self.session.post(f"{self.base_url}/embeddings", json={"model": model, "input": input}, timeout=self.timeout)
+        response.raise_for_status()
+        return {"model": model, "embeddings": [item["embedding"] for item in response.json()["data"]]}
+
+    def show(self, model: str) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"general.architecture": "openai"}
+        # llama.cpp exposes its context size on /props next to the /v1 routes
+        try:
+            props = self.session.get(f"{self.base_url.rsplit('/v1', 1)[0]}/props", timeout=10).json()
+            n_ctx = props.get("default_generation_settings", {}).get("n_ctx")
+            if n_ctx:
+                info["openai.context_length"] = n_ctx
+        except Exception as e:
+            logger.debug(f"No /props endpoint on {self.base_url}: {str(e)}")
+        response = self.session.get(f"{self.base_url}/models", timeout=10)
+        response.raise_for_status()
+        known = {entry.get("id"): entry for entry in response.json().get("data", [])}
+        return {"model": model, "details": known.get(model, {}), "model_info": info, "parameters": ""}
+
+    def _slot_action(self, action: str, name: str) -> Dict[str, Any]:
+        """
+        Calls the llama.cpp slot save/restore endpoint.
+
+        The server must run with --slot-save-path; the file is stored there.
+        """
+        url = f"{self.base_url.rsplit('/v1', 1)[0]}/slots/{self.slot_id}?action={action}"
+        response = self.session.post(url, json={"filename": f"{name}.bin"}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def save_context(self, model: str, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            result = self._slot_action("save", name)
+            return {"slot": self.slot_id, "filename": result.get("filename"), "tokens": result.get("n_saved")}
+        except Exception as e:
+            logger.info(f"Slot save not available on {self.base_url}: {str(e)}")
+            return None
+
+    def restore_context(self, model: str, name: str, messages: List[Dict[str, str]],
+                        options: Optional[Dict[str, Any]] = None) -> bool:
+        try:
+            result = self._slot_action("restore", name)
+            logger.info(f"Restored {result.get('n_restored')} tokens into slot {self.slot_id}")
+            return True
+        except Exception as e:
+            logger.info(f"Slot restore failed on {self.base_url}: {str(e)}")
+            return False
+
+    def show_status(self) -> str:
+        status = f"Backend: {self.name} ({self.base_url})"
+        if self.coalescer:
+            status += (f"\nCoalesced batches: {self.coalescer.batches}, "
+                       f"average batch size {self.coalescer.average_batch():.2f}")
+        return status
+
+    def close(self) -> None:
+        if self.coalescer:
+            self.coalescer.close()
+        self._executor.shutdown(wait=False)
+        self.session.close()
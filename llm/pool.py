@@ -0,0 +1,372 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import ollama
+
+from llm.backend import DEFAULT_OLLAMA_HOST
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaHost:
+    """
+    State for a single Ollama node in the pool.
+
+    Attributes:
+        url (str): Base URL of the node
+        client (ollama.Client): Keep-alive client bound to the node
+        outstanding (int): Requests currently running on the node
+        healthy (bool): Result of the last health check or request
+        latencies (Deque[float]): Recent chat latencies in seconds
+    """
+
+    def __init__(self, url: str, timeout: Optional[float] = None):
+        self.url = url
+        # Each ollama.Client owns an httpx connection pool, so connections stay alive between calls
+        self.client = ollama.Client(host=url, timeout=timeout)
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.requests = 0
+        self.latencies: Deque[float] = deque(maxlen=100)
+
+    def __repr__(self) -> str:
+        return f"OllamaHost({self.url}, outstanding={self.outstanding}, healthy={self.healthy})"
+
+
+class HedgeAttempt:
+    """
+    One request of a hedged chat; its node slot is given back exactly once.
+
+    Attributes:
+        host (OllamaHost): The node the request runs on
+        released (bool): Whether the slot was given back, by the request or by abandoning it
+        started (threading.Event): Set when the request leaves the executor queue for the node
+    """
+
+    def __init__(self, host: OllamaHost):
+        self.host = host
+        self.released = False
+        self.started = threading.Event()
+
+
+class OllamaClientPool:
+    """
+    Load balanced client for several Ollama nodes.
+
+    Requests go to the healthy node with the fewest outstanding requests. A
+    background thread checks the health of every node. Chat requests that run
+    longer than the pool's latency percentile are hedged: a duplicate is sent to
+    a second node and whichever answers first wins. The delay counts from when
+    the request reaches its node, not from when it was queued, and at most
+    `max_hedges` hedges run at once on an executor of their own, so a busy
+    pool doesn't hedge its own queueing and add to the load. The pool exposes `chat` and
+    `show` with the same signatures as the `ollama` module, so it can be used
+    anywhere the module is.
+    """
+
+    def __init__(self, hosts: Optional[List[str]] = None, hedge_percentile: Optional[float] = 95.0,
+                 min_hedge_delay: float = 2.0, health_interval: float = 15.0, timeout: Optional[float] = None,
+                 max_hedges: int = 2):
+        """
+        Initialize the client pool.
+
+        Args:
+            hosts: Base URLs of the Ollama nodes, defaults to the local node
+            hedge_percentile: Latency percentile after which a request is hedged, None disables hedging
+            min_hedge_delay: Lower bound in seconds for the hedge delay
+            health_interval: Seconds between health checks, 0 disables the checker
+            timeout: Request timeout in seconds passed to each client
+            max_hedges: Hedges running at once; slow requests past it aren't hedged
+        """
+        self.hosts = [OllamaHost(url, timeout) for url in (hosts or [DEFAULT_OLLAMA_HOST])]
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.health_interval = health_interval
+        self.max_hedges = max(1, max_hedges)
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+        self.hedges_in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 4 * len(self.hosts)), thread_name_prefix="ollama-pool")
+        self._hedge_executor = ThreadPoolExecutor(max_workers=self.max_hedges, thread_name_prefix="ollama-hedge")
+        self._stop = threading.Event()
+        if health_interval and len(self.hosts) > 1:
+            threading.Thread(target=self._health_loop, name="ollama-health", daemon=True).start()
+
+    def _acquire(self, exclude: Optional[OllamaHost] = None) -> Optional[OllamaHost]:
+        """
+        Picks the least loaded healthy node and reserves a slot on it.
+
+        Args:
+            exclude: Node that must not be picked (used for hedges)
+
+        Returns:
+            The chosen node, or None if no other node is available
+        """
+        with self._lock:
+            candidates = [h for h in self.hosts if h is not exclude]
+            if not candidates:
+                return None
+            healthy = [h for h in candidates if h.healthy]
+            # If every node looks down, still try one rather than failing outright
+            pool = healthy or ([] if exclude else candidates)
+            if not pool:
+                return None
+            host = min(pool, key=lambda h: (h.outstanding, self._percentile(h.latencies, 50.0)))
+            host.outstanding += 1
+            host.requests += 1
+            return host
+
+    def _release(self, host: OllamaHost, latency: Optional[float], ok: bool,
+                 attempt: Optional[HedgeAttempt] = None) -> None:
+        """
+        Returns a slot to a node and records the outcome.
+
+        Args:
+            host: The node the request ran on
+            latency: Request latency in seconds, None to record none
+            ok: Whether the request succeeded
+            attempt: The hedge attempt the slot belongs to; its outcome is ignored once abandoned
+        """
+        with self._lock:
+            if attempt is not None:
+                if attempt.released:
+                    return
+                attempt.released = True
+            host.outstanding -= 1
+            if ok:
+                host.failures = 0
+                host.healthy = True
+                if latency is not None:
+                    host.latencies.append(latency)
+            else:
+                host.failures += 1
+                if host.failures >= 2:
+                    host.healthy = False
+
+    @staticmethod
+    def _percentile(values, percentile: float) -> float:
+        """
+        Returns a percentile of a sequence of latencies, 0.0 when empty.
+        """
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Returns how long to wait before hedging a chat request.
+
+        Returns:
+            Delay in seconds, or None when hedging is disabled or pointless
+        """
+        if self.hedge_percentile is None or len(self.hosts) < 2:
+            return None
+        with self._lock:
+            recent = [latency for h in self.hosts for latency in h.latencies]
+        return max(self.min_hedge_delay, self._percentile(recent, self.hedge_percentile))
+
+    def _abandon(self, attempt: HedgeAttempt) -> None:
+        """
+        Gives back the slot of a hedge attempt that lost, without recording an outcome for its node.
+        """
+        with self._lock:
+            if not attempt.released:
+                attempt.released = True
+                attempt.host.outstanding -= 1
+
+    def _call(self, host: OllamaHost, method: str, *args, attempt: Optional[HedgeAttempt] = None, **kwargs) -> Any:
+        """
+        Runs a client method on a node and records latency and failures.
+        """
+        if attempt is not None:
+            attempt.started.set()
+        start = time.monotonic()
+        try:
+            result = getattr(host.client, method)(*args, **kwargs)
+        except Exception:
+            self._release(host, None, False, attempt)
+            raise
+        self._release(host, time.monotonic() - start, True, attempt)
+        return result
+
+    def chat(self, model: str, messages: Optional[List[Dict[str, Any]]] = None, **kwargs) -> Any:
+        """
+        Sends a chat request to the least loaded node, hedging slow requests.
+
+        Args:
+            model: Model name
+            messages: Chat messages
+            **kwargs: Other arguments accepted by ollama.chat
+
+        Returns:
+            The chat response from whichever node answered first
+        """
+        if kwargs.get("stream"):
+            return self._stream(model, messages, **kwargs)
+        primary = self._acquire()
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._call(primary, "chat", model, messages=messages, **kwargs)
+
+        first = HedgeAttempt(primary)
+        future = self._executor.submit(self._call, primary, "chat", model, messages=messages, attempt=first, **kwargs)
+        futures = {future: first}
+        # Time spent waiting for an executor thread is not the node being slow
+        future.add_done_callback(lambda _: first.started.set())
+        first.started.wait()
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            second = self._hedge(primary, delay, model, messages, **kwargs)
+            if second is not None:
+                futures[second[0]] = second[1]
+
+        # Return the first success; only raise once every attempt has failed
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if futures[future] is not first:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    for loser in pending:
+                        # A request already on the wire can't be interrupted, but it stops counting against its node
+                        loser.cancel()
+                        self._abandon(futures[loser])
+                    return future.result()
+                error = future.exception()
+                logger.warning(f"Chat request failed on {futures[future].host.url}: {str(error)}")
+        raise error
+
+    def _hedge(self, primary: OllamaHost, delay: float, model: str, messages: Optional[List[Dict[str, Any]]],
+               **kwargs) -> Optional[tuple]:
+        """
+        Sends a duplicate of a slow chat request to another node, unless max_hedges are already running.
+
+        Returns:
+            The hedge's future and attempt, or None if it wasn't sent
+        """
+        with self._lock:
+            if self.hedges_in_flight >= self.max_hedges:
+                self.hedges_skipped += 1
+                return None
+            self.hedges_in_flight += 1
+        secondary = self._acquire(exclude=primary)
+        if secondary is None:
+            with self._lock:
+                self.hedges_in_flight -= 1
+            return None
+        logger.info(f"Hedging chat request: {primary.url} slower than {delay:.2f}s, retrying on {secondary.url}")
+        with self._lock:
+            self.hedged += 1
+        attempt = HedgeAttempt(secondary)
+        future = self._hedge_executor.submit(self._call, secondary, "chat", model, messages=messages,
+                                             attempt=attempt, **kwargs)
+        # Counted until the request really ends, even when it lost and was abandoned
+        future.add_done_callback(self._hedge_done)
+        return future, attempt
+
+    def _hedge_done(self, _) -> None:
+        with self._lock:
+            self.hedges_in_flight -= 1
+
+    def _stream(self, model: str, messages: Optional[List[Dict[str, Any]]], **kwargs) -> Iterator[Any]:
+        """
+        Streams a chat response, holding a node's slot from the first chunk requested until the stream ends.
+
+        A stream closed before its end gives the slot back without counting as a failure of the node.
+        """
+        host = self._acquire()
+        start = time.monotonic()
+        finished = failed = False
+        try:
+            for chunk in host.client.chat(model, messages=messages, **kwargs):
+                yield chunk
+            finished = True
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(host, time.monotonic() - start if finished else None, not failed)
+
+    def embed(self, model: str, input: Any, **kwargs) -> Any:
+        """
+        Computes embeddings on the least loaded node.
+
+        Args:
+            model: Embedding model name
+            input: Text or list of texts to embed
+
+        Returns:
+            The embed response from the node
+        """
+        return self._call(self._acquire(), "embed", model, input=input, **kwargs)
+
+    def show(self, model: str) -> Any:
+        """
+        Returns model information from the least loaded node.
+
+        Args:
+            model: Model name
+
+        Returns:
+            The show response from the node
+        """
+        return self._call(self._acquire(), "show", model)
+
+    def check_health(self) -> None:
+        """
+        Probes every node once and updates its health flag.
+        """
+        for host in self.hosts:
+            try:
+                host.client.ps()
+                healthy = True
+            except Exception as e:
+                logger.debug(f"Health check failed for {host.url}: {str(e)}")
+                healthy = False
+            with self._lock:
+                if healthy != host.healthy:
+                    logger.warning(f"Ollama node {host.url} is now {'healthy' if healthy else 'unhealthy'}")
+                host.healthy = healthy
+                if healthy:
+                    host.failures = 0
+
+    def _health_loop(self) -> None:
+        """
+        Background loop running the health checks.
+        """
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def close(self) -> None:
+        """
+        Stops the health checker and the hedging executor.
+        """
+        self._stop.set()
+        self._executor.shutdown(wait=False)
+        self._hedge_executor.shutdown(wait=False)
+
+    def show_status(self) -> str:
+        """
+        Returns the state of every node as a formatted string.
+        """
+        with self._lock:
+            lines = [
+                f"{h.url}: {'healthy' if h.healthy else 'unhealthy'}, outstanding {h.outstanding}, "
+                f"requests {h.requests}, p50 {self._percentile(h.latencies, 50.0):.2f}s, "
+                f"p95 {self._percentile(h.latencies, 95.0):.2f}s"
+                for h in self.hosts
+            ]
+            lines.append(f"Hedged requests: {self.hedged} (hedge won {self.hedge_wins}, "
+                         f"{self.hedges_skipped} not hedged at the limit of {self.max_hedges})")
+        return "\n".join(lines)
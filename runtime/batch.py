@@ -0,0 +1,278 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, TextIO
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    """
+    One prompt of a batch.
+
+    Attributes:
+        index (int): 1-based line number in the input
+        item_id (str): The record's `id`, or the line number
+        prompt (str): Message for the agent, or a ! command
+        agent (Optional[str]): Agent name or id; the default agent when None
+        error (Optional[str]): Why the line could not be read
+    """
+    index: int
+    item_id: str
+    prompt: str = ""
+    agent: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchSummary:
+    """
+    Counters of a batch run.
+    """
+    total: int = 0
+    skipped: int = 0
+    done: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    interrupted: bool = False
+
+    def describe(self) -> str:
+        rate = self.done / self.seconds if self.seconds else 0.0
+        text = (f"{self.done} prompts in {self.seconds:.1f}s ({rate:.2f}/s), {self.errors} errors, "
+                f"{self.skipped} already done")
+        if self.interrupted:
+            text += f"; interrupted with {self.total - self.skipped - self.done} left, run again to resume"
+        return text
+
+
+def read_items(lines: Iterable[str]) -> List[BatchItem]:
+    """
+    Parses JSONL prompts.
+
+    Each line is an object with `prompt` (or `message`) and optional `id` and
+    `agent`, or a JSON string holding just the prompt. Blank lines are skipped;
+    lines that can't be read become items with an error.
+    """
+    items = []
+    for index, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        item = BatchItem(index, str(index))
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            item.error = f"Invalid JSON: {str(e)}"
+            items.append(item)
+            continue
+        if isinstance(data, str):
+            data = {"prompt": data}
+        if not isinstance(data, dict):
+            item.error = "Expected an object or a string"
+        else:
+            item.item_id = str(data.get("id", index))
+            item.prompt = data.get("prompt") or data.get("message") or ""
+            item.agent = data.get("agent")
+            if not isinstance(item.prompt, str) or not item.prompt.strip():
+                item.error = "No prompt"
+        items.append(item)
+    return items
+
+
+def completed_ids(path: str) -> Set[str]:
+    """
+    Returns the ids answered without error in an earlier run's output file.
+
+    The file is rewritten without failed and half-written lines, so their
+    prompts are retried and each id appears once.
+    """
+    if not os.path.exists(path):
+        return set()
+    done, kept = set(), []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(result, dict) and result.get("error") is None and "id" in result:
+                done.add(str(result["id"]))
+                kept.append(line if line.endswith("\n") else line + "\n")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.writelines(kept)
+    os.replace(temp_path, path)
+    return done
+
+
+class BatchRunner:
+    """
+    Answers a batch of prompts on a pool of agent sessions.
+
+    Every worker thread keeps its own agent session per agent, built by the
+    community with the shared backend, admission control and caches, so
+    `concurrency` prompts are answered at once. Each prompt starts from an
+    empty conversation: the results don't depend on which worker took a
+    prompt or in which order, which also makes an interrupted run safe to
+    resume. Prompts the admission controller sheds or the model fails to
+    answer are recorded as errors, so they are retried on resume. Prompts
+    starting with ! run as commands.
+
+    Results are written as JSONL lines, flushed one by one, in input order
+    (held back until the earlier prompts are done) or in completion order.
+    """
+
+    def __init__(self, community, default_agent_id: str, concurrency: int = 4, ordered: bool = True,
+                 command: Optional[Callable[[str], str]] = None, progress: Optional[TextIO] = None,
+                 progress_interval: float = 1.0):
+        """
+        Initialize the runner.
+
+        Args:
+            community: The CommunityOfAgents providing agents
+            default_agent_id: Agent answering prompts that don't name one
+            concurrency: Number of worker threads and agent sessions per agent
+            ordered: Write results in input order instead of completion order
+            command: Function running a ! command; commands fail without it
+            progress: Stream for progress lines, stderr when None
+            progress_interval: Seconds between progress lines
+        """
+        self.community = community
+        self.default_agent_id = default_agent_id
+        self.concurrency = max(1, concurrency)
+        self.ordered = ordered
+        self.command = command
+        self.progress = progress or sys.stderr
+        self.progress_interval = progress_interval
+        self.stop = threading.Event()
+        self._command_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def resolve(self, name: Optional[str]) -> str:
+        if not name:
+            return self.default_agent_id
+        name = str(name)
+        agent_id = name if name in self.community.registry.descriptors else self.community.registry.find_id(name)
+        if agent_id is None:
+            raise ValueError(f"Unknown agent: {name}")
+        return agent_id
+
+    def answer(self, item: BatchItem, sessions: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answers one prompt with the worker's agent sessions.
+
+        Returns:
+            The result record
+        """
+        start = time.perf_counter()
+        result = {"id": item.item_id, "agent_id": None, "prompt": item.prompt, "response": None, "error": item.error}
+        if item.error:
+            return dict(result, seconds=0.0)
+        try:
+            if item.prompt.startswith("!"):
+                if self.command is None:
+                    raise ValueError("Commands are not available")
+                # Commands act on the interface's agent, one at a time
+                with self._command_lock:
+                    result["response"] = self.command(item.prompt)
+            else:
+                agent_id = result["agent_id"] = self.resolve(item.agent)
+                agent = sessions.get(agent_id)
+                if agent is None:
+                    descriptor = self.community.registry.descriptors[agent_id]
+                    # A user name of its own keeps batch sessions apart from saved interactive ones
+                    agent = sessions[agent_id] = self.community.create_agent(descriptor.details(), "batch")
+                agent.conversation_history.clear_message_history()
+                agent.intro_given = True
+                # Strict: a shed or failed request is an error, so a resumed run asks again
+                result["response"] = agent.agent_response(item.prompt, strict=True)
+        except Exception as e:
+            logger.error(f"Error answering batch item {item.item_id}: {str(e)}")
+            result["error"] = str(e)
+        result["seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def run(self, items: List[BatchItem], output: TextIO, done: Optional[Set[str]] = None) -> BatchSummary:
+        """
+        Answers the items not in `done` and writes their results to `output`.
+
+        stop (or Ctrl-C in the calling thread) lets the prompts being answered
+        finish and leaves the rest for the next run.
+
+        Args:
+            items: Prompts to answer
+            output: Stream receiving one JSON line per result
+            done: Ids answered by an earlier run
+
+        Returns:
+            BatchSummary of this run
+        """
+        done = done or set()
+        todo = [item for item in items if item.item_id not in done]
+        summary = BatchSummary(total=len(items), skipped=len(items) - len(todo))
+        pending: Dict[int, Dict[str, Any]] = {}  # Finished results waiting for earlier ones, by position
+        next_position = 0
+        next_item = iter(enumerate(todo))
+        start = time.perf_counter()
+        last_progress = 0.0
+
+        def write(position: int, result: Dict[str, Any]) -> None:
+            nonlocal next_position, last_progress
+            with self._lock:
+                summary.done += 1
+                summary.errors += result["error"] is not None
+                pending[position] = result
+                ready = []
+                if self.ordered:
+                    while next_position in pending:
+                        ready.append(pending.pop(next_position))
+                        next_position += 1
+                else:
+                    ready.append(pending.pop(position))
+                for record in ready:
+                    output.write(json.dumps(record) + "\n")
+                output.flush()
+                now = time.perf_counter()
+                if now - last_progress >= self.progress_interval or summary.done == len(todo):
+                    last_progress = now
+                    self.report(summary, len(todo), now - start)
+
+        def worker() -> None:
+            sessions: Dict[str, Any] = {}
+            while not self.stop.is_set():
+                with self._lock:
+                    position, item = next(next_item, (None, None))
+                if item is None:
+                    return
+                write(position, self.answer(item, sessions))
+
+        threads = [threading.Thread(target=worker, name=f"batch-{n}", daemon=True)
+                   for n in range(min(self.concurrency, len(todo)))]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.2)
+        except KeyboardInterrupt:
+            self.stop.set()
+            print("\nFinishing the prompts in progress...", file=self.progress)
+            for thread in threads:
+                thread.join()
+        summary.seconds = time.perf_counter() - start
+        summary.interrupted = self.stop.is_set() and summary.done < len(todo)
+        return summary
+
+    def report(self, summary: BatchSummary, todo: int, elapsed: float) -> None:
+        """
+        Prints a progress line with the throughput and the estimated time left.
+        """
+        rate = summary.done / elapsed if elapsed else 0.0
+        eta = (todo - summary.done) / rate if rate else 0.0
+        print(f"[batch] {summary.done}/{todo} done, {summary.errors} errors, {rate:.2f} prompts/s, "
+              f"ETA {eta:.0f}s", file=self.progress, flush=True)
@@ -0,0 +1,278 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+USER = "user"
+
+
+@dataclass
+class BusMessage:
+    """
+    A message published on a topic.
+    """
+    topic: str
+    sender: str  # Agent id, or USER
+    content: str
+    deadline: Optional[float] = None  # time.monotonic() after which the message is dropped unread
+    name: str = ""  # Display name of the sender
+    created: float = field(default_factory=time.monotonic)
+    message_id: int = 0
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        return self.deadline is not None and (now or time.monotonic()) > self.deadline
+
+
+class MessageBus:
+    """
+    In-process publish/subscribe bus that lets agents talk to each other.
+
+    Every agent has a bounded mailbox per topic, so an agent in several
+    discussions at once reads each one separately. Publishing waits up to `put_timeout`
+    for space in a full mailbox, which slows down fast publishers, and drops
+    the message for that subscriber if there still is none. Agent turns run
+    on worker threads under a global cap on concurrent LLM turns; the cap is
+    held until a turn's thread finishes, even when the awaiting task was
+    cancelled or hit its deadline, so it always bounds the real load on the
+    LLM server.
+
+    The bus runs its own event loop on a background thread. Synchronous
+    callers use run(); coroutines can also be scheduled on `loop` directly.
+    """
+
+    def __init__(self, mailbox_size: int = 16, llm_concurrency: int = 2, put_timeout: float = 1.0):
+        """
+        Initialize the bus.
+
+        Args:
+            mailbox_size: Messages each agent's mailbox for a topic holds
+            llm_concurrency: Maximum agent turns running at once
+            put_timeout: Seconds a publisher waits for space in a full mailbox
+        """
+        self.mailbox_size = mailbox_size
+        self.llm_concurrency = llm_concurrency
+        self.put_timeout = put_timeout
+        self.topics: Dict[str, Set[str]] = {}
+        self.mailboxes: Dict[Tuple[str, str], asyncio.Queue] = {}  # By (agent id, topic)
+        self.transcripts: Dict[str, List[BusMessage]] = {}
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0, "expired": 0,
+                      "turns": 0, "timeouts": 0, "cancelled": 0}
+        self.active_turns = 0
+        self.busy: Set[Tuple[str, str]] = set()  # (agent id, topic) of turns handling received messages
+        self.unread: Dict[Tuple[str, str], int] = {}  # Messages delivered to a mailbox and not yet taken
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._llm: Optional[asyncio.Semaphore] = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """
+        Starts the bus event loop thread if it isn't running.
+        """
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="message-bus", daemon=True).start()
+            return self.loop
+
+    def run(self, coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        Runs a coroutine on the bus loop and waits for its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.start()).result(timeout)
+
+    def subscribe(self, agent_id: str, topic: str) -> None:
+        self.topics.setdefault(topic, set()).add(agent_id)
+
+    def unsubscribe(self, agent_id: str, topic: Optional[str] = None) -> None:
+        """
+        Removes an agent from one topic, or from all topics, dropping the mailboxes and their unread messages.
+        """
+        for name in [topic] if topic else list(self.topics):
+            self.topics.get(name, set()).discard(agent_id)
+        for key in [key for key in self.mailboxes if key[0] == agent_id and topic in (None, key[1])]:
+            del self.mailboxes[key]
+        for key in [key for key in self.unread if key[0] == agent_id and topic in (None, key[1])]:
+            del self.unread[key]
+
+    def mailbox(self, agent_id: str, topic: str) -> asyncio.Queue:
+        queue = self.mailboxes.get((agent_id, topic))
+        if queue is None:
+            queue = self.mailboxes[(agent_id, topic)] = asyncio.Queue(self.mailbox_size)
+        return queue
+
+    async def publish(self, message: BusMessage) -> int:
+        """
+        Delivers a message to every subscriber of its topic except the sender.
+
+        Args:
+            message: The message to publish
+
+        Returns:
+            int: Number of mailboxes the message was delivered to
+        """
+        message.message_id = next(self._ids)
+        self.stats["published"] += 1
+        self.transcripts.setdefault(message.topic, []).append(message)
+        delivered = 0
+        for agent_id in sorted(self.topics.get(message.topic, ())):
+            if agent_id == message.sender:
+                continue
+            key = (agent_id, message.topic)
+            self.unread[key] = self.unread.get(key, 0) + 1
+            try:
+                await asyncio.wait_for(self.mailbox(agent_id, message.topic).put(message), self.put_timeout)
+                delivered += 1
+            except asyncio.TimeoutError:
+                self.unread[key] -= 1
+                self.stats["dropped"] += 1
+                logger.warning(f"Mailbox of {agent_id} is full, dropped message {message.message_id}")
+        self.stats["delivered"] += delivered
+        return delivered
+
+    async def run_turn(self, agent, prompt: str, deadline: Optional[float] = None) -> Optional[str]:
+        """
+        Runs one agent turn on a worker thread under the LLM concurrency cap.
+
+        Args:
+            agent: The agent answering
+            prompt: The message it answers
+            deadline: time.monotonic() by which the answer is needed
+
+        Returns:
+            The answer, or None if the deadline passed first
+        """
+        if self._llm is None:
+            self._llm = asyncio.Semaphore(self.llm_concurrency)
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            self.stats["timeouts"] += 1
+            return None
+        try:
+            await asyncio.wait_for(self._llm.acquire(), remaining)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return None
+        loop = asyncio.get_running_loop()
+        self.active_turns += 1
+        future = loop.run_in_executor(None, agent.agent_response, prompt)
+
+        def finished(_):
+            # Release the cap only when the thread is done, not when the waiter gives up
+            self.active_turns -= 1
+            self._llm.release()
+
+        future.add_done_callback(finished)
+        remaining = None if deadline is None else deadline - time.monotonic()
+        try:
+            answer = await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            logger.warning(f"Turn of {agent.first_name} missed its deadline; the answer is discarded")
+            return None
+        self.stats["turns"] += 1
+        return answer
+
+    async def serve(self, agent, topic: str, max_turns: int, deadline: Optional[float] = None) -> int:
+        """
+        Answers messages on a topic until the agent has taken max_turns turns or the deadline passes.
+
+        All messages waiting in the mailbox are answered together in one turn.
+
+        Returns:
+            int: Number of turns taken
+        """
+        mailbox = self.mailbox(agent.agent_id, topic)
+        turns = 0
+        try:
+            while turns < max_turns:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                try:
+                    messages = [await asyncio.wait_for(mailbox.get(), remaining)]
+                except asyncio.TimeoutError:
+                    break
+                self.busy.add((agent.agent_id, topic))
+                try:
+                    while not mailbox.empty():
+                        messages.append(mailbox.get_nowait())
+                    self.unread[(agent.agent_id, topic)] -= len(messages)
+                    now = time.monotonic()
+                    fresh = [message for message in messages if not message.expired(now)]
+                    self.stats["expired"] += len(messages) - len(fresh)
+                    if not fresh:
+                        continue
+                    prompt = "\n".join(f"{message.name or message.sender} says: {message.content}"
+                                       for message in fresh)
+                    answer = await self.run_turn(agent, prompt, deadline)
+                    if answer is None:
+                        break
+                    turns += 1
+                    prefix = f"{agent.first_name}>:"
+                    if answer.startswith(prefix):
+                        answer = answer[len(prefix):].strip()
+                    await self.publish(BusMessage(topic, agent.agent_id, answer, deadline, name=agent.first_name))
+                finally:
+                    self.busy.discard((agent.agent_id, topic))
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        return turns
+
+    async def discuss(self, agents: Iterable, opener: str, topic: Optional[str] = None,
+                      max_turns: int = 2, timeout: float = 120.0, poll: float = 0.05) -> List[BusMessage]:
+        """
+        Runs a discussion between agents, concurrently, in bounded time.
+
+        The opener is published to all participants. Each agent answers what it
+        has received at most max_turns times, and its answers are published to
+        the others. The discussion ends when every agent has used its turns,
+        when no agent is busy and no message is waiting, or at the timeout,
+        whichever comes first; unfinished agents are cancelled.
+
+        Args:
+            agents: Participating agents
+            opener: Message starting the discussion
+            topic: Topic name, generated when None
+            max_turns: Turns per agent
+            timeout: Seconds the whole discussion may take
+            poll: Seconds between checks for a quiet discussion
+
+        Returns:
+            The messages of the discussion in publishing order
+        """
+        agents = list(agents)
+        topic = topic or f"discussion-{next(self._ids)}"
+        deadline = time.monotonic() + timeout
+        for agent in agents:
+            self.subscribe(agent.agent_id, topic)
+        self.transcripts[topic] = []
+        tasks = {asyncio.create_task(self.serve(agent, topic, max_turns, deadline)): agent for agent in agents}
+        try:
+            await self.publish(BusMessage(topic, USER, opener, deadline, name=USER))
+            pending = set(tasks)
+            while pending and time.monotonic() < deadline:
+                _, pending = await asyncio.wait(pending, timeout=poll)
+                if not any((tasks[task].agent_id, topic) in self.busy or self.unread.get((tasks[task].agent_id, topic))
+                           for task in pending):
+                    break  # Nobody is answering and nothing is left to answer
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for agent in agents:
+                self.unsubscribe(agent.agent_id, topic)
+        return self.transcripts.pop(topic, [])
+
+    def show_stats(self) -> str:
+        """
+        Returns the bus counters as a one-line summary.
+        """
+        counters = ", ".join(f"{name}: {value}" for name, value in self.stats.items())
+        return f"Message bus ({self.llm_concurrency} concurrent turns, mailboxes of {self.mailbox_size}): {counters}"
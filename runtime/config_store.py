@@ -0,0 +1,255 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigStore:
+    """
+    JSON configuration file read from memory and written behind.
+
+    Reads use `config`, an immutable snapshot that writers replace as a whole,
+    so they take no lock and never see a half-applied update. set() only
+    swaps the snapshot and marks the key dirty; a background writer saves the
+    file once no key has changed for `flush_delay` seconds, and at least every
+    `max_delay` seconds while changes keep coming, so a burst of updates (a
+    slider being dragged) costs one write. Files are written to a temporary
+    file and renamed over the old one, so readers and crashes never see a
+    truncated file.
+
+    With a `reload_interval` the writer also polls the file's modification
+    time and reloads it when it was changed by someone else; keys set here
+    and not yet written win over the file's values.
+    """
+
+    def __init__(self, path: str, defaults: Optional[Mapping[str, Any]] = None, flush_delay: float = 0.5,
+                 max_delay: float = 2.0, reload_interval: float = 0.0):
+        """
+        Initialize the store and load the file, creating it from `defaults` when missing.
+
+        Args:
+            path: Path of the JSON file
+            defaults: Configuration written when the file doesn't exist
+            flush_delay: Seconds without changes before dirty keys are written
+            max_delay: Longest seconds a change waits to be written
+            reload_interval: Seconds between checks for outside changes, 0 to never reload
+        """
+        self.path = path
+        self.flush_delay = flush_delay
+        self.max_delay = max_delay
+        self.reload_interval = reload_interval
+        self.config: Mapping[str, Any] = MappingProxyType({})
+        self.stats = {"sets": 0, "writes": 0, "reloads": 0, "errors": 0}
+        self._dirty: Dict[str, Any] = {}  # Keys set since the last write
+        self._first_dirty = 0.0
+        self._last_dirty = 0.0
+        self._file_stat: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()  # One write or reload at a time
+        self._writer: Optional[threading.Thread] = None
+        self._closed = False
+        try:
+            if os.path.exists(path):
+                self.config = MappingProxyType(self._read())
+            else:
+                self.config = MappingProxyType(dict(defaults or {}))
+                self._write(self.config)
+        except Exception as e:
+            logger.error(f"Error loading configuration: {str(e)}")
+            # Keep running on the defaults, but don't overwrite a file that couldn't be read
+            self.config = MappingProxyType(dict(defaults or {}))
+        atexit.register(self.close)
+
+    def start(self) -> "ConfigStore":
+        """
+        Starts the background writer, which also watches the file for outside changes.
+        """
+        with self._lock:
+            if not self._closed and (self._writer is None or not self._writer.is_alive()):
+                # Also restarts it in a forked process, where the parent's thread doesn't exist
+                self._writer = threading.Thread(target=self._run, name="config-writer", daemon=True)
+                self._writer.start()
+        return self
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get configuration value.
+
+        Args:
+            key: Configuration key
+            default: Default value if key not found
+
+        Returns:
+            Configuration value or default
+        """
+        return self.config.get(key, default)
+
+    def get_all(self) -> Dict[str, Any]:
+        """
+        Get all configuration values.
+
+        Returns:
+            Dictionary containing all configuration
+        """
+        return dict(self.config)
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Set configuration value; the file is written in the background.
+
+        Args:
+            key: Configuration key
+            value: Configuration value
+        """
+        self.update({key: value})
+
+    def update(self, values: Mapping[str, Any], persist: bool = True) -> None:
+        """
+        Sets several configuration values at once.
+
+        Args:
+            values: Keys and their new values
+            persist: Write them to the file; False changes this process only
+        """
+        with self._lock:
+            config = dict(self.config)
+            config.update(values)
+            self.config = MappingProxyType(config)
+            self.stats["sets"] += 1
+            if not persist:
+                return
+            now = time.monotonic()
+            if not self._dirty:
+                self._first_dirty = now
+            self._last_dirty = now
+            self._dirty.update(values)
+            self._wake.notify()
+        self.start()
+
+    def flush(self) -> bool:
+        """
+        Writes the dirty keys now.
+
+        Returns:
+            bool: Whether the file was written
+        """
+        with self._write_lock:
+            if self.reload_interval:
+                # Keep outside changes to the other keys instead of writing over them
+                self._reload()
+            with self._lock:
+                if not self._dirty:
+                    return False
+                written = self._dirty
+                self._dirty = {}
+                snapshot = self.config
+            try:
+                self._write(snapshot)
+                return True
+            except Exception as e:
+                logger.error(f"Error saving configuration: {str(e)}")
+                self.stats["errors"] += 1
+                with self._lock:
+                    # Retried on the next flush unless set again meanwhile
+                    for key, value in written.items():
+                        self._dirty.setdefault(key, value)
+                    self._first_dirty = self._last_dirty = time.monotonic()
+                return False
+
+    def close(self) -> None:
+        """
+        Writes pending changes and stops the writer.
+        """
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self.flush()
+
+    def reload(self) -> bool:
+        """
+        Loads the file again if it changed since it was last read or written.
+
+        Returns:
+            bool: Whether the configuration was reloaded
+        """
+        with self._write_lock:
+            return self._reload()
+
+    def _reload(self) -> bool:
+        stat = self._stat()
+        if stat is None or stat == self._file_stat:
+            return False
+        try:
+            config = self._read()
+        except Exception as e:
+            # Probably caught mid-save by an editor that doesn't rename; tried again once it changes
+            logger.warning(f"Ignoring unreadable configuration {self.path}: {str(e)}")
+            self._file_stat = stat
+            return False
+        with self._lock:
+            config.update(self._dirty)
+            self.config = MappingProxyType(config)
+            self.stats["reloads"] += 1
+        logger.info(f"Reloaded configuration from {self.path}")
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                if self._dirty:
+                    due = min(self._last_dirty + self.flush_delay, self._first_dirty + self.max_delay)
+                    timeout = due - time.monotonic()
+                else:
+                    timeout = self.reload_interval or None
+                if timeout is None or timeout > 0:
+                    self._wake.wait(timeout)
+                dirty = bool(self._dirty)
+                flush = dirty and time.monotonic() >= min(
+                    self._last_dirty + self.flush_delay, self._first_dirty + self.max_delay)
+            if flush:
+                self.flush()
+            elif not dirty and self.reload_interval:
+                self.reload()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> Dict[str, Any]:
+        # Stat first: a change made while reading is then picked up by the next check
+        stat = self._stat()
+        with open(self.path, "r") as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError("the configuration must be a JSON object")
+        self._file_stat = stat
+        return config
+
+    def _write(self, config: Mapping[str, Any]) -> None:
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(dict(config), f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._file_stat = self._stat()
+        self.stats["writes"] += 1
+
+    def show_stats(self) -> str:
+        """
+        Returns the store counters as a one-line summary.
+        """
+        counters = ", ".join(f"{name}: {value}" for name, value in self.stats.items())
+        return f"Config {self.path} ({len(self._dirty)} keys pending): {counters}"
@@ -0,0 +1,108 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Results shared by the agents answering one broadcast, set on the worker threads
+SHARED_RESULTS: contextvars.ContextVar[Optional["SharedResults"]] = contextvars.ContextVar(
+    "shared_results", default=None)
+
+
+class SharedResults:
+    """
+    Memoizes call results for the duration of one broadcast.
+
+    SingleFlight only collapses calls that overlap in time. Agents answering
+    the same message reach their tool calls at different moments, so within a
+    broadcast a completed result is kept and handed to every later identical
+    call as well.
+    """
+
+    def __init__(self):
+        self._results: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hits = 0
+
+    def do(self, key: Tuple[str, str], fn: Callable, *args, **kwargs) -> Any:
+        """
+        Runs fn once per key and returns the same result (or exception) to every caller.
+
+        Args:
+            key: Key built with runtime.singleflight.make_key()
+            fn: Function to run
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            The result of fn
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._results.get(key)
+            leader = future is None
+            if leader:
+                future = self._results[key] = Future()
+            else:
+                self.hits += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+
+@dataclass
+class FanOutResult:
+    """
+    Outcome of one target of a fan-out.
+    """
+    target: Any
+    response: Optional[str]
+    seconds: float
+    error: Optional[str] = None
+
+
+def fan_out(targets: Iterable[Any], call: Callable[[Any], str], max_concurrency: int = 4,
+            shared: Optional[SharedResults] = None) -> Iterator[FanOutResult]:
+    """
+    Calls `call` for every target on a bounded thread pool and yields results as they complete.
+
+    Args:
+        targets: Targets to call, e.g. agent ids
+        call: Function producing the response of one target
+        max_concurrency: Maximum number of calls running at once
+        shared: Result cache visible to the calls through SHARED_RESULTS, a new one when None
+
+    Yields:
+        FanOutResult in completion order
+    """
+    targets = list(targets)
+    if not targets:
+        return
+    shared = shared or SharedResults()
+
+    def run(target) -> FanOutResult:
+        token = SHARED_RESULTS.set(shared)
+        start = time.perf_counter()
+        try:
+            return FanOutResult(target, call(target), time.perf_counter() - start)
+        except Exception as e:
+            logger.error(f"Error in fan-out call for {target}: {str(e)}")
+            return FanOutResult(target, None, time.perf_counter() - start, str(e))
+        finally:
+            SHARED_RESULTS.reset(token)
+
+    workers = max(1, min(max_concurrency, len(targets)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fan-out") as executor:
+        futures = [executor.submit(run, target) for target in targets]
+        for future in as_completed(futures):
+            yield future.result()
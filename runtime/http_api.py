@@ -0,0 +1,697 @@
+import asyncio
+import contextlib
+import json
+import logging
+import re
+import signal
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from runtime.metrics import REGISTRY
+from runtime.sessions import SessionHost, session_id
+from runtime.workers import WorkerError
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 16384
+USER_PATTERN = re.compile(r"^[\w .@-]{1,64}$")
+
+
+class HttpError(Exception):
+    """
+    Error answered with a JSON body {"error": message} and the given status.
+    """
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+@dataclass
+class Request:
+    """
+    A parsed HTTP/1.x request.
+    """
+    method: str
+    path: str
+    version: str
+    headers: Dict[str, str]
+    body: bytes = b""
+    query: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self) -> Dict[str, Any]:
+        """
+        Returns the body as a JSON object; an empty body is an empty object.
+        """
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HttpError(400, f"Invalid JSON body: {str(e)}")
+        if not isinstance(data, dict):
+            raise HttpError(400, "The JSON body must be an object")
+        return data
+
+    def wants_stream(self, data: Dict[str, Any]) -> bool:
+        return bool(data.get("stream")) or "text/event-stream" in self.headers.get("accept", "")
+
+
+@dataclass
+class Response:
+    """
+    Result of a handler: a JSON payload, or a stream of server-sent events.
+
+    `events` is a plain generator function yielding (event, data) pairs; it
+    runs on a worker thread under the concurrency cap, with `agent` locked if set.
+    """
+    status: int = 200
+    payload: Any = None
+    events: Optional[Callable[[], Iterator[Tuple[str, Any]]]] = None
+    agent: Any = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class ApiServer:
+    """
+    Headless HTTP/JSON API for service-to-service traffic.
+
+    Runs an asyncio HTTP/1.1 server on its own event loop thread, next to (or
+    instead of) the Gradio UI, and calls CommunityOfAgents and Agent directly.
+    Connections are kept alive between requests until they idle for
+    `keepalive_timeout`. Request headers and bodies are size limited. Agent
+    turns run on a thread pool of `max_concurrency` workers; requests wait up
+    to `queue_timeout` for a worker, and beyond `max_queue` waiting requests
+    new ones are answered 503 at once instead of piling up. Turns of the same
+    agent are serialized so two requests never interleave in one conversation:
+    requests for one agent queue here without holding a worker, and the
+    agent's own turn lock also covers broadcasts to several agents.
+
+    A `user` in a chat request opens a session: an agent of its own for that
+    agent and user, restored from and saved to the community's SessionStore.
+    At most `max_sessions` are kept in memory; the least recently used is saved
+    and closed past the cap. Sessions live in this process, or with `workers`
+    in the worker process owning them, so their turns use every CPU core.
+
+    stop() drains: the listening socket is closed, idle connections are
+    dropped, requests in flight finish (up to `drain_timeout`) and answer with
+    Connection: close, then the open sessions are saved.
+    """
+
+    def __init__(self, interface, host: str = "127.0.0.1", port: int = 8081, max_body: int = 65536,
+                 max_concurrency: int = 4, max_queue: int = 64, queue_timeout: float = 30.0,
+                 max_connections: int = 256, max_sessions: int = 256, keepalive_timeout: float = 15.0,
+                 drain_timeout: float = 30.0, ping_interval: float = 15.0, workers=None):
+        """
+        Initialize the server; start() opens the port.
+
+        Args:
+            interface: The application Interface; commands and default routing go through it
+            host: Interface to bind, local only by default
+            port: Port to listen on, 0 picks a free one
+            max_body: Largest accepted request body in bytes
+            max_concurrency: Agent turns and commands running at once
+            max_queue: Requests allowed to wait for a worker before 503s are returned
+            queue_timeout: Seconds a request waits for a worker before a 503
+            max_connections: Open connections beyond which new ones get a 503
+            max_sessions: User sessions kept in memory
+            keepalive_timeout: Seconds an idle connection is kept open
+            drain_timeout: Seconds stop() waits for requests in flight
+            ping_interval: Seconds between keep-alive comments on an idle event stream
+            workers: WorkerPool answering the user sessions, this process when None
+        """
+        self.interface = interface
+        self.community = interface.community
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_connections = max_connections
+        self.max_sessions = max_sessions
+        self.keepalive_timeout = keepalive_timeout
+        self.drain_timeout = drain_timeout
+        self.ping_interval = ping_interval
+        self.workers = workers
+        self.session_host = SessionHost(self.community, max_sessions)
+        self.stats = {"connections": 0, "requests": 0, "streams": 0, "rejected": 0, "errors": 0}
+        self.active = 0  # Requests being handled
+        self.waiting = 0  # Requests waiting for a worker
+        self.draining = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="api")
+        self.routes = [
+            ("GET", re.compile(r"^/v1/health$"), self.health),
+            ("GET", re.compile(r"^/v1/agents$"), self.list_agents),
+            ("POST", re.compile(r"^/v1/chat$"), self.chat),
+            ("POST", re.compile(r"^/v1/commands$"), self.command),
+            ("GET", re.compile(r"^/v1/sessions$"), self.list_sessions),
+            ("POST", re.compile(r"^/v1/sessions$"), self.open_session),
+            ("GET", re.compile(r"^/v1/sessions/([^/]+)$"), self.get_session),
+            ("POST", re.compile(r"^/v1/sessions/([^/]+)/save$"), self.save_session),
+            ("DELETE", re.compile(r"^/v1/sessions/([^/]+)$"), self.close_session),
+        ]
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.Task, bool] = {}  # Connection task -> handling a request
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker_slots: Optional[asyncio.Semaphore] = None
+        self._agent_locks: "weakref.WeakKeyDictionary[Any, asyncio.Lock]" = weakref.WeakKeyDictionary()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> "ApiServer":
+        """
+        Opens the port and serves on a background event loop thread.
+        """
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="http-api", daemon=True).start()
+                asyncio.run_coroutine_threadsafe(self._listen(), self.loop).result()
+        return self
+
+    async def _listen(self) -> None:
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        if self.workers is not None:
+            self._worker_slots = asyncio.Semaphore(self.workers.capacity)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Serving the HTTP API on http://{self.host}:{self.port}/v1")
+
+    def serve_forever(self) -> None:
+        """
+        Starts the server and blocks until SIGINT or SIGTERM, then drains it.
+        """
+        self.start()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self._stopped.set())
+        self._stopped.wait()
+        self.stop()
+
+    def stop(self) -> None:
+        """
+        Drains the server and saves the open sessions. Safe to call more than once.
+        """
+        with self._lock:
+            if self.loop is None or self.draining:
+                return
+            self.draining = True
+        try:
+            asyncio.run_coroutine_threadsafe(self._drain(), self.loop).result(self.drain_timeout + 5)
+        except Exception as e:
+            logger.error(f"Error draining the HTTP API: {str(e)}")
+        self.session_host.save_all()
+        self.executor.shutdown(wait=False)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._stopped.set()
+
+    async def _drain(self) -> None:
+        self._server.close()
+        for task, busy in list(self._connections.items()):
+            if not busy:
+                task.cancel()
+        deadline = time.monotonic() + self.drain_timeout
+        while self.active and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.active:
+            logger.warning(f"HTTP API stopped with {self.active} requests still running")
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        logger.info(f"HTTP API drained: {self.show_stats()}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = False
+        self.stats["connections"] += 1
+        try:
+            if len(self._connections) > self.max_connections or self.draining:
+                self.stats["rejected"] += 1
+                await self._send_json(writer, "HTTP/1.1", 503, {"error": "Too many connections"}, False,
+                                      {"Retry-After": "1"})
+                return
+            while not self.draining:
+                try:
+                    request = await self._read_request(reader, writer)
+                except HttpError as e:
+                    # The rest of the stream can't be trusted after a bad request; answer and close
+                    await self._send_json(writer, "HTTP/1.1", e.status, {"error": e.message}, False, e.headers)
+                    return
+                if request is None:
+                    return
+                self._connections[task] = True
+                self.active += 1
+                try:
+                    keep_alive = await self._dispatch(request, writer)
+                finally:
+                    self.active -= 1
+                    self._connections[task] = False
+                if not keep_alive:
+                    return
+        except (asyncio.CancelledError, ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            del self._connections[task]
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Optional[Request]:
+        """
+        Reads one request; None when the client closed an idle connection or it timed out.
+        """
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HttpError(400, "Incomplete request")
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, f"Request headers are larger than {MAX_HEADER_BYTES} bytes")
+
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        if len(parts) != 3:
+            raise HttpError(400, "Malformed request line")
+        method, target, version = parts
+        if version not in ("HTTP/1.0", "HTTP/1.1"):
+            raise HttpError(505, f"{version} is not supported")
+        headers = {}
+        for line in filter(None, lines[1:]):
+            name, separator, value = line.partition(":")
+            if not separator:
+                raise HttpError(400, "Malformed header")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HttpError(411, "Chunked request bodies are not supported, send a Content-Length")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > self.max_body:
+            raise HttpError(413, f"Request body is larger than {self.max_body} bytes")
+        if length and headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), self.keepalive_timeout) if length else b""
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            raise HttpError(400, "Incomplete request body")
+        url = urlsplit(target)
+        return Request(method.upper(), url.path, version, headers, body, parse_qs(url.query))
+
+    async def _dispatch(self, request: Request, writer: asyncio.StreamWriter) -> bool:
+        """
+        Handles one request and writes its response.
+
+        Returns:
+            Whether the connection stays open for the next request
+        """
+        start = time.perf_counter()
+        self.stats["requests"] += 1
+        route = "unknown"
+        try:
+            handler, args, route = self._route(request)
+            response = await handler(request, *args)
+            if response.events:
+                await self._stream(request, writer, response)
+                status = 200
+            else:
+                status = response.status
+                await self._send_json(writer, request.version, status, response.payload,
+                                      request.keep_alive and not self.draining, response.headers)
+        except HttpError as e:
+            status = e.status
+            await self._send_json(writer, request.version, status, {"error": e.message},
+                                  request.keep_alive and not self.draining, e.headers)
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Error handling {request.method} {request.path}: {str(e)}")
+            self.stats["errors"] += 1
+            status = 500
+            await self._send_json(writer, request.version, status, {"error": str(e)}, False)
+        REGISTRY.observe("coa_api_request_seconds", time.perf_counter() - start, route=route)
+        REGISTRY.inc("coa_api_responses_total", status=status)
+        return request.keep_alive and not self.draining and status != 500
+
+    def _route(self, request: Request) -> Tuple[Callable, Tuple[str, ...], str]:
+        allowed = []
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if match:
+                if method == request.method:
+                    return handler, match.groups(), handler.__name__
+                allowed.append(method)
+        if allowed:
+            raise HttpError(405, f"{request.method} is not allowed on {request.path}", {"Allow": ", ".join(allowed)})
+        raise HttpError(404, f"No endpoint {request.path}")
+
+    @staticmethod
+    def _head(version: str, status: int, headers: Dict[str, str]) -> bytes:
+        lines = [f"{version} {status} {HTTPStatus(status).phrase}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send_json(self, writer: asyncio.StreamWriter, version: str, status: int, payload: Any,
+                         keep_alive: bool, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        head = {"Content-Type": "application/json", "Content-Length": str(len(body)),
+                "Connection": "keep-alive" if keep_alive else "close"}
+        head.update(headers or {})
+        writer.write(self._head(version, status, head) + body)
+        await writer.drain()
+
+    async def _stream(self, request: Request, writer: asyncio.StreamWriter, response: Response) -> None:
+        """
+        Runs an event generator on a worker and writes its events as server-sent events.
+
+        HTTP/1.1 streams are chunked so the connection can be reused; HTTP/1.0
+        streams end by closing it.
+        """
+        chunked = request.version == "HTTP/1.1"
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def produce() -> None:
+            def put(item) -> None:
+                with contextlib.suppress(RuntimeError):  # The loop is gone after a forced stop
+                    loop.call_soon_threadsafe(queue.put_nowait, item)
+            try:
+                for event in response.events():
+                    put(event)
+            except Exception as e:
+                logger.error(f"Error in event stream for {request.path}: {str(e)}")
+                put(("error", {"error": str(e)}))
+            finally:
+                put(None)
+
+        def write(text: str) -> None:
+            data = text.encode("utf-8")
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+
+        async with self._agent_lock(response.agent):
+            # Busy and queue errors are still answered as JSON; headers are sent once a worker is ours
+            await self._acquire()
+            self.stats["streams"] += 1
+            headers = {"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+            if chunked:
+                headers.update({"Transfer-Encoding": "chunked", "Connection": "keep-alive"})
+            else:
+                headers["Connection"] = "close"
+            writer.write(self._head(request.version, 200, headers))
+            producer = self._submit(produce)
+            try:
+                while True:
+                    try:
+                        item = await asyncio.wait_for(queue.get(), self.ping_interval)
+                    except asyncio.TimeoutError:
+                        write(": ping\n\n")
+                        await writer.drain()
+                        continue
+                    if item is None:
+                        break
+                    name, data = item
+                    write(f"event: {name}\ndata: {json.dumps(data)}\n\n")
+                    await writer.drain()
+            finally:
+                # A client that went away doesn't end the turn; keep the agent locked until it does
+                await asyncio.wait([producer])
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        else:
+            request.headers["connection"] = "close"
+
+    def _agent_lock(self, agent) -> Any:
+        if agent is None:
+            return contextlib.nullcontext()
+        lock = self._agent_locks.get(agent)
+        if lock is None:
+            lock = self._agent_locks[agent] = asyncio.Lock()
+        return lock
+
+    async def _acquire(self, slots: Optional[asyncio.Semaphore] = None) -> None:
+        """
+        Waits for a worker slot; raises a 503 when the queue is full or the wait times out.
+        """
+        slots = slots or self._slots
+        if self.waiting >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise HttpError(503, "Server is busy", {"Retry-After": "1"})
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise HttpError(503, "Server is busy", {"Retry-After": "1"})
+        finally:
+            self.waiting -= 1
+
+    def _submit(self, fn: Callable, *args) -> asyncio.Future:
+        """
+        Runs fn on the worker pool in an acquired slot, releasing it when the thread is done.
+        """
+        future = asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def _call(self, agent, fn: Callable, *args) -> Any:
+        async with self._agent_lock(agent):
+            await self._acquire()
+            future = self._submit(fn, *args)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The thread can't be stopped; keep the agent locked until its turn is over
+                await asyncio.wait([future])
+                raise
+
+    def _resolve(self, name: Optional[str]) -> str:
+        """
+        Returns the agent id for a name or id; the interface's agent when None.
+        """
+        if not name:
+            return self.interface.agent.agent_id
+        name = str(name)
+        agent_id = name if name in self.community.registry.descriptors else self.community.registry.find_id(name)
+        if agent_id is None:
+            raise HttpError(404, f"Unknown agent: {name}")
+        return agent_id
+
+    def _session_key(self, agent_id: str, user: Any) -> str:
+        if not isinstance(user, str) or not USER_PATTERN.match(user):
+            raise HttpError(400, "user must be 1-64 letters, digits, spaces or . @ _ -")
+        return session_id(agent_id, user)
+
+    def _run_session(self, key: str, operation: str, *args) -> Any:
+        """
+        Runs a SessionHost operation from a worker thread, in the process owning the session.
+        """
+        if self.workers is None:
+            return getattr(self.session_host, operation)(*args)
+        return self.workers.submit(key, operation, *args).result()
+
+    async def _sessions(self, key: str, operation: str, *args) -> Any:
+        """
+        Runs a SessionHost operation for the session `key`.
+
+        Unknown agents and sessions become 404s and lost workers 503s.
+        """
+        try:
+            if self.workers is None:
+                return await self._call(None, getattr(self.session_host, operation), *args)
+            # Workers run the turn, so only their capacity is waited for and no thread here is held
+            await self._acquire(self._worker_slots)
+            future = asyncio.wrap_future(self.workers.submit(key, operation, *args))
+            future.add_done_callback(lambda _: self._worker_slots.release())
+            return await future
+        except LookupError as e:
+            raise HttpError(404, str(e))
+        except WorkerError as e:
+            raise HttpError(503, str(e), {"Retry-After": "1"})
+
+    async def _list_sessions(self) -> List[Dict[str, Any]]:
+        if self.workers is None:
+            return self.session_host.list()
+        try:
+            shards = await asyncio.gather(*(asyncio.wrap_future(future) for future in self.workers.broadcast("list")))
+        except WorkerError as e:
+            raise HttpError(503, str(e), {"Retry-After": "1"})
+        return [session for shard in shards for session in shard]
+
+    async def health(self, request: Request) -> Response:
+        """
+        GET /v1/health: server state; 503 while draining so load balancers move away.
+        """
+        return Response(503 if self.draining else 200, {
+            "status": "draining" if self.draining else "ok",
+            "active": self.active, "waiting": self.waiting, "connections": len(self._connections),
+            "sessions": None if self.workers else len(self.session_host.sessions),
+            "workers": self.workers.alive() if self.workers else 0, **self.stats})
+
+    async def list_agents(self, request: Request) -> Response:
+        """
+        GET /v1/agents: every indexed agent and whether it is loaded.
+        """
+        registry = self.community.registry
+        return Response(200, {"agents": [
+            {"agent_id": d.agent_id, "first_name": d.first_name, "last_name": d.last_name,
+             "live": d.agent_id in registry.live}
+            for d in list(registry.descriptors.values())]})
+
+    async def chat(self, request: Request) -> Response:
+        """
+        POST /v1/chat {"message", "agent"?, "agents"?, "user"?, "stream"?}
+
+        `agents` ("all" or "a,b,c") asks several agents at once, like !ask.
+        Otherwise one agent answers: the user's session with `agent` when a
+        `user` is given, else `agent`, else the agent the interface would pick
+        (an @name mention or the router).
+        """
+        data = request.json()
+        message = data.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HttpError(400, "message is required")
+        stream = request.wants_stream(data)
+
+        if data.get("agents"):
+            agent_ids, unknown = self.community.resolve_agents(str(data["agents"]))
+            if unknown:
+                raise HttpError(404, f"Unknown agents: {', '.join(unknown)}")
+
+            def answers() -> Iterator[Tuple[str, Any]]:
+                start = time.perf_counter()
+                for result in self.community.broadcast(agent_ids, message):
+                    yield "answer", {"agent_id": result.target, "response": result.response,
+                                     "error": result.error, "seconds": round(result.seconds, 3)}
+                yield "done", {"agents": len(agent_ids), "seconds": round(time.perf_counter() - start, 3)}
+
+            if stream:
+                return Response(events=answers)
+            results = await self._call(None, lambda: list(answers()))
+            return Response(200, {"answers": [data for _, data in results[:-1]], **results[-1][1]})
+
+        if data.get("user") is not None:
+            agent_id = self._resolve(data.get("agent"))
+            user = data["user"]
+            key = self._session_key(agent_id, user)
+            if stream:
+                info = {"agent_id": agent_id, "agent": self.community.registry.descriptors[agent_id].first_name,
+                        "session": key}
+
+                def session_events() -> Iterator[Tuple[str, Any]]:
+                    start = time.perf_counter()
+                    yield "start", info
+                    result = self._run_session(key, "chat", agent_id, user, message)
+                    yield "message", dict(info, response=result["response"])
+                    yield "done", {"seconds": round(time.perf_counter() - start, 3)}
+                return Response(events=session_events)
+            result = await self._sessions(key, "chat", agent_id, user, message)
+            return Response(200, {"agent_id": agent_id, "agent": result["agent"], "session": key,
+                                  "response": result["response"], "seconds": result["seconds"]})
+
+        loop = asyncio.get_running_loop()
+        if data.get("agent"):
+            # Loading an agent may read its saved session, so it runs off the event loop
+            agent = await loop.run_in_executor(None, self.community.get_agent_by_id, self._resolve(data["agent"]))
+            if agent is None:
+                raise HttpError(404, f"Agent {data['agent']} is not available")
+        else:
+            agent, message = await loop.run_in_executor(None, self.interface.target_agent, message)
+        info = {"agent_id": agent.agent_id, "agent": agent.first_name, "session": None}
+
+        if stream:
+            def events() -> Iterator[Tuple[str, Any]]:
+                start = time.perf_counter()
+                yield "start", info
+                yield "message", dict(info, response=agent.agent_response(message))
+                yield "done", {"seconds": round(time.perf_counter() - start, 3)}
+            return Response(events=events, agent=agent)
+        start = time.perf_counter()
+        response = await self._call(agent, agent.agent_response, message)
+        return Response(200, dict(info, response=response, seconds=round(time.perf_counter() - start, 3)))
+
+    async def command(self, request: Request) -> Response:
+        """
+        POST /v1/commands {"command": "!stats", "stream"?}
+
+        Runs a ! command as typed in the UI, against the interface's agent.
+        With streaming, !ask answers are sent as they complete.
+        """
+        data = request.json()
+        command = data.get("command")
+        if not isinstance(command, str) or not command.startswith("!"):
+            raise HttpError(400, "command must be a string starting with !")
+        agent = self.interface.agent
+        if command.startswith("!ask") and request.wants_stream(data):
+            def events() -> Iterator[Tuple[str, Any]]:
+                for line in self.interface.ask_command(command):
+                    yield "answer", {"response": line}
+                yield "done", {}
+            return Response(events=events)
+        response = await self._call(agent, self.interface.command_interface, command, [])
+        return Response(200, {"command": command, "response": response})
+
+    async def list_sessions(self, request: Request) -> Response:
+        """
+        GET /v1/sessions: the open sessions, least recently used first.
+        """
+        return Response(200, {"sessions": await self._list_sessions()})
+
+    async def open_session(self, request: Request) -> Response:
+        """
+        POST /v1/sessions {"user", "agent"?}: opens a session, resuming a saved one.
+        """
+        data = request.json()
+        agent_id = self._resolve(data.get("agent"))
+        result = await self._sessions(self._session_key(agent_id, data.get("user")), "open", agent_id, data["user"])
+        return Response(201 if result["opened"] else 200, result)
+
+    async def get_session(self, request: Request, session_id: str) -> Response:
+        """
+        GET /v1/sessions/{id}: a session and its conversation history.
+        """
+        return Response(200, await self._sessions(session_id, "history", session_id))
+
+    async def save_session(self, request: Request, session_id: str) -> Response:
+        """
+        POST /v1/sessions/{id}/save: writes the session to disk.
+        """
+        return Response(200, await self._sessions(session_id, "save", session_id))
+
+    async def close_session(self, request: Request, session_id: str) -> Response:
+        """
+        DELETE /v1/sessions/{id}: saves and closes a session.
+        """
+        return Response(200, await self._sessions(session_id, "close", session_id))
+
+    def show_stats(self) -> str:
+        """
+        Returns the server counters as a one-line summary.
+        """
+        counters = ", ".join(f"{name}: {value}" for name, value in self.stats.items())
+        sessions = f"{self.workers.size} worker processes" if self.workers else \
+            f"{len(self.session_host.sessions)} sessions"
+        return f"HTTP API on {self.host}:{self.port} ({self.max_concurrency} workers, {sessions}): {counters}"
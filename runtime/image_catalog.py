@@ -0,0 +1,166 @@
+import fnmatch
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".gif"})
+THUMBNAIL_DIR = os.path.join("cache", "thumbnails")
+THUMBNAIL_SIZE = (300, 400)
+
+
+class ImageCatalog:
+    """
+    Sorted index of the images in a directory, with a cache of avatar-sized thumbnails.
+
+    The directory is read with a single scandir pass, without a stat per file,
+    and read again only when its modification time changes, which happens
+    whenever an image is added, removed or renamed. Thumbnails are keyed on the
+    name, size and modification time of their image, so a replaced image gets
+    a new one on its next request.
+    """
+
+    def __init__(self, directory: str, thumbnail_dir: str = THUMBNAIL_DIR,
+                 thumbnail_size: Tuple[int, int] = THUMBNAIL_SIZE):
+        """
+        Initialize the catalog; the directory is read on first use.
+
+        Args:
+            directory: Directory holding the images
+            thumbnail_dir: Directory of the thumbnail cache
+            thumbnail_size: Largest width and height of a thumbnail
+        """
+        self.directory = os.path.abspath(directory)
+        self.thumbnail_dir = thumbnail_dir
+        self.thumbnail_size = tuple(thumbnail_size)
+        self.names: List[str] = []
+        self._folded: Dict[str, str] = {}  # Case-folded name -> name
+        self._signature: Optional[Tuple[int, int]] = None
+        self._thumbnails: Dict[str, str] = {}  # Name -> latest thumbnail written by this process
+        self._lock = threading.Lock()
+        self._thumbnail_lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.directory)
+
+    def refresh(self) -> bool:
+        """
+        Reads the directory again if it changed since it was last read.
+
+        Returns:
+            bool: Whether it was read
+        """
+        try:
+            stat = os.stat(self.directory)
+            signature = (stat.st_ino, stat.st_mtime_ns)
+        except OSError:
+            signature = None
+        with self._lock:
+            if signature is not None and signature == self._signature:
+                return False
+            self._scan()
+            # A change in the same clock tick as this scan wouldn't move the mtime; check again next time
+            recent = signature is not None and time.time_ns() - signature[1] < 2_000_000_000
+            self._signature = None if recent else signature
+            return True
+
+    def _scan(self) -> None:
+        names = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                        names.append(entry.name)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Error reading images directory {self.directory}: {str(e)}")
+        names.sort(key=str.casefold)
+        self.names = names
+        self._folded = {name.casefold(): name for name in names}
+        logger.debug(f"Indexed {len(names)} images in {self.directory}")
+
+    def list(self, query: str = "", page: int = 1, per_page: int = 50) -> Tuple[List[str], int]:
+        """
+        Returns one page of the image names matching a query, and how many match in all.
+
+        Args:
+            query: Case-insensitive part of the name, or a pattern like "*.png"; empty for all
+            page: Page number, from 1
+            per_page: Names per page
+        """
+        self.refresh()
+        names = self.names
+        query = query.strip().casefold()
+        if query:
+            if any(char in query for char in "*?["):
+                names = [name for name in names if fnmatch.fnmatchcase(name.casefold(), query)]
+            else:
+                names = [name for name in names if query in name.casefold()]
+        start = (max(1, page) - 1) * per_page
+        return names[start:start + per_page], len(names)
+
+    def find(self, name: str) -> Optional[str]:
+        """
+        Returns the name of an image as it is on disk, matched case-insensitively, or None.
+        """
+        self.refresh()
+        return self._folded.get(name.strip().casefold())
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def thumbnail(self, name: str) -> Optional[str]:
+        """
+        Returns the path of an image resized to fit the thumbnail size, creating it if needed.
+
+        Falls back to the image itself when it can't be resized. Returns None
+        if there is no such image.
+        """
+        name = self.find(name)
+        if name is None:
+            return None
+        source = self.path(name)
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        width, height = self.thumbnail_size
+        key = f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\0{width}x{height}"
+        jpeg = os.path.splitext(name)[1].lower() in (".jpg", ".jpeg")
+        target = os.path.join(self.thumbnail_dir,
+                              hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + (".jpg" if jpeg else ".png"))
+        if os.path.exists(target):
+            return target
+        with self._thumbnail_lock:
+            if os.path.exists(target):
+                return target
+            try:
+                with Image.open(source) as image:
+                    # Thumbnails carry no EXIF, so apply its rotation first
+                    resized = ImageOps.exif_transpose(image)
+                    resized.thumbnail((width, height))
+                    if jpeg and resized.mode not in ("RGB", "L"):
+                        resized = resized.convert("RGB")
+                    os.makedirs(self.thumbnail_dir, exist_ok=True)
+                    temporary = f"{target}.tmp"
+                    resized.save(temporary, format="JPEG" if jpeg else "PNG", quality=85, optimize=True)
+                os.replace(temporary, target)
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                logger.warning(f"Could not create a thumbnail of {name}, serving the full image: {str(e)}")
+                return source
+            previous = self._thumbnails.get(name)
+            self._thumbnails[name] = target
+        if previous and previous != target:
+            try:
+                os.remove(previous)
+            except OSError:
+                pass
+        logger.debug(f"Created thumbnail {target} of {name}")
+        return target
@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import threading
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+INTRO_CACHE_DIR = os.path.join("cache", "intros")
+
+
+class IntroCache:
+    """
+    On-disk cache of agent introductions keyed by agent id, user, model and day.
+
+    The introduction prompt only depends on the personality, the name of the
+    user it greets, the model and the date, so one generated introduction
+    serves every session of that user on that day.
+    Entries from earlier days are dropped when the cache is written.
+    """
+
+    def __init__(self, directory: str = INTRO_CACHE_DIR):
+        """
+        Initialize the cache and load the stored introductions.
+
+        Args:
+            directory: Directory holding the cache file
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, "intros.json")
+        self.entries: Dict[str, str] = {}
+        self.pending: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable intro cache {self.path}: {str(e)}")
+
+    @staticmethod
+    def key(agent, model: Optional[str] = None, day: Optional[date] = None) -> str:
+        # The date stays last: entries of earlier days are recognized by their suffix
+        return f"{agent.agent_id}|{agent.username}|{model or agent.model}|{(day or date.today()).isoformat()}"
+
+    def get(self, agent, model: Optional[str] = None) -> Optional[str]:
+        """
+        Returns today's cached introduction of an agent, or None.
+        """
+        with self._lock:
+            return self.entries.get(self.key(agent, model))
+
+    def put(self, agent, text: str, model: Optional[str] = None) -> None:
+        """
+        Stores an introduction and writes the cache file.
+        """
+        self._store(self.key(agent, model), text)
+
+    def _store(self, key: str, text: str) -> None:
+        today = date.today().isoformat()
+        with self._lock:
+            self.entries[key] = text
+            self.entries = {entry: value for entry, value in self.entries.items() if entry.endswith(today)}
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                temp_path = f"{self.path}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.entries, f, indent=4)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                logger.error(f"Error saving intro cache: {str(e)}")
+
+    def warm(self, agents: Iterable, background: bool = True) -> int:
+        """
+        Generates the missing introductions of today for the given agents.
+
+        Args:
+            agents: Agents whose introductions should be ready
+            background: Generate on background threads instead of waiting
+
+        Returns:
+            int: Number of introductions being generated
+        """
+        started = []
+        for agent in agents:
+            key = self.key(agent)
+            with self._lock:
+                if key in self.entries or (key in self.pending and self.pending[key].is_alive()):
+                    continue
+                thread = threading.Thread(target=self._generate, args=(agent, key), name="intro-cache", daemon=True)
+                self.pending[key] = thread
+            thread.start()
+            started.append(thread)
+        if not background:
+            for thread in started:
+                thread.join()
+        return len(started)
+
+    def _generate(self, agent, key: str) -> None:
+        try:
+            text = agent.generate_introduction()
+            if text is not None:
+                self._store(key, text)
+                logger.info(f"Cached introduction for {key}")
+        except Exception as e:
+            logger.error(f"Error generating introduction for {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self.pending.pop(key, None)
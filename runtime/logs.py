@@ -0,0 +1,203 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Characters kept from a large payload such as a prompt or raw model response
+MAX_PAYLOAD = 2000
+
+_listener: Optional[QueueListener] = None
+_silenced: List[str] = []
+_lock = threading.Lock()
+
+
+class Payload:
+    """
+    Log argument that is only rendered, and truncated, when the record is written.
+
+    Pass it as a %-style argument so nothing is built on the request thread:
+    `logger.debug("Raw response: %s", Payload(response))`. A callable is called
+    at write time, which keeps expensive renderings such as the history off the
+    hot path entirely.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: Optional[int] = None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        value = self.value() if callable(self.value) else self.value
+        text = value if isinstance(value, str) else str(value)
+        limit = self.limit or MAX_PAYLOAD
+        if len(text) > limit:
+            return f"{text[:limit]}... [{len(text) - limit} more chars]"
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps every Nth DEBUG/INFO record per category.
+
+    Categories are logger name prefixes mapped to the fraction of records to
+    keep, e.g. {"agent.agent.payload": 0.1}; the longest matching prefix wins.
+    Warnings and errors are never sampled. The record has already been created
+    when a filter runs, so sampling saves the formatting and writing; a rate of
+    0 is applied as a logger level by configure_logging instead, which also
+    skips creating the record.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rates = {name: rate for name, rate in (rates or {}).items() if rate < 1}
+        self._counters: Dict[str, itertools.count] = {}
+        self._resolved: Dict[str, Optional[str]] = {}
+
+    def _category(self, name: str) -> Optional[str]:
+        category = self._resolved.get(name, "")
+        if category == "":
+            matches = [prefix for prefix in self.rates if name == prefix or name.startswith(prefix + ".")]
+            category = self._resolved[name] = max(matches, key=len) if matches else None
+        return category
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not self.rates or record.levelno >= logging.WARNING:
+            return True
+        category = self._category(record.name)
+        if category is None:
+            return True
+        rate = self.rates[category]
+        if rate <= 0:
+            return False
+        counter = self._counters.setdefault(category, itertools.count())
+        return next(counter) % round(1 / rate) == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves message formatting to the listener thread.
+
+    The standard QueueHandler renders the message before queueing it, which
+    would put the formatting cost back on the request thread. Only exception
+    tracebacks are rendered here, as they reference live frames.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats records as compact JSON lines for offline analysis.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+def configure_logging(level: str = "INFO", jsonl_path: Optional[str] = None,
+                      sampling: Optional[Dict[str, float]] = None,
+                      max_payload: int = MAX_PAYLOAD) -> QueueListener:
+    """
+    Routes all logging through a queue drained by a background listener thread.
+
+    Calling it again replaces the previous configuration, so the module-level
+    defaults can be updated once the config file has been read.
+
+    Args:
+        level: Root log level name
+        jsonl_path: Optional file receiving every record as a JSON line
+        sampling: Logger name prefix -> fraction of DEBUG/INFO records to keep
+        max_payload: Characters kept from Payload arguments
+
+    Returns:
+        The running queue listener
+    """
+    global _listener, MAX_PAYLOAD
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        MAX_PAYLOAD = max_payload
+        for name in _silenced:
+            logging.getLogger(name).setLevel(logging.NOTSET)
+        _silenced.clear()
+        for name, rate in (sampling or {}).items():
+            if rate <= 0:
+                logging.getLogger(name).setLevel(logging.WARNING)
+                _silenced.append(name)
+        handlers = []
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(console)
+        if jsonl_path:
+            sink = logging.FileHandler(jsonl_path, encoding="utf-8")
+            sink.setFormatter(JsonLinesFormatter())
+            handlers.append(sink)
+
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = DeferredQueueHandler(records)
+        queue_handler.addFilter(SamplingFilter(sampling))
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            if not isinstance(handler, QueueHandler):
+                handler.close()
+        root.addHandler(queue_handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+
+        _listener = QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        return _listener
+
+
+def shutdown_logging() -> None:
+    """
+    Flushes the queue and stops the listener thread.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_after_fork() -> None:
+    """
+    Starts a new listener thread in a forked child; threads don't survive a fork.
+
+    The child gets a queue of its own, so records the parent had not written
+    yet aren't written twice.
+    """
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is None:
+        return
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, QueueHandler):
+            handler.queue = records
+    _listener = QueueListener(records, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_after_fork)
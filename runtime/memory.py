@@ -0,0 +1,53 @@
+import os
+import sys
+from typing import Any, Optional, Set
+
+
+def size_of(*objects: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    Returns the bytes held by objects and the strings, lists, tuples and dicts inside them.
+
+    Objects reachable more than once, like a system prompt also stored in
+    the last request, are counted once. Other objects count their own size only.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return total
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def rss_bytes() -> int:
+    """
+    Returns the resident set size of this process, or 0 where it can't be read.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak rather than current, and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
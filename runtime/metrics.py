@@ -0,0 +1,292 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Linear sub-buckets per power of two, bounding the relative error to about 1.6%
+SUB_BUCKETS = 64
+QUANTILES = (0.5, 0.9, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    HDR-style histogram with log-linear buckets.
+
+    Values are recorded in microseconds (or raw units for counts). Each power of
+    two is split into SUB_BUCKETS linear buckets, so percentiles keep the same
+    relative precision from microseconds to minutes with a small, bounded
+    number of buckets.
+    """
+
+    def __init__(self, scale: float = 1e6):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            scale: Multiplier converting recorded values to integer bucket units
+                (1e6 records seconds at microsecond resolution, 1 records counts)
+        """
+        self.scale = scale
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    @staticmethod
+    def _index(units: int) -> int:
+        """
+        Maps an integer value to its bucket index.
+        """
+        if units < 2 * SUB_BUCKETS:
+            return units
+        shift = units.bit_length() - SUB_BUCKETS.bit_length()
+        return shift * SUB_BUCKETS + (units >> shift)
+
+    @staticmethod
+    def _value(index: int) -> float:
+        """
+        Returns the midpoint value of a bucket index.
+        """
+        if index < 2 * SUB_BUCKETS:
+            return float(index)
+        shift = index // SUB_BUCKETS - 1
+        low = (index - shift * SUB_BUCKETS) << shift
+        return low + ((1 << shift) - 1) / 2.0
+
+    def record(self, value: float) -> None:
+        """
+        Records one value.
+
+        Args:
+            value: The value in the histogram's unit (seconds by default)
+        """
+        index = self._index(max(0, int(value * self.scale)))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, quantile: float) -> float:
+        """
+        Returns the value at a quantile.
+
+        Args:
+            quantile: Quantile between 0 and 1
+
+        Returns:
+            float: The estimated value, 0.0 when empty
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(quantile * self.count)))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, max(self.min, self._value(index) / self.scale))
+        return self.max
+
+    def mean(self) -> float:
+        """
+        Returns the mean of the recorded values.
+        """
+        return self.total / self.count if self.count else 0.0
+
+
+class MetricsRegistry:
+    """
+    Process-wide store of latency histograms and counters.
+
+    Spans are timed with the `span` context manager and recorded in the
+    `coa_span_seconds` histogram labelled with the span name. Other components
+    can add collectors that return their own metrics at export time.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.collectors: List[Callable[[], List[Tuple[str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, value: float, scale: float = 1e6, **labels) -> None:
+        """
+        Records a value in a labelled histogram.
+
+        Args:
+            name: Metric name
+            value: Value to record
+            scale: Histogram resolution, see Histogram
+            **labels: Metric labels
+        """
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(scale)
+            histogram.record(value)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        """
+        Increments a labelled counter.
+        """
+        key = (name, self._labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """
+        Times the enclosed block and records it as a span.
+
+        Args:
+            name: Span name such as 'prompt_build' or 'llm'
+            **labels: Extra labels such as the tool name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("coa_span_seconds", time.perf_counter() - start, span=name, **labels)
+
+    def record_llm(self, response: Any, stage: str) -> None:
+        """
+        Records the token counts and timings returned by the LLM server.
+
+        Args:
+            response: Chat response in the Ollama format
+            stage: Which call of the turn this was, e.g. 'first' or 'tool_followup'
+        """
+        try:
+            for field, metric in (("prompt_eval_count", "coa_llm_prompt_tokens"), ("eval_count", "coa_llm_eval_tokens")):
+                if response.get(field) is not None:
+                    self.observe(metric, response[field], scale=1, stage=stage)
+            for field, span in (("load_duration", "llm.load"), ("prompt_eval_duration", "llm.prefill"),
+                                ("eval_duration", "llm.decode"), ("total_duration", "llm.server_total")):
+                if response.get(field):
+                    self.observe("coa_span_seconds", response[field] / 1e9, span=span, stage=stage)
+        except (AttributeError, TypeError) as e:
+            logger.debug(f"LLM response without timing fields: {str(e)}")
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, str, Dict[str, str], float]]]) -> None:
+        """
+        Registers a function returning extra metrics at export time.
+
+        Args:
+            collector: Function returning (name, type, labels, value) tuples,
+                where type is 'counter' or 'gauge'
+        """
+        self.collectors.append(collector)
+
+    def reset(self) -> None:
+        """
+        Clears all recorded histograms and counters.
+        """
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def show_stats(self) -> str:
+        """
+        Returns the span and token statistics as a formatted table.
+        """
+        with self._lock:
+            items = sorted(self.histograms.items())
+            if not items:
+                return "No turns recorded yet."
+            lines = [f"{'span':<32}{'count':>8}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"]
+            for (name, labels), histogram in items:
+                label = ",".join(value for _, value in labels)
+                values = [histogram.mean()] + [histogram.percentile(q) for q in QUANTILES] + [histogram.max]
+                if name == "coa_span_seconds":
+                    lines.append(f"{label:<32}{histogram.count:>8}" + "".join(f"{v * 1000:>8.1f}ms" for v in values))
+                else:
+                    title = f"{name.replace('coa_llm_', '')}:{label}"
+                    lines.append(f"{title:<32}{histogram.count:>8}" + "".join(f"{v:>10.0f}" for v in values))
+        return "\n".join(lines)
+
+    def prometheus_text(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+        """
+        def render_labels(labels) -> str:
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        typed = set()
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            for quantile in QUANTILES:
+                lines.append(f"{name}{render_labels(labels + (('quantile', str(quantile)),))} {histogram.percentile(quantile)}")
+            lines.append(f"{name}_sum{render_labels(labels)} {histogram.total}")
+            lines.append(f"{name}_count{render_labels(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{render_labels(labels)} {value}")
+        for collector in self.collectors:
+            try:
+                for name, kind, labels, value in collector():
+                    if name not in typed:
+                        lines.append(f"# TYPE {name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{name}{render_labels(self._labels(labels))} {value}")
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {str(e)}")
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serves the metrics as Prometheus text on http://host:port/metrics.
+
+        Args:
+            port: Port to listen on
+            host: Interface to bind, local only by default
+
+        Returns:
+            The running server
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics request: {format % args}")
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+        return server
+
+
+# Shared registry used by the agent, toolbox and interfaces
+REGISTRY = MetricsRegistry()
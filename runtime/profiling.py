@@ -0,0 +1,278 @@
+import cProfile
+import contextlib
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = "profiles"
+# Frames to highlight in the report: name -> (file fragment, function names)
+HIGHLIGHTS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "regex parsing": ("agent.py", ("check_json_response",)),
+    "prompt rendering": ("agent.py", ("update_system_prompt",)),
+    "tool execution": ("Toolbox.py", ("execute_tool",)),
+    "llm call": ("agent.py", ("llm_response",)),
+}
+MAX_STACK_DEPTH = 64
+
+# Returned while profiling is off, so a turn only pays for one attribute check
+_DISABLED = contextlib.nullcontext()
+
+Func = Tuple[str, int, str]
+
+
+def frame_name(func: Func) -> str:
+    """
+    Formats a pstats function key as module:function for reports and stacks.
+    """
+    filename, line, name = func
+    if filename == "~":
+        # Built-ins such as <method 're.Pattern.search'>
+        return name.strip("<>").replace("built-in method ", "").replace("method ", "")
+    return f"{os.path.basename(filename).rsplit('.', 1)[0]}:{name}:{line}"
+
+
+def collapsed_stacks(stats: pstats.Stats) -> List[str]:
+    """
+    Converts profile statistics into the collapsed-stack format used by flame graph tools.
+
+    cProfile only keeps caller/callee pairs, so each function's time is split over its
+    call paths in proportion to the time each caller spent in it.
+
+    Args:
+        stats: Profile statistics
+
+    Returns:
+        List of 'frame;frame;frame microseconds' lines
+    """
+    entries = stats.stats
+    callees: Dict[Func, List[Func]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(func)
+
+    totals: Dict[str, float] = {}
+
+    def walk(func: Func, inclusive: float, stack: List[str], seen: set) -> None:
+        _, _, self_time, cumulative, _ = entries[func]
+        if cumulative <= 0 or len(stack) >= MAX_STACK_DEPTH:
+            return
+        share = min(1.0, inclusive / cumulative)
+        path = stack + [frame_name(func)]
+        key = ";".join(path)
+        totals[key] = totals.get(key, 0.0) + self_time * share
+        for callee in callees.get(func, []):
+            if callee in seen:
+                continue
+            edge = entries[callee][4][func][3]
+            walk(callee, edge * share, path, seen | {callee})
+
+    for func, (_, _, _, cumulative, callers) in entries.items():
+        # Calls made from the frame that enabled profiling have no caller entry and become roots
+        external = cumulative - sum(edge[3] for caller, edge in callers.items() if caller in entries and caller != func)
+        if external > 0:
+            walk(func, external, [], {func})
+    return [f"{stack} {int(value * 1e6)}" for stack, value in totals.items() if value * 1e6 >= 1]
+
+
+class TurnProfiler:
+    """
+    Profiles the next N agent turns with cProfile and tracemalloc.
+
+    Turns are wrapped with `turn()`; while profiling is off that returns a shared
+    null context. Time is accumulated into one cProfile profile across the
+    turns, and allocation sites are taken from a tracemalloc snapshot diff
+    around each turn. When the requested number of turns has run, the pstats
+    file and a collapsed-stack export are written to the output directory.
+    """
+
+    def __init__(self, output_dir: str = PROFILE_DIR, top: int = 15):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_dir: Directory for the .pstats and .collapsed files
+            top: Number of functions and allocation sites in the report
+        """
+        self.output_dir = output_dir
+        self.top = top
+        self.remaining = 0
+        self.turns = 0
+        self.profile: Optional[cProfile.Profile] = None
+        self.allocations: Dict[str, List[int]] = {}
+        self.peak_bytes = 0
+        self.last_report = ""
+        self._started_tracemalloc = False
+        # cProfile can only profile one thread at a time
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.remaining > 0
+
+    def start(self, turns: int = 5) -> str:
+        """
+        Profiles the next `turns` agent turns.
+
+        Returns:
+            Confirmation message
+        """
+        if turns < 1:
+            return "Number of turns must be at least 1."
+        self.profile = cProfile.Profile()
+        self.allocations = {}
+        self.peak_bytes = 0
+        self.turns = 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        self.remaining = turns
+        return f"Profiling the next {turns} turn(s)."
+
+    def stop(self) -> str:
+        """
+        Stops profiling and saves whatever was collected.
+
+        Returns:
+            The profile report
+        """
+        if not self.active:
+            return "Profiling is not running."
+        return self._finish()
+
+    def _finish(self) -> str:
+        self.remaining = 0
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if not self.turns:
+            return "Profiling stopped before any turn ran."
+        report = self.dump()
+        # Later dumps return this report instead of saving the same profile again
+        self.profile = None
+        return report
+
+    def turn(self):
+        """
+        Returns the context manager wrapping one agent turn.
+        """
+        if not self.remaining:
+            return _DISABLED
+        return self._profile_turn()
+
+    @contextmanager
+    def _profile_turn(self) -> Iterator[None]:
+        # Turns running concurrently in other sessions are not profiled
+        if not self._lock.acquire(blocking=False):
+            yield
+            return
+        try:
+            profile = self.profile
+            tracing = tracemalloc.is_tracing()
+            before = tracemalloc.take_snapshot() if tracing else None
+            if tracing:
+                tracemalloc.reset_peak()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                if tracing:
+                    self.peak_bytes = max(self.peak_bytes, tracemalloc.get_traced_memory()[1])
+                    self._record_allocations(before, tracemalloc.take_snapshot())
+                self.turns += 1
+                self.remaining = max(0, self.remaining - 1)
+        finally:
+            self._lock.release()
+        if not self.remaining:
+            logger.info(f"Profiling finished after {self.turns} turn(s)")
+            self.last_report = self._finish()
+
+    def _record_allocations(self, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> None:
+        """
+        Adds the allocations made during one turn to the per-site totals.
+        """
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        after = after.filter_traces(ignore)
+        for stat in after.compare_to(before.filter_traces(ignore), "lineno"):
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            site = f"{os.path.basename(frame.filename)}:{frame.lineno}"
+            totals = self.allocations.setdefault(site, [0, 0])
+            totals[0] += stat.size_diff
+            totals[1] += stat.count_diff
+
+    def highlights(self, stats: pstats.Stats) -> List[Tuple[str, int, float]]:
+        """
+        Sums the cumulative time of the highlighted stages.
+
+        Returns:
+            List of (stage, calls, cumulative seconds)
+        """
+        rows = []
+        for label, (filename, names) in HIGHLIGHTS.items():
+            calls, cumulative = 0, 0.0
+            for (path, _, name), (_, count, _, ct, _) in stats.stats.items():
+                if name in names and path.endswith(filename):
+                    calls += count
+                    cumulative += ct
+            rows.append((label, calls, cumulative))
+        # All regex work, including the think tag search and tool argument handling
+        regex = [entry for func, entry in stats.stats.items() if func[0] == "~" and "re.Pattern" in func[2]]
+        rows.append(("re.Pattern methods", sum(e[1] for e in regex), sum(e[3] for e in regex)))
+        return rows
+
+    def dump(self) -> str:
+        """
+        Writes the collected profile to disk and returns a summary report.
+
+        Returns:
+            The report, or a message when nothing has been collected
+        """
+        if self.profile is None or not self.turns:
+            return self.last_report or "No profile collected yet. Use !profile on [turns] first."
+        stats = pstats.Stats(self.profile)
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"turns-{time.strftime('%Y%m%d-%H%M%S')}")
+        stats.dump_stats(f"{base}.pstats")
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            f.write("\n".join(collapsed_stacks(stats)) + "\n")
+
+        lines = [f"Profiled {self.turns} turn(s), total {stats.total_tt * 1000:.1f}ms", ""]
+        lines.append(f"{'stage':<24}{'calls':>8}{'cumulative':>14}")
+        for label, calls, cumulative in self.highlights(stats):
+            lines.append(f"{label:<24}{calls:>8}{cumulative * 1000:>12.1f}ms")
+        lines.append("")
+        lines.append(f"{'function':<60}{'calls':>8}{'tottime':>12}{'cumtime':>12}")
+        ranked = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        for func, (_, calls, tottime, cumulative, _) in ranked:
+            lines.append(f"{frame_name(func)[:59]:<60}{calls:>8}{tottime * 1000:>10.1f}ms{cumulative * 1000:>10.1f}ms")
+        if self.allocations:
+            lines.append("")
+            lines.append(f"Peak traced memory {self.peak_bytes / 1024:.1f} KiB; top allocation sites:")
+            ranked_sites = sorted(self.allocations.items(), key=lambda item: item[1][0], reverse=True)[:self.top]
+            for site, (size, count) in ranked_sites:
+                lines.append(f"  {site:<40}{size / 1024:>10.1f} KiB{count:>8} blocks")
+        lines.append("")
+        lines.append(f"Saved {base}.pstats and {base}.collapsed")
+        self.last_report = "\n".join(lines)
+        return self.last_report
+
+    def status(self) -> str:
+        """
+        Returns whether profiling is running and how many turns are left.
+        """
+        if self.active:
+            return f"Profiling: {self.turns} turn(s) done, {self.remaining} remaining."
+        return "Profiling is off."
+
+
+# Shared profiler used by the agent and the command interface
+PROFILER = TurnProfiler()
@@ -0,0 +1,354 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from llm.backend import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+SESSION_DIR = "sessions"
+# The history is the last part of the system prompt; what comes after it changes every turn
+HISTORY_END = "</conversation_history>"
+
+
+def prompt_prefix(system_prompt: str) -> str:
+    """
+    Returns the part of a system prompt a later prompt still starts with: everything up to the end of the history.
+    """
+    end = system_prompt.rfind(HISTORY_END)
+    # Drop the indentation before the closing tag; the next prompt has new entries there
+    return system_prompt[:end].rstrip() if end >= 0 else system_prompt
+
+
+def prefix_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def session_id(agent_id: str, username: str) -> str:
+    """
+    Returns the file-safe session name of an agent and its user.
+    """
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{agent_id}-{username}")
+
+
+class SessionStore:
+    """
+    Saves conversations to disk and brings the LLM server's context back on resume.
+
+    A session file holds the history and, when the agent has talked to the
+    model, a snapshot record: the model, the hash and length of the prompt
+    prefix the server's KV cache was built from, and whatever the backend
+    saved (a llama.cpp slot file). On resume the history is loaded and the new
+    system prompt is compared with the recorded prefix; only when it still
+    starts with the same text is the backend asked to restore its context.
+    Otherwise the next request simply prefills from scratch.
+    """
+
+    def __init__(self, backend: LLMBackend, directory: str = SESSION_DIR):
+        """
+        Initialize the session store.
+
+        Args:
+            backend: Backend whose context is saved and restored
+            directory: Directory holding the session files
+        """
+        self.backend = backend
+        self.directory = directory
+
+    def session_name(self, agent) -> str:
+        """
+        Returns the file-safe session name of an agent and its user.
+        """
+        return session_id(agent.agent_id, agent.username)
+
+    def path(self, agent) -> str:
+        return os.path.join(self.directory, f"{self.session_name(agent)}.json")
+
+    def save(self, agent) -> str:
+        """
+        Writes the agent's conversation and a context snapshot.
+
+        Args:
+            agent: The agent to save
+
+        Returns:
+            Confirmation message
+        """
+        name = self.session_name(agent)
+        data: Dict[str, Any] = {
+            "agent_id": agent.agent_id,
+            "username": agent.username,
+            "model": agent.model,
+            "saved_at": time.time(),
+            "intro_given": agent.intro_given,
+            "history": agent.conversation_history.messages,
+        }
+        if agent.last_request:
+            model, messages, options = agent.last_request
+            prefix = prompt_prefix(messages[0]["content"])
+            data["context"] = {
+                "model": model,
+                "options": options,
+                "prefix_hash": prefix_hash(prefix),
+                "prefix_chars": len(prefix),
+                "backend": self.backend.name,
+                "state": self.backend.save_context(model, name),
+            }
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(agent)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+        logger.info(f"Saved session {name} with {len(data['history'])} history entries")
+        return f"Session saved to {path}."
+
+    def restore(self, agent, background: bool = True) -> str:
+        """
+        Loads a saved conversation into the agent and restores the server context when the prefix matches.
+
+        Args:
+            agent: The agent to resume
+            background: Restore the server context on a background thread
+
+        Returns:
+            Description of what was restored
+        """
+        path = self.path(agent)
+        if not os.path.exists(path):
+            return "No saved session."
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error reading session {path}: {str(e)}")
+            return f"Error reading saved session: {str(e)}"
+
+        agent.conversation_history.load_history(data.get("history", []))
+        agent.intro_given = data.get("intro_given", bool(data.get("history")))
+        agent.update_system_prompt()
+        restored = f"Resumed {len(agent.conversation_history.messages)} history entries"
+
+        reason = self.context_mismatch(agent, data.get("context"))
+        if reason:
+            logger.info(f"Session context not restored: {reason}")
+            return f"{restored}; the next reply prefills the full prompt ({reason})."
+
+        context = data["context"]
+        messages = [{"role": "system", "content": agent.system_prompt}]
+        args = (context["model"], self.session_name(agent), messages, agent.request_options(context["model"]))
+        if background:
+            threading.Thread(target=self.backend.restore_context, args=args, name="context-restore", daemon=True).start()
+            return f"{restored}; restoring the model context in the background."
+        if self.backend.restore_context(*args):
+            return f"{restored} and the model context."
+        return f"{restored}; the backend could not restore the model context."
+
+    def context_mismatch(self, agent, context: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Checks whether a saved context can be reused for the agent's current prompt.
+
+        Returns:
+            The reason it can't be reused, or None if it can
+        """
+        if not context:
+            return "no context snapshot"
+        if context.get("backend") != self.backend.name:
+            return f"saved with the {context.get('backend')} backend"
+        if context.get("model") != agent.model:
+            return f"saved for model {context.get('model')}"
+        if context.get("options", {}).get("num_ctx") != agent.request_options(agent.model).get("num_ctx"):
+            return "context window changed"
+        prefix = agent.system_prompt[:context.get("prefix_chars", 0)]
+        if prefix_hash(prefix) != context.get("prefix_hash"):
+            return "prompt prefix changed"
+        return None
+
+
+class SessionHost:
+    """
+    Keeps the live conversations of users with agents in memory.
+
+    A session is an agent of its own for one agent and user, built by the
+    community and resumed from the SessionStore when a saved one exists.
+    Turns of one session run one at a time. Past `max_sessions` the least
+    recently used idle session is saved and closed; a session being saved is
+    only opened again once the save is done, so it resumes with every turn. All methods return plain
+    dictionaries, so they can be called across a process boundary; unknown
+    agents and sessions raise LookupError.
+    """
+
+    def __init__(self, community, max_sessions: int = 256):
+        """
+        Initialize an empty host.
+
+        Args:
+            community: The CommunityOfAgents building and parking the session agents
+            max_sessions: Sessions kept in memory
+        """
+        self.community = community
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self.locks: Dict[str, threading.Lock] = {}
+        self.parking: Dict[str, threading.Event] = {}  # Sessions closed and still being saved
+        self._lock = threading.Lock()
+
+    def _open(self, agent_id: str, user: str) -> Tuple[Any, threading.Lock, bool]:
+        """
+        Returns the agent and turn lock of a session, opening it if needed, and whether it was opened.
+        """
+        name = session_id(agent_id, user)
+        with self._lock:
+            if name in self.sessions:
+                self.sessions.move_to_end(name)
+                return self.sessions[name], self.locks[name], False
+            parking = self.parking.get(name)
+        if parking is not None:
+            # Resuming before the save is done would lose the latest turns
+            parking.wait()
+        descriptor = self.community.registry.descriptors.get(agent_id)
+        if descriptor is None:
+            raise LookupError(f"Unknown agent: {agent_id}")
+        # Built outside the lock: resuming reads the saved session from disk
+        agent = self.community.create_agent(descriptor.details(), user)
+        evicted = []
+        with self._lock:
+            if name in self.sessions:  # Opened by a concurrent call meanwhile
+                return self.sessions[name], self.locks[name], False
+            self.sessions[name] = agent
+            lock = self.locks[name] = threading.Lock()
+            while len(self.sessions) > self.max_sessions:
+                # Taking the lock keeps a turn from starting on the session while it is saved
+                victim = next((key for key in self.sessions
+                               if key != name and self.locks[key].acquire(blocking=False)), None)
+                if victim is None:
+                    break  # Every session is answering; go over the cap until one finishes
+                evicted.append((victim, self.sessions.pop(victim), self.locks.pop(victim)))
+                self.parking[victim] = threading.Event()
+        for victim, old_agent, old_lock in evicted:
+            try:
+                self._park(victim, old_agent)
+            finally:
+                old_lock.release()
+        return agent, lock, True
+
+    def _turn(self, agent_id: str, user: str) -> Tuple[Any, threading.Lock]:
+        """
+        Returns the agent of a session with its turn lock held, opening the session if needed.
+        """
+        name = session_id(agent_id, user)
+        while True:
+            agent, lock, _ = self._open(agent_id, user)
+            lock.acquire()
+            with self._lock:
+                if self.sessions.get(name) is agent:
+                    return agent, lock
+            # Closed while waiting for the lock; open it again
+            lock.release()
+
+    def _hold(self, name: str) -> Tuple[Any, threading.Lock]:
+        """
+        Returns the agent of an open session with its turn lock held.
+        """
+        with self._lock:
+            if name not in self.sessions:
+                raise LookupError(f"No open session {name}")
+            agent, lock = self.sessions[name], self.locks[name]
+        lock.acquire()
+        with self._lock:
+            if self.sessions.get(name) is agent:
+                return agent, lock
+        lock.release()
+        raise LookupError(f"No open session {name}")
+
+    def _park(self, name: str, agent) -> None:
+        """
+        Saves a session removed from memory and lets it be opened again.
+        """
+        try:
+            self.community.park_agent(agent)
+        finally:
+            with self._lock:
+                parking = self.parking.pop(name, None)
+            if parking is not None:
+                parking.set()
+
+    def describe(self, agent) -> Dict[str, Any]:
+        return {"session": session_id(agent.agent_id, agent.username), "agent_id": agent.agent_id,
+                "agent": agent.first_name, "user": agent.username,
+                "history_entries": len(agent.conversation_history.messages)}
+
+    def open(self, agent_id: str, user: str) -> Dict[str, Any]:
+        agent, _, opened = self._open(agent_id, user)
+        return dict(self.describe(agent), opened=opened)
+
+    def chat(self, agent_id: str, user: str, message: str) -> Dict[str, Any]:
+        """
+        Answers a message in the session of an agent and user, opening it if needed.
+        """
+        start = time.perf_counter()
+        agent, lock = self._turn(agent_id, user)
+        try:
+            response = agent.agent_response(message)
+        finally:
+            lock.release()
+        return dict(self.describe(agent), response=response, seconds=round(time.perf_counter() - start, 3))
+
+    def history(self, name: str) -> Dict[str, Any]:
+        with self._lock:
+            if name not in self.sessions:
+                raise LookupError(f"No open session {name}")
+            agent = self.sessions[name]
+        return dict(self.describe(agent), history=list(agent.conversation_history.messages))
+
+    def save(self, name: str) -> Dict[str, Any]:
+        agent, lock = self._hold(name)
+        try:
+            result = self.community.sessions.save(agent)
+        finally:
+            lock.release()
+        return dict(self.describe(agent), result=result)
+
+    def close(self, name: str) -> Dict[str, Any]:
+        """
+        Saves a session and removes it from memory.
+        """
+        agent, lock = self._hold(name)
+        try:
+            with self._lock:
+                self.sessions.pop(name, None)
+                self.locks.pop(name, None)
+                self.parking[name] = threading.Event()
+            self._park(name, agent)
+        finally:
+            lock.release()
+        return dict(self.describe(agent), closed=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        Returns the open sessions, least recently used first.
+        """
+        with self._lock:
+            agents = list(self.sessions.values())
+        return [self.describe(agent) for agent in agents]
+
+    def save_all(self) -> int:
+        """
+        Saves and closes every session.
+
+        Returns:
+            int: Number of sessions closed
+        """
+        with self._lock:
+            agents = list(self.sessions.values())
+            self.sessions.clear()
+            self.locks.clear()
+        for agent in agents:
+            self.community.park_agent(agent)
+        return len(agents)
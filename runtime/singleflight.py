@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: Any) -> str:
+    """
+    Normalizes free text so trivially different spellings share a key.
+
+    Args:
+        text: Text to normalize (non-strings are converted with str())
+
+    Returns:
+        str: Stripped, case-folded text with collapsed whitespace
+    """
+    return re.sub(r"\s+", " ", str(text)).strip().casefold()
+
+
+def make_key(namespace: str, *parts: Any) -> Tuple[str, str]:
+    """
+    Builds a single-flight key from a namespace and request parts.
+
+    Args:
+        namespace: Category of the request, e.g. 'tool' or 'llm'
+        *parts: JSON serialisable parts identifying the request
+
+    Returns:
+        Tuple of the namespace and a canonical encoding of the parts
+    """
+    return namespace, json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+
+
+class SingleFlight:
+    """
+    Collapses identical in-flight requests into one execution.
+
+    The first caller for a key runs the function; callers arriving with the same
+    key while it is running wait for and share its result (or exception). Nothing
+    is cached once the call completes. Thread callers use `do`, asyncio callers
+    use `do_async`, and both share the same in-flight table so a coroutine can
+    join a call started by a thread and the other way round.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _join_or_lead(self, key: Tuple[str, str]) -> Tuple[Future, bool]:
+        """
+        Returns the in-flight future for a key and whether the caller must run it.
+        """
+        with self._lock:
+            stats = self.stats.setdefault(key[0], {"calls": 0, "executions": 0, "collapsed": 0})
+            stats["calls"] += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                stats["collapsed"] += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            stats["executions"] += 1
+            return future, True
+
+    def _finish(self, key: Tuple[str, str], future: Future, result: Any = None, error: BaseException = None) -> None:
+        """
+        Publishes the leader's outcome and removes the key from the table.
+        """
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Tuple[str, str], fn: Callable, *args, **kwargs) -> Any:
+        """
+        Runs fn for the key, or waits for the identical call already in flight.
+
+        Args:
+            key: Key built with make_key()
+            fn: Function to run
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            The result of fn
+        """
+        future, leader = self._join_or_lead(key)
+        if not leader:
+            logger.debug(f"Joining in-flight {key[0]} request")
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key: Tuple[str, str], fn: Callable, *args, **kwargs) -> Any:
+        """
+        Asyncio version of do(). fn may be a coroutine function or a plain
+        function, which is run in the default executor.
+
+        Args:
+            key: Key built with make_key()
+            fn: Coroutine function or function to run
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            The result of fn
+        """
+        future, leader = self._join_or_lead(key)
+        if not leader:
+            logger.debug(f"Joining in-flight {key[0]} request")
+            return await asyncio.wrap_future(future)
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                result = await fn(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def collapse_ratio(self, namespace: str = None) -> float:
+        """
+        Returns the fraction of calls that were served by another call's execution.
+
+        Args:
+            namespace: Only count this namespace, all namespaces when None
+
+        Returns:
+            float: Collapsed calls divided by total calls
+        """
+        with self._lock:
+            selected = [s for n, s in self.stats.items() if namespace is None or n == namespace]
+            calls = sum(s["calls"] for s in selected)
+            collapsed = sum(s["collapsed"] for s in selected)
+        return collapsed / calls if calls else 0.0
+
+    def show_stats(self) -> str:
+        """
+        Returns the deduplication statistics as a formatted string.
+        """
+        with self._lock:
+            stats = {n: dict(s) for n, s in self.stats.items()}
+        if not stats:
+            return "No requests deduplicated yet."
+        lines = [
+            f"{namespace}: {s['calls']} calls, {s['executions']} executions, {s['collapsed']} collapsed "
+            f"(ratio {s['collapsed'] / s['calls']:.2%})"
+            for namespace, s in sorted(stats.items())
+        ]
+        lines.append(f"overall collapse ratio: {self.collapse_ratio():.2%}")
+        return "\n".join(lines)
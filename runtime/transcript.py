@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_DIR = os.path.join("cache", "transcripts")
+
+
+class Transcript:
+    """
+    Chat transcript of one session, kept on the server and read in pages.
+
+    The most recent `max_memory` entries are held in memory. Older ones are
+    appended to a JSONL file in blocks and read back by byte offset when a
+    page reaching that far back is requested, so memory stays bounded however
+    long the session runs. Without a path they are dropped instead.
+    Entries are numbered from 0 in the order they were added.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory: int = 1000):
+        """
+        Initialize an empty transcript.
+
+        Args:
+            path: JSONL file receiving entries moved out of memory
+            max_memory: Entries kept in memory, at least 2
+        """
+        self.path = path
+        self.max_memory = max(2, max_memory)
+        self.recent: List[Dict[str, str]] = []
+        self.spilled = 0  # Entries moved out of memory; recent[0] is entry number `spilled`
+        self.offsets = array("q")  # Byte offset of each entry in the file
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.spilled + len(self.recent)
+
+    def append(self, role: str, content: str) -> int:
+        """
+        Adds an entry.
+
+        Returns:
+            int: Its number
+        """
+        with self._lock:
+            self.recent.append({"role": role, "content": content})
+            if len(self.recent) > self.max_memory:
+                # Half the entries at once, so the file is written once per max_memory / 2 appends
+                self._spill(len(self.recent) - self.max_memory // 2)
+            return len(self) - 1
+
+    def page(self, start: int, end: int) -> List[Dict[str, str]]:
+        """
+        Returns entries start to end (exclusive), reading older ones from disk.
+
+        Entries that were dropped without a file are left out.
+        """
+        with self._lock:
+            start, end = max(0, start), min(end, len(self))
+            if start >= end:
+                return []
+            entries = []
+            if start < self.spilled and self.path and len(self.offsets) == self.spilled:
+                entries = self._read(start, min(end, self.spilled))
+            if end > self.spilled:
+                entries += self.recent[max(0, start - self.spilled):end - self.spilled]
+            return entries
+
+    def tail(self, count: int) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        Returns the number of the first of the last `count` entries, and those entries.
+        """
+        start = max(0, len(self) - count)
+        return start, self.page(start, len(self))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.recent = []
+            self.spilled = 0
+            self.offsets = array("q")
+            self._remove()
+
+    def _spill(self, count: int) -> None:
+        moving, self.recent = self.recent[:count], self.recent[count:]
+        if self.path and len(self.offsets) == self.spilled:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "ab") as f:
+                    position = f.tell()
+                    lines = []
+                    for entry in moving:
+                        line = json.dumps(entry).encode("utf-8") + b"\n"
+                        self.offsets.append(position)
+                        position += len(line)
+                        lines.append(line)
+                    f.write(b"".join(lines))
+            except OSError as e:
+                # Older pages can't be loaded any more; keep the offsets from covering a partial file
+                logger.error(f"Error writing transcript {self.path}: {str(e)}")
+                self.offsets = array("q")
+        self.spilled += count
+
+    def _read(self, start: int, end: int) -> List[Dict[str, str]]:
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offsets[start])
+                stop = self.offsets[end] if end < len(self.offsets) else None
+                data = f.read(stop - self.offsets[start]) if stop is not None else f.read()
+            return [json.loads(line) for line in data.splitlines()]
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading transcript {self.path}: {str(e)}")
+            return []
+
+    def _remove(self) -> None:
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove transcript {self.path}: {str(e)}")
+
+
+class TranscriptStore:
+    """
+    Transcripts of the open chat sessions, by session id.
+
+    A browser tab is a session; its transcript is dropped, with its file,
+    when the tab is closed or past `max_sessions` for the least recently used.
+    """
+
+    def __init__(self, directory: str = TRANSCRIPT_DIR, max_memory: int = 1000, max_sessions: int = 256):
+        """
+        Initialize an empty store.
+
+        Args:
+            directory: Directory of the files holding older entries, None to drop them
+            max_memory: Entries each transcript keeps in memory
+            max_sessions: Transcripts kept before the least recently used is dropped
+        """
+        self.directory = directory
+        self.max_memory = max_memory
+        self.max_sessions = max_sessions
+        self.transcripts: "OrderedDict[str, Transcript]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Transcript:
+        """
+        Returns the transcript of a session, creating it if needed.
+        """
+        with self._lock:
+            transcript = self.transcripts.get(session_id)
+            if transcript is not None:
+                self.transcripts.move_to_end(session_id)
+                return transcript
+            path = None
+            if self.directory:
+                name = re.sub(r"[^A-Za-z0-9_.-]", "_", session_id)
+                path = os.path.join(self.directory, f"{name}.jsonl")
+            transcript = self.transcripts[session_id] = Transcript(path, self.max_memory)
+            # A file left behind by an earlier run belongs to no live session
+            transcript.clear()
+            evicted = []
+            while len(self.transcripts) > self.max_sessions:
+                evicted.append(self.transcripts.popitem(last=False)[1])
+        for old in evicted:
+            old.clear()
+        return transcript
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            transcript = self.transcripts.pop(session_id, None)
+        if transcript is not None:
+            transcript.clear()
+
+    def close(self) -> None:
+        """
+        Drops every transcript and its file.
+        """
+        with self._lock:
+            transcripts = list(self.transcripts.values())
+            self.transcripts.clear()
+        for transcript in transcripts:
+            transcript.clear()
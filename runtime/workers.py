@@ -0,0 +1,406 @@
+import bisect
+import contextlib
+import gc
+import hashlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import reduction
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from runtime.logs import shutdown_logging
+from runtime.sessions import SessionHost
+
+try:
+    import msgpack
+except ImportError:  # Optional; frames fall back to JSON
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# SessionHost methods a worker accepts
+OPERATIONS = frozenset({"open", "chat", "history", "save", "close", "list", "stats"})
+
+
+def encode(message: Any) -> bytes:
+    if msgpack is not None:
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(",", ":")).encode("utf-8")
+
+
+def decode(data: bytes) -> Any:
+    if msgpack is not None:
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+class WorkerError(RuntimeError):
+    """
+    Raised when a worker process exited before answering.
+    """
+
+
+class WorkerProcess:
+    """
+    Handle of a worker process forked by the spawner.
+
+    Workers are the spawner's children, not the supervisor's, so they are
+    watched by pid; the spawner reaps them as they exit.
+    """
+
+    def __init__(self, pid: int, name: str):
+        self.pid = pid
+        self.name = name
+
+    def is_alive(self) -> bool:
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_alive() and (deadline is None or time.monotonic() < deadline):
+            time.sleep(0.05)
+
+    def terminate(self) -> None:
+        with contextlib.suppress(ProcessLookupError):
+            os.kill(self.pid, signal.SIGTERM)
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys to nodes.
+
+    Every node owns `replicas` points on the ring and a key belongs to the
+    first point after its hash, so adding or removing a node only moves the
+    keys of that node, about 1/N of them.
+    """
+
+    def __init__(self, nodes: List[int], replicas: int = 64):
+        points = sorted((self.hash(f"{node}:{replica}"), node) for node in nodes for replica in range(replicas))
+        self.hashes = [point for point, _ in points]
+        self.nodes = [node for _, node in points]
+
+    @staticmethod
+    def hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def node_for(self, key: str) -> int:
+        index = bisect.bisect(self.hashes, self.hash(key)) % len(self.hashes)
+        return self.nodes[index]
+
+
+def worker_main(index: int, connection, community, threads: int, max_sessions: int,
+                backend_factory: Optional[Callable] = None, inherited: Tuple = ()) -> None:
+    """
+    Serves session requests in a forked worker process until told to stop.
+
+    Requests are (request id, operation, arguments) frames answered with
+    (request id, ok, result or [error type, message]) frames, possibly out of
+    order; up to `threads` run at once.
+    """
+    # The supervisor's ends of the other workers' pipes; holding them would hide those workers' exits
+    for other in inherited:
+        other.close()
+    community.after_fork(backend_factory() if backend_factory else None)
+    host = SessionHost(community, max_sessions)
+    send_lock = threading.Lock()
+    handled = 0
+
+    def handle(request_id: int, operation: str, args: List[Any]) -> None:
+        nonlocal handled
+        try:
+            if operation == "stats":
+                result = {"worker": index, "pid": os.getpid(), "sessions": len(host.sessions), "handled": handled}
+            else:
+                result = getattr(host, operation)(*args)
+            reply = (request_id, True, result)
+        except Exception as e:
+            if not isinstance(e, LookupError):
+                logger.error(f"Worker {index} failed on {operation}: {str(e)}")
+            reply = (request_id, False, [type(e).__name__ if isinstance(e, LookupError) else "Error", str(e)])
+        handled += 1
+        with send_lock:
+            connection.send_bytes(encode(reply))
+
+    logger.info(f"Worker {index} started with pid {os.getpid()}")
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"worker-{index}") as executor:
+        while True:
+            try:
+                request_id, operation, args = decode(connection.recv_bytes())
+            except (EOFError, OSError):
+                break
+            if operation == "stop":
+                break
+            if operation not in OPERATIONS:
+                with send_lock:
+                    connection.send_bytes(encode((request_id, False, ["Error", f"Unknown operation {operation}"])))
+                continue
+            executor.submit(handle, request_id, operation, args)
+    saved = host.save_all()
+    logger.info(f"Worker {index} stopped after {handled} requests, saved {saved} sessions")
+    connection.close()
+    # Forked processes leave through os._exit, so flush the log queue here
+    shutdown_logging()
+
+
+def spawner_main(connection, inherited: Tuple, community, threads: int, max_sessions: int,
+                 backend_factory: Optional[Callable] = None) -> None:
+    """
+    Forks the worker processes the supervisor asks for until its pipe closes.
+
+    The spawner is forked by start() before the supervisor runs its server
+    threads, and does nothing but wait for requests, so workers started
+    later, after a crash, don't inherit locks held by the supervisor's HTTP,
+    config writer or health threads. A request is a worker index; the reply
+    is the worker's pid followed by the supervisor's end of its pipe.
+    """
+    for other in inherited:
+        other.close()
+    # The kernel reaps exited workers; the supervisor notices them by their closed pipes
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    while True:
+        try:
+            (index,) = decode(connection.recv_bytes())
+        except (EOFError, OSError):
+            break
+        parent, child = multiprocessing.Pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                parent.close()
+                worker_main(index, child, community, threads, max_sessions, backend_factory, (connection,))
+            except BaseException as e:
+                logger.error(f"Worker {index} failed: {str(e)}")
+                shutdown_logging()
+                code = 1
+            finally:
+                os._exit(code)
+        child.close()
+        try:
+            connection.send_bytes(encode([pid]))
+            reduction.send_handle(connection, parent.fileno(), os.getppid())
+        except OSError:
+            break
+        finally:
+            parent.close()
+    shutdown_logging()
+
+
+class WorkerPool:
+    """
+    Supervisor of worker processes that each own a shard of the user sessions.
+
+    Sessions are assigned to workers by consistent hashing on the session id,
+    so all turns of a session run in the same process, next to its agent and
+    history, and each process has its own GIL for prompt rendering, parsing
+    and tool work. Requests travel over pipes as length-prefixed frames,
+    msgpack encoded when msgpack is installed and JSON otherwise.
+
+    Workers are forked once the supervisor has loaded the agent registry, the
+    compiled personalities and the router index: those pages are shared
+    copy-on-write, and gc.freeze() keeps the collector from touching (and
+    thereby copying) them. start() forks a spawner process at that point,
+    which forks every worker, so a worker restarted while the supervisor runs
+    its server threads still comes from a process without them. Each worker
+    then creates its own LLM backend, admission controller and caches. A
+    worker that exits is started again on the next request routed to it;
+    sessions it had not saved are lost.
+    """
+
+    def __init__(self, community, workers: int = 2, threads: int = 4, max_sessions: int = 256,
+                 backend_factory: Optional[Callable] = None):
+        """
+        Initialize the pool; start() forks the workers.
+
+        Args:
+            community: The CommunityOfAgents whose state the workers inherit
+            workers: Number of worker processes
+            threads: Requests each worker handles at once
+            max_sessions: Sessions each worker keeps in memory
+            backend_factory: Builds each worker's LLM backend, the configured backend when None
+        """
+        self.community = community
+        self.size = workers
+        self.threads = threads
+        self.max_sessions = max_sessions
+        self.backend_factory = backend_factory
+        self.ring = HashRing(list(range(workers)))
+        self.processes: List[Optional[WorkerProcess]] = [None] * workers
+        self.connections: List[Any] = [None] * workers
+        self.pending: Dict[int, Tuple[int, Future]] = {}
+        self.requests = [0] * workers
+        self.restarts = 0
+        self.stopping = False
+        self._ids = itertools.count(1)
+        self._send_locks = [threading.Lock() for _ in range(workers)]
+        self._lock = threading.Lock()
+        self._spawn_lock = threading.Lock()
+        self._context = multiprocessing.get_context("fork")
+        self.spawner: Optional[multiprocessing.Process] = None
+        self._spawner_connection = None
+
+    @property
+    def capacity(self) -> int:
+        return self.size * self.threads
+
+    def start(self) -> "WorkerPool":
+        """
+        Forks the workers.
+        """
+        # Build what the workers share before forking so they inherit it instead of each building it
+        if self.community.router_stale:
+            self.community.route("")
+        gc.collect()
+        gc.freeze()
+        self._spawner_connection, child = self._context.Pipe()
+        self.spawner = self._context.Process(
+            target=spawner_main, name="coa-worker-spawner", daemon=True,
+            args=(child, (self._spawner_connection,), self.community, self.threads, self.max_sessions,
+                  self.backend_factory))
+        self.spawner.start()
+        child.close()
+        gc.unfreeze()
+        for index in range(self.size):
+            self._spawn(index)
+        logger.info(f"Started {self.size} worker processes with {self.threads} threads each")
+        return self
+
+    def _spawn(self, index: int) -> None:
+        """
+        Has the spawner fork a worker; raises OSError or EOFError if the spawner is gone.
+        """
+        with self._spawn_lock:
+            self._spawner_connection.send_bytes(encode([index]))
+            (pid,) = decode(self._spawner_connection.recv_bytes())
+            parent = Connection(reduction.recv_handle(self._spawner_connection))
+        self.processes[index] = WorkerProcess(pid, f"coa-worker-{index}")
+        self.connections[index] = parent
+        threading.Thread(target=self._receive, args=(index, parent), name=f"worker-{index}-replies",
+                         daemon=True).start()
+
+    def _receive(self, index: int, connection) -> None:
+        """
+        Resolves the futures of one worker's replies until its pipe closes.
+        """
+        while True:
+            try:
+                request_id, ok, result = decode(connection.recv_bytes())
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                _, future = self.pending.pop(request_id, (None, None))
+            if future is None:
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                kind, message = result
+                future.set_exception(LookupError(message) if kind == "LookupError" else RuntimeError(message))
+        with self._lock:
+            lost = [request_id for request_id, (worker, _) in self.pending.items() if worker == index]
+            futures = [self.pending.pop(request_id)[1] for request_id in lost]
+            if self.connections[index] is connection:
+                self.connections[index] = None
+        for future in futures:
+            future.set_exception(WorkerError(f"Worker {index} exited"))
+        if not self.stopping:
+            logger.warning(f"Worker {index} exited with {len(futures)} requests pending")
+
+    def alive(self) -> int:
+        return sum(1 for process in self.processes if process is not None and process.is_alive())
+
+    def worker_for(self, key: str) -> int:
+        return self.ring.node_for(key)
+
+    def submit(self, key: str, operation: str, *args) -> Future:
+        """
+        Sends an operation to the worker owning a session.
+
+        Args:
+            key: Session id
+            operation: SessionHost method name
+            *args: Its arguments
+
+        Returns:
+            Future resolving to the result
+        """
+        return self._send(self.worker_for(key), operation, list(args))
+
+    def broadcast(self, operation: str, *args) -> List[Future]:
+        """
+        Sends an operation to every worker.
+        """
+        return [self._send(index, operation, list(args)) for index in range(self.size)]
+
+    def _send(self, index: int, operation: str, args: List[Any]) -> Future:
+        future: Future = Future()
+        request_id = next(self._ids)
+        with self._send_locks[index]:
+            if self.stopping:
+                future.set_exception(WorkerError("Worker pool is stopping"))
+                return future
+            if self.connections[index] is None:
+                self.restarts += 1
+                logger.warning(f"Restarting worker {index}")
+                try:
+                    self._spawn(index)
+                except (EOFError, OSError) as e:
+                    future.set_exception(WorkerError(f"Worker {index} could not be restarted: {str(e)}"))
+                    return future
+            with self._lock:
+                self.pending[request_id] = (index, future)
+                self.requests[index] += 1
+            try:
+                self.connections[index].send_bytes(encode((request_id, operation, args)))
+            except (OSError, ValueError) as e:
+                with self._lock:
+                    self.pending.pop(request_id, None)
+                future.set_exception(WorkerError(f"Worker {index} is unavailable: {str(e)}"))
+        return future
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """
+        Asks the workers to finish their requests and save their sessions, then waits for them.
+        """
+        if self.stopping:
+            return
+        self.stopping = True
+        for index, connection in enumerate(self.connections):
+            if connection is None:
+                continue
+            with self._send_locks[index], contextlib.suppress(OSError, ValueError):
+                connection.send_bytes(encode((0, "stop", [])))
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            if process is not None:
+                process.join(max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    logger.warning(f"Worker {process.name} did not stop in time")
+                    process.terminate()
+        if self._spawner_connection is not None:
+            self._spawner_connection.close()
+            self.spawner.join(max(0.0, deadline - time.monotonic()))
+
+    def show_stats(self) -> str:
+        """
+        Returns the workers and the requests routed to each as a one-line summary.
+        """
+        workers = ", ".join(
+            f"{index}: pid {process.pid if process else '-'} "
+            f"{'up' if process and process.is_alive() else 'down'}, {self.requests[index]} requests"
+            for index, process in enumerate(self.processes))
+        return f"Worker pool ({self.size} processes x {self.threads} threads, {self.restarts} restarts): {workers}"
@@ -0,0 +1,78 @@
+import unittest
+
+from llm.admission import AdmissionController, model_size
+
+MODELS = ['cogito:8b', 'gemma3:12b', 'phi4', 'qwen3:0.6b', 'qwen3:8b']
+
+
+class ModelSizeTest(unittest.TestCase):
+    def test_size_from_tag(self):
+        self.assertEqual(model_size("gemma3:12b"), 12.0)
+        self.assertEqual(model_size("qwen3:0.6b"), 0.6)
+
+    def test_untagged_size_is_unknown(self):
+        self.assertIsNone(model_size("phi4"))
+        self.assertIsNone(model_size("llama3:latest"))
+
+
+class AdmissionControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.controller = AdmissionController(MODELS, max_in_flight=2, latency_target=1.0, cooldown=1)
+
+    def finish(self, ticket, latency):
+        # Backdate the start instead of sleeping
+        ticket.started -= latency
+        self.controller.release(ticket)
+
+    def test_rejects_past_max_in_flight(self):
+        first = self.controller.admit("qwen3:8b")
+        second = self.controller.admit("qwen3:8b")
+        self.assertIsNotNone(first)
+        self.assertIsNotNone(second)
+        self.assertIsNone(self.controller.admit("qwen3:8b"))
+        self.controller.release(first)
+        self.assertIsNotNone(self.controller.admit("qwen3:8b"))
+        self.assertEqual(self.controller.metrics()["rejected"], 1)
+
+    def test_degrades_history_then_model(self):
+        self.finish(self.controller.admit("gemma3:12b"), 5.0)
+        ticket = self.controller.admit("gemma3:12b")
+        self.assertEqual(ticket.level, 1)
+        self.assertEqual(ticket.model, "gemma3:12b")
+        self.assertEqual(ticket.history_limit, self.controller.history_budget)
+        self.finish(ticket, 5.0)
+        ticket = self.controller.admit("gemma3:12b")
+        self.assertEqual(ticket.level, 2)
+        self.assertIn(ticket.model, ("cogito:8b", "qwen3:8b"))
+        self.controller.release(ticket)
+
+    def test_recovers_when_fast_again(self):
+        self.finish(self.controller.admit("gemma3:12b"), 5.0)
+        self.assertEqual(self.controller.level, 1)
+        self.finish(self.controller.admit("gemma3:12b"), 0.1)
+        self.assertEqual(self.controller.level, 0)
+
+    def test_small_model_does_not_clamp_shared_level(self):
+        for _ in range(3):
+            self.finish(self.controller.admit("gemma3:12b"), 5.0)
+        self.assertEqual(self.controller.level, 3)
+        small = self.controller.admit("qwen3:0.6b")
+        self.assertEqual(small.level, 1)
+        self.assertEqual(small.model, "qwen3:0.6b")
+        # Between the recovery threshold and the target, so no level change is due
+        self.finish(small, 0.8)
+        self.assertEqual(self.controller.level, 3)
+        self.assertEqual(self.controller.admit("gemma3:12b").level, 3)
+
+    def test_untagged_model_is_never_substituted(self):
+        self.assertEqual(self.controller.max_level("phi4"), 1)
+        self.assertNotIn("phi4", self.controller.models)
+        for _ in range(3):
+            self.finish(self.controller.admit("gemma3:12b"), 5.0)
+        ticket = self.controller.admit("phi4")
+        self.assertEqual(ticket.model, "phi4")
+        self.assertEqual(ticket.level, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
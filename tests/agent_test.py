@@ -0,0 +1,148 @@
+import sys
+import threading
+import time
+import unittest
+
+from agent.agent import Agent, Message, ReplyUnavailable
+from agents.agents import AGENT_REBECCA
+from llm.admission import AdmissionController, BUSY_MESSAGE
+from llm.fake_backend import FakeBackend, default_reply
+
+
+def make_agent(**kwargs) -> Agent:
+    agent = Agent(AGENT_REBECCA, "Tester", "qwen3:8b", [], backend=FakeBackend(), **kwargs)
+    agent.intro_given = True
+    return agent
+
+
+class AgentResponseTest(unittest.TestCase):
+    def test_reply_is_stored_in_history(self):
+        agent = make_agent()
+        reply = agent.agent_response("hello")
+        self.assertIn("You said: hello", reply)
+        self.assertEqual(len(agent.conversation_history.messages), 2)
+
+    def test_shed_reply_is_not_stored_in_history(self):
+        agent = make_agent(admission=AdmissionController(["qwen3:8b"], max_in_flight=0))
+        reply = agent.agent_response("hello")
+        self.assertEqual(reply, f"{agent.first_name}>: {BUSY_MESSAGE}")
+        self.assertEqual(agent.conversation_history.messages, [])
+        self.assertNotIn(BUSY_MESSAGE, agent.system_prompt)
+
+    def test_strict_turn_raises_instead_of_a_shed_reply(self):
+        agent = make_agent(admission=AdmissionController(["qwen3:8b"], max_in_flight=0))
+        with self.assertRaises(ReplyUnavailable) as raised:
+            agent.agent_response("hello", strict=True)
+        self.assertEqual(str(raised.exception), BUSY_MESSAGE)
+        self.assertEqual(agent.conversation_history.messages, [])
+
+    def test_error_reply_is_not_stored_in_history(self):
+        def failing(model, messages):
+            raise ConnectionError("server down")
+        agent = make_agent()
+        agent.backend = FakeBackend(responder=failing)
+        reply = agent.agent_response("hello")
+        self.assertIn("server down", reply)
+        self.assertEqual(agent.conversation_history.messages, [])
+
+    def test_concurrent_turns_of_one_agent_do_not_interleave(self):
+        running = []
+        overlaps = []
+
+        def responder(model, messages):
+            running.append(1)
+            overlaps.append(len(running))
+            time.sleep(0.05)
+            running.pop()
+            return default_reply(model, messages)
+
+        agent = make_agent()
+        agent.backend = FakeBackend(responder=responder)
+        replies = {}
+        threads = [threading.Thread(target=lambda n=n: replies.__setitem__(n, agent.agent_response(f"message {n}")))
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max(overlaps), 1)
+        for n, reply in replies.items():
+            self.assertTrue(reply.endswith(f"You said: message {n}"))
+        history = agent.conversation_history.messages
+        for user_entry, agent_entry in zip(history[::2], history[1::2]):
+            self.assertTrue(agent_entry.endswith(user_entry.split(">: ", 1)[1]))
+
+
+class ScratchCopyTest(unittest.TestCase):
+    def test_answer_leaves_the_agent_untouched(self):
+        agent = make_agent()
+        agent.intro_given = False
+        agent.conversation_history.update_history("hi", "hello Tester")
+        prompt = getattr(agent, "user_prompt", None)
+        reply = agent.scratch_copy().agent_response("what do you all think?")
+        self.assertIn("You said: what do you all think?", reply)
+        self.assertEqual(agent.conversation_history.messages, ["Tester>: hi", f"{agent.first_name}>: hello Tester"])
+        self.assertFalse(agent.intro_given)
+        self.assertEqual(getattr(agent, "user_prompt", None), prompt)
+
+    def test_copy_has_its_own_turn_lock(self):
+        agent = make_agent()
+        scratch = agent.scratch_copy()
+        self.assertIsNot(scratch.turn_lock, agent.turn_lock)
+        with agent.turn_lock:
+            thread = threading.Thread(target=scratch.agent_response, args=("hello",))
+            thread.start()
+            thread.join(2)
+            self.assertFalse(thread.is_alive())
+
+    def test_introduction_does_not_touch_the_conversation(self):
+        agent = make_agent()
+        self.assertIsNotNone(agent.generate_introduction())
+        self.assertEqual(agent.conversation_history.messages, [])
+
+
+class MessageTest(unittest.TestCase):
+    def test_keeps_at_most_max_length_entries(self):
+        history = Message("Tester", "Rebecca", max_length=4)
+        for n in range(5):
+            history.update_history(f"question {n}", f"answer {n}")
+        self.assertEqual(len(history.messages), 4)
+        self.assertEqual(history.messages[0], "Tester>: question 3")
+        self.assertEqual(history.dropped, 6)
+        self.assertEqual(len(history.token_counts), 4)
+
+    def test_byte_cap_drops_oldest_but_keeps_last_exchange(self):
+        history = Message("Tester", "Rebecca", max_length=1000, max_bytes=2000)
+        for n in range(50):
+            history.update_history(f"question {n} " * 5, f"answer {n} " * 5)
+        self.assertLessEqual(history.bytes, 2000)
+        self.assertEqual(history.bytes, sum(sys.getsizeof(entry) for entry in history.messages))
+        self.assertTrue(history.messages[-1].startswith("Rebecca>: answer 49"))
+        history.update_history("x" * 5000, "y" * 5000)
+        self.assertEqual(len(history.messages), 2)
+
+    def test_memory_usage_tracks_history(self):
+        agent = make_agent(max_history_bytes=4096)
+        before = agent.memory_bytes()
+        for n in range(20):
+            agent.agent_response(f"message {n} " * 10)
+        usage = agent.memory_usage()
+        self.assertGreater(agent.memory_bytes(), before)
+        self.assertLessEqual(usage["history_bytes"] - sys.getsizeof(agent.conversation_history.messages)
+                             - sys.getsizeof(agent.conversation_history.token_counts), 4096)
+        self.assertGreater(usage["history_dropped"], 0)
+
+
+
+class FakeBackendTest(unittest.TestCase):
+    def test_keeps_only_the_latest_calls(self):
+        backend = FakeBackend(replies=["a", "b", "c"], max_calls=2)
+        replies = [backend.chat("m", [{"role": "user", "content": str(i)}])["message"]["content"]
+                   for i in range(5)]
+        self.assertEqual(replies, ["a", "b", "c", "a", "b"])
+        self.assertEqual(backend.call_count, 5)
+        self.assertEqual([call["messages"][0]["content"] for call in backend.calls], ["3", "4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
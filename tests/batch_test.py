@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from agent.agent import Agent
+from agent.registry import AgentDescriptor, AgentRegistry
+from agents.agents import AGENT_REBECCA
+from llm.admission import AdmissionController, BUSY_MESSAGE
+from llm.fake_backend import FakeBackend
+from runtime.batch import BatchRunner, completed_ids, read_items
+
+
+class BatchRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.jsonl")
+        self.admission = AdmissionController(["qwen3:8b"], max_in_flight=4)
+        registry = AgentRegistry(lambda details: None)
+        registry.register(AgentDescriptor.from_personality(AGENT_REBECCA))
+        self.community = SimpleNamespace(registry=registry, create_agent=self.create_agent)
+        self.runner = BatchRunner(self.community, str(AGENT_REBECCA["agent_id"]), concurrency=2,
+                                  progress=io.StringIO())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create_agent(self, details: dict, username: str) -> Agent:
+        return Agent(details, username, "qwen3:8b", [], backend=FakeBackend(), admission=self.admission)
+
+    def run_batch(self, lines):
+        done = completed_ids(self.path)
+        with open(self.path, "a", encoding="utf-8") as output:
+            summary = self.runner.run(read_items(lines), output, done)
+        with open(self.path, encoding="utf-8") as f:
+            return summary, [json.loads(line) for line in f]
+
+    def test_answers_prompts_in_order(self):
+        summary, results = self.run_batch(['{"id": "a", "prompt": "hello"}', '"bye"', "not json"])
+        self.assertEqual([result["id"] for result in results], ["a", "2", "3"])
+        self.assertIn("You said: hello", results[0]["response"])
+        self.assertIsNone(results[1]["error"])
+        self.assertIn("Invalid JSON", results[2]["error"])
+        self.assertEqual((summary.done, summary.errors), (3, 1))
+
+    def test_shed_prompts_are_errors_and_retried_on_resume(self):
+        self.admission.max_in_flight = 0
+        summary, results = self.run_batch(['{"id": "a", "prompt": "hello"}'])
+        self.assertEqual(results[0]["error"], BUSY_MESSAGE)
+        self.assertIsNone(results[0]["response"])
+        self.assertEqual(summary.errors, 1)
+        self.assertEqual(completed_ids(self.path), set())
+
+        self.admission.max_in_flight = 4
+        summary, results = self.run_batch(['{"id": "a", "prompt": "hello"}'])
+        self.assertEqual((summary.skipped, summary.errors), (0, 0))
+        self.assertEqual([result["id"] for result in results], ["a"])
+        self.assertIn("You said: hello", results[0]["response"])
+        self.assertEqual(completed_ids(self.path), {"a"})
+
+    def test_model_failures_are_errors(self):
+        def failing(model, messages):
+            raise ConnectionError("server down")
+
+        self.community.create_agent = lambda details, username: Agent(
+            details, username, "qwen3:8b", [], backend=FakeBackend(responder=failing))
+        _, results = self.run_batch(['"hello"'])
+        self.assertIn("server down", results[0]["error"])
+
+    def test_unknown_agent(self):
+        _, results = self.run_batch(['{"prompt": "hello", "agent": "nobody"}'])
+        self.assertEqual(results[0]["error"], "Unknown agent: nobody")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import time
+import unittest
+
+from runtime.bus import BusMessage, MessageBus
+
+
+class EchoAgent:
+    """
+    Stands in for an Agent: answers with what it was told, after a delay.
+    """
+
+    def __init__(self, agent_id: str, delay: float = 0.0):
+        self.agent_id = agent_id
+        self.first_name = agent_id.capitalize()
+        self.delay = delay
+        self.prompts = []
+
+    def agent_response(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        time.sleep(self.delay)
+        return f"{self.first_name}>: heard {len(prompt.splitlines())}"
+
+
+class MessageBusTest(unittest.TestCase):
+    def setUp(self):
+        self.bus = MessageBus(mailbox_size=4, llm_concurrency=2, put_timeout=0.05)
+
+    def test_publish_skips_sender_and_drops_when_full(self):
+        async def scenario():
+            for agent_id in ("a", "b"):
+                self.bus.subscribe(agent_id, "t")
+            for n in range(6):
+                await self.bus.publish(BusMessage("t", "a", f"message {n}"))
+        asyncio.run(scenario())
+        self.assertEqual(self.bus.mailbox("b", "t").qsize(), 4)
+        self.assertNotIn(("a", "t"), self.bus.mailboxes)
+        self.assertEqual(self.bus.stats["dropped"], 2)
+        self.assertEqual(self.bus.unread[("b", "t")], 4)
+
+    def test_discussion_exchanges_messages(self):
+        agents = [EchoAgent("ann"), EchoAgent("bob")]
+        transcript = asyncio.run(self.bus.discuss(agents, "hello", max_turns=2, timeout=5.0))
+        self.assertEqual(transcript[0].content, "hello")
+        self.assertEqual(sum(message.sender == "ann" for message in transcript), 2)
+        self.assertEqual(sum(message.sender == "bob" for message in transcript), 2)
+        self.assertEqual(self.bus.mailboxes, {})
+
+    def test_fast_turn_on_one_topic_does_not_end_a_slow_one(self):
+        shared = EchoAgent("shared")
+        shared.agent_response = lambda prompt: time.sleep(0.3 if "slow" in prompt else 0) or "Shared>: done"
+
+        async def scenario():
+            return await asyncio.gather(
+                self.bus.discuss([shared], "slow", topic="one", max_turns=1, timeout=5.0, poll=0.02),
+                self.bus.discuss([shared], "fast", topic="two", max_turns=1, timeout=5.0, poll=0.02))
+
+        one, two = asyncio.run(scenario())
+        self.assertEqual([message.content for message in one], ["slow", "done"])
+        self.assertEqual([message.content for message in two], ["fast", "done"])
+        self.assertEqual(self.bus.busy, set())
+
+    def test_agent_in_two_discussions_keeps_both(self):
+        shared = EchoAgent("shared", delay=0.05)
+
+        async def scenario():
+            return await asyncio.gather(
+                self.bus.discuss([shared, EchoAgent("ann", delay=0.05)], "first", topic="one", max_turns=1, timeout=5.0),
+                self.bus.discuss([shared, EchoAgent("bob", delay=0.05)], "second", topic="two", max_turns=1, timeout=5.0))
+
+        one, two = asyncio.run(scenario())
+        self.assertIn("shared", [message.sender for message in one])
+        self.assertIn("shared", [message.sender for message in two])
+        self.assertEqual(self.bus.stats["expired"], 0)
+        self.assertTrue(any("first" in prompt for prompt in shared.prompts))
+        self.assertTrue(any("second" in prompt for prompt in shared.prompts))
+
+    def test_serving_one_topic_leaves_other_topics_unread(self):
+        shared = EchoAgent("shared")
+
+        async def scenario():
+            for topic in ("one", "two"):
+                self.bus.subscribe("shared", topic)
+            await self.bus.publish(BusMessage("one", "ann", "first"))
+            await self.bus.publish(BusMessage("two", "bob", "second"))
+            return await self.bus.serve(shared, "one", max_turns=1, deadline=time.monotonic() + 2.0)
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+        self.assertEqual(shared.prompts, ["ann says: first"])
+        self.assertEqual(self.bus.unread[("shared", "two")], 1)
+        self.assertEqual(self.bus.mailbox("shared", "two").get_nowait().content, "second")
+        self.assertEqual(self.bus.stats["expired"], 0)
+
+    def test_discussion_ends_at_timeout(self):
+        agents = [EchoAgent("slow", delay=1.0), EchoAgent("late", delay=1.0)]
+
+        async def scenario():
+            # Timed inside the loop; asyncio.run also waits for the abandoned turn threads
+            start = time.monotonic()
+            await self.bus.discuss(agents, "hello", max_turns=3, timeout=0.3)
+            return time.monotonic() - start
+
+        self.assertLess(asyncio.run(scenario()), 0.9)
+        self.assertGreaterEqual(self.bus.stats["timeouts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
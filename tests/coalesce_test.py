@@ -0,0 +1,102 @@
+import os
+import signal
+import threading
+import time
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from llm.coalesce import RequestCoalescer
+
+
+class RequestCoalescerTest(unittest.TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=8)
+        self.batches = []
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def submit_batch(self, requests):
+        # Each request is a number of seconds to sleep, or an exception to raise
+        self.batches.append(list(requests))
+        return [self.executor.submit(self.run_request, request) for request in requests]
+
+    @staticmethod
+    def run_request(request):
+        if isinstance(request, Exception):
+            raise request
+        time.sleep(request)
+        return request
+
+    def test_groups_requests_within_window(self):
+        coalescer = RequestCoalescer(self.submit_batch, window=0.1, max_batch=8)
+        results = []
+        threads = [threading.Thread(target=lambda n=n: results.append(coalescer.submit(n / 100)))
+                   for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [0.0, 0.01, 0.02, 0.03])
+        self.assertEqual(coalescer.batches, 1)
+        self.assertEqual(coalescer.average_batch(), 4)
+
+    def test_later_request_does_not_wait_for_earlier_batch(self):
+        coalescer = RequestCoalescer(self.submit_batch, window=0.005, max_batch=8)
+        slow = threading.Thread(target=coalescer.submit, args=(1.0,))
+        slow.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        self.assertEqual(coalescer.submit(0.1), 0.1)
+        self.assertLess(time.monotonic() - start, 0.5)
+        slow.join()
+        self.assertEqual(coalescer.batches, 2)
+
+    def test_errors_reach_their_caller(self):
+        coalescer = RequestCoalescer(self.submit_batch, window=0.005)
+        with self.assertRaises(ValueError):
+            coalescer.submit(ValueError("bad request"))
+        self.assertEqual(coalescer.submit(0.0), 0.0)
+
+    def test_failure_to_start_a_batch_fails_its_requests(self):
+        def broken(requests):
+            raise ConnectionError("server down")
+        coalescer = RequestCoalescer(broken, window=0.005)
+        with self.assertRaises(ConnectionError):
+            coalescer.submit(0.0)
+
+    def test_close_submits_queued_requests_and_stops_the_dispatcher(self):
+        coalescer = RequestCoalescer(self.submit_batch, window=10.0)
+        caller = threading.Thread(target=coalescer.submit, args=(0.0,))
+        caller.start()
+        time.sleep(0.05)
+        coalescer.close()
+        caller.join(timeout=1.0)
+        self.assertFalse(caller.is_alive())
+        self.assertEqual(self.batches, [[0.0]])
+        self.assertFalse(coalescer._dispatcher.is_alive())
+        with self.assertRaises(RuntimeError):
+            coalescer.submit(0.0)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs os.fork")
+    def test_forked_child_gets_its_own_dispatcher(self):
+        def run_now(requests):
+            # The parent's executor threads don't exist in the child either
+            futures = [Future() for _ in requests]
+            for future, request in zip(futures, requests):
+                future.set_result(request)
+            return futures
+        coalescer = RequestCoalescer(run_now, window=0.005)
+        self.assertEqual(coalescer.submit(1), 1)
+        pid = os.fork()
+        if pid == 0:
+            signal.alarm(5)  # A child stuck waiting on the parent's thread would hang the test
+            os._exit(0 if coalescer.submit(2) == 2 else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(coalescer.submit(3), 3)
+        coalescer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
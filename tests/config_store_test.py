@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from runtime.config_store import ConfigStore
+
+
+class ConfigStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "config.json")
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        self.directory.cleanup()
+
+    def store(self, **kwargs) -> ConfigStore:
+        store = ConfigStore(self.path, {"model": "llama3.2", "temperature": 0.7}, **kwargs)
+        self.stores.append(store)
+        return store
+
+    def read(self) -> dict:
+        with open(self.path) as f:
+            return json.load(f)
+
+    def wait_for(self, condition, timeout: float = 2.0) -> None:
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("timed out")
+            time.sleep(0.01)
+
+    def test_missing_file_is_created_from_defaults(self):
+        store = self.store()
+        self.assertEqual(self.read(), {"model": "llama3.2", "temperature": 0.7})
+        self.assertEqual(store.get("model"), "llama3.2")
+        self.assertEqual(store.get("missing", 3), 3)
+
+    def test_existing_file_wins_over_defaults(self):
+        with open(self.path, "w") as f:
+            json.dump({"model": "qwen2.5"}, f)
+        self.assertEqual(self.store().get_all(), {"model": "qwen2.5"})
+
+    def test_snapshot_is_immutable_and_replaced_on_set(self):
+        store = self.store(flush_delay=10, max_delay=10)
+        snapshot = store.config
+        with self.assertRaises(TypeError):
+            snapshot["model"] = "qwen2.5"
+        store.set("model", "qwen2.5")
+        self.assertEqual(snapshot["model"], "llama3.2")
+        self.assertEqual(store.get("model"), "qwen2.5")
+
+    def test_burst_of_sets_is_one_write(self):
+        store = self.store(flush_delay=0.1, max_delay=5)
+        writes = store.stats["writes"]
+        for step in range(20):
+            store.set("temperature", step / 20)
+        self.assertEqual(self.read()["temperature"], 0.7)
+        self.wait_for(lambda: store.stats["writes"] > writes)
+        time.sleep(0.2)
+        self.assertEqual(store.stats["writes"], writes + 1)
+        self.assertEqual(self.read()["temperature"], 0.95)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_flush_writes_pending_keys_only_once(self):
+        store = self.store(flush_delay=10, max_delay=10)
+        store.update({"model": "qwen2.5", "temperature": 0.2})
+        self.assertTrue(store.flush())
+        self.assertFalse(store.flush())
+        self.assertEqual(self.read(), {"model": "qwen2.5", "temperature": 0.2})
+
+    def test_update_without_persist_stays_in_memory(self):
+        store = self.store(flush_delay=10, max_delay=10)
+        store.update({"model": "qwen2.5"}, persist=False)
+        self.assertFalse(store.flush())
+        self.assertEqual(store.get("model"), "qwen2.5")
+        self.assertEqual(self.read()["model"], "llama3.2")
+
+    def test_close_writes_pending_keys(self):
+        store = self.store(flush_delay=10, max_delay=10)
+        store.set("model", "qwen2.5")
+        store.close()
+        self.assertEqual(self.read()["model"], "qwen2.5")
+
+    def test_reload_picks_up_outside_edits_and_keeps_dirty_keys(self):
+        store = self.store(flush_delay=10, max_delay=10)
+        self.assertFalse(store.reload())
+        store.set("temperature", 0.1)
+        with open(self.path, "w") as f:
+            json.dump({"model": "mistral", "temperature": 0.9, "top_k": 40}, f)
+        self.assertTrue(store.reload())
+        self.assertEqual(store.get_all(), {"model": "mistral", "temperature": 0.1, "top_k": 40})
+        self.assertFalse(store.reload())
+
+    def test_flush_with_reload_keeps_outside_edits_to_other_keys(self):
+        store = self.store(flush_delay=10, max_delay=10, reload_interval=10)
+        store.set("temperature", 0.1)
+        with open(self.path, "w") as f:
+            json.dump({"model": "mistral", "temperature": 0.9}, f)
+        store.flush()
+        self.assertEqual(self.read(), {"model": "mistral", "temperature": 0.1})
+
+    def test_unreadable_file_is_not_loaded(self):
+        store = self.store(flush_delay=10, max_delay=10)
+        with open(self.path, "w") as f:
+            f.write('{"model": ')
+        self.assertFalse(store.reload())
+        self.assertEqual(store.get("model"), "llama3.2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+import unittest
+
+from PIL import Image
+
+from runtime.image_catalog import ImageCatalog
+from tools.List_Images import change_image, list_images
+
+
+class ImageCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.work = tempfile.TemporaryDirectory()
+        self.images = os.path.join(self.work.name, "images")
+        self.thumbnails = os.path.join(self.work.name, "thumbnails")
+        os.mkdir(self.images)
+        for name in ("Rebecca.jpg", "agent.png", "judy.GIF", "viktor.jpeg"):
+            self.image(name)
+        for name in ("notes.txt", "README"):
+            open(os.path.join(self.images, name), "w").close()
+        os.mkdir(os.path.join(self.images, "folder.png"))
+        self.age()
+        self.catalog = ImageCatalog(self.images, self.thumbnails, thumbnail_size=(30, 40))
+
+    def tearDown(self):
+        self.work.cleanup()
+
+    def image(self, name: str, size=(120, 80), color="red") -> None:
+        formats = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".gif": "GIF"}
+        Image.new("RGB", size, color).save(os.path.join(self.images, name), formats[os.path.splitext(name)[1].lower()])
+
+    def age(self, path: str = None, seconds: float = 10) -> None:
+        # A modification time within the last moments isn't trusted, and would make every call scan again
+        past = time.time() - seconds
+        os.utime(path or self.images, (past, past))
+
+    def test_lists_image_files_sorted_case_insensitively(self):
+        self.assertEqual(self.catalog.list(), (["agent.png", "judy.GIF", "Rebecca.jpg", "viktor.jpeg"], 4))
+
+    def test_filter_by_part_of_name_or_pattern(self):
+        self.assertEqual(self.catalog.list("REB"), (["Rebecca.jpg"], 1))
+        self.assertEqual(self.catalog.list("*.JP*"), (["Rebecca.jpg", "viktor.jpeg"], 2))
+        self.assertEqual(self.catalog.list("?gent*"), (["agent.png"], 1))
+        self.assertEqual(self.catalog.list("nothing"), ([], 0))
+
+    def test_pagination(self):
+        self.assertEqual(self.catalog.list("", 2, 3), (["viktor.jpeg"], 4))
+        self.assertEqual(self.catalog.list("", 0, 3), (["agent.png", "judy.GIF", "Rebecca.jpg"], 4))
+        self.assertEqual(self.catalog.list("", 3, 3), ([], 4))
+
+    def test_find_is_case_insensitive_and_limited_to_the_catalog(self):
+        self.assertEqual(self.catalog.find(" rebecca.JPG "), "Rebecca.jpg")
+        self.assertIsNone(self.catalog.find("notes.txt"))
+        self.assertIsNone(self.catalog.find("../images/Rebecca.jpg"))
+        self.assertIsNone(self.catalog.find("folder.png"))
+
+    def test_unchanged_directory_is_not_read_again(self):
+        self.assertTrue(self.catalog.refresh())
+        self.assertFalse(self.catalog.refresh())
+
+    def test_added_and_removed_images_are_picked_up(self):
+        self.catalog.list()
+        self.image("alt.png")
+        os.remove(os.path.join(self.images, "judy.GIF"))
+        self.age(seconds=5)
+        self.assertEqual(self.catalog.list()[0], ["agent.png", "alt.png", "Rebecca.jpg", "viktor.jpeg"])
+
+    def test_recent_change_is_checked_again(self):
+        os.utime(self.images)
+        self.assertTrue(self.catalog.refresh())
+        self.assertTrue(self.catalog.refresh())
+
+    def test_missing_directory(self):
+        catalog = ImageCatalog(os.path.join(self.work.name, "missing"), self.thumbnails)
+        self.assertFalse(catalog.exists())
+        self.assertEqual(catalog.list(), ([], 0))
+
+    def test_thumbnail_is_created_and_cached(self):
+        thumbnail = self.catalog.thumbnail("rebecca.jpg")
+        self.assertEqual(os.path.dirname(thumbnail), self.thumbnails)
+        self.assertTrue(thumbnail.endswith(".jpg"))
+        with Image.open(thumbnail) as image:
+            self.assertEqual(image.size, (30, 20))
+        modified = os.stat(thumbnail).st_mtime_ns
+        self.assertEqual(self.catalog.thumbnail("Rebecca.jpg"), thumbnail)
+        self.assertEqual(os.stat(thumbnail).st_mtime_ns, modified)
+        self.assertTrue(self.catalog.thumbnail("agent.png").endswith(".png"))
+
+    def test_replaced_image_gets_a_new_thumbnail(self):
+        old = self.catalog.thumbnail("agent.png")
+        self.image("agent.png", size=(200, 100), color="blue")
+        self.age(os.path.join(self.images, "agent.png"), seconds=5)
+        new = self.catalog.thumbnail("agent.png")
+        self.assertNotEqual(new, old)
+        self.assertFalse(os.path.exists(old))
+        self.assertEqual(os.listdir(self.thumbnails), [os.path.basename(new)])
+
+    def test_unreadable_image_falls_back_to_the_original(self):
+        with open(os.path.join(self.images, "broken.png"), "w") as f:
+            f.write("not an image")
+        self.age()
+        with self.assertLogs("runtime.image_catalog", "WARNING"):
+            self.assertEqual(self.catalog.thumbnail("broken.png"), self.catalog.path("broken.png"))
+        self.assertIsNone(self.catalog.thumbnail("unknown.png"))
+
+
+class ListImagesTest(unittest.TestCase):
+    def test_lists_the_project_images(self):
+        listing = list_images()
+        self.assertTrue(listing.startswith("Available images:\n"))
+        self.assertIn("- Rebecca.jpg\n", listing)
+
+    def test_filter_and_pages(self):
+        self.assertEqual(list_images("rebecca"), "Available images:\n- Rebecca.jpg\n")
+        self.assertEqual(list_images("*.bmp"), "No images matching *.bmp found in the images directory.")
+        self.assertIn("There is no page 9", list_images("page 9"))
+
+    def test_change_image(self):
+        self.assertEqual(change_image("REBECCA.JPG"), "Rebecca.jpg")
+        with self.assertLogs("tools.List_Images", "ERROR"):
+            self.assertEqual(change_image("notes.txt"), "File notes.txt is not a valid image type.")
+            self.assertEqual(change_image("../images/agent.jpg"),
+                             "Image ../images/agent.jpg not found in the images directory.")
+
+
+if __name__ == "__main__":
+    unittest.main()
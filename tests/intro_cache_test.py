@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from agent.agent import Agent
+from agents.agents import AGENT_REBECCA
+from llm.fake_backend import FakeBackend
+from runtime.intro_cache import IntroCache
+
+
+class IntroCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = IntroCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def agent(self, username: str, backend: FakeBackend = None) -> Agent:
+        return Agent(AGENT_REBECCA, username, "qwen3:8b", [], backend=backend or FakeBackend(),
+                     intro_cache=self.cache)
+
+    def test_intro_is_cached_per_username(self):
+        backend = FakeBackend()
+        judy, viktor = self.agent("Judy", backend), self.agent("Viktor", backend)
+        self.assertIn("Judy", judy.agent_introduction())
+        self.assertIn("Viktor", viktor.agent_introduction())
+        self.assertNotIn("Judy", viktor.conversation_history.messages[0])
+        self.assertEqual(len(backend.calls), 2)
+
+    def test_same_user_reuses_the_cached_intro(self):
+        backend = FakeBackend()
+        first = self.agent("Judy", backend).agent_introduction()
+        self.assertEqual(self.agent("Judy", backend).agent_introduction(), first)
+        self.assertEqual(len(backend.calls), 1)
+
+    def test_entries_survive_a_restart(self):
+        judy = self.agent("Judy")
+        self.cache.put(judy, "Hi Judy")
+        self.assertEqual(IntroCache(self.directory.name).get(judy), "Hi Judy")
+        self.assertIsNone(IntroCache(self.directory.name).get(self.agent("Viktor")))
+
+    def test_key_changes_with_model_and_day(self):
+        judy = self.agent("Judy")
+        yesterday = date.today() - timedelta(days=1)
+        self.assertNotEqual(IntroCache.key(judy), IntroCache.key(judy, "llama3.2"))
+        self.assertNotEqual(IntroCache.key(judy), IntroCache.key(judy, day=yesterday))
+        self.assertTrue(IntroCache.key(judy).endswith(date.today().isoformat()))
+
+    def test_warm_generates_missing_intros_once(self):
+        backend = FakeBackend()
+        agents = [self.agent("Judy", backend), self.agent("Viktor", backend)]
+        self.assertEqual(self.cache.warm(agents, background=False), 2)
+        self.assertEqual(self.cache.warm(agents, background=False), 0)
+        self.assertTrue(os.path.exists(self.cache.path))
+        self.assertIn("Viktor", self.cache.get(agents[1]))
+
+
+if __name__ == "__main__":
+    unittest.main()
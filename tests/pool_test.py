@@ -0,0 +1,170 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from benchmarks.fake_ollama import FakeOllamaServer
+from llm.pool import OllamaClientPool
+
+MESSAGES = [{"role": "user", "content": "hello there"}]
+
+
+class OllamaClientPoolTest(unittest.TestCase):
+    def setUp(self):
+        # Stub Ollama nodes with an injected prefill delay; no token delay
+        self.servers: List[FakeOllamaServer] = [FakeOllamaServer(token_rate=0, latency=0.0).start() for _ in range(2)]
+        self.pools: List[OllamaClientPool] = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.close()
+            for host in pool.hosts:
+                # ollama.Client has no close() of its own
+                host.client._client.close()
+        for server in self.servers:
+            server.stop()
+
+    def make_pool(self, **kwargs) -> OllamaClientPool:
+        kwargs.setdefault("hedge_percentile", None)
+        kwargs.setdefault("health_interval", 0)
+        pool = OllamaClientPool([server.url for server in self.servers], **kwargs)
+        self.pools.append(pool)
+        return pool
+
+    def outstanding(self, pool: OllamaClientPool) -> List[int]:
+        return [host.outstanding for host in pool.hosts]
+
+    def chat_concurrently(self, pool: OllamaClientPool, count: int) -> None:
+        threads = [threading.Thread(target=pool.chat, args=("fake:1b", MESSAGES)) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+            # Let each request reserve its slot before the next picks a node
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+
+    def test_least_outstanding_spreads_concurrent_requests(self):
+        for server in self.servers:
+            server.latency = 0.5
+        pool = self.make_pool()
+        self.chat_concurrently(pool, 4)
+        self.assertEqual([server.requests for server in self.servers], [2, 2])
+        self.assertEqual(self.outstanding(pool), [0, 0])
+
+    def test_least_outstanding_avoids_busy_node(self):
+        self.servers[0].latency = 0.5
+        pool = self.make_pool()
+        slow = threading.Thread(target=pool.chat, args=("fake:1b", MESSAGES))
+        slow.start()
+        time.sleep(0.1)
+        for _ in range(3):
+            pool.chat("fake:1b", MESSAGES)
+        slow.join()
+        self.assertEqual([server.requests for server in self.servers], [1, 3])
+
+    def test_health_check_ejects_and_recovers_node(self):
+        pool = self.make_pool()
+        port = int(self.servers[1].url.rsplit(":", 1)[1])
+        self.servers[1].stop()
+        pool.check_health()
+        self.assertEqual([host.healthy for host in pool.hosts], [True, False])
+        for _ in range(3):
+            pool.chat("fake:1b", MESSAGES)
+        self.assertEqual(self.servers[0].requests, 3)
+
+        self.servers[1] = FakeOllamaServer(port=port, token_rate=0, latency=0.0).start()
+        pool.check_health()
+        self.assertEqual([host.healthy for host in pool.hosts], [True, True])
+        self.chat_concurrently(pool, 2)
+        self.assertGreaterEqual(self.servers[1].requests, 1)
+
+    def test_failed_requests_eject_node(self):
+        pool = self.make_pool()
+        self.servers[0].stop()
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                pool.chat("fake:1b", MESSAGES)
+        self.assertFalse(pool.hosts[0].healthy)
+        self.servers = self.servers[1:]
+        pool.chat("fake:1b", MESSAGES)
+        self.assertEqual(self.outstanding(pool), [0, 0])
+
+    def test_hedges_after_latency_percentile(self):
+        self.servers[0].latency = 1.0
+        pool = self.make_pool(hedge_percentile=95.0, min_hedge_delay=0.05)
+        for host in pool.hosts:
+            host.latencies.extend([0.1] * 10 + [0.3] * 10)
+        self.assertAlmostEqual(pool.hedge_delay(), 0.3)
+
+        start = time.monotonic()
+        response = pool.chat("fake:1b", MESSAGES)
+        elapsed = time.monotonic() - start
+        self.assertIn("hello there", response["message"]["content"])
+        self.assertGreaterEqual(elapsed, 0.3)
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual((pool.hedged, pool.hedge_wins), (1, 1))
+        # The losing request is still running on the slow node but no longer counts against it
+        self.assertEqual(self.outstanding(pool), [0, 0])
+        time.sleep(1.0)
+        self.assertEqual(self.outstanding(pool), [0, 0])
+        self.assertTrue(pool.hosts[0].healthy)
+
+    def test_no_hedge_before_threshold(self):
+        self.servers[0].latency = 0.2
+        pool = self.make_pool(hedge_percentile=95.0, min_hedge_delay=0.5)
+        pool.chat("fake:1b", MESSAGES)
+        self.assertEqual(pool.hedged, 0)
+        self.assertEqual(self.servers[1].requests, 0)
+
+    def test_executor_queue_time_does_not_trigger_hedge(self):
+        pool = self.make_pool(hedge_percentile=95.0, min_hedge_delay=0.2)
+        pool._executor.shutdown()
+        pool._executor = ThreadPoolExecutor(max_workers=1)
+        blocker = pool._executor.submit(time.sleep, 0.5)
+        start = time.monotonic()
+        pool.chat("fake:1b", MESSAGES)
+        self.assertGreaterEqual(time.monotonic() - start, 0.5)
+        self.assertTrue(blocker.done())
+        self.assertEqual(pool.hedged, 0)
+        self.assertEqual(sum(server.requests for server in self.servers), 1)
+
+    def test_outstanding_hedges_are_capped(self):
+        for server in self.servers:
+            server.latency = 0.6
+        pool = self.make_pool(hedge_percentile=95.0, min_hedge_delay=0.1, max_hedges=1)
+        self.chat_concurrently(pool, 2)
+        self.assertEqual((pool.hedged, pool.hedges_skipped), (1, 1))
+        deadline = time.monotonic() + 2
+        while pool.hedges_in_flight and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(pool.hedges_in_flight, 0)
+        self.assertEqual(self.outstanding(pool), [0, 0])
+        self.assertIn("1 not hedged at the limit of 1", pool.show_status())
+
+    def test_stream_releases_slot_when_finished(self):
+        pool = self.make_pool()
+        chunks = list(pool.chat("fake:1b", MESSAGES, stream=True))
+        self.assertTrue(chunks[-1]["done"])
+        self.assertEqual(self.outstanding(pool), [0, 0])
+        self.assertEqual(len(pool.hosts[0].latencies) + len(pool.hosts[1].latencies), 1)
+
+    def test_stream_releases_slot_when_closed_early(self):
+        pool = self.make_pool()
+        stream = pool.chat("fake:1b", MESSAGES, stream=True)
+        next(stream)
+        self.assertEqual(sum(self.outstanding(pool)), 1)
+        stream.close()
+        self.assertEqual(self.outstanding(pool), [0, 0])
+        self.assertTrue(all(host.healthy and host.failures == 0 for host in pool.hosts))
+
+    def test_stream_never_iterated_holds_no_slot(self):
+        pool = self.make_pool()
+        stream = pool.chat("fake:1b", MESSAGES, stream=True)
+        self.assertEqual(self.outstanding(pool), [0, 0])
+        del stream
+        self.assertEqual(self.outstanding(pool), [0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
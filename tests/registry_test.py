@@ -0,0 +1,256 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from agent.registry import AgentDescriptor, AgentRegistry
+
+
+def personality(agent_id: str, first_name: str, mission: str = "") -> dict:
+    return {"agent_id": agent_id, "first_name": first_name, "last_name": "Test", "mission": mission}
+
+
+def build(details: dict) -> SimpleNamespace:
+    return SimpleNamespace(agent_id=details["agent_id"], first_name=details["first_name"],
+                           last_name=details["last_name"], mission=details["mission"], turn_lock=threading.RLock())
+
+
+class Turn:
+    """
+    Holds the turn lock of an agent on another thread, as a running turn does.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.started, self.done = threading.Event(), threading.Event()
+        self.thread = threading.Thread(target=self._run)
+
+    def _run(self):
+        with self.agent.turn_lock:
+            self.started.set()
+            self.done.wait(5)
+
+    def __enter__(self):
+        self.thread.start()
+        self.started.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+
+
+class AgentRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.evicted = []
+        self.registry = AgentRegistry(build, max_live=2, on_evict=self.evicted.append)
+        for n in range(4):
+            self.registry.register(AgentDescriptor.from_personality(personality(f"a{n}", f"Name{n}")))
+
+    def test_lookup_by_id_and_name(self):
+        self.assertEqual(self.registry.get("a1").first_name, "Name1")
+        self.assertEqual(self.registry.get_by_name("NAME2").agent_id, "a2")
+        self.assertIsNone(self.registry.get("missing"))
+        self.assertIs(self.registry.get("a1"), self.registry.get("a1"))
+        self.assertEqual(self.registry.hydrations, 2)
+
+    def test_evicts_least_recently_used_past_cap(self):
+        self.registry.get("a0")
+        self.registry.get("a1")
+        self.registry.get("a0")
+        self.registry.get("a2")
+        self.assertEqual(list(self.registry.live), ["a0", "a2"])
+        self.assertEqual([agent.agent_id for agent in self.evicted], ["a1"])
+
+    def test_replacing_live_agent_goes_through_on_evict(self):
+        old = self.registry.get("a1")
+        self.registry.register(AgentDescriptor.from_personality(personality("a1", "Renamed", "new mission")))
+        self.assertEqual(self.evicted, [old])
+        self.assertNotIn("a1", self.registry.live)
+        self.assertEqual(self.registry.get("a1").mission, "new mission")
+        self.assertEqual(self.registry.find_id("renamed"), "a1")
+        self.assertIsNone(self.registry.find_id("Name1"))
+
+    def test_replacing_pinned_agent_is_deferred(self):
+        pinned = build(personality("a1", "Name1"))
+        self.registry.add_live(pinned)
+        self.registry.register(AgentDescriptor.from_personality(personality("a1", "Name1", "new mission")))
+        self.assertIs(self.registry.get("a1"), pinned)
+        self.assertEqual(self.evicted, [])
+
+    def test_concurrent_gets_hydrate_once(self):
+        calls = []
+
+        def slow_build(details):
+            calls.append(details["agent_id"])
+            time.sleep(0.2)
+            return build(details)
+
+        self.registry.factory = slow_build
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get("a3"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, ["a3"])
+        self.assertEqual(len({id(agent) for agent in results}), 1)
+
+    def test_slow_hydration_does_not_block_other_lookups(self):
+        live = self.registry.get("a0")
+        started = threading.Event()
+
+        def slow_build(details):
+            started.set()
+            time.sleep(0.5)
+            return build(details)
+
+        self.registry.factory = slow_build
+        thread = threading.Thread(target=self.registry.get, args=("a3",))
+        thread.start()
+        started.wait()
+        start = time.monotonic()
+        self.assertIs(self.registry.get("a0"), live)
+        self.assertLess(time.monotonic() - start, 0.1)
+        thread.join()
+
+    def test_descriptor_replaced_during_hydration(self):
+        replaced = threading.Event()
+
+        def build_then_replace(details):
+            if not replaced.is_set():
+                replaced.set()
+                self.registry.register(AgentDescriptor.from_personality(personality("a3", "Name3", "new mission")))
+            return build(details)
+
+        self.registry.factory = build_then_replace
+        self.assertEqual(self.registry.get("a3").mission, "new mission")
+
+
+class AgentRegistryEvictionTest(unittest.TestCase):
+    def setUp(self):
+        self.evicted = []
+        self.registry = AgentRegistry(build, max_live=1, on_evict=self.park)
+        for n in range(3):
+            self.registry.register(AgentDescriptor.from_personality(personality(f"a{n}", f"Name{n}")))
+
+    def park(self, agent):
+        self.evicted.append(agent)
+
+    def test_on_evict_runs_outside_the_registry_lock(self):
+        self.registry.get("a0")
+        found = []
+
+        def slow_park(agent):
+            # A lookup from another thread must not wait for this save
+            thread = threading.Thread(target=lambda: found.append(self.registry.get_by_name("Name1")))
+            thread.start()
+            thread.join(1)
+            self.assertFalse(thread.is_alive())
+
+        self.registry.on_evict = slow_park
+        agent = self.registry.get("a1")
+        self.assertEqual(found, [agent])
+
+    def test_agent_mid_turn_is_not_evicted(self):
+        busy = self.registry.get("a0")
+        with Turn(busy):
+            self.registry.get("a1")
+            self.assertEqual(set(self.registry.live), {"a0", "a1"})
+            self.assertEqual(self.evicted, [])
+        self.registry.get("a2")
+        self.assertEqual(list(self.registry.live), ["a2"])
+        self.assertEqual({agent.agent_id for agent in self.evicted}, {"a0", "a1"})
+
+    def test_evicted_agent_lock_is_released(self):
+        first = self.registry.get("a0")
+        self.registry.get("a1")
+        self.assertEqual(self.evicted, [first])
+        with Turn(first):
+            pass
+
+    def test_agent_replaced_mid_turn_is_rebuilt_after_the_turn(self):
+        old = self.registry.get("a0")
+        with Turn(old):
+            self.registry.register(AgentDescriptor.from_personality(personality("a0", "Name0", "new mission")))
+            self.assertEqual(self.evicted, [])
+            self.assertIs(self.registry.live["a0"], old)
+        self.assertEqual(self.registry.get("a0").mission, "new mission")
+        self.assertEqual(self.evicted, [old])
+
+    def test_hydration_waits_for_the_evicted_agent_to_be_saved(self):
+        saving, saved = threading.Event(), threading.Event()
+        order = []
+
+        def slow_park(agent):
+            saving.set()
+            time.sleep(0.2)
+            order.append(f"saved {agent.agent_id}")
+            saved.set()
+
+        def tracked_build(details):
+            order.append(f"built {details['agent_id']}")
+            return build(details)
+
+        self.registry.get("a0")
+        self.registry.on_evict = slow_park
+        self.registry.factory = tracked_build
+        thread = threading.Thread(target=self.registry.get, args=("a1",))
+        thread.start()
+        saving.wait()
+        self.registry.max_live = 2
+        self.registry.get("a0")
+        thread.join()
+        self.assertEqual(order, ["built a1", "saved a0", "built a0"])
+
+
+class AgentRegistryMemoryTest(unittest.TestCase):
+    def setUp(self):
+        self.evicted = []
+        self.measured = []
+        self.registry = AgentRegistry(build, max_live=0, on_evict=self.evicted.append, max_bytes=250,
+                                      size_of=self.size_of)
+        for n in range(4):
+            self.registry.register(AgentDescriptor.from_personality(personality(f"a{n}", f"Name{n}")))
+
+    def size_of(self, agent) -> int:
+        self.measured.append(agent.agent_id)
+        return getattr(agent, "size", 100)
+
+    def test_evicts_past_byte_cap(self):
+        for n in range(4):
+            self.registry.get(f"a{n}")
+        self.assertEqual(list(self.registry.live), ["a2", "a3"])
+        self.assertEqual(self.registry.total_bytes, 200)
+        self.assertEqual([agent.agent_id for agent in self.evicted], ["a0", "a1"])
+
+    def test_lookup_measures_only_the_agent_looked_up(self):
+        self.registry.get("a0")
+        self.registry.get("a1")
+        self.measured.clear()
+        for _ in range(10):
+            self.registry.get("a1")
+        self.assertEqual(set(self.measured), {"a1"})
+        self.assertEqual(len(self.measured), 10)
+
+    def test_growth_seen_on_lookup_evicts_others(self):
+        first = self.registry.get("a0")
+        grown = self.registry.get("a1")
+        grown.size = 200
+        self.registry.get("a1")
+        self.assertEqual(self.evicted, [first])
+        self.assertEqual(self.registry.total_bytes, 200)
+
+    def test_live_bytes_remeasures_and_forgets_removed(self):
+        agent = self.registry.get("a0")
+        self.registry.get("a1")
+        agent.size = 50
+        self.assertEqual(self.registry.live_bytes(), 150)
+        self.registry.remove("a1")
+        self.assertEqual(self.registry.total_bytes, 50)
+        self.registry.drop_live()
+        self.assertEqual(self.registry.total_bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+from agent.router import AgentRouter, terms
+from llm.fake_backend import FakeBackend
+
+TOOL_DOCS = {
+    "get_weather": "Returns the weather forecast, temperature and rain for a city.",
+    "calculate": "Calculates the result of a mathematical expression like 2 + 3 * 4.",
+}
+PERSONALITIES = [
+    {"agent_id": "w", "first_name": "Judy", "mission": "Track the weather, storms and forecasts for any city.",
+     "personality": "Calm.", "description": "Loves the outdoors.", "tools": ["get_weather"]},
+    {"agent_id": "m", "first_name": "Viktor", "mission": "Solve maths problems and calculations.",
+     "personality": "Patient.", "description": "A ripperdoc who counts everything.", "tools": ["calculate"]},
+    {"agent_id": "n", "first_name": "Rebecca", "mission": "Follow AI news and LLM software releases.",
+     "personality": "Cheeky.", "description": "A mercenary.", "tools": []},
+]
+NAMES = {"judy": "w", "viktor": "m", "rebecca": "n"}
+
+
+class TermsTest(unittest.TestCase):
+    def test_drops_stopwords_and_plurals(self):
+        self.assertEqual(terms("What are the forecasts for cities?"), ["forecast", "citie"])
+        self.assertEqual(terms("class glass"), ["class", "glass"])
+
+    def test_numbers_and_operators(self):
+        self.assertEqual(terms("12 * 7"), ["#num", "#op", "#num"])
+
+
+class AgentRouterTest(unittest.TestCase):
+    def setUp(self):
+        self.router = AgentRouter(TOOL_DOCS, min_confidence=0.15)
+        self.router.build(PERSONALITIES)
+
+    def test_routes_by_mission_and_tools(self):
+        self.assertEqual(self.router.route("Will there be rain in Night City tomorrow?").agent_id, "w")
+        self.assertEqual(self.router.route("Please calculate 12 * 7").agent_id, "m")
+        self.assertEqual(self.router.route("Any new LLM releases?").agent_id, "n")
+
+    def test_bare_expression_matches_calculator_agent(self):
+        route = self.router.route("(3 + 4) * 12")
+        self.assertEqual(route.agent_id, "m")
+        self.assertEqual(route.method, "index")
+
+    def test_mention_wins_and_is_stripped(self):
+        route = self.router.route("@Viktor what is the weather like?", lambda name: NAMES.get(name.lower()))
+        self.assertEqual((route.agent_id, route.method, route.message), ("m", "mention", "what is the weather like?"))
+
+    def test_unknown_mention_falls_back_to_index(self):
+        route = self.router.route("@nobody weather forecast please", lambda name: NAMES.get(name.lower()))
+        self.assertEqual((route.agent_id, route.method), ("w", "index"))
+
+    def test_no_matching_terms(self):
+        route = self.router.route("zzz qqq")
+        self.assertIsNone(route.agent_id)
+        self.assertEqual(route.method, "none")
+
+    def test_candidates_are_ranked(self):
+        route = self.router.route("weather forecast")
+        scores = [score for _, score in route.candidates]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertGreater(route.confidence, 0.15)
+
+    def test_llm_tiebreak_when_not_confident(self):
+        backend = FakeBackend(replies=["2"])
+        router = AgentRouter(TOOL_DOCS, min_confidence=1.1, backend=backend, model="fake:1b")
+        router.build(PERSONALITIES)
+        route = router.route("weather and calculations")
+        self.assertEqual(route.method, "llm")
+        self.assertEqual(route.agent_id, route.candidates[1][0])
+        self.assertEqual(len(backend.calls), 1)
+
+    def test_tiebreak_reply_without_a_valid_number_keeps_index_choice(self):
+        router = AgentRouter(TOOL_DOCS, min_confidence=1.1, backend=FakeBackend(replies=["9"]), model="fake:1b")
+        router.build(PERSONALITIES)
+        route = router.route("weather and calculations")
+        self.assertEqual(route.method, "index")
+        self.assertEqual(route.agent_id, route.candidates[0][0])
+
+    def test_rebuild_replaces_index(self):
+        self.router.build(PERSONALITIES[:1])
+        self.assertEqual(self.router.agent_ids, ["w"])
+        self.assertIsNone(self.router.route("calculate 2 + 2").agent_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
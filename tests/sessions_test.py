@@ -0,0 +1,106 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from agent.agent import Agent
+from agent.registry import AgentDescriptor, AgentRegistry
+from agents.agents import AGENT_REBECCA
+from llm.fake_backend import FakeBackend
+from runtime.sessions import SessionHost, session_id
+
+
+class FakeCommunity:
+    def __init__(self):
+        self.registry = AgentRegistry(lambda details: None)
+        for agent_id in ("a0", "a1"):
+            self.registry.register(AgentDescriptor.from_personality(dict(AGENT_REBECCA, agent_id=agent_id)))
+        self.parked = []
+        self.park_delay = 0.0
+        self.events = []
+        self.sessions = SimpleNamespace(save=lambda agent: "saved")
+        self.router_stale = False
+
+    def after_fork(self, backend=None) -> None:
+        pass
+
+    def create_agent(self, details: dict, user: str) -> Agent:
+        self.events.append(f"opened {details['agent_id']}")
+        agent = Agent(details, user, "qwen3:8b", [], backend=FakeBackend())
+        agent.intro_given = True
+        return agent
+
+    def park_agent(self, agent) -> None:
+        time.sleep(self.park_delay)
+        self.parked.append(agent)
+        self.events.append(f"parked {agent.agent_id}")
+
+
+class SessionHostTest(unittest.TestCase):
+    def setUp(self):
+        self.community = FakeCommunity()
+        self.host = SessionHost(self.community, max_sessions=1)
+
+    def test_chat_opens_session(self):
+        result = self.host.chat("a0", "judy", "hello")
+        self.assertIn("You said: hello", result["response"])
+        self.assertEqual(result["session"], session_id("a0", "judy"))
+        self.assertEqual(self.host.history(result["session"])["history_entries"], 2)
+        with self.assertRaises(LookupError):
+            self.host.chat("missing", "judy", "hello")
+
+    def test_least_recently_used_session_is_parked(self):
+        self.host.chat("a0", "judy", "hello")
+        self.host.chat("a1", "judy", "hello")
+        self.assertEqual([agent.agent_id for agent in self.community.parked], ["a0"])
+        self.assertEqual(list(self.host.sessions), [session_id("a1", "judy")])
+
+    def test_turn_never_runs_on_a_session_evicted_before_its_lock_was_taken(self):
+        opened = self.host._open
+
+        def open_then_evict(agent_id, user):
+            result = opened(agent_id, user)
+            if not self.community.parked:
+                # Another request evicts the session before this one takes its lock
+                opened("a1", user)
+            return result
+
+        self.host._open = open_then_evict
+        result = self.host.chat("a0", "judy", "hello")
+        dropped = self.community.parked[0]
+        self.assertEqual(dropped.agent_id, "a0")
+        self.assertEqual(dropped.conversation_history.messages, [])
+        current = self.host.sessions[session_id("a0", "judy")]
+        self.assertIsNot(current, dropped)
+        self.assertEqual(len(current.conversation_history.messages), 2)
+        self.assertIn("You said: hello", result["response"])
+
+    def test_session_is_reopened_after_its_save(self):
+        self.host.chat("a0", "judy", "hello")
+        self.community.park_delay = 0.2
+        thread = threading.Thread(target=self.host.chat, args=("a1", "judy", "hello"))
+        thread.start()
+        while not self.host.parking:
+            time.sleep(0.005)
+        self.community.park_delay = 0.0
+        self.host.chat("a0", "judy", "again")
+        thread.join()
+        self.assertEqual(self.community.events[:4], ["opened a0", "opened a1", "parked a0", "opened a0"])
+
+    def test_closed_session_is_gone(self):
+        name = self.host.open("a0", "judy")["session"]
+        self.assertTrue(self.host.close(name)["closed"])
+        for call in (self.host.save, self.host.close, self.host.history):
+            with self.assertRaises(LookupError):
+                call(name)
+
+    def test_save_all(self):
+        self.host.max_sessions = 2
+        self.host.open("a0", "judy")
+        self.host.open("a1", "judy")
+        self.assertEqual(self.host.save_all(), 2)
+        self.assertEqual(self.host.list(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from runtime.singleflight import SingleFlight, make_key, normalize_text
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+
+    def slow(self, value, delay=0.1):
+        self.calls += 1
+        time.sleep(delay)
+        return value
+
+    def run_threads(self, count, target):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(target())) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_keys_normalize_text(self):
+        self.assertEqual(normalize_text("  What   TIME is it "), "what time is it")
+        self.assertEqual(make_key("tool", "calc", {"b": 1, "a": 2}), make_key("tool", "calc", {"a": 2, "b": 1}))
+        self.assertNotEqual(make_key("tool", "calc"), make_key("llm", "calc"))
+
+    def test_concurrent_identical_calls_run_once(self):
+        key = make_key("tool", "TimeKeeper")
+        results = self.run_threads(5, lambda: self.flight.do(key, self.slow, "12:00"))
+        self.assertEqual(results, ["12:00"] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.stats["tool"], {"calls": 5, "executions": 1, "collapsed": 4})
+        self.assertAlmostEqual(self.flight.collapse_ratio("tool"), 0.8)
+
+    def test_different_keys_run_separately(self):
+        self.flight.do(make_key("tool", "a"), self.slow, 1, 0)
+        self.flight.do(make_key("tool", "b"), self.slow, 2, 0)
+        self.assertEqual(self.calls, 2)
+
+    def test_nothing_is_cached_after_completion(self):
+        key = make_key("tool", "a")
+        self.flight.do(key, self.slow, 1, 0)
+        self.flight.do(key, self.slow, 1, 0)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.flight._inflight, {})
+
+    def test_errors_reach_every_waiter(self):
+        key = make_key("llm", "broken")
+        errors = []
+
+        def failing():
+            time.sleep(0.1)
+            raise ValueError("server down")
+
+        def call():
+            try:
+                self.flight.do(key, failing)
+            except ValueError as e:
+                errors.append(str(e))
+
+        self.run_threads(3, call)
+        self.assertEqual(errors, ["server down"] * 3)
+        self.assertEqual(self.flight._inflight, {})
+
+    def test_async_callers_join_thread_calls(self):
+        key = make_key("llm", "shared")
+        started = threading.Event()
+
+        def leader():
+            started.set()
+            return self.slow("answer", 0.2)
+
+        thread = threading.Thread(target=self.flight.do, args=(key, leader))
+        thread.start()
+        started.wait()
+
+        async def join():
+            return await asyncio.gather(*(self.flight.do_async(key, self.slow, "other") for _ in range(3)))
+
+        self.assertEqual(asyncio.run(join()), ["answer"] * 3)
+        thread.join()
+        self.assertEqual(self.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import threading
+import unittest
+
+from runtime.fanout import SHARED_RESULTS, SharedResults
+from runtime.singleflight import SingleFlight
+from toolbox.Toolbox import Toolbox
+
+
+class ToolboxTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def lookup(name: str) -> str:
+            """Looks a name up."""
+            self.calls.append(("lookup", name))
+            return f"found {name}"
+
+        def show(name: str) -> str:
+            """Shows a name."""
+            self.calls.append(("show", name))
+            return name
+
+        show.side_effects = True
+        self.toolbox = Toolbox([lookup, show], singleflight=SingleFlight())
+
+    def shared(self, tool: str, *inputs: str) -> list:
+        token = SHARED_RESULTS.set(SharedResults())
+        try:
+            return [self.toolbox.execute_tool(tool, tool_input)["tool_output"] for tool_input in inputs]
+        finally:
+            SHARED_RESULTS.reset(token)
+
+    def test_executes_tool(self):
+        self.assertEqual(self.toolbox.execute_tool("lookup", "Agent.jpg"),
+                         {"tool_choice": "lookup", "tool_input": "Agent.jpg", "tool_output": "found Agent.jpg"})
+        self.assertEqual(self.toolbox.execute_tool("missing", "x")["tool_output"], "None")
+
+    def test_identical_calls_share_a_result_within_a_broadcast(self):
+        self.assertEqual(self.shared("lookup", "agent.jpg", "agent.jpg"), ["found agent.jpg"] * 2)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_arguments_differing_in_case_are_separate_calls(self):
+        self.assertEqual(self.shared("lookup", "agent.jpg", "Agent.JPG"), ["found agent.jpg", "found Agent.JPG"])
+        self.assertEqual(len(self.calls), 2)
+
+    def test_side_effecting_tool_runs_every_call(self):
+        self.assertEqual(self.shared("show", "agent.jpg", "agent.jpg"), ["agent.jpg"] * 2)
+        self.assertEqual(self.calls, [("show", "agent.jpg")] * 2)
+
+    def test_side_effecting_tool_is_not_collapsed_in_flight(self):
+        release = threading.Event()
+
+        def slow_show(name: str) -> str:
+            """Shows a name slowly."""
+            self.calls.append(("show", name))
+            release.wait(2)
+            return name
+
+        slow_show.side_effects = True
+        self.toolbox.add_tool(slow_show)
+        threads = [threading.Thread(target=self.toolbox.execute_tool, args=("slow_show", "agent.jpg"))
+                   for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        while len(self.calls) < 2 and all(thread.is_alive() for thread in threads):
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.calls), 2)
+        self.assertNotIn("tool", self.toolbox.singleflight.stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
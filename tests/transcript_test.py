@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+
+from runtime.transcript import Transcript, TranscriptStore
+
+
+def fill(transcript: Transcript, count: int) -> None:
+    for n in range(count):
+        transcript.append("user" if n % 2 == 0 else "assistant", f"message {n} é")
+
+
+class TranscriptTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "session.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_append_numbers_entries(self):
+        transcript = Transcript(self.path, max_memory=10)
+        self.assertEqual(transcript.append("user", "Hi"), 0)
+        self.assertEqual(transcript.append("assistant", "Hello"), 1)
+        self.assertEqual(len(transcript), 2)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_spills_half_of_memory_to_file(self):
+        transcript = Transcript(self.path, max_memory=10)
+        fill(transcript, 11)
+        self.assertEqual(transcript.spilled, 6)
+        self.assertEqual(len(transcript.recent), 5)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 6)
+
+    def test_page_reads_across_file_and_memory(self):
+        transcript = Transcript(self.path, max_memory=10)
+        fill(transcript, 95)
+        self.assertLess(len(transcript.recent), 10)
+        self.assertEqual([entry["content"] for entry in transcript.page(0, 95)],
+                         [f"message {n} é" for n in range(95)])
+        self.assertEqual(transcript.page(40, 43), [
+            {"role": "user", "content": "message 40 é"},
+            {"role": "assistant", "content": "message 41 é"},
+            {"role": "user", "content": "message 42 é"},
+        ])
+        boundary = transcript.spilled
+        self.assertEqual([entry["content"] for entry in transcript.page(boundary - 2, boundary + 2)],
+                         [f"message {n} é" for n in range(boundary - 2, boundary + 2)])
+
+    def test_page_bounds_are_clamped(self):
+        transcript = Transcript(self.path, max_memory=10)
+        fill(transcript, 5)
+        self.assertEqual(len(transcript.page(-3, 100)), 5)
+        self.assertEqual(transcript.page(4, 2), [])
+        self.assertEqual(transcript.page(5, 10), [])
+
+    def test_tail(self):
+        transcript = Transcript(self.path, max_memory=4)
+        fill(transcript, 20)
+        start, entries = transcript.tail(6)
+        self.assertEqual(start, 14)
+        self.assertEqual([entry["content"] for entry in entries], [f"message {n} é" for n in range(14, 20)])
+        self.assertEqual(transcript.tail(50)[0], 0)
+
+    def test_without_path_older_entries_are_dropped(self):
+        transcript = Transcript(None, max_memory=4)
+        fill(transcript, 10)
+        self.assertEqual(len(transcript), 10)
+        self.assertEqual([entry["content"] for entry in transcript.page(0, 10)],
+                         [f"message {n} é" for n in range(transcript.spilled, 10)])
+
+    def test_clear_removes_file(self):
+        transcript = Transcript(self.path, max_memory=4)
+        fill(transcript, 10)
+        transcript.clear()
+        self.assertEqual(len(transcript), 0)
+        self.assertFalse(os.path.exists(self.path))
+        fill(transcript, 10)
+        self.assertEqual(transcript.page(0, 1)[0]["content"], "message 0 é")
+
+
+class TranscriptStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get_returns_same_transcript(self):
+        store = TranscriptStore(self.directory.name, max_memory=4)
+        self.assertIs(store.get("tab-1"), store.get("tab-1"))
+        self.assertIsNot(store.get("tab-1"), store.get("tab-2"))
+
+    def test_session_id_is_made_safe_for_a_file_name(self):
+        store = TranscriptStore(self.directory.name, max_memory=4)
+        transcript = store.get("../../etc/passwd")
+        self.assertEqual(os.path.dirname(transcript.path), self.directory.name)
+
+    def test_file_from_earlier_run_is_removed(self):
+        stale = os.path.join(self.directory.name, "tab-1.jsonl")
+        with open(stale, "w") as f:
+            f.write('{"role": "user", "content": "old"}\n')
+        TranscriptStore(self.directory.name).get("tab-1")
+        self.assertFalse(os.path.exists(stale))
+
+    def test_least_recently_used_session_is_evicted_with_its_file(self):
+        store = TranscriptStore(self.directory.name, max_memory=2, max_sessions=2)
+        first = store.get("tab-1")
+        fill(first, 5)
+        fill(store.get("tab-2"), 5)
+        store.get("tab-1")
+        store.get("tab-3")
+        self.assertEqual(list(store.transcripts), ["tab-1", "tab-3"])
+        self.assertTrue(os.path.exists(first.path))
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "tab-2.jsonl")))
+
+    def test_drop_and_close_remove_files(self):
+        store = TranscriptStore(self.directory.name, max_memory=2)
+        fill(store.get("tab-1"), 5)
+        fill(store.get("tab-2"), 5)
+        store.drop("tab-1")
+        store.drop("tab-unknown")
+        self.assertEqual(os.listdir(self.directory.name), ["tab-2.jsonl"])
+        store.close()
+        self.assertEqual(os.listdir(self.directory.name), [])
+        self.assertEqual(len(store.transcripts), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
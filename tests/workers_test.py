@@ -0,0 +1,98 @@
+import os
+import signal
+import time
+import unittest
+from collections import Counter
+
+from runtime.sessions import session_id
+from runtime.workers import HashRing, WorkerPool, decode, encode
+from tests.sessions_test import FakeCommunity
+
+KEYS = [f"session-{n}" for n in range(4000)]
+
+
+class HashRingTest(unittest.TestCase):
+    def test_mapping_is_deterministic(self):
+        first, second = HashRing([0, 1, 2, 3]), HashRing([3, 2, 1, 0])
+        self.assertEqual([first.node_for(key) for key in KEYS], [second.node_for(key) for key in KEYS])
+
+    def test_keys_spread_over_every_node(self):
+        counts = Counter(HashRing([0, 1, 2, 3]).node_for(key) for key in KEYS)
+        self.assertEqual(set(counts), {0, 1, 2, 3})
+        for count in counts.values():
+            self.assertGreater(count, len(KEYS) / 4 * 0.5)
+            self.assertLess(count, len(KEYS) / 4 * 1.5)
+
+    def test_adding_a_node_only_moves_keys_to_it(self):
+        before, after = HashRing([0, 1, 2, 3]), HashRing([0, 1, 2, 3, 4])
+        moved = [key for key in KEYS if before.node_for(key) != after.node_for(key)]
+        self.assertTrue(all(after.node_for(key) == 4 for key in moved))
+        self.assertGreater(len(moved), len(KEYS) / 5 * 0.5)
+        self.assertLess(len(moved), len(KEYS) / 5 * 1.5)
+
+    def test_single_node_owns_everything(self):
+        ring = HashRing([7], replicas=1)
+        self.assertEqual({ring.node_for(key) for key in KEYS[:100]}, {7})
+
+
+class FrameTest(unittest.TestCase):
+    def test_round_trip(self):
+        message = [12, "chat", ["session-1", "Hello, Judy!", {"images": [], "score": 0.5}], None, True]
+        self.assertEqual(decode(encode(message)), message)
+
+    def test_encodes_to_bytes(self):
+        self.assertIsInstance(encode({"op": "stats"}), bytes)
+
+
+def parent_pid(pid: int) -> int:
+    with open(f"/proc/{pid}/stat") as f:
+        return int(f.read().rsplit(")", 1)[1].split()[1])
+
+
+@unittest.skipUnless(hasattr(os, "fork") and os.path.exists("/proc/self/stat"), "needs fork and /proc")
+class WorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(FakeCommunity(), workers=2, threads=2).start()
+
+    def tearDown(self):
+        self.pool.stop(5)
+
+    def chat(self, user: str, message: str) -> dict:
+        return self.pool.submit(session_id("a0", user), "chat", "a0", user, message).result(10)
+
+    def test_sessions_answer_on_their_worker(self):
+        self.assertIn("You said: hello", self.chat("judy", "hello")["response"])
+        stats = [future.result(10) for future in self.pool.broadcast("stats")]
+        self.assertEqual(sorted(stat["worker"] for stat in stats), [0, 1])
+        self.assertEqual(sum(stat["sessions"] for stat in stats), 1)
+
+    def test_workers_are_forked_by_the_spawner(self):
+        for process in self.pool.processes:
+            self.assertEqual(parent_pid(process.pid), self.pool.spawner.pid)
+
+    def test_dead_worker_is_restarted_from_the_spawner(self):
+        self.chat("judy", "hello")
+        index = self.pool.worker_for(session_id("a0", "judy"))
+        old = self.pool.processes[index]
+        os.kill(old.pid, signal.SIGKILL)
+        deadline = time.monotonic() + 5
+        while self.pool.connections[index] is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(old.is_alive())
+        result = self.chat("judy", "again")
+        self.assertIn("You said: again", result["response"])
+        self.assertEqual(result["history_entries"], 2)
+        self.assertEqual(self.pool.restarts, 1)
+        restarted = self.pool.processes[index]
+        self.assertNotEqual(restarted.pid, old.pid)
+        self.assertEqual(parent_pid(restarted.pid), self.pool.spawner.pid)
+
+    def test_stop_ends_workers_and_spawner(self):
+        processes = list(self.pool.processes)
+        self.pool.stop(5)
+        self.assertFalse(any(process.is_alive() for process in processes))
+        self.assertFalse(self.pool.spawner.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
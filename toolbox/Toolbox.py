@@ -1,23 +1,42 @@
 import logging
+from functools import lru_cache
 from typing import Optional, List
+from runtime.fanout import SHARED_RESULTS
+from runtime.singleflight import SingleFlight, make_key
+from runtime.metrics import REGISTRY
+from runtime.logs import Payload
 
 logger = logging.getLogger(__name__)
+payload_logger = logging.getLogger(f"{__name__}.payload")
+
+
+@lru_cache(maxsize=32)
+def describe_tools(tools: tuple) -> str:
+    """
+    Renders the descriptions of a tool set, once per distinct set for all agents.
+    """
+    toolbox_dict = {tool.__name__: tool.__doc__.strip() for tool in tools}
+    return "\n".join([f"{name}: {doc}" for name, doc in toolbox_dict.items()])
+
 
 class Toolbox:
     """
     Toolbox class that contains all tools.
     """
 
-    def __init__(self, tools: Optional[List[callable]] = None):
+    def __init__(self, tools: Optional[List[callable]] = None, singleflight: Optional[SingleFlight] = None):
         """
         Initialize a new Toolbox instance.
         
         Args:
             tools (Optional[List[callable]]): Initial list of tools to add to the toolbox.
                 If None, starts with an empty toolbox.
+            singleflight (Optional[SingleFlight]): Shared deduplication of identical concurrent tool calls.
+                If None, every call runs the tool.
         """
         self.toolbox = []
         self.custom_tools = {}
+        self.singleflight = singleflight
         if tools:
             self.add_tools(tools)
         logger.debug(f"Toolbox initialized with tools: {self.toolbox}")
@@ -70,8 +89,7 @@ class Toolbox:
         Returns:
             str: A formatted string containing all tool descriptions.
         """
-        toolbox_dict = {tool.__name__: tool.__doc__.strip() for tool in self.toolbox}
-        return "\n".join([f"{name}: {doc}" for name, doc in toolbox_dict.items()])
+        return describe_tools(tuple(self.toolbox))
 
     def get_tool_list(self) -> str:
         """
@@ -95,7 +113,7 @@ class Toolbox:
             bool: True if the tool exists, False otherwise
         """
         exists = tool_choice in [tool.__name__ for tool in self.toolbox]
-        logger.debug(f"Tool {tool_choice} {'found' if exists else 'not found'} in the toolbox.")
+        logger.debug("Tool %s %s in the toolbox.", tool_choice, "found" if exists else "not found")
         return exists
         
     def __len__(self) -> int:
@@ -120,16 +138,28 @@ class Toolbox:
         """
         for tool in self.toolbox:
             if tool.__name__ == tool_choice:
-                logger.debug(f"Executing tool {tool_choice} with input: {tool_input}")
+                payload_logger.debug("Executing tool %s with input: %s", tool_choice, Payload(tool_input))
                 try:
                     # Check if the tool requires input
                     if tool_input and tool_input != "None":
                         # If the tool requires input, pass it to the tool
-                        tool_output = tool(tool_input)
+                        args = (tool_input,)
                     else:
                         # If the tool doesn't require input, call it without arguments
-                        tool_output = tool()
-                    logger.debug(f"Executed tool {tool_choice} with output: {tool_output}")
+                        args = ()
+                    with REGISTRY.span("tool", tool=tool_choice):
+                        # Exact arguments: a file name or path that differs only in case is another call
+                        key = make_key("tool", tool_choice, *args)
+                        shared = SHARED_RESULTS.get()
+                        if getattr(tool, "side_effects", False):
+                            # Every call of a tool that changes something has to run
+                            tool_output = tool(*args)
+                        elif shared is not None:
+                            # Agents answering the same broadcast reuse each other's tool results
+                            tool_output = shared.do(key, self._run_tool, key, tool, args)
+                        else:
+                            tool_output = self._run_tool(key, tool, args)
+                    payload_logger.debug("Executed tool %s with output: %s", tool_choice, Payload(tool_output))
                     return {"tool_choice": tool_choice, "tool_input": tool_input, "tool_output": tool_output}
                 except TypeError as e:
                     logger.error(f"Error executing tool {tool_choice}: {str(e)}")
@@ -138,3 +168,11 @@ class Toolbox:
         # Fallback if for some reason the tool wasn't executed.
         logger.debug("Tool not executed. Returning default response.")
         return {"tool_choice": "None", "tool_input": "None", "tool_output": "None"}
+
+    def _run_tool(self, key, tool, args: tuple):
+        """
+        Runs a tool, sharing the execution with identical calls in flight in other sessions.
+        """
+        if self.singleflight:
+            return self.singleflight.do(key, tool, *args)
+        return tool(*args)
@@ -1,90 +1,91 @@
-import os
-import sys
+import re
 import logging
 from pathlib import Path
-from typing import List, Optional
+
+from runtime.image_catalog import ImageCatalog, IMAGE_EXTENSIONS
 
 
 logger = logging.getLogger(__name__)
 
-def list_images() -> str:
+# The project's images directory, two levels up from this file, indexed once for all calls
+IMAGES_DIRECTORY = Path(__file__).resolve().parent.parent / "images"
+IMAGE_CATALOG = ImageCatalog(str(IMAGES_DIRECTORY))
+IMAGES_PER_PAGE = 50
+
+
+def list_images(query: str = "") -> str:
     """
-    Lists all image files in the project's images directory.
-    
+    Lists the image files in the project's images directory, 50 per page.
+    Optional input: part of a name or a pattern like "*.png" to filter by, and/or "page N" for later pages.
+
     Returns:
         str: A formatted string containing the list of images
     """
     try:
-        # Get the project root directory (two levels up from the current file)
-        project_root = Path(__file__).resolve().parent.parent
-        images_directory = project_root / "images"
-        
-        # Debug output
-        logger.debug(f"Project root: {project_root}")
-        logger.debug(f"Images directory: {images_directory}")
-        
-        if not images_directory.exists():
+        if not IMAGE_CATALOG.exists():
             return "The images directory does not exist."
-            
-        # List all image files
-        image_files = [
-            f for f in images_directory.iterdir() 
-            if f.is_file() and f.suffix.lower() in ['.png', '.jpg', '.jpeg', '.gif']
-        ]
-        
-        if not image_files:
+
+        match = re.search(r"\bpage\s+(\d+)\b", query, re.IGNORECASE)
+        page = int(match.group(1)) if match else 1
+        pattern = (query[:match.start()] + query[match.end():] if match else query).strip()
+        names, total = IMAGE_CATALOG.list(pattern, page, IMAGES_PER_PAGE)
+
+        if not total:
+            if pattern:
+                return f"No images matching {pattern} found in the images directory."
             return "No images found in the images directory."
-            
+        pages = (total + IMAGES_PER_PAGE - 1) // IMAGES_PER_PAGE
+        if not names:
+            return f"There is no page {page}; the images fill {pages} page{'s' if pages > 1 else ''}."
+
         # Format the output
-        result = "Available images:\n"
-        for image_file in image_files:
-            result += f"- {image_file.name}\n"
-        return result
-        
+        header = "Available images:"
+        if pages > 1:
+            header = f"Available images (page {max(1, page)} of {pages}, {total} in all):"
+        return "\n".join([header] + [f"- {name}" for name in names]) + "\n"
+
     except Exception as e:
         return f"Error listing images: {str(e)}"
 
-if __name__ == "__main__":
-    print(list_images())
 
 def change_image(imagename: str) -> str:
     """
     Changes the displayed image from the project's images directory.
-    
+
     Args:
         imagename: Name of the image file to find
-        
+
     Returns:
         str: The name of the image file if found, error message if not
     """
     try:
-        # Get the project root directory (two levels up from the current file)
-        project_root = Path(__file__).resolve().parent.parent
-        images_directory = project_root / "images"
-        image_path = images_directory / imagename
-        
-        # Debug output
-        logger.debug(f"Looking for image: {image_path}")
-        
-        # Check if the image exists
-        if not image_path.exists():
-            logger.error(f"Image not found: {imagename}")
-            return f"Image {imagename} not found in the images directory."
-            
+        logger.debug(f"Looking for image: {imagename}")
+
         # Verify it's an image file
-        if image_path.suffix.lower() not in ['.png', '.jpg', '.jpeg', '.gif']:
+        if Path(imagename.strip()).suffix.lower() not in IMAGE_EXTENSIONS:
             logger.error(f"Invalid image type: {imagename}")
             return f"File {imagename} is not a valid image type."
-            
-        logger.debug(f"Image found: {imagename}")
-        return imagename
-        
+
+        # Only names in the catalog are accepted, so the input can't point outside the directory
+        name = IMAGE_CATALOG.find(imagename)
+        if name is None:
+            logger.error(f"Image not found: {imagename}")
+            return f"Image {imagename} not found in the images directory."
+
+        logger.debug(f"Image found: {name}")
+        return name
+
     except Exception as e:
         logger.error(f"Error changing image: {str(e)}")
         return f"Error changing image: {str(e)}"
 
+
+# Changes the displayed image, so calls are never shared or deduplicated
+change_image.side_effects = True
+
+
 if __name__ == "__main__":
+    print(list_images())
     print(change_image("agent2.jpg"))
     print(change_image("agent.jpg"))
     print(change_image("agent3.jpg"))
-